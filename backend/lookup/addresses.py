@@ -0,0 +1,462 @@
+"""
+US address normalization and the PropertyRecord lookups behind address_search.
+
+normalize_address() rewrites a street, city, state and ZIP into the USPS
+standard form of Publication 28: upper case, no punctuation, standard
+suffix, directional and secondary unit abbreviations, two-letter state
+codes and a 5-digit ZIP, so "123 north Main Street, Apt. #4" and
+"123 N MAIN ST APT 4" are the same address. The pieces are recognized by
+position, the way the USPS parses a delivery line:
+
+    number  predirectional  street name  suffix  postdirectional  unit
+
+A word from the tables only counts where it can stand, so "North" in
+"123 North St" stays the street name and "Park" in "123 Park Ave" is not
+a suffix.
+
+PropertyRecord rows are stored under the normalized address, so looking
+one up is an index seek on (address_key, zip_code), or on (zip_code,
+street) when the ZIP is known but the city is spelled differently. The
+search views build their cache keys from the normalized address too.
+"""
+import logging
+import math
+import random
+import re
+import unicodedata
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from django.db import DatabaseError
+
+from .models import PropertyRecord
+from .people import US_STATES, state_key
+
+logger = logging.getLogger(__name__)
+
+# Street suffixes (Publication 28, appendix C1): standard abbreviation and
+# the spellings that map to it
+_SUFFIX_SPELLINGS = {
+    'ALY': ['ALLEY', 'ALLEE', 'ALLY'],
+    'ANX': ['ANNEX', 'ANEX', 'ANNX'],
+    'ARC': ['ARCADE'],
+    'AVE': ['AVENUE', 'AV', 'AVEN', 'AVENU', 'AVN', 'AVNUE'],
+    'BCH': ['BEACH'],
+    'BND': ['BEND'],
+    'BLF': ['BLUFF', 'BLUF'],
+    'BLVD': ['BOULEVARD', 'BOUL', 'BOULV'],
+    'BR': ['BRANCH', 'BRNCH'],
+    'BRG': ['BRIDGE', 'BRDGE'],
+    'BRK': ['BROOK'],
+    'BTM': ['BOTTOM', 'BOT', 'BOTTM'],
+    'BYP': ['BYPASS', 'BYPA', 'BYPAS', 'BYPS'],
+    'CIR': ['CIRCLE', 'CIRC', 'CIRCL', 'CRCL', 'CRCLE'],
+    'CLF': ['CLIFF'],
+    'CLFS': ['CLIFFS'],
+    'CMN': ['COMMON'],
+    'COR': ['CORNER'],
+    'CORS': ['CORNERS'],
+    'CP': ['CAMP', 'CMP'],
+    'CPE': ['CAPE'],
+    'CRES': ['CRESCENT', 'CRSENT', 'CRSNT'],
+    'CRK': ['CREEK'],
+    'CRSE': ['COURSE'],
+    'CSWY': ['CAUSEWAY', 'CAUSWA'],
+    'CT': ['COURT'],
+    'CTR': ['CENTER', 'CEN', 'CENT', 'CENTR', 'CENTRE', 'CNTER', 'CNTR'],
+    'CTS': ['COURTS'],
+    'CURV': ['CURVE'],
+    'CV': ['COVE'],
+    'CYN': ['CANYON', 'CANYN', 'CNYN'],
+    'DL': ['DALE'],
+    'DR': ['DRIVE', 'DRIV', 'DRV'],
+    'EST': ['ESTATE'],
+    'ESTS': ['ESTATES'],
+    'EXPY': ['EXPRESSWAY', 'EXP', 'EXPR', 'EXPRESS', 'EXPW'],
+    'EXT': ['EXTENSION', 'EXTN', 'EXTNSN'],
+    'FLD': ['FIELD'],
+    'FLDS': ['FIELDS'],
+    'FLS': ['FALLS'],
+    'FRD': ['FORD'],
+    'FRST': ['FOREST', 'FORESTS'],
+    'FRY': ['FERRY', 'FRRY'],
+    'FWY': ['FREEWAY', 'FREEWY', 'FRWAY', 'FRWY'],
+    'GDN': ['GARDEN', 'GARDN', 'GRDEN', 'GRDN'],
+    'GDNS': ['GARDENS', 'GRDNS'],
+    'GLN': ['GLEN'],
+    'GRN': ['GREEN'],
+    'GRV': ['GROVE', 'GROV'],
+    'GTWY': ['GATEWAY', 'GATEWY', 'GATWAY', 'GTWAY'],
+    'HBR': ['HARBOR', 'HARB', 'HARBR', 'HRBOR'],
+    'HL': ['HILL'],
+    'HLS': ['HILLS'],
+    'HOLW': ['HOLLOW', 'HLLW', 'HOLLOWS', 'HOLWS'],
+    'HTS': ['HEIGHTS', 'HT'],
+    'HVN': ['HAVEN'],
+    'HWY': ['HIGHWAY', 'HIGHWY', 'HIWAY', 'HIWY', 'HWAY'],
+    'IS': ['ISLAND', 'ISLND'],
+    'JCT': ['JUNCTION', 'JCTION', 'JCTN', 'JUNCTN', 'JUNCTON'],
+    'KNL': ['KNOLL', 'KNOL'],
+    'KY': ['KEY'],
+    'LDG': ['LODGE', 'LDGE', 'LODG'],
+    'LK': ['LAKE'],
+    'LKS': ['LAKES'],
+    'LN': ['LANE'],
+    'LNDG': ['LANDING', 'LNDNG'],
+    'LOOP': ['LOOPS'],
+    'MALL': [],
+    'MDWS': ['MEADOWS', 'MDW', 'MEDOWS'],
+    'ML': ['MILL'],
+    'MNR': ['MANOR'],
+    'MSN': ['MISSION', 'MISSN', 'MSSN'],
+    'MT': ['MOUNT', 'MNT'],
+    'MTN': ['MOUNTAIN', 'MNTAIN', 'MNTN', 'MOUNTIN', 'MTIN'],
+    'OPAS': ['OVERPASS'],
+    'ORCH': ['ORCHARD', 'ORCHRD'],
+    'OVAL': ['OVL'],
+    'PARK': ['PRK', 'PARKS'],
+    'PASS': [],
+    'PATH': ['PATHS'],
+    'PIKE': ['PIKES'],
+    'PKWY': ['PARKWAY', 'PARKWY', 'PKWAY', 'PKY', 'PARKWAYS', 'PKWYS'],
+    'PL': ['PLACE'],
+    'PLN': ['PLAIN'],
+    'PLNS': ['PLAINS'],
+    'PLZ': ['PLAZA', 'PLZA'],
+    'PNE': ['PINE'],
+    'PR': ['PRAIRIE', 'PRR'],
+    'PRT': ['PORT'],
+    'PT': ['POINT'],
+    'PTS': ['POINTS'],
+    'RD': ['ROAD'],
+    'RDG': ['RIDGE', 'RDGE'],
+    'RIV': ['RIVER', 'RVR', 'RIVR'],
+    'RNCH': ['RANCH', 'RANCHES', 'RNCHS'],
+    'ROW': [],
+    'RTE': ['ROUTE'],
+    'RUN': [],
+    'SHR': ['SHORE', 'SHOAR'],
+    'SKWY': ['SKYWAY'],
+    'SMT': ['SUMMIT', 'SUMIT', 'SUMITT'],
+    'SPG': ['SPRING', 'SPNG', 'SPRNG'],
+    'SQ': ['SQUARE', 'SQR', 'SQRE', 'SQU'],
+    'ST': ['STREET', 'STRT', 'STR'],
+    'STA': ['STATION', 'STATN', 'STN'],
+    'TER': ['TERRACE', 'TERR'],
+    'TPKE': ['TURNPIKE', 'TRNPK', 'TURNPK'],
+    'TRCE': ['TRACE', 'TRACES'],
+    'TRL': ['TRAIL', 'TRAILS', 'TRLS'],
+    'TUNL': ['TUNNEL', 'TUNEL', 'TUNLS', 'TUNNELS', 'TUNNL'],
+    'UN': ['UNION'],
+    'VIS': ['VISTA', 'VIST', 'VST', 'VSTA'],
+    'VL': ['VILLE'],
+    'VLG': ['VILLAGE', 'VILL', 'VILLAG', 'VILLG', 'VILLIAGE'],
+    'VLY': ['VALLEY', 'VALLY', 'VLLY'],
+    'VW': ['VIEW'],
+    'WALK': [],
+    'WAY': ['WY'],
+    'WL': ['WELL'],
+    'XING': ['CROSSING', 'CRSSNG'],
+    'XRD': ['CROSSROAD'],
+}
+STREET_SUFFIXES = {
+    spelling: standard
+    for standard, spellings in _SUFFIX_SPELLINGS.items()
+    for spelling in [standard] + spellings
+}
+
+DIRECTIONALS = {
+    'NORTH': 'N', 'SOUTH': 'S', 'EAST': 'E', 'WEST': 'W',
+    'NORTHEAST': 'NE', 'NORTHWEST': 'NW', 'SOUTHEAST': 'SE', 'SOUTHWEST': 'SW',
+}
+DIRECTIONALS.update({standard: standard for standard in list(DIRECTIONALS.values())})
+
+# Secondary unit designators (appendix C2): standard abbreviation and
+# whether a number or letter follows it
+_UNIT_SPELLINGS = {
+    ('APT', True): ['APARTMENT'],
+    ('BLDG', True): ['BUILDING'],
+    ('BSMT', False): ['BASEMENT'],
+    ('DEPT', True): ['DEPARTMENT'],
+    ('FL', True): ['FLOOR'],
+    ('FRNT', False): ['FRONT'],
+    ('HNGR', True): ['HANGAR'],
+    ('LBBY', False): ['LOBBY'],
+    ('LOT', True): [],
+    ('LOWR', False): ['LOWER'],
+    ('OFC', False): ['OFFICE'],
+    ('PH', False): ['PENTHOUSE'],
+    ('REAR', False): [],
+    ('RM', True): ['ROOM'],
+    ('SPC', True): ['SPACE'],
+    ('STE', True): ['SUITE'],
+    ('TRLR', True): ['TRAILER'],
+    ('UNIT', True): [],
+    ('UPPR', False): ['UPPER'],
+    ('#', True): [],
+}
+UNIT_DESIGNATORS = {
+    spelling: designator
+    for designator, spellings in _UNIT_SPELLINGS.items()
+    for spelling in [designator[0]] + spellings
+}
+
+# City words written the way the USPS city list writes them
+_CITY_WORDS = {'SAINT': 'ST', 'SAINTE': 'STE', 'FORT': 'FT', 'MOUNT': 'MT'}
+
+_DROPPED = re.compile(r"['’`.]")
+# Hyphens and slashes are kept inside numbers ("123-45", "1/2", "4-B")
+_SEPARATORS = re.compile(r'(?<![0-9])[-/]|[-/](?![0-9A-Z])|[^A-Z0-9#/-]+')
+_HOUSE_NUMBER = re.compile(r'^(\d[0-9A-Z/-]*|[NSEW]\d+[NSEW]\d+)$')
+_FRACTION = re.compile(r'^\d/\d$')
+# "APT4", "STE200"
+_ATTACHED_UNIT = re.compile(r'^([A-Z]+)(\d[0-9A-Z-]*)$')
+
+
+class NormalizedAddress(NamedTuple):
+    number: str
+    predirectional: str
+    street_name: str
+    suffix: str
+    postdirectional: str
+    unit: str
+    city: str
+    state: str
+    zip_code: str
+    zip_plus4: str
+
+    @property
+    def street(self) -> str:
+        """Delivery line: '123 N MAIN ST APT 4'"""
+        parts = (self.number, self.predirectional, self.street_name, self.suffix,
+                 self.postdirectional, self.unit)
+        return ' '.join(part for part in parts if part)
+
+    @property
+    def key(self) -> str:
+        """PropertyRecord.address_key: '123 N MAIN ST APT 4|SPRINGFIELD|IL'"""
+        return f"{self.street}|{self.city}|{self.state}"
+
+    @property
+    def formatted(self) -> str:
+        formatted = f"{self.street}, {self.city}, {self.state}"
+        return f"{formatted} {self.zip_code}" if self.zip_code else formatted
+
+
+def _tokens(value: Optional[str]) -> List[str]:
+    """Upper-case ASCII words of value, '#' split off as its own word"""
+    decomposed = unicodedata.normalize('NFKD', value or '')
+    text = ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).upper()
+    text = _DROPPED.sub('', text).replace('#', ' # ')
+    return _SEPARATORS.sub(' ', text).split()
+
+
+def _split_unit(tokens: List[str]) -> Tuple[List[str], str]:
+    """(street tokens, standard unit) for the tokens after the house number"""
+    # The street name needs at least one word, so a unit starts at index 1
+    for position in range(1, len(tokens)):
+        token = tokens[position]
+        designator = UNIT_DESIGNATORS.get(token)
+        value = tokens[position + 1:]
+        if designator is None:
+            attached = _ATTACHED_UNIT.match(token)
+            if attached is None or not UNIT_DESIGNATORS.get(attached.group(1), ('', False))[1]:
+                continue
+            designator = UNIT_DESIGNATORS[attached.group(1)]
+            value = [attached.group(2)] + value
+        standard, ranged = designator
+        if not ranged and value:
+            # "Front", "Lower" and the like only count as the last word
+            continue
+        if ranged and value and value[0] == '#':
+            # "Apt #4"
+            value = value[1:]
+        return tokens[:position], ' '.join([standard] + value)
+    return tokens, ''
+
+
+def normalize_street(value: Optional[str]) -> Tuple[str, str, str, str, str, str]:
+    """
+    Split a delivery line into standard parts.
+
+    Args:
+        value: Street address, e.g. "123 north Main Street, Apt. #4"
+
+    Returns:
+        (number, predirectional, street name, suffix, postdirectional, unit),
+        e.g. ('123', 'N', 'MAIN', 'ST', '', 'APT 4'); parts that are not
+        there are ''
+    """
+    tokens = _tokens(value)
+    number = ''
+    if len(tokens) > 1 and _HOUSE_NUMBER.match(tokens[0]):
+        number = tokens.pop(0)
+        if len(tokens) > 1 and _FRACTION.match(tokens[0]):
+            number += ' ' + tokens.pop(0)
+
+    tokens, unit = _split_unit(tokens)
+    predirectional = suffix = postdirectional = ''
+    if len(tokens) > 1 and tokens[-1] in DIRECTIONALS:
+        postdirectional = DIRECTIONALS[tokens.pop()]
+    if len(tokens) > 1 and tokens[-1] in STREET_SUFFIXES:
+        suffix = STREET_SUFFIXES[tokens.pop()]
+    if len(tokens) > 1 and tokens[0] in DIRECTIONALS:
+        predirectional = DIRECTIONALS[tokens.pop(0)]
+    return number, predirectional, ' '.join(tokens), suffix, postdirectional, unit
+
+
+def normalize_city(value: Optional[str]) -> str:
+    """'Saint Louis' -> 'ST LOUIS'"""
+    return ' '.join(_CITY_WORDS.get(token, token) for token in _tokens(value) if token != '#')
+
+
+def normalize_state(value: Optional[str]) -> str:
+    """'New York' or 'ny' -> 'NY'; unknown states are upper-cased"""
+    return state_key(value).upper()
+
+
+def normalize_zip(value: Optional[str]) -> Tuple[str, str]:
+    """
+    (ZIP, ZIP+4 add-on) from a ZIP or ZIP+4 code.
+
+    ZIP codes that lost their leading zeros in a spreadsheet ('2134') are
+    padded back; anything else that is not 5 or 9 digits gives ('', '').
+    """
+    digits = ''.join(ch for ch in value or '' if ch.isdigit())
+    if len(digits) == 9:
+        return digits[:5], digits[5:]
+    if 3 <= len(digits) <= 5:
+        return digits.zfill(5), ''
+    return '', ''
+
+
+def normalize_address(street: Optional[str], city: Optional[str], state: Optional[str],
+                      zip_code: Optional[str] = '') -> NormalizedAddress:
+    """USPS standard form of an address; see the module docstring"""
+    zip5, plus4 = normalize_zip(zip_code)
+    return NormalizedAddress(
+        *normalize_street(street),
+        city=normalize_city(city),
+        state=normalize_state(state),
+        zip_code=zip5,
+        zip_plus4=plus4,
+    )
+
+
+def find_property(address: NormalizedAddress) -> Optional[PropertyRecord]:
+    """
+    The PropertyRecord at a normalized address, if there is one.
+
+    With a ZIP code, a record under the same street and ZIP is accepted
+    when the city doesn't match (a vanity or misspelled city name).
+    """
+    if not address.street:
+        return None
+    records = PropertyRecord.objects.all()
+    try:
+        if not address.zip_code:
+            return records.filter(address_key=address.key).first()
+        record = records.filter(address_key=address.key, zip_code=address.zip_code).first()
+        if record is None:
+            record = records.filter(zip_code=address.zip_code, street=address.street, state=address.state).first()
+        return record
+    except DatabaseError as e:
+        logger.error(f"Property lookup failed: {e}")
+        return None
+
+
+# Synthetic data for load_property_records --synthetic and benchmark_address_search
+
+_STREET_NAMES = (
+    'Main', 'Oak', 'Maple', 'Cedar', 'Elm', 'Washington', 'Walnut', 'Chestnut', 'Lincoln',
+    'Jefferson', 'Franklin', 'Madison', 'Jackson', 'Hickory', 'Willow', 'Sunset', 'Church',
+    'School', 'High', 'Broad', 'Central', 'Dogwood', 'Magnolia', 'Laurel', 'Juniper', 'Sycamore',
+    'Birch', 'Aspen', 'Poplar', 'Cherry', 'Holly', 'Adams', 'Monroe', 'Wilson', 'Harrison',
+    'Grant', 'Johnson', 'Columbia', 'Liberty', 'Market', 'Water', 'Railroad', 'King', 'Queen',
+    'Prospect', 'Pleasant', 'Garfield', 'Hamilton', 'Spruce', 'Locust', 'Mulberry', 'Vine',
+    'Fairview', 'Highland', 'Riverside', 'Lakeview', 'Meadow', 'Jones', 'Smith',
+)
+_STREET_TYPES = ('ST', 'AVE', 'RD', 'DR', 'LN', 'CT', 'BLVD', 'PL', 'WAY', 'CIR', 'PKWY', 'TER')
+_CITY_PREFIXES = ('Spring', 'River', 'Oak', 'Green', 'Fair', 'Lake', 'Maple', 'Clear', 'Cedar',
+                  'Red', 'Glen', 'Rock', 'Stone', 'Sun', 'Pleasant', 'Brook', 'Ash', 'Elm',
+                  'Silver', 'Bay', 'Saint', 'Fort', 'Mount', 'New', 'Port')
+_CITY_ENDINGS = ('field', 'ville', 'ton', 'wood', 'dale', 'port', 'view', 'brook', 'burg',
+                 ' Springs', ' Falls', ' City', ' Heights', ' Grove', ' Hills')
+_PROPERTY_TYPES = ('Single Family Home', 'Single Family Home', 'Single Family Home',
+                   'Townhouse', 'Condominium', 'Multi-Family')
+
+
+def _ordinal(number: int) -> str:
+    suffix = 'th' if 10 <= number % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(number % 10, 'th')
+    return f"{number}{suffix}"
+
+
+def _spelling(rng: random.Random, standard: str, spellings: Dict[str, List[str]]) -> str:
+    """standard or a full spelling of it, in title case, sometimes with a period"""
+    choices = [standard] + spellings.get(standard, [])[:1]
+    word = rng.choice(choices).title()
+    return word + '.' if word.upper() == standard and rng.random() < 0.2 else word
+
+
+def synthetic_properties(count: int, seed: int = 1) -> Iterator[Dict[str, object]]:
+    """
+    Generate unique property records with inconsistently written addresses.
+
+    Suffixes and directionals are spelled out or abbreviated, units are
+    written "Apt 4", "#4" or "Apartment 4" and states as codes or names,
+    as in data collected from several sources.
+    """
+    rng = random.Random(seed)
+    reserved = STREET_SUFFIXES.keys() | DIRECTIONALS.keys() | UNIT_DESIGNATORS.keys()
+    streets = [name for name in _STREET_NAMES if name.upper() not in reserved]
+    streets += [_ordinal(number) for number in range(1, 100)]
+    cities = [prefix + ending for prefix in _CITY_PREFIXES for ending in _CITY_ENDINGS]
+    states = sorted(US_STATES.items())
+    directions = ('N', 'S', 'E', 'W')
+    suffix_names = {standard: spellings for standard, spellings in _SUFFIX_SPELLINGS.items()}
+    direction_names = {abbr: [name] for name, abbr in DIRECTIONALS.items() if name != abbr}
+
+    # A segment is one street in one town; every town has its own four ZIP
+    # codes. Stepping through the segments with a stride coprime to their
+    # number visits each once before any gets a second house number.
+    towns = len(cities) * len(states)
+    segments = towns * len(streets)
+    stride = 7919
+    while math.gcd(stride, segments) != 1:
+        stride += 2
+    for index in range(count):
+        segment = index * stride % segments
+        town, street = divmod(segment, len(streets))
+        city, state = divmod(town, len(states))
+        number = 100 + 2 * (index // segments) * 10 + segment % 10
+
+        parts = [str(number)]
+        if street % 5 == 0:
+            parts.append(_spelling(rng, directions[street % 4], direction_names))
+        parts.append(streets[street])
+        parts.append(_spelling(rng, _STREET_TYPES[(street + town) % len(_STREET_TYPES)], suffix_names))
+        if rng.random() < 0.15:
+            parts.append(rng.choice(('Apt {}', '#{}', 'Apartment {}', 'Unit {}')).format(rng.randint(1, 40)))
+
+        state_name, state_code = states[state]
+        zip_code = f"{10000 + town * 4 + street % 4:05d}"
+        value = rng.randrange(90, 1500) * 1000
+        sqft = rng.randrange(600, 4500)
+        yield {
+            'street': ' '.join(parts),
+            'city': cities[city],
+            'state': state_code if rng.random() < 0.8 else state_name.title(),
+            'zip_code': zip_code if rng.random() < 0.8 else f"{zip_code}-{rng.randrange(10000):04d}",
+            'property_type': _PROPERTY_TYPES[segment % len(_PROPERTY_TYPES)],
+            'year_built': rng.randrange(1900, 2024),
+            'square_feet': sqft,
+            'lot_size_sqft': sqft * rng.randrange(2, 8),
+            'bedrooms': max(1, sqft // 700),
+            'bathrooms': max(1, sqft // 1000) + rng.choice((0, 0.5)),
+            'stories': 1 if sqft < 1500 else 2,
+            'estimated_value': value,
+            'tax_assessment': int(value * 0.85),
+            'annual_tax': int(value * 0.012),
+            'last_sale_price': int(value * rng.uniform(0.6, 0.95)),
+            'last_sale_date': f"{rng.randrange(1995, 2024)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}",
+            'parcel_number': f"{town:05d}-{street:03d}-{number:05d}",
+        }
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.db.models import Count, Avg
+from .addresses import normalize_address
 from .models import (
     SearchLog, 
     APIResponseCache, 
@@ -8,6 +9,11 @@ from .models import (
     SiteConfiguration,
     PhoneNumberAnalytics,
     IPRateLimit,
+    BlockedNetwork,
+    PersonRecord,
+    PropertyRecord,
+    BackgroundCheckJob,
+    BackgroundCheckCallback,
     UserFeedback,
     SiteStatistics,
     APIErrorLog
@@ -213,6 +219,107 @@ class APIErrorLogAdmin(admin.ModelAdmin):
     error_message_preview.short_description = 'Error Message'
 
 
+@admin.register(BlockedNetwork)
+class BlockedNetworkAdmin(admin.ModelAdmin):
+    list_display = [
+        'network',
+        'reason',
+        'is_active',
+        'expires_at',
+        'created_at'
+    ]
+    list_filter = ['is_active', 'created_at']
+    search_fields = ['network', 'reason']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(PersonRecord)
+class PersonRecordAdmin(admin.ModelAdmin):
+    list_display = [
+        'last_name',
+        'first_name',
+        'age',
+        'city',
+        'state',
+        'phone_number',
+        'source'
+    ]
+    list_filter = ['state', 'source']
+    search_fields = ['last_name', 'first_name', 'phone_number', 'email']
+    readonly_fields = ['created_at', 'updated_at']
+    # Skip the COUNT(*) over every record on each changelist page
+    show_full_result_count = False
+
+
+
+@admin.register(PropertyRecord)
+class PropertyRecordAdmin(admin.ModelAdmin):
+    list_display = [
+        'street',
+        'city',
+        'state',
+        'zip_code',
+        'property_type',
+        'estimated_value',
+        'source'
+    ]
+    list_filter = ['state', 'property_type', 'source']
+    # Prefix and exact matches can use the (zip_code, street) index
+    search_fields = ['^street', '=zip_code', 'parcel_number']
+    readonly_fields = ['address_key', 'created_at', 'updated_at']
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        # Store the address in the normalized form lookups use
+        address = normalize_address(obj.street, obj.city, obj.state, obj.zip_code)
+        obj.street, obj.city, obj.state = address.street, address.city, address.state
+        obj.zip_code = address.zip_code
+        obj.zip_plus4 = address.zip_plus4 or obj.zip_plus4
+        obj.address_key = address.key
+        super().save_model(request, obj, form, change)
+
+
+class BackgroundCheckCallbackInline(admin.TabularInline):
+    model = BackgroundCheckCallback
+    extra = 0
+    can_delete = False
+    readonly_fields = ['url', 'attempts', 'next_at', 'delivered_at', 'error', 'created_at']
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(BackgroundCheckJob)
+class BackgroundCheckJobAdmin(admin.ModelAdmin):
+    list_display = [
+        'id',
+        'subject',
+        'status',
+        'attempts',
+        'worker',
+        'created_at',
+        'finished_at',
+        'callback_status'
+    ]
+    list_filter = ['status', 'created_at']
+    search_fields = ['=id', '=query_hash']
+    readonly_fields = [field.name for field in BackgroundCheckJob._meta.fields]
+    inlines = [BackgroundCheckCallbackInline]
+    
+    def subject(self, obj):
+        return ' '.join(part for part in (obj.query.get('first_name'), obj.query.get('last_name')) if part)
+    subject.short_description = 'Subject'
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('callbacks')
+    
+    def callback_status(self, obj):
+        callbacks = list(obj.callbacks.all())
+        if not callbacks:
+            return '-'
+        return ', '.join(callback.status for callback in callbacks)
+    callback_status.short_description = 'Callback'
+
 # Custom admin site configuration
 admin.site.site_header = 'NumberLookup.us Administration'
 admin.site.site_title = 'NumberLookup.us Admin'
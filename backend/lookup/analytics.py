@@ -0,0 +1,184 @@
+"""
+Buffered search counters for PhoneNumberAnalytics, PopularSearch and the
+hourly SearchTrendBucket rows behind lookup.trending.
+
+Phone searches call ``search_counters.record()``, which only bumps a
+per-number count in an in-process dict. A daemon thread flushes the
+buffer every SEARCH_ANALYTICS_FLUSH_INTERVAL seconds, or sooner once
+SEARCH_ANALYTICS_MAX_BUFFER distinct numbers are waiting, so a number
+searched a thousand times between flushes costs one row update rather
+than a thousand.
+
+A flush writes each chunk of numbers to each table in a few statements:
+missing rows are inserted with a zero count (ignoring conflicts, so a
+concurrent worker creating the same row is harmless), then every row is
+bumped with ``search_count = F('search_count') + n``, one UPDATE per
+distinct n. The increments are done by the database, so workers never
+overwrite each other's counts. Pending counts are flushed at interpreter
+exit.
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import PhoneNumberAnalytics, PopularSearch, SearchTrendBucket
+from .trending import current_hour
+
+logger = logging.getLogger(__name__)
+
+# Numbers per flush statement
+FLUSH_CHUNK_SIZE = 500
+
+
+class SearchCounterBuffer:
+    """Aggregate search counts per number in memory and flush them in bulk"""
+
+    def __init__(self, enabled: bool = True, flush_interval: float = 30.0, max_buffer: int = 5000):
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._counts: Dict[str, int] = defaultdict(int)
+        # Latest location/carrier/line type per number, for new PopularSearch rows
+        self._details: Dict[str, Tuple[str, str, str]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        self.recorded = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.failed = 0
+
+    def record(self, number: str, location: str = '', carrier: str = '', line_type: str = ''):
+        """Count one search for a normalized number"""
+        if not self.enabled or not number:
+            return
+        self._ensure_worker()
+        with self._lock:
+            self._counts[number] += 1
+            self._details[number] = (location or '', carrier or '', line_type or '')
+            self.recorded += 1
+            full = len(self._counts) >= self.max_buffer
+        if full:
+            self._wake.set()
+
+    def record_many(self, results: Iterable[Dict]):
+        """Count one search per phone result dict (e.g. from a bulk lookup)"""
+        for result in results:
+            if result.get('valid'):
+                self.record(result.get('number'), result.get('location'),
+                            result.get('carrier'), result.get('line_type'))
+
+    def _ensure_worker(self):
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None:
+            return
+        with self._lock:
+            # A forked worker inherits the object but not the thread
+            if self._pid != pid or self._thread is None:
+                self._pid = pid
+                self._thread = threading.Thread(
+                    target=self._run, name='search-counters', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+            close_old_connections()
+
+    def flush(self) -> int:
+        """Write the buffered counts now, on the calling thread; returns numbers flushed"""
+        with self._lock:
+            if not self._counts:
+                return 0
+            counts, self._counts = self._counts, defaultdict(int)
+            details, self._details = self._details, {}
+
+        numbers = list(counts)
+        flushed = 0
+        with self._flush_lock:
+            for start in range(0, len(numbers), FLUSH_CHUNK_SIZE):
+                chunk = {number: counts[number] for number in numbers[start:start + FLUSH_CHUNK_SIZE]}
+                try:
+                    self._write(chunk, details)
+                    flushed += len(chunk)
+                except Exception as e:
+                    with self._lock:
+                        self.failed += len(chunk)
+                    logger.error(f"Failed to flush search counts for {len(chunk)} numbers: {e}")
+
+        with self._lock:
+            self.flushes += 1
+            self.rows_flushed += flushed
+        return flushed
+
+    def _write(self, counts: Dict[str, int], details: Dict[str, Tuple[str, str, str]]):
+        now = timezone.now()
+        by_increment = defaultdict(list)
+        for number, count in counts.items():
+            by_increment[count].append(number)
+
+        for model in (PhoneNumberAnalytics, PopularSearch):
+            self._increment(model.objects.all(), counts, by_increment,
+                            lambda number: self._new_row(model, number, details.get(number)),
+                            'search_count', last_searched=now)
+
+        # Counts buffered across an hour boundary land in the flush's hour
+        hour = current_hour(now.timestamp())
+        self._increment(SearchTrendBucket.objects.filter(hour=hour), counts, by_increment,
+                        lambda number: SearchTrendBucket(phone_number=number, hour=hour, count=0),
+                        'count')
+
+    @staticmethod
+    def _increment(queryset, counts, by_increment, new_row, field: str, **updates):
+        """Add each number's count to field on its row in queryset, creating missing rows"""
+        existing = set(queryset.filter(phone_number__in=counts).values_list('phone_number', flat=True))
+        missing = [number for number in counts if number not in existing]
+        if missing:
+            queryset.model.objects.bulk_create([new_row(number) for number in missing], ignore_conflicts=True)
+        for increment, numbers in by_increment.items():
+            queryset.filter(phone_number__in=numbers).update(**{field: F(field) + increment}, **updates)
+
+    @staticmethod
+    def _new_row(model, number: str, details: Optional[Tuple[str, str, str]]):
+        # Created at zero; the F() update that follows adds the real count
+        if model is PopularSearch:
+            location, carrier, line_type = details or ('', '', '')
+            return PopularSearch(phone_number=number, search_count=0, location=location[:200],
+                                 carrier=carrier[:100], line_type=line_type[:50])
+        return model(phone_number=number, search_count=0)
+
+    def shutdown(self):
+        if self._pid == os.getpid() or self._counts:
+            self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'enabled': self.enabled,
+            'buffered': len(self._counts),
+            'recorded': self.recorded,
+            'flushes': self.flushes,
+            'rows_flushed': self.rows_flushed,
+            'failed': self.failed,
+        }
+
+
+search_counters = SearchCounterBuffer(
+    enabled=getattr(settings, 'SEARCH_ANALYTICS_ENABLED', True),
+    flush_interval=getattr(settings, 'SEARCH_ANALYTICS_FLUSH_INTERVAL', 30),
+    max_buffer=getattr(settings, 'SEARCH_ANALYTICS_MAX_BUFFER', 5000),
+)
+atexit.register(search_counters.shutdown)
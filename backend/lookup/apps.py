@@ -3,3 +3,14 @@
 class LookupConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'lookup'
+
+    def ready(self):
+        # Build the NPA-NXX table at startup rather than on the first search
+        from .nanp import get_nanp_table
+        get_nanp_table()
+
+        # Connect the signals that tell workers to reload the blocklist and
+        # the people index, and drop cached searches of edited records
+        from . import blocklist  # noqa: F401
+        from . import cache_keys  # noqa: F401
+        from . import people  # noqa: F401
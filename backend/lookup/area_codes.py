@@ -0,0 +1,275 @@
+"""
+Built-in US area code reference data.
+
+These are the area-code level defaults used to seed the NANP lookup table
+(see ``lookup.nanp``). Exchange-level data is loaded on top of them from
+``settings.NANP_EXCHANGE_DATASET`` when configured.
+
+It also lists the area codes eligible for the phone parsing fast path in
+``lookup.utils.parse_phone``.
+"""
+
+
+# ==================== US AREA CODE TO LOCATION MAPPING ====================
+US_AREA_CODE_LOCATIONS = {
+    # New York
+    '212': 'Manhattan, New York', '646': 'Manhattan, New York', '332': 'Manhattan, New York',
+    '718': 'Brooklyn/Queens, New York', '347': 'Brooklyn/Queens, New York', '929': 'Brooklyn/Queens, New York',
+    '917': 'New York City, New York', '845': 'Hudson Valley, New York', '914': 'Westchester County, New York',
+    '516': 'Long Island, New York', '631': 'Long Island, New York', '585': 'Rochester, New York',
+    '716': 'Buffalo, New York', '315': 'Syracuse, New York', '518': 'Albany, New York',
+    
+    # California
+    '213': 'Los Angeles, California', '310': 'Los Angeles, California', '323': 'Los Angeles, California',
+    '424': 'Los Angeles, California', '747': 'Los Angeles, California', '818': 'San Fernando Valley, California',
+    '415': 'San Francisco, California', '628': 'San Francisco, California', '510': 'Oakland, California',
+    '408': 'San Jose, California', '669': 'San Jose, California', '650': 'San Mateo, California',
+    '925': 'Contra Costa County, California', '831': 'Monterey, California', '559': 'Fresno, California',
+    '916': 'Sacramento, California', '619': 'San Diego, California', '858': 'San Diego, California',
+    '760': 'Palm Springs, California', '951': 'Riverside, California',
+    
+    # Florida
+    '305': 'Miami, Florida', '786': 'Miami, Florida', '954': 'Fort Lauderdale, Florida',
+    '754': 'Fort Lauderdale, Florida', '561': 'West Palm Beach, Florida', '772': 'Port St. Lucie, Florida',
+    '407': 'Orlando, Florida', '321': 'Orlando, Florida', '689': 'Orlando, Florida',
+    '813': 'Tampa, Florida', '727': 'St. Petersburg, Florida', '941': 'Sarasota, Florida',
+    '239': 'Naples, Florida', '904': 'Jacksonville, Florida', '850': 'Tallahassee, Florida',
+    
+    # Texas
+    '214': 'Dallas, Texas', '469': 'Dallas, Texas', '972': 'Dallas, Texas', '945': 'Dallas, Texas',
+    '713': 'Houston, Texas', '281': 'Houston, Texas', '832': 'Houston, Texas', '346': 'Houston, Texas',
+    '210': 'San Antonio, Texas', '726': 'San Antonio, Texas', '512': 'Austin, Texas', '737': 'Austin, Texas',
+    '817': 'Fort Worth, Texas', '682': 'Fort Worth, Texas', '915': 'El Paso, Texas',
+    '956': 'Laredo, Texas', '361': 'Corpus Christi, Texas',
+    
+    # Illinois
+    '312': 'Chicago, Illinois', '773': 'Chicago, Illinois', '872': 'Chicago, Illinois',
+    '630': 'Chicago Suburbs, Illinois', '331': 'Chicago Suburbs, Illinois', '847': 'Chicago Suburbs, Illinois',
+    '224': 'Chicago Suburbs, Illinois', '217': 'Springfield, Illinois', '309': 'Peoria, Illinois',
+    
+    # Georgia
+    '404': 'Atlanta, Georgia', '678': 'Atlanta, Georgia', '770': 'Atlanta, Georgia',
+    '470': 'Atlanta, Georgia', '762': 'Augusta, Georgia', '912': 'Savannah, Georgia',
+    
+    # Pennsylvania
+    '215': 'Philadelphia, Pennsylvania', '267': 'Philadelphia, Pennsylvania', '445': 'Philadelphia, Pennsylvania',
+    '610': 'Philadelphia Suburbs, Pennsylvania', '484': 'Philadelphia Suburbs, Pennsylvania',
+    '412': 'Pittsburgh, Pennsylvania', '724': 'Pittsburgh Suburbs, Pennsylvania', '878': 'Pittsburgh, Pennsylvania',
+    '717': 'Harrisburg, Pennsylvania', '570': 'Scranton, Pennsylvania',
+    
+    # Ohio
+    '216': 'Cleveland, Ohio', '440': 'Cleveland Suburbs, Ohio', '614': 'Columbus, Ohio',
+    '380': 'Columbus, Ohio', '513': 'Cincinnati, Ohio', '937': 'Dayton, Ohio', '419': 'Toledo, Ohio',
+    
+    # Michigan
+    '313': 'Detroit, Michigan', '248': 'Detroit Suburbs, Michigan', '734': 'Ann Arbor, Michigan',
+    '616': 'Grand Rapids, Michigan', '517': 'Lansing, Michigan', '810': 'Flint, Michigan',
+    
+    # Washington
+    '206': 'Seattle, Washington', '425': 'Seattle Suburbs, Washington', '253': 'Tacoma, Washington',
+    '509': 'Spokane, Washington', '360': 'Olympia, Washington', '564': 'Washington',
+    
+    # Massachusetts
+    '617': 'Boston, Massachusetts', '857': 'Boston, Massachusetts', '781': 'Boston Suburbs, Massachusetts',
+    '339': 'Boston Suburbs, Massachusetts', '508': 'Worcester, Massachusetts', '774': 'Worcester, Massachusetts',
+    '413': 'Springfield, Massachusetts', '351': 'Massachusetts',
+    
+    # Arizona
+    '602': 'Phoenix, Arizona', '623': 'Phoenix, Arizona', '480': 'Phoenix, Arizona',
+    '520': 'Tucson, Arizona', '928': 'Flagstaff, Arizona',
+    
+    # Nevada
+    '702': 'Las Vegas, Nevada', '725': 'Las Vegas, Nevada', '775': 'Reno, Nevada',
+    
+    # Colorado
+    '303': 'Denver, Colorado', '720': 'Denver, Colorado', '970': 'Fort Collins, Colorado',
+    '719': 'Colorado Springs, Colorado',
+    
+    # Oregon
+    '503': 'Portland, Oregon', '971': 'Portland, Oregon', '541': 'Eugene, Oregon',
+    
+    # North Carolina
+    '704': 'Charlotte, North Carolina', '980': 'Charlotte, North Carolina', '919': 'Raleigh, North Carolina',
+    '984': 'Raleigh, North Carolina', '336': 'Greensboro, North Carolina', '910': 'Wilmington, North Carolina',
+    
+    # Virginia
+    '703': 'Northern Virginia', '571': 'Northern Virginia', '804': 'Richmond, Virginia',
+    '757': 'Norfolk, Virginia', '540': 'Roanoke, Virginia',
+    
+    # Maryland
+    '301': 'Maryland', '240': 'Maryland', '410': 'Baltimore, Maryland', '443': 'Baltimore, Maryland',
+    
+    # Washington DC
+    '202': 'Washington, DC',
+    
+    # Tennessee
+    '615': 'Nashville, Tennessee', '629': 'Nashville, Tennessee', '901': 'Memphis, Tennessee',
+    '423': 'Chattanooga, Tennessee', '865': 'Knoxville, Tennessee',
+    
+    # Wisconsin
+    '414': 'Milwaukee, Wisconsin', '262': 'Milwaukee Suburbs, Wisconsin', '608': 'Madison, Wisconsin',
+    '920': 'Green Bay, Wisconsin', '715': 'Eau Claire, Wisconsin',
+    
+    # Minnesota
+    '612': 'Minneapolis, Minnesota', '651': 'St. Paul, Minnesota', '763': 'Minneapolis Suburbs, Minnesota',
+    '952': 'Minneapolis Suburbs, Minnesota', '320': 'St. Cloud, Minnesota', '507': 'Rochester, Minnesota',
+    
+    # Missouri
+    '314': 'St. Louis, Missouri', '636': 'St. Louis Suburbs, Missouri', '816': 'Kansas City, Missouri',
+    '417': 'Springfield, Missouri', '573': 'Columbia, Missouri',
+    
+    # Indiana
+    '317': 'Indianapolis, Indiana', '463': 'Indianapolis, Indiana', '812': 'Evansville, Indiana',
+    '219': 'Gary, Indiana', '260': 'Fort Wayne, Indiana', '574': 'South Bend, Indiana',
+    
+    # Louisiana
+    '504': 'New Orleans, Louisiana', '985': 'New Orleans Suburbs, Louisiana', '225': 'Baton Rouge, Louisiana',
+    '318': 'Shreveport, Louisiana', '337': 'Lafayette, Louisiana',
+    
+    # Kentucky
+    '502': 'Louisville, Kentucky', '859': 'Lexington, Kentucky', '270': 'Bowling Green, Kentucky',
+    
+    # Alabama
+    '205': 'Birmingham, Alabama', '659': 'Birmingham, Alabama', '256': 'Huntsville, Alabama',
+    '334': 'Montgomery, Alabama', '251': 'Mobile, Alabama',
+    
+    # South Carolina
+    '803': 'Columbia, South Carolina', '843': 'Charleston, South Carolina', '864': 'Greenville, South Carolina',
+    
+    # Oklahoma
+    '405': 'Oklahoma City, Oklahoma', '918': 'Tulsa, Oklahoma', '580': 'Lawton, Oklahoma',
+    
+    # Connecticut
+    '203': 'New Haven, Connecticut', '475': 'New Haven, Connecticut', '860': 'Hartford, Connecticut',
+    '959': 'Hartford, Connecticut',
+    
+    # Iowa
+    '515': 'Des Moines, Iowa', '319': 'Cedar Rapids, Iowa', '563': 'Davenport, Iowa',
+    
+    # Arkansas
+    '501': 'Little Rock, Arkansas', '479': 'Fayetteville, Arkansas', '870': 'Jonesboro, Arkansas',
+    
+    # Mississippi
+    '601': 'Jackson, Mississippi', '662': 'Tupelo, Mississippi', '228': 'Gulfport, Mississippi',
+    
+    # Kansas
+    '316': 'Wichita, Kansas', '785': 'Topeka, Kansas', '913': 'Kansas City, Kansas',
+    
+    # New Mexico
+    '505': 'Albuquerque, New Mexico', '575': 'Las Cruces, New Mexico',
+    
+    # Nebraska
+    '402': 'Omaha, Nebraska', '531': 'Omaha, Nebraska', '308': 'Grand Island, Nebraska',
+    
+    # West Virginia
+    '304': 'Charleston, West Virginia', '681': 'West Virginia',
+    
+    # Idaho
+    '208': 'Boise, Idaho', '986': 'Idaho',
+    
+    # Hawaii
+    '808': 'Hawaii',
+    
+    # Alaska
+    '907': 'Alaska',
+    
+    # Maine
+    '207': 'Maine',
+    
+    # New Hampshire
+    '603': 'New Hampshire',
+    
+    # Vermont
+    '802': 'Vermont',
+    
+    # Rhode Island
+    '401': 'Rhode Island',
+    
+    # Delaware
+    '302': 'Delaware',
+    
+    # Montana
+    '406': 'Montana',
+    
+    # Wyoming
+    '307': 'Wyoming',
+    
+    # North Dakota
+    '701': 'North Dakota',
+    
+    # South Dakota
+    '605': 'South Dakota',
+    
+    # Utah
+    '801': 'Salt Lake City, Utah', '385': 'Salt Lake City, Utah', '435': 'Provo, Utah',
+}
+
+# ==================== US AREA CODE TO CARRIER MAPPING ====================
+US_AREA_CODE_CARRIERS = {
+    '212': 'Verizon Wireless', '646': 'Verizon Wireless', '718': 'T-Mobile',
+    '347': 'T-Mobile', '917': 'Verizon Wireless', '929': 'Metro PCS',
+    '310': 'AT&T Wireless', '323': 'T-Mobile', '213': 'AT&T Wireless',
+    '424': 'Verizon Wireless', '818': 'AT&T Wireless', '415': 'Verizon Wireless',
+    '628': 'T-Mobile', '510': 'AT&T Wireless', '408': 'Verizon Wireless',
+    '669': 'T-Mobile', '650': 'AT&T Wireless', '925': 'AT&T Wireless',
+    '305': 'T-Mobile', '786': 'Metro PCS', '954': 'AT&T Wireless',
+    '561': 'Verizon Wireless', '407': 'T-Mobile', '321': 'Verizon Wireless',
+    '813': 'Verizon Wireless', '727': 'AT&T Wireless', '904': 'AT&T Wireless',
+    '404': 'AT&T Wireless', '678': 'T-Mobile', '770': 'Verizon Wireless',
+    '470': 'Sprint', '312': 'Verizon Wireless', '773': 'T-Mobile',
+    '872': 'AT&T Wireless', '630': 'AT&T Wireless', '847': 'Verizon Wireless',
+    '702': 'T-Mobile', '725': 'AT&T Wireless', '303': 'Verizon Wireless',
+    '720': 'T-Mobile', '206': 'T-Mobile', '425': 'Verizon Wireless',
+    '253': 'AT&T Wireless', '503': 'Verizon Wireless', '971': 'T-Mobile',
+    '602': 'Verizon Wireless', '623': 'AT&T Wireless', '480': 'T-Mobile',
+    '520': 'AT&T Wireless', '928': 'Verizon Wireless', '214': 'AT&T Wireless',
+    '469': 'Verizon Wireless', '972': 'T-Mobile', '713': 'AT&T Wireless',
+    '281': 'Verizon Wireless', '832': 'T-Mobile', '210': 'AT&T Wireless',
+    '512': 'Verizon Wireless', '737': 'T-Mobile', '817': 'AT&T Wireless',
+    '202': 'Verizon Wireless', '301': 'AT&T Wireless', '240': 'T-Mobile',
+    '410': 'Verizon Wireless', '443': 'T-Mobile', '571': 'Verizon Wireless',
+    '703': 'AT&T Wireless', '804': 'Verizon Wireless', '757': 'AT&T Wireless',
+    '617': 'Verizon Wireless', '857': 'T-Mobile', '781': 'AT&T Wireless',
+    '508': 'Verizon Wireless', '413': 'AT&T Wireless', '215': 'Verizon Wireless',
+    '267': 'T-Mobile', '610': 'Verizon Wireless', '484': 'T-Mobile',
+    '412': 'Verizon Wireless', '724': 'AT&T Wireless', '216': 'Verizon Wireless',
+    '614': 'AT&T Wireless', '513': 'Verizon Wireless', '313': 'T-Mobile',
+}
+
+
+# ==================== PHONENUMBERS FAST-PATH AREA CODES ====================
+# Area codes for which phonenumbers treats every [2-9]XX-XXXX number as a
+# valid US FIXED_LINE_OR_MOBILE number. Numbers in these area codes can be
+# validated and formatted without calling phonenumbers (see
+# lookup.utils.parse_phone). Generated by probing the metadata shipped with
+# the phonenumbers version below; the fast path switches itself off when a
+# different version is installed.
+FAST_PATH_PHONENUMBERS_VERSION = '8.13.24'
+
+FAST_PATH_AREA_CODES = frozenset({
+    '201', '202', '203', '205', '206', '207', '208', '209', '210', '212', '213', '214', '215', '216',
+    '217', '218', '219', '220', '223', '224', '225', '228', '229', '231', '234', '239', '240', '248',
+    '251', '252', '253', '254', '256', '260', '262', '267', '269', '270', '272', '276', '279', '281',
+    '283', '301', '302', '303', '304', '305', '307', '308', '309', '310', '312', '313', '314', '315',
+    '316', '317', '318', '319', '320', '321', '323', '325', '326', '330', '331', '332', '334', '336',
+    '337', '339', '341', '346', '347', '350', '351', '352', '360', '361', '364', '380', '385', '386',
+    '401', '402', '404', '405', '406', '407', '408', '409', '410', '412', '413', '414', '415', '417',
+    '419', '423', '424', '425', '430', '432', '434', '435', '440', '442', '443', '445', '447', '448',
+    '458', '463', '464', '469', '470', '475', '478', '479', '480', '484', '501', '502', '503', '504',
+    '507', '508', '509', '510', '512', '513', '515', '516', '517', '518', '520', '530', '531', '534',
+    '539', '540', '541', '551', '557', '559', '561', '562', '563', '564', '567', '570', '571', '572',
+    '573', '574', '575', '580', '582', '585', '586', '601', '602', '603', '605', '606', '607', '608',
+    '609', '610', '612', '614', '615', '616', '617', '618', '619', '620', '623', '626', '628', '629',
+    '630', '631', '636', '640', '641', '646', '650', '651', '656', '657', '659', '660', '661', '662',
+    '667', '669', '678', '680', '681', '682', '689', '701', '702', '703', '704', '706', '707', '708',
+    '712', '713', '714', '715', '716', '717', '718', '719', '720', '724', '725', '726', '727', '731',
+    '732', '734', '737', '740', '743', '747', '754', '757', '760', '762', '763', '765', '769', '770',
+    '771', '772', '773', '774', '775', '779', '781', '785', '786', '801', '802', '803', '804', '805',
+    '806', '808', '810', '812', '813', '814', '815', '816', '817', '818', '820', '826', '828', '830',
+    '831', '832', '835', '838', '839', '840', '843', '845', '847', '848', '850', '854', '856', '857',
+    '858', '859', '860', '862', '863', '864', '865', '870', '872', '878', '901', '903', '904', '906',
+    '907', '908', '909', '910', '912', '913', '914', '915', '916', '917', '918', '919', '920', '925',
+    '928', '929', '930', '931', '934', '936', '937', '938', '940', '941', '943', '945', '947', '948',
+    '949', '951', '952', '954', '956', '959', '970', '971', '972', '973', '978', '979', '980', '984',
+    '985', '986', '989',
+})
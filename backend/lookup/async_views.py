@@ -0,0 +1,466 @@
+"""
+Async versions of the search views, for running under an ASGI server.
+
+They behave exactly like the views in views.py but use the async cache and
+ORM APIs, so under uvicorn/daphne a request waiting on the cache or an
+upstream provider doesn't hold a threadpool thread. lookup/urls.py routes to
+these when LOOKUP_ASYNC_VIEWS is enabled.
+"""
+import functools
+import logging
+
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.log import log_response
+
+from .addresses import normalize_address
+from .analytics import search_counters
+from .background import get_background_fanout, sse_event
+from .blocklist import blocklist
+from .cache_keys import (
+    address_cache_key,
+    background_cache_key,
+    key_versions,
+    people_cache_key,
+    phone_cache_key,
+)
+from .caching import search_cache
+from .nanp import get_nanp_table
+from .numverify import numverify_client
+from .providers import ADDRESS, PEOPLE, PHONE, get_pipeline
+from .ratelimit import rate_limit_snapshots, rate_limiter
+from .search import (
+    address_query,
+    arun_search,
+    people_query,
+    phone_query,
+    result_cache_timeout,
+    result_durable_ttl,
+)
+from .search_log import search_log
+from .utils import get_client_ip, get_parse_cache_stats, parse_phone
+
+logger = logging.getLogger(__name__)
+
+
+def require_GET(view):
+    """require_http_methods(["GET"]) for async views (Django 4.2's only wraps sync ones)"""
+    @functools.wraps(view)
+    async def inner(request, *args, **kwargs):
+        if request.method != 'GET':
+            response = HttpResponseNotAllowed(['GET'])
+            log_response(
+                'Method Not Allowed (%s): %s', request.method, request.path,
+                response=response,
+                request=request,
+            )
+            return response
+        return await view(request, *args, **kwargs)
+    return inner
+
+
+@require_GET
+async def health_check(request):
+    """API health check endpoint"""
+    return JsonResponse({
+        'status': 'healthy',
+        'message': 'NumberLookup.us API - US Numbers Only',
+        'timestamp': timezone.now().isoformat(),
+        'version': '1.0.0',
+        'supported_countries': ['United States'],
+        'area_codes_supported': get_nanp_table().area_code_count,
+        'parse_cache': get_parse_cache_stats(),
+        'search_cache': search_cache.stats(),
+        'cache_keys': key_versions.stats(),
+        'search_log': search_log.stats(),
+        'numverify': numverify_client.stats(),
+        'providers': get_pipeline().stats(),
+        'rate_limit': {**rate_limiter.stats(), 'snapshots': rate_limit_snapshots.stats()},
+        'blocklist': blocklist.stats(),
+        'search_counters': search_counters.stats()
+    })
+
+
+@require_GET
+async def phone_search(request, number):
+    """
+    Main phone search endpoint - US numbers only
+
+    Args:
+        number: Phone number (should be 11 digits starting with 1 for US)
+
+    Returns:
+        JSON with phone information or error
+    """
+    try:
+        logger.info(f"=== Phone search for: {number} ===")
+
+        client_ip = get_client_ip(request)
+        user_agent = request.META.get('HTTP_USER_AGENT', '')
+
+        parsed = parse_phone(number)
+        if not parsed.valid:
+            logger.error(f"Validation failed: {parsed.error}")
+            return JsonResponse({
+                'error': parsed.error,
+                'number': number,
+                'valid': False
+            }, status=400)
+
+        normalized_number = parsed.normalized
+        logger.info(f"Normalized: {normalized_number}")
+
+        if not normalized_number.startswith('+1'):
+            return JsonResponse({
+                'error': 'Only US phone numbers are supported',
+                'number': number,
+                'valid': False,
+                'suggestion': 'Please enter a valid 10-digit US phone number'
+            }, status=400)
+
+        if parsed.region_code != 'US':
+            return JsonResponse({
+                'error': 'Only US phone numbers are supported',
+                'number': number,
+                'valid': False
+            }, status=400)
+
+        cache_key = phone_cache_key(normalized_number)
+        result, cache_hit = await search_cache.aget_or_compute(
+            cache_key,
+            lambda: arun_search(PHONE, phone_query(parsed)),
+            timeout=result_cache_timeout,
+            durable_ttl=result_durable_ttl,
+            api_source='phonenumbers',
+        )
+
+        if cache_hit:
+            logger.info(f"Cache HIT for {normalized_number}")
+            result = {**result, 'cached': True}
+        else:
+            logger.info(f"Cache MISS - processed {normalized_number}")
+
+        await search_log.alog(
+            phone_number=number,
+            normalized_number=normalized_number,
+            ip_address=client_ip,
+            user_agent=user_agent,
+            found_results=True,
+            api_source='cache' if cache_hit else result['source'],
+            cache_hit=cache_hit
+        )
+
+        search_counters.record(normalized_number, result.get('location'),
+                               result.get('carrier'), result.get('line_type'))
+
+        return JsonResponse(result)
+
+    except Exception as e:
+        logger.error(f"Search error: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'error': 'Search failed',
+            'number': number,
+            'valid': False,
+            'message': 'Please try again'
+        }, status=500)
+
+
+@require_GET
+async def people_search(request):
+    """
+    People search endpoint - Search by name and optional location
+
+    Args:
+        first_name: First name to search
+        last_name: Last name to search
+        city: Optional city
+        state: Optional state
+
+    Returns:
+        JSON with search results or error
+    """
+    try:
+        first_name = request.GET.get('first_name', '').strip()
+        last_name = request.GET.get('last_name', '').strip()
+        city = request.GET.get('city', '').strip()
+        state = request.GET.get('state', '').strip()
+
+        logger.info(f"=== People search: {first_name} {last_name} ===")
+
+        if not first_name and not last_name:
+            return JsonResponse({
+                'error': 'Please provide at least a first name or last name',
+                'success': False
+            }, status=400)
+
+        client_ip = get_client_ip(request)
+        user_agent = request.META.get('HTTP_USER_AGENT', '')
+
+        full_name = f"{first_name} {last_name}".strip()
+
+        cache_key = people_cache_key(first_name, last_name, city, state)
+
+        result, cache_hit = await search_cache.aget_or_compute(
+            cache_key,
+            lambda: arun_search(PEOPLE, people_query(first_name, last_name, city, state)),
+            timeout=result_cache_timeout,
+            durable_ttl=result_durable_ttl,
+            api_source='mock_data',
+        )
+
+        if cache_hit:
+            logger.info(f"Cache HIT for {full_name}")
+            result = {**result, 'cached': True}
+        else:
+            logger.info(f"Cache MISS - processed {full_name}")
+
+        await search_log.alog(
+            phone_number=full_name,
+            normalized_number=full_name,
+            ip_address=client_ip,
+            user_agent=user_agent,
+            found_results=True,
+            api_source='cache' if cache_hit else result.get('source', 'mock_data'),
+            cache_hit=cache_hit
+        )
+
+        return JsonResponse(result)
+
+    except Exception as e:
+        logger.error(f"People search error: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'error': 'Search failed',
+            'success': False,
+            'message': 'Please try again'
+        }, status=500)
+
+
+@require_GET
+async def address_search(request):
+    """
+    Address search endpoint - Find property records and residents by address
+
+    Args:
+        street: Street address
+        city: City name
+        state: State code (e.g., CA, NY)
+        zip_code: ZIP code (optional)
+
+    Returns:
+        JSON with property information or error
+    """
+    try:
+        street = request.GET.get('street', '').strip()
+        city = request.GET.get('city', '').strip()
+        state = request.GET.get('state', '').strip()
+        zip_code = request.GET.get('zip_code', '').strip()
+
+        logger.info(f"=== Address search: {street}, {city}, {state} ===")
+
+        if not street or not city or not state:
+            return JsonResponse({
+                'error': 'Please provide street, city, and state',
+                'success': False
+            }, status=400)
+
+        client_ip = get_client_ip(request)
+        user_agent = request.META.get('HTTP_USER_AGENT', '')
+
+        address = normalize_address(street, city, state, zip_code)
+        full_address = address.formatted
+
+        cache_key = address_cache_key(address)
+
+        result, cache_hit = await search_cache.aget_or_compute(
+            cache_key,
+            lambda: arun_search(ADDRESS, address_query(address.street, address.city, address.state, address.zip_code)),
+            timeout=result_cache_timeout,
+            durable_ttl=result_durable_ttl,
+            api_source='mock_data',
+        )
+
+        if cache_hit:
+            logger.info(f"Cache HIT for {full_address}")
+            result = {**result, 'cached': True}
+        else:
+            logger.info(f"Cache MISS - processed {full_address}")
+
+        await search_log.alog(
+            phone_number=f"{street}, {city}, {state} {zip_code}".strip(),
+            normalized_number=full_address,
+            ip_address=client_ip,
+            user_agent=user_agent,
+            found_results=True,
+            api_source='cache' if cache_hit else result.get('source', 'mock_data'),
+            cache_hit=cache_hit
+        )
+
+        return JsonResponse(result)
+
+    except Exception as e:
+        logger.error(f"Address search error: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'error': 'Search failed',
+            'success': False,
+            'message': 'Please try again'
+        }, status=500)
+
+
+@require_GET
+async def background_check_search(request):
+    """
+    Background check endpoint - Search for comprehensive background information
+
+    Args:
+        first_name: First name to search
+        last_name: Last name to search
+        city: Optional city
+        state: Optional state
+
+    Returns:
+        JSON with background check results or error
+    """
+    try:
+        first_name = request.GET.get('first_name', '').strip()
+        last_name = request.GET.get('last_name', '').strip()
+        city = request.GET.get('city', '').strip()
+        state = request.GET.get('state', '').strip()
+
+        logger.info(f"=== Background check: {first_name} {last_name} ===")
+
+        if not first_name or not last_name:
+            return JsonResponse({
+                'error': 'Please provide both first name and last name',
+                'success': False
+            }, status=400)
+
+        client_ip = get_client_ip(request)
+        user_agent = request.META.get('HTTP_USER_AGENT', '')
+
+        full_name = f"{first_name} {last_name}".strip()
+
+        cache_key = background_cache_key(first_name, last_name, city, state)
+
+        result, cache_hit = await search_cache.aget_or_compute(
+            cache_key,
+            lambda: get_background_fanout().arun(people_query(first_name, last_name, city, state)),
+            timeout=result_cache_timeout,
+            durable_ttl=result_durable_ttl,
+            api_source='mock_data',
+        )
+
+        if cache_hit:
+            logger.info(f"Cache HIT for {full_name}")
+            result = {**result, 'cached': True}
+        else:
+            logger.info(f"Cache MISS - processed {full_name}")
+
+        await search_log.alog(
+            phone_number=full_name,
+            normalized_number=full_name,
+            ip_address=client_ip,
+            user_agent=user_agent,
+            found_results=True,
+            api_source='cache' if cache_hit else 'mock_data',
+            cache_hit=cache_hit
+        )
+
+        return JsonResponse(result)
+
+    except Exception as e:
+        logger.error(f"Background check error: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'error': 'Background check failed',
+            'success': False,
+            'message': 'Please try again'
+        }, status=500)
+
+@require_GET
+async def background_check_stream(request):
+    """
+    Streaming background check endpoint - Server-Sent Events
+
+    Queries the record sources concurrently and sends each source's
+    sections as soon as it answers, so the first sections arrive after the
+    fastest source rather than the slowest. The merged result is cached
+    under the same key as background_check_search.
+
+    Args:
+        first_name: First name to search
+        last_name: Last name to search
+        city: Optional city
+        state: Optional state
+
+    Returns:
+        text/event-stream with a "start" event listing the sources, a
+        "section" (or "source_failed") event per source and a final "done"
+        event carrying the full background check result. A cached result
+        is sent as "start" and "done" only.
+    """
+    first_name = request.GET.get('first_name', '').strip()
+    last_name = request.GET.get('last_name', '').strip()
+    city = request.GET.get('city', '').strip()
+    state = request.GET.get('state', '').strip()
+
+    logger.info(f"=== Background check stream: {first_name} {last_name} ===")
+
+    if not first_name or not last_name:
+        return JsonResponse({
+            'error': 'Please provide both first name and last name',
+            'success': False
+        }, status=400)
+
+    full_name = f"{first_name} {last_name}".strip()
+    query = people_query(first_name, last_name, city, state)
+    cache_key = background_cache_key(first_name, last_name, city, state)
+    fanout = get_background_fanout()
+    cached = await search_cache.aget(cache_key)
+
+    await search_log.alog(
+        phone_number=full_name,
+        normalized_number=full_name,
+        ip_address=get_client_ip(request),
+        user_agent=request.META.get('HTTP_USER_AGENT', ''),
+        found_results=True,
+        api_source='cache' if cached is not None else 'mock_data',
+        cache_hit=cached is not None
+    )
+
+    async def stream():
+        yield sse_event('start', {
+            'query': query,
+            'sources': [source.as_dict() for source in fanout.sources],
+            'cached': cached is not None,
+        })
+        if cached is not None:
+            logger.info(f"Cache HIT for {full_name}")
+            yield sse_event('done', {**cached, 'cached': True})
+            return
+
+        check = fanout.start(query)
+        try:
+            async for outcome in check:
+                yield sse_event('section' if outcome.ok else 'source_failed', outcome.as_dict())
+            result = check.result()
+            await search_cache.aset(
+                cache_key, result,
+                timeout=result_cache_timeout(result),
+                durable_ttl=result_durable_ttl(result),
+                api_source='mock_data',
+            )
+            logger.info(f"Cache MISS - streamed {full_name}")
+            yield sse_event('done', result)
+        except Exception as e:
+            # Headers are already sent; end the stream with an error event
+            logger.error(f"Background check stream error: {str(e)}", exc_info=True)
+            yield sse_event('failed', {
+                'error': 'Background check failed',
+                'success': False,
+                'message': 'Please try again'
+            })
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keep nginx from buffering the events
+    response['X-Accel-Buffering'] = 'no'
+    return response
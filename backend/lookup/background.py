@@ -0,0 +1,369 @@
+"""
+Background checks assembled from concurrent record sources.
+
+A background check draws on several record sources (identity, criminal,
+court, address history, relatives, employment) that answer at very
+different speeds, and each fills a few sections of the result.
+BackgroundFanOut queries them all at once and yields each source's sections
+as soon as it answers, which is what lets /api/search/background/stream/
+send them to the client over Server-Sent Events while the slow sources are
+still running. Every source has its own deadline (BACKGROUND_SOURCE_TIMEOUT,
+or its entry in BACKGROUND_SOURCE_TIMEOUTS); a source that misses it or
+fails is reported and keeps the local sample sections, and the merged
+result is marked ``provider_fallback`` so it is only cached briefly.
+
+Each source is served by a provider: the local sample data by default, or
+a provider from the registry named in BACKGROUND_SOURCES, e.g.
+"criminal=stub,court=stub". The local provider builds every section in one
+cheap call on the calling thread; that result is the base of the merged
+payload and supplies the sections of the local sources, while the others
+run on a thread pool (or as tasks, from the async views).
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .providers import BACKGROUND, Provider, get_registry
+
+logger = logging.getLogger(__name__)
+
+# Record sources and the result sections each one fills, in the order they
+# are announced to stream clients
+RECORD_SOURCES: Dict[str, Tuple[str, ...]] = {
+    'identity': ('subject', 'phone_numbers', 'email_addresses'),
+    'address_history': ('property_records',),
+    'relatives': ('relatives', 'social_media'),
+    'employment': ('employment_history', 'education'),
+    'court': ('court_records', 'bankruptcies', 'liens_judgments'),
+    'criminal': ('criminal_records', 'sex_offender_check'),
+}
+
+
+class RecordSource(NamedTuple):
+    """A record source, the provider serving it and its deadline in seconds"""
+
+    name: str
+    sections: Tuple[str, ...]
+    provider: Provider
+    deadline: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'sections': list(self.sections),
+            'provider': self.provider.name,
+            'deadline_ms': round(self.deadline * 1000),
+        }
+
+
+class SourceOutcome(NamedTuple):
+    """What one source returned (or why it didn't) during a background check"""
+
+    source: str
+    sections: Dict[str, Any]
+    latency: float
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'source': self.source,
+            'ok': self.ok,
+            'latency_ms': round(self.latency * 1000, 1),
+            'error': self.error,
+            'sections': self.sections,
+        }
+
+
+def sse_event(event: str, data: Any) -> str:
+    """One Server-Sent Events message with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+def _timed_lookup(provider: Provider, query: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
+    started = time.monotonic()
+    fields = provider.lookup(BACKGROUND, query)
+    return fields, time.monotonic() - started
+
+
+async def _atimed_lookup(provider: Provider, query: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
+    started = time.monotonic()
+    fields = await provider.alookup(BACKGROUND, query)
+    return fields, time.monotonic() - started
+
+
+class BackgroundCheck:
+    """
+    One background check in progress.
+
+    Iterate it (``for`` from sync code, ``async for`` from async code) to
+    start the sources and receive a SourceOutcome per source as it answers
+    or reaches its deadline; result() then returns the merged payload.
+    """
+
+    def __init__(self, fanout: 'BackgroundFanOut', query: Dict[str, Any]):
+        self.fanout = fanout
+        self.query = query
+        self.base: Optional[Dict[str, Any]] = None
+        self.outcomes: List[SourceOutcome] = []
+        self.finished = False
+
+    @property
+    def sources(self) -> List[RecordSource]:
+        return self.fanout.sources
+
+    def _source_query(self, source: RecordSource) -> Dict[str, Any]:
+        return {**self.query, 'sections': source.sections}
+
+    def _answered(self, source: RecordSource, fields: Dict[str, Any], latency: float) -> SourceOutcome:
+        sections = {name: fields[name] for name in source.sections if name in fields}
+        return self._record(SourceOutcome(source.name, sections, latency))
+
+    def _failed(self, source: RecordSource, error: str, latency: float) -> SourceOutcome:
+        logger.warning(f"Background source {source.name} ({source.provider.name}) failed: {error}")
+        return self._record(SourceOutcome(source.name, {}, latency, error))
+
+    def _record(self, outcome: SourceOutcome) -> SourceOutcome:
+        self.outcomes.append(outcome)
+        return outcome
+
+    def _local_outcomes(self, latency: float) -> List[SourceOutcome]:
+        return [
+            self._answered(source, self.base, latency)
+            for source in self.sources if source.provider is self.fanout.local
+        ]
+
+    def __iter__(self) -> Iterator[SourceOutcome]:
+        started = time.monotonic()
+        remote = [source for source in self.sources if source.provider is not self.fanout.local]
+        pending = {}
+        if remote:
+            executor = self.fanout._get_executor()
+            for source in remote:
+                pending[executor.submit(_timed_lookup, source.provider, self._source_query(source))] = source
+
+        try:
+            # The local sections are ready while the remote sources are in flight
+            self.base = self.fanout.local.lookup(BACKGROUND, self.query)
+            yield from self._local_outcomes(time.monotonic() - started)
+
+            while pending:
+                now = time.monotonic()
+                for future, source in list(pending.items()):
+                    if not future.done() and now >= started + source.deadline:
+                        del pending[future]
+                        future.cancel()
+                        yield self._failed(source, 'timeout', now - started)
+                if not pending:
+                    break
+
+                wake = min(started + source.deadline for source in pending.values())
+                done, _ = wait(pending, timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+                for future in done:
+                    source = pending.pop(future)
+                    try:
+                        fields, latency = future.result()
+                    except Exception as e:
+                        yield self._failed(source, str(e) or type(e).__name__, time.monotonic() - started)
+                    else:
+                        yield self._answered(source, fields, latency)
+            self.finished = True
+        finally:
+            # Sources still running when the client goes away finish in the background
+            for future in pending:
+                future.cancel()
+
+    async def __aiter__(self):
+        started = time.monotonic()
+        pending = {
+            asyncio.ensure_future(_atimed_lookup(source.provider, self._source_query(source))): source
+            for source in self.sources if source.provider is not self.fanout.local
+        }
+
+        try:
+            local = self.fanout.local
+            if BACKGROUND in local.blocking_kinds:
+                self.base = await local.alookup(BACKGROUND, self.query)
+            else:
+                self.base = local.lookup(BACKGROUND, self.query)
+            for outcome in self._local_outcomes(time.monotonic() - started):
+                yield outcome
+
+            while pending:
+                now = time.monotonic()
+                for task, source in list(pending.items()):
+                    if not task.done() and now >= started + source.deadline:
+                        del pending[task]
+                        task.cancel()
+                        yield self._failed(source, 'timeout', now - started)
+                if not pending:
+                    break
+
+                wake = min(started + source.deadline for source in pending.values())
+                done, _ = await asyncio.wait(
+                    pending, timeout=max(0.0, wake - now), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    source = pending.pop(task)
+                    try:
+                        fields, latency = task.result()
+                    except Exception as e:
+                        yield self._failed(source, str(e) or type(e).__name__, time.monotonic() - started)
+                    else:
+                        yield self._answered(source, fields, latency)
+            self.finished = True
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def result(self) -> Dict[str, Any]:
+        """
+        The merged background check once every source has reported.
+
+        Sections come from the sources that answered; the rest keep the
+        local sample data, as when run_search() falls back to it.
+        """
+        if not self.finished:
+            raise RuntimeError('The background check has not finished')
+        result = dict(self.base)
+        for outcome in self.outcomes:
+            result.update(outcome.sections)
+        if any(not outcome.ok for outcome in self.outcomes):
+            result['provider_fallback'] = True
+        return result
+
+
+class BackgroundFanOut:
+    """Runs background checks over a fixed set of record sources"""
+
+    def __init__(self, local: Provider, sources: Iterable[RecordSource], max_workers: int = 32):
+        self.local = local
+        self.sources = list(sources)
+        self.max_workers = max_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix='background-source'
+                    )
+        return self._executor
+
+    def start(self, query: Dict[str, Any]) -> BackgroundCheck:
+        """A background check for query; the sources start when it is iterated"""
+        return BackgroundCheck(self, query)
+
+    def run(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a background check to completion.
+
+        Args:
+            query: Search parameters (lookup.search.people_query)
+
+        Returns:
+            The merged background check result
+        """
+        check = self.start(query)
+        for _ in check:
+            pass
+        return check.result()
+
+    async def arun(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Async run()"""
+        check = self.start(query)
+        async for _ in check:
+            pass
+        return check.result()
+
+
+def _pairs(entries: Iterable[str], setting: str) -> Dict[str, str]:
+    """The <source>=<value> entries of a list setting"""
+    pairs = {}
+    for entry in entries:
+        name, sep, value = entry.partition('=')
+        if not sep or name.strip() not in RECORD_SOURCES:
+            logger.error(f"Ignoring {entry!r} in {setting}: expected <source>=<value> "
+                         f"with a source among {', '.join(RECORD_SOURCES)}")
+            continue
+        pairs[name.strip()] = value.strip()
+    return pairs
+
+
+def build_sources(registry, providers: Dict[str, str], timeout: float,
+                  timeouts: Dict[str, float]) -> List[RecordSource]:
+    """
+    RECORD_SOURCES with their providers and deadlines.
+
+    Args:
+        registry: ProviderRegistry to take the providers from
+        providers: Provider name per source; unlisted sources use 'local'
+        timeout: Default deadline in seconds
+        timeouts: Deadlines for particular sources
+
+    Returns:
+        List of RecordSource
+    """
+    local = registry.get('local')
+    sources = []
+    for name, sections in RECORD_SOURCES.items():
+        provider = local
+        provider_name = providers.get(name, 'local')
+        if provider_name != 'local':
+            try:
+                provider = registry.get(provider_name)
+            except KeyError:
+                logger.error(f"Background source {name}: provider {provider_name!r} is not in "
+                             f"LOOKUP_PROVIDERS, using the local data")
+                provider = local
+            else:
+                if not provider.supports(BACKGROUND) or not provider.available():
+                    logger.error(f"Background source {name}: provider {provider_name!r} can't serve "
+                                 f"background checks, using the local data")
+                    provider = local
+        sources.append(RecordSource(name, sections, provider, timeouts.get(name, timeout)))
+    return sources
+
+
+_fanout = None
+_fanout_lock = threading.Lock()
+
+
+def get_background_fanout() -> BackgroundFanOut:
+    """The process-wide fan-out configured by the BACKGROUND_* settings"""
+    global _fanout
+    if _fanout is None:
+        with _fanout_lock:
+            if _fanout is None:
+                timeouts = {}
+                for name, value in _pairs(getattr(settings, 'BACKGROUND_SOURCE_TIMEOUTS', []),
+                                          'BACKGROUND_SOURCE_TIMEOUTS').items():
+                    try:
+                        timeouts[name] = float(value)
+                    except ValueError:
+                        logger.error(f"Ignoring the BACKGROUND_SOURCE_TIMEOUTS entry for {name}: "
+                                     f"{value!r} is not a number")
+                registry = get_registry()
+                _fanout = BackgroundFanOut(
+                    registry.get('local'),
+                    build_sources(
+                        registry,
+                        _pairs(getattr(settings, 'BACKGROUND_SOURCES', []), 'BACKGROUND_SOURCES'),
+                        getattr(settings, 'BACKGROUND_SOURCE_TIMEOUT', 8.0),
+                        timeouts,
+                    ),
+                    max_workers=getattr(settings, 'PROVIDER_MAX_WORKERS', 32),
+                )
+    return _fanout
@@ -0,0 +1,281 @@
+"""
+In-process blocklist of client IPs and CIDR ranges.
+
+Blocked networks (BlockedNetwork rows) and blocked clients (IPRateLimit
+rows with is_blocked set) are loaded into two sorted interval arrays per
+process, one for IPv4 and one for IPv6, with overlapping ranges merged.
+Checking a client is an address-to-integer conversion and one binary
+search, so rejecting a blocked scraper costs a few microseconds and no
+database or cache access.
+
+Saving or deleting either model bumps a version counter in
+CACHES['default']. Each process checks that counter at most once every
+BLOCKLIST_SYNC_INTERVAL seconds and, when it has moved, reloads only the
+rows updated since its last load; a deletion forces a full reload.
+Entries with an expiry drop out on their own when it passes.
+"""
+import bisect
+import ipaddress
+import logging
+import socket
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import BlockedNetwork, IPRateLimit
+
+logger = logging.getLogger(__name__)
+
+# Bumped on every change; BLOCKLIST_RESET_KEY only when rows are deleted
+BLOCKLIST_VERSION_KEY = 'blocklist:version'
+BLOCKLIST_RESET_KEY = 'blocklist:reset'
+
+# Re-read rows updated this long before the last load, to cover writes
+# that committed after it with slightly older timestamps
+WATERMARK_OVERLAP = timedelta(seconds=5)
+
+_IPV4_MAPPED_PREFIX = b'\x00' * 10 + b'\xff\xff'
+
+
+class IntervalSet:
+    """Sorted, non-overlapping [start, end] integer ranges with O(log n) lookup"""
+
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self, ranges: List[Tuple[int, int]]):
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1] + 1:
+                if end > merged[-1][1]:
+                    merged[-1][1] = end
+            else:
+                merged.append([start, end])
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    def __contains__(self, value: int) -> bool:
+        index = bisect.bisect_right(self.starts, value) - 1
+        return index >= 0 and value <= self.ends[index]
+
+    def __len__(self):
+        return len(self.starts)
+
+
+def address_key(ip: str) -> Optional[Tuple[int, int]]:
+    """(4 or 6, address as int) for an IP string, None if it isn't one"""
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+    except (OSError, TypeError, ValueError):
+        pass
+    try:
+        packed = socket.inet_pton(socket.AF_INET6, ip)
+    except (OSError, TypeError, ValueError):
+        return None
+    if packed[:12] == _IPV4_MAPPED_PREFIX:
+        # ::ffff:a.b.c.d is an IPv4 client behind a dual-stack socket
+        return 4, int.from_bytes(packed[12:], 'big')
+    return 6, int.from_bytes(packed, 'big')
+
+
+def network_range(network: str) -> Tuple[int, int, int]:
+    """(4 or 6, first address, last address) for an IP or CIDR string"""
+    net = ipaddress.ip_network(network.strip(), strict=False)
+    return net.version, int(net.network_address), int(net.broadcast_address)
+
+
+def bump_version(full: bool = False):
+    """Tell every process to reload the blocklist (fully, after deletions)"""
+    cache = caches['default']
+    keys = [BLOCKLIST_VERSION_KEY, BLOCKLIST_RESET_KEY] if full else [BLOCKLIST_VERSION_KEY]
+    for key in keys:
+        try:
+            try:
+                cache.incr(key)
+            except ValueError:
+                if not cache.add(key, 1, None):
+                    cache.incr(key)
+        except Exception as e:
+            logger.error(f"Failed to bump {key}: {e}")
+
+
+class IPBlocklist:
+    """Per-process blocklist refreshed from the database on a version bump"""
+
+    def __init__(self, sync_interval: float = 5.0, cache_alias: str = 'default'):
+        self.sync_interval = sync_interval
+        self.cache_alias = cache_alias
+        # (source, row id) -> (family, first, last, expires at as a timestamp)
+        self._entries: Dict[Tuple[str, int], Tuple[int, int, int, Optional[float]]] = {}
+        self._sets = {4: IntervalSet([]), 6: IntervalSet([])}
+        self._next_expiry = None
+        self._watermark = None
+        self._versions = None
+        self._loaded = False
+        self._next_sync = 0.0
+        self._sync_lock = threading.Lock()
+
+        self.loads = 0
+        self.full_loads = 0
+        self.rejected = 0
+
+    def is_blocked(self, ip: str) -> bool:
+        """Whether a client IP falls in any active blocked address or range"""
+        self._maybe_sync(time.monotonic())
+        return self._contains(ip)
+
+    async def ais_blocked(self, ip: str) -> bool:
+        """is_blocked() for async callers; the version check uses the async cache API"""
+        now = time.monotonic()
+        if now >= self._next_sync:
+            await self._amaybe_sync(now)
+        return self._contains(ip)
+
+    def _contains(self, ip: str) -> bool:
+        key = address_key(ip)
+        if key is None:
+            return False
+        family, address = key
+        if address in self._sets[family]:
+            self.rejected += 1
+            return True
+        return False
+
+    def _sync_action(self, versions):
+        """What a sync with the given cache versions has to do, or None"""
+        if not self._loaded or versions[1] != self._versions[1]:
+            return lambda: self.reload(full=True)
+        if versions[0] != self._versions[0]:
+            return lambda: self.reload(full=False)
+        if self._next_expiry is not None and time.time() >= self._next_expiry:
+            return self._rebuild
+        return None
+
+    @staticmethod
+    def _version_pair(versions):
+        return versions.get(BLOCKLIST_VERSION_KEY), versions.get(BLOCKLIST_RESET_KEY)
+
+    def _maybe_sync(self, now: float):
+        if now < self._next_sync or not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sync = now + self.sync_interval
+            versions = self._version_pair(
+                caches[self.cache_alias].get_many([BLOCKLIST_VERSION_KEY, BLOCKLIST_RESET_KEY])
+            )
+            action = self._sync_action(versions)
+            if action is not None:
+                action()
+            self._versions = versions
+        except Exception as e:
+            logger.error(f"Blocklist sync failed: {e}")
+        finally:
+            self._sync_lock.release()
+
+    async def _amaybe_sync(self, now: float):
+        # Never blocks: another thread or task already syncing is left to it
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sync = now + self.sync_interval
+            versions = self._version_pair(
+                await caches[self.cache_alias].aget_many([BLOCKLIST_VERSION_KEY, BLOCKLIST_RESET_KEY])
+            )
+            action = self._sync_action(versions)
+            if action is not None:
+                # Reloads read the database, which is sync only
+                await sync_to_async(action)()
+            self._versions = versions
+        except Exception as e:
+            logger.error(f"Blocklist sync failed: {e}")
+        finally:
+            self._sync_lock.release()
+
+    def reload(self, full: bool = True):
+        """Load blocked rows from the database (only changed rows unless full)"""
+        started = timezone.now()
+        entries = {} if full else dict(self._entries)
+        since = None if full or self._watermark is None else self._watermark - WATERMARK_OVERLAP
+
+        networks = BlockedNetwork.objects.all()
+        clients = IPRateLimit.objects.filter(is_blocked=True) if since is None else IPRateLimit.objects.all()
+        if since is not None:
+            networks = networks.filter(updated_at__gte=since)
+            clients = clients.filter(updated_at__gte=since)
+
+        for row_id, network, active, expires_at in networks.values_list(
+                'id', 'network', 'is_active', 'expires_at').iterator():
+            self._apply(entries, ('network', row_id), network, active, expires_at)
+        for row_id, ip, blocked, blocked_until in clients.values_list(
+                'id', 'ip_address', 'is_blocked', 'blocked_until').iterator():
+            self._apply(entries, ('client', row_id), ip, blocked, blocked_until)
+
+        self._entries = entries
+        self._watermark = started
+        self._loaded = True
+        self.loads += 1
+        if full:
+            self.full_loads += 1
+        self._rebuild()
+
+    @staticmethod
+    def _apply(entries, key, network: str, active: bool, expires_at):
+        expires = expires_at.timestamp() if expires_at else None
+        if not active or (expires is not None and expires <= time.time()):
+            entries.pop(key, None)
+            return
+        try:
+            family, first, last = network_range(network)
+        except ValueError:
+            logger.error(f"Ignoring invalid blocklist entry {network!r}")
+            entries.pop(key, None)
+            return
+        entries[key] = (family, first, last, expires)
+
+    def _rebuild(self):
+        now = time.time()
+        ranges = {4: [], 6: []}
+        next_expiry = None
+        for key, (family, first, last, expires) in list(self._entries.items()):
+            if expires is not None:
+                if expires <= now:
+                    del self._entries[key]
+                    continue
+                next_expiry = expires if next_expiry is None else min(next_expiry, expires)
+            ranges[family].append((first, last))
+        # Swapped in whole, so concurrent readers see either set, never a mix
+        self._sets = {4: IntervalSet(ranges[4]), 6: IntervalSet(ranges[6])}
+        self._next_expiry = next_expiry
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._entries),
+            'ipv4_ranges': len(self._sets[4]),
+            'ipv6_ranges': len(self._sets[6]),
+            'loads': self.loads,
+            'full_loads': self.full_loads,
+            'rejected': self.rejected,
+        }
+
+
+blocklist = IPBlocklist(sync_interval=getattr(settings, 'BLOCKLIST_SYNC_INTERVAL', 5))
+
+
+@receiver(post_save, sender=BlockedNetwork)
+@receiver(post_save, sender=IPRateLimit)
+def _blocklist_row_saved(sender, instance, **kwargs):
+    transaction.on_commit(bump_version)
+
+
+@receiver(post_delete, sender=BlockedNetwork)
+@receiver(post_delete, sender=IPRateLimit)
+def _blocklist_row_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: bump_version(full=True))
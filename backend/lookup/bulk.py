@@ -0,0 +1,427 @@
+"""
+Bulk phone lookups.
+
+lookup_phone_numbers() handles a whole batch the way phone_search handles
+one number, but with batch operations at every step: numbers are parsed
+in one pass and deduplicated, cached results are fetched with one
+multi-get per cache tier, misses are computed together and written back
+with set_many, and the searches are logged with a single bulk insert.
+
+lookup_phone_stream() does the same for inputs too large to hold in
+memory: rows are read lazily from a CSV or NDJSON source, looked up in
+fixed-size chunks and yielded one result at a time, each tagged with its
+row offset so an interrupted run can be resumed from where it stopped.
+"""
+import codecs
+import csv
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from .analytics import search_counters
+from .cache_keys import phone_cache_key
+from .caching import search_cache
+from .providers import PHONE, get_pipeline
+from .search import phone_query, result_cache_timeout, result_durable_ttl, run_search
+from .search_log import search_log
+from .utils import ParsedPhone, parse_phone
+from .vectorized import ERROR_INPUT, ERROR_MESSAGES, input_text, normalize_nanp
+
+logger = logging.getLogger(__name__)
+
+NOT_US_ERROR = 'Only US phone numbers are supported'
+
+
+class BulkLookupError(ValueError):
+    """Raised for a bulk request that can't be processed at all"""
+
+
+class BulkRateLimited(Exception):
+    """Raised by a lookup_phone_stream() charge callback to stop the stream"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f'Rate limit exceeded, retry after {retry_after} seconds')
+        self.retry_after = retry_after
+
+
+def parse_numbers(numbers: List[Any]) -> List[ParsedPhone]:
+    """
+    Parse and validate every input, in order.
+
+    The batch is normalized with NumPy first (lookup.vectorized), so
+    formatting variants of a number collapse to one E.164 string and each
+    distinct number is parsed once. Inputs that aren't well-formed NANP
+    numbers are parsed individually, as phone_search would; values that
+    can't be a number at all (lists, objects, overlong strings) are
+    rejected without parsing.
+
+    Args:
+        numbers: Raw phone number inputs
+
+    Returns:
+        ParsedPhone per input (invalid ones carry the error)
+    """
+    e164 = normalize_nanp(numbers).e164_list()
+    by_e164 = {}
+    parsed_numbers = []
+    for number, normalized in zip(numbers, e164):
+        if normalized is None:
+            text = input_text(number)
+            parsed_numbers.append(parse_phone(text) if text is not None
+                                  else ParsedPhone(valid=False, error=ERROR_MESSAGES[ERROR_INPUT]))
+            continue
+        parsed = by_e164.get(normalized)
+        if parsed is None:
+            parsed = by_e164[normalized] = parse_phone(normalized)
+        parsed_numbers.append(parsed)
+    return parsed_numbers
+
+
+def _error_entry(number: Any, error: str) -> Dict[str, Any]:
+    return {'input': number, 'number': number, 'valid': False, 'error': error}
+
+
+def _resolve(computes: Dict[str, Callable[[], Dict[str, Any]]],
+             map_compute: Callable) -> Dict[str, Tuple[Dict[str, Any], bool]]:
+    """{number: (result, cache_hit)} for a {E.164 number: compute} mapping"""
+    keys = {number: phone_cache_key(number) for number in computes}
+    if None in keys.values():
+        # The cache key versions aren't loaded yet, so leave the cache alone
+        numbers = list(computes)
+        values = map_compute(lambda number: computes[number](), numbers)
+        return {number: (value, False) for number, value in zip(numbers, values)}
+    resolved = search_cache.get_many_or_compute(
+        {keys[number]: compute for number, compute in computes.items()},
+        timeout=result_cache_timeout,
+        durable_ttl=result_durable_ttl,
+        api_source='phonenumbers',
+        map_compute=map_compute,
+    )
+    return {number: resolved[key] for number, key in keys.items()}
+
+
+def _lookup_batch(numbers: List[Any], client_ip: Optional[str],
+                  user_agent: str = '') -> Dict[str, Any]:
+    parsed_numbers = parse_numbers(numbers)
+
+    # Deduplicate valid US numbers by their E.164 form
+    computes = {}
+    keys = []
+    for parsed in parsed_numbers:
+        if parsed.valid and parsed.region_code == 'US':
+            key = parsed.normalized
+            keys.append(key)
+            if key not in computes:
+                computes[key] = (lambda parsed=parsed: run_search(PHONE, phone_query(parsed)))
+        else:
+            keys.append(None)
+
+    resolved = {}
+    if computes:
+        # External providers are I/O bound, so compute their misses concurrently
+        external = any(not p.inline for p in get_pipeline().providers_for(PHONE))
+        workers = getattr(settings, 'PHONE_BULK_WORKERS', 8)
+        if external and workers > 1 and len(computes) > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bulk-lookup') as pool:
+                resolved = _resolve(computes, pool.map)
+        else:
+            resolved = _resolve(computes, map)
+
+    results = []
+    log_rows = []
+    cache_hits = 0
+    for number, parsed, key in zip(numbers, parsed_numbers, keys):
+        if key is None:
+            results.append(_error_entry(number, parsed.error if not parsed.valid else NOT_US_ERROR))
+            continue
+        result, cache_hit = resolved[key]
+        cache_hits += cache_hit
+        results.append({**result, 'input': number, 'cached': cache_hit})
+        log_rows.append({
+            'phone_number': str(number)[:20],
+            'normalized_number': parsed.normalized,
+            'ip_address': client_ip,
+            'user_agent': user_agent,
+            'found_results': True,
+            'api_source': 'cache' if cache_hit else result['source'],
+            'cache_hit': cache_hit,
+        })
+
+    if client_ip is not None:
+        search_log.log_many(log_rows)
+        search_counters.record_many(results)
+
+    valid = len(log_rows)
+    logger.info(
+        f"Bulk phone lookup: {len(numbers)} numbers, {len(computes)} unique, "
+        f"{valid} valid, {cache_hits} cache hits"
+    )
+    return {
+        'count': len(numbers),
+        'unique': len(computes),
+        'valid': valid,
+        'invalid': len(numbers) - valid,
+        'cache_hits': cache_hits,
+        'results': results,
+    }
+
+
+def lookup_phone_numbers(numbers: List[Any], client_ip: str, user_agent: str = '') -> Dict[str, Any]:
+    """
+    Look up a batch of phone numbers.
+
+    Args:
+        numbers: Raw phone number inputs, at most PHONE_BULK_MAX_NUMBERS
+        client_ip: Requesting IP, for the search log
+        user_agent: Requesting user agent, for the search log
+
+    Returns:
+        Summary counts and one result per input, in input order
+
+    Raises:
+        BulkLookupError: if the batch is empty or too large
+    """
+    max_numbers = getattr(settings, 'PHONE_BULK_MAX_NUMBERS', 5000)
+    if not numbers:
+        raise BulkLookupError('Please provide at least one phone number')
+    if len(numbers) > max_numbers:
+        raise BulkLookupError(f'At most {max_numbers} numbers can be looked up per request')
+    return _lookup_batch(numbers, client_ip, user_agent)
+
+
+# Column names recognised as the phone number in a CSV header row
+CSV_NUMBER_COLUMNS = ('phone', 'phone_number', 'number', 'telephone', 'mobile')
+
+# Columns written by csv_lines(), in order
+CSV_OUTPUT_FIELDS = (
+    'row', 'input', 'valid', 'number', 'formatted_number', 'location', 'carrier',
+    'line_type', 'area_code', 'source', 'cached', 'error',
+)
+
+
+def _text_lines(source: Iterable) -> Iterator[str]:
+    """Decode a binary line iterator (uploads, request bodies) as UTF-8 text"""
+    if isinstance(source, io.TextIOBase):
+        return iter(source)
+    return codecs.iterdecode(iter(source), 'utf-8-sig', errors='replace')
+
+
+def _csv_column(rows: Iterator[List[str]], index: int) -> Iterator[Any]:
+    for row in rows:
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        yield row[index] if index < len(row) else ''
+
+
+def _chain_first(first: List[str], rest: Iterator[List[str]]) -> Iterator[List[str]]:
+    yield first
+    yield from rest
+
+
+def iter_csv_numbers(source: Iterable, column: Optional[str] = None) -> Iterator[Any]:
+    """
+    Yield the phone number from each CSV row.
+
+    The number is taken from ``column`` (a header name or 0-based index),
+    else from the first header named like a phone column, else from the
+    first column of a file without a header. The header is read straight
+    away so a bad ``column`` fails before any lookups start.
+
+    Args:
+        source: Text or binary line iterator
+        column: Column holding the number
+
+    Returns:
+        Iterator of raw numbers, one per data row
+
+    Raises:
+        BulkLookupError: if ``column`` names a column the header lacks
+    """
+    reader = csv.reader(_text_lines(source))
+    first = next(reader, None)
+    if first is None:
+        return iter(())
+    header = [cell.strip().lower() for cell in first]
+
+    index = 0
+    has_header = False
+    if column is not None and not str(column).isdigit():
+        if column.strip().lower() not in header:
+            raise BulkLookupError(f'Column {column!r} not found in the CSV header')
+        index = header.index(column.strip().lower())
+        has_header = True
+    else:
+        named = [i for i, name in enumerate(header) if name in CSV_NUMBER_COLUMNS]
+        has_header = bool(named)
+        if column is not None:
+            index = int(column)
+        elif named:
+            index = named[0]
+
+    return _csv_column(reader if has_header else _chain_first(first, reader), index)
+
+
+def iter_ndjson_numbers(source: Iterable) -> Iterator[Any]:
+    """
+    Yield the phone number from each NDJSON line.
+
+    A line may be a JSON string or number, or an object with a "number" or
+    "phone" key. Lines that aren't valid JSON are passed through as text
+    so they come back as invalid results rather than aborting the stream.
+    """
+    for line in _text_lines(source):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError:
+            yield line
+            continue
+        if isinstance(value, dict):
+            value = value.get('number', value.get('phone'))
+        yield value
+
+
+def iter_numbers(source: Iterable, fmt: str, column: Optional[str] = None) -> Iterator[Any]:
+    """Yield raw numbers from a 'csv' or 'ndjson' source"""
+    if fmt == 'csv':
+        return iter_csv_numbers(source, column)
+    if fmt == 'ndjson':
+        return iter_ndjson_numbers(source)
+    raise BulkLookupError(f'Unsupported input format {fmt!r}, expected csv or ndjson')
+
+
+class BulkProgress:
+    """Running totals for a streamed bulk lookup"""
+
+    __slots__ = ('offset', 'rows', 'valid', 'cache_hits', 'chunks')
+
+    def __init__(self, offset: int = 0):
+        self.offset = offset
+        self.rows = 0
+        self.valid = 0
+        self.cache_hits = 0
+        self.chunks = 0
+
+    @property
+    def next_offset(self) -> int:
+        """Offset to resume from: the first row not yet returned"""
+        return self.offset + self.rows
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            'rows': self.rows,
+            'valid': self.valid,
+            'invalid': self.rows - self.valid,
+            'cache_hits': self.cache_hits,
+            'chunks': self.chunks,
+            'next_offset': self.next_offset,
+        }
+
+
+def lookup_phone_stream(numbers: Iterable[Any], client_ip: Optional[str] = None,
+                        user_agent: str = '', chunk_size: Optional[int] = None,
+                        offset: int = 0,
+                        progress: Optional[BulkProgress] = None,
+                        charge: Optional[Callable[[int], None]] = None,
+                        allowance: Optional[Callable[[], Optional[int]]] = None) -> Iterator[Tuple[str, Any]]:
+    """
+    Look up an arbitrarily long sequence of numbers, chunk by chunk.
+
+    Only one chunk of inputs and results is held at a time, so memory use
+    doesn't grow with the input.
+
+    Args:
+        numbers: Raw phone number inputs; consumed lazily
+        client_ip: Requesting IP for the search log (None: don't log)
+        user_agent: Requesting user agent, for the search log
+        chunk_size: Numbers per lookup batch (default PHONE_BULK_CHUNK_SIZE)
+        offset: Rows to skip first, to resume an earlier run
+        progress: BulkProgress to update (a new one is used if omitted)
+        charge: Called with each chunk's size before it is looked up; may
+            raise BulkRateLimited to end the stream
+        allowance: Called before each chunk for the number of rows that may
+            be looked up now (None: no limit); the chunk is cut to that size
+
+    Returns:
+        Iterator of ('result', result) items, each result carrying its
+        0-based input "row", with a ('progress', BulkProgress) item after
+        every chunk
+    """
+    chunk_size = chunk_size or getattr(settings, 'PHONE_BULK_CHUNK_SIZE', 500)
+    if chunk_size < 1:
+        raise BulkLookupError('Chunk size must be at least 1')
+    if offset < 0:
+        raise BulkLookupError('Offset must not be negative')
+    progress = progress or BulkProgress(offset)
+
+    numbers = iter(numbers)
+    if offset:
+        # Consume (not just slice) so the skipped rows are never held
+        for _ in islice(numbers, offset):
+            pass
+
+    while True:
+        size = chunk_size
+        if allowance is not None:
+            remaining = allowance()
+            if remaining is not None:
+                # With nothing left, one row is still read so that charge()
+                # refuses it with a time to retry
+                size = max(1, min(chunk_size, remaining))
+        chunk = list(islice(numbers, size))
+        if not chunk:
+            break
+        if charge is not None:
+            charge(len(chunk))
+        batch = _lookup_batch(chunk, client_ip, user_agent)
+        row = progress.next_offset
+        for result in batch['results']:
+            yield 'result', {'row': row, **result}
+            row += 1
+        progress.rows += batch['count']
+        progress.valid += batch['valid']
+        progress.cache_hits += batch['cache_hits']
+        progress.chunks += 1
+        yield 'progress', progress
+
+
+def _csv_line(values: Iterable[Any]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(['' if value is None else value for value in values])
+    return buffer.getvalue()
+
+
+def csv_trailer(next_offset: int, error: str) -> str:
+    """
+    Final CSV line for a stream that stopped early.
+
+    The row has no input; its "row" column is the offset to resume from and
+    its "error" column says why the stream stopped.
+    """
+    trailer = {'row': next_offset, 'error': error}
+    return _csv_line(trailer.get(field) for field in CSV_OUTPUT_FIELDS)
+
+
+def csv_lines(items: Iterable[Tuple[str, Any]], header: bool = True) -> Iterator[str]:
+    """Render lookup_phone_stream() output as CSV lines (progress items are dropped)"""
+    if header:
+        yield _csv_line(CSV_OUTPUT_FIELDS)
+    for kind, item in items:
+        if kind == 'result':
+            yield _csv_line(item.get(field) for field in CSV_OUTPUT_FIELDS)
+
+
+def ndjson_lines(items: Iterable[Tuple[str, Any]], progress: bool = True) -> Iterator[str]:
+    """Render lookup_phone_stream() output as NDJSON, one object per line"""
+    for kind, item in items:
+        if kind == 'result':
+            yield json.dumps(item, default=str) + '\n'
+        elif progress:
+            yield json.dumps({'progress': item.as_dict()}) + '\n'
@@ -0,0 +1,263 @@
+"""
+Search cache keys.
+
+Every search endpoint takes its cache key from here. A search type's query
+parameters are canonicalized (Unicode NFKC, casefolded, whitespace
+collapsed), so equivalent queries share one entry, and hashed into a key of
+fixed length:
+
+    <kind>:v<version>:<32 hex digits>
+
+That is well within memcached's 250-byte key limit and the 100 characters
+of APIResponseCache.cache_key, however long the input.
+
+The version is a namespace per search type. bump_version() (or
+`manage.py bump_cache_version`) moves a type to new keys, which
+invalidates all of its cached results at once without touching them; the
+old entries expire on their own. Versions are stored in SiteConfiguration
+rows (``cache_key_version.<kind>``), and a daemon thread in each process
+re-reads them every CACHE_KEY_VERSION_SYNC_INTERVAL seconds, so building a
+key never waits on the database. Until a process's first load finishes the
+key functions return None, which search_cache treats as "don't cache":
+searches skip the cache altogether rather than block the caller (or the
+event loop, in the async views), read entries a bump has invalidated or
+store results under a key no other process would read.
+
+Saving or deleting a PersonRecord or PropertyRecord invalidates the keys
+of the searches that return it as typed (invalidate_person_searches(),
+invalidate_property_searches()), so edits show up without waiting for
+SEARCH_CACHE_TIMEOUT. Results for other spellings of the same query still
+age out on their own.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import unicodedata
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .addresses import NormalizedAddress
+from .caching import search_cache
+from .models import PersonRecord, PropertyRecord, SiteConfiguration
+from .providers import ADDRESS, BACKGROUND, PEOPLE, PHONE, SEARCH_KINDS
+
+logger = logging.getLogger(__name__)
+
+VERSION_CONFIG_KEY = 'cache_key_version.{}'
+# Used until the versions are loaded; stored versions start at 1
+UNLOADED_VERSION = 0
+
+
+def canonical_text(value: Any) -> str:
+    """NFKC, casefolded, whitespace collapsed: ' ＪＯＨＮ  Smith ' -> 'john smith'"""
+    text = unicodedata.normalize('NFKC', str(value if value is not None else ''))
+    return ' '.join(text.casefold().split())
+
+
+def canonical_params(params: Dict[str, Any]) -> Dict[str, str]:
+    """Query parameters with every value in canonical form"""
+    return {name: canonical_text(value) for name, value in params.items()}
+
+
+def params_digest(params: Dict[str, Any]) -> str:
+    """128-bit hex digest of the canonical form of params"""
+    canonical = json.dumps(canonical_params(params), sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class KeyVersions:
+    """Per-process copy of the search type versions, refreshed by a daemon thread"""
+
+    def __init__(self, sync_interval: float = 5.0):
+        self.sync_interval = sync_interval
+        self._versions: Dict[str, int] = {kind: 1 for kind in SEARCH_KINDS}
+        self._loaded = threading.Event()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self.loads = 0
+        self.load_errors = 0
+
+    def get(self, kind: str) -> int:
+        """Current version of kind; never waits, UNLOADED_VERSION before the first load"""
+        self._ensure_worker()
+        if not self._loaded.is_set():
+            return UNLOADED_VERSION
+        return self._versions[kind]
+
+    def _ensure_worker(self):
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None:
+            return
+        with self._lock:
+            # A forked worker inherits the object but not the thread
+            if self._pid != pid or self._thread is None:
+                self._pid = pid
+                self._loaded.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name='cache-key-versions', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.load()
+            except Exception as e:
+                self.load_errors += 1
+                logger.error(f"Loading cache key versions failed: {e}")
+            finally:
+                close_old_connections()
+                self._loaded.set()
+            if self._stop.wait(self.sync_interval):
+                break
+
+    def ensure_loaded(self):
+        """Load the versions now if the worker hasn't yet (queries the database)"""
+        self._ensure_worker()
+        if not self._loaded.is_set():
+            self.load()
+            self._loaded.set()
+
+    def load(self):
+        """Read the versions from SiteConfiguration"""
+        rows = dict(
+            SiteConfiguration.objects
+            .filter(key__in=[VERSION_CONFIG_KEY.format(kind) for kind in SEARCH_KINDS], is_active=True)
+            .values_list('key', 'value')
+        )
+        versions = {}
+        for kind in SEARCH_KINDS:
+            value = rows.get(VERSION_CONFIG_KEY.format(kind), '1')
+            try:
+                versions[kind] = int(value)
+            except ValueError:
+                logger.error(f"Ignoring cache key version {value!r} for {kind}: not an integer")
+                versions[kind] = self._versions[kind]
+        changed = {kind for kind, version in versions.items() if version != self._versions[kind]}
+        if changed and self._loaded.is_set():
+            logger.info(f"Cache key versions changed: "
+                        f"{', '.join(f'{kind}=v{versions[kind]}' for kind in sorted(changed))}")
+        self._versions = versions
+        self.loads += 1
+
+    def bump(self, kind: str) -> int:
+        """Move kind to a new version in the database and in this process"""
+        if kind not in SEARCH_KINDS:
+            raise ValueError(f"Unknown search kind: {kind}")
+        with transaction.atomic():
+            config, _ = SiteConfiguration.objects.select_for_update().get_or_create(
+                key=VERSION_CONFIG_KEY.format(kind),
+                defaults={'value': '1', 'description': f'Cache key version of {kind} searches (lookup.cache_keys)'},
+            )
+            try:
+                current = int(config.value)
+            except ValueError:
+                current = self._versions[kind]
+            config.value = str(max(current, self._versions[kind]) + 1)
+            config.is_active = True
+            config.save(update_fields=['value', 'is_active', 'updated_at'])
+        self._versions = {**self._versions, kind: int(config.value)}
+        logger.info(f"Cache key version of {kind} searches bumped to v{config.value}")
+        return int(config.value)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'loaded': self._loaded.is_set(),
+            'versions': dict(self._versions),
+            'loads': self.loads,
+            'load_errors': self.load_errors,
+        }
+
+
+key_versions = KeyVersions(sync_interval=getattr(settings, 'CACHE_KEY_VERSION_SYNC_INTERVAL', 5))
+
+
+def bump_version(kind: str) -> int:
+    """
+    Invalidate every cached result of a search type.
+
+    Args:
+        kind: Search kind (providers.PHONE, PEOPLE, ADDRESS or BACKGROUND)
+
+    Returns:
+        The new version
+    """
+    return key_versions.bump(kind)
+
+
+def cache_key(kind: str, **params: Any) -> Optional[str]:
+    """
+    Cache key of a search.
+
+    Args:
+        kind: Search kind (providers.PHONE, PEOPLE, ADDRESS or BACKGROUND)
+        params: The query parameters the result depends on
+
+    Returns:
+        '<kind>:v<version>:<digest>', or None while the versions are not
+        loaded yet (the search bypasses the cache)
+    """
+    version = key_versions.get(kind)
+    if version == UNLOADED_VERSION:
+        return None
+    return f"{kind}:v{version}:{params_digest(params)}"
+
+
+def phone_cache_key(number: str) -> Optional[str]:
+    """Cache key of a phone search by E.164 number"""
+    return cache_key(PHONE, number=number)
+
+
+def people_cache_key(first_name: str, last_name: str, city: str, state: str) -> Optional[str]:
+    return cache_key(PEOPLE, first_name=first_name, last_name=last_name, city=city, state=state)
+
+
+def address_cache_key(address: NormalizedAddress) -> Optional[str]:
+    """Cache key of a normalized address (the ZIP+4 extension doesn't change the result)"""
+    return cache_key(ADDRESS, street=address.street, city=address.city,
+                     state=address.state, zip_code=address.zip_code)
+
+
+def background_cache_key(first_name: str, last_name: str, city: str, state: str) -> Optional[str]:
+    """Cache key shared by the background check endpoints and jobs"""
+    return cache_key(BACKGROUND, first_name=first_name, last_name=last_name, city=city, state=state)
+
+
+def invalidate_person_searches(record: PersonRecord):
+    """Drop the cached people and background searches for a person's name, with and without location"""
+    key_versions.ensure_loaded()
+    locations = {(record.city, record.state), (record.city, ''), ('', record.state), ('', '')}
+    for city, state in locations:
+        search_cache.invalidate(people_cache_key(record.first_name, record.last_name, city, state))
+        search_cache.invalidate(background_cache_key(record.first_name, record.last_name, city, state))
+
+
+def invalidate_property_searches(record: PropertyRecord):
+    """Drop the cached address searches for a property, with and without its ZIP code"""
+    key_versions.ensure_loaded()
+    parts = record.address_key.split('|')
+    if len(parts) != 3:
+        return
+    street, city, state = parts
+    for zip_code in {record.zip_code, ''}:
+        search_cache.invalidate(cache_key(ADDRESS, street=street, city=city, state=state, zip_code=zip_code))
+
+
+@receiver(post_save, sender=PersonRecord)
+@receiver(post_delete, sender=PersonRecord)
+def _person_record_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_person_searches(instance))
+
+
+@receiver(post_save, sender=PropertyRecord)
+@receiver(post_delete, sender=PropertyRecord)
+def _property_record_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_property_searches(instance))
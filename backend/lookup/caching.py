@@ -0,0 +1,967 @@
+"""
+Tiered cache for search results.
+
+L1 is a small TTL/LRU dictionary private to each worker process; L2 is the
+shared Django cache (LocMemCache, or Redis when REDIS_URL is set). Reads try
+L1 first and only go to L2 on an L1 miss, so popular keys are served without
+a network round trip.
+
+L1 entries live for a few seconds (SEARCH_CACHE_L1_TTL). When L2 is private
+to the process (LocMemCache), misses are remembered for even less
+(SEARCH_CACHE_NEGATIVE_TTL); with a shared L2 they are not, since that would
+hide a value another worker has just stored. Explicit invalidations
+(invalidate(), called when the records behind a result change) are
+broadcast through L2: each one is appended to a short log of
+``tiered:invalidation:<seq>`` keys, and every worker replays the log at most
+once per SEARCH_CACHE_SYNC_INTERVAL seconds to drop its own L1 copies.
+
+Behind L2 sits a durable L3, the APIResponseCache table. A result that
+misses L1 and L2 is looked up there and, when found, back-filled into the
+upper tiers, so a cache flush or Redis restart is not a cold start. Hit
+counts for L3 rows are buffered in memory and written in batches.
+
+Misses are coalesced by get_or_compute(): concurrent requests for the same
+key inside a process wait on a single computation, and across processes a
+short lease (``tiered:lease:<key>``, taken with cache.add) lets one worker
+recompute while the others poll L2 for its result.
+
+Entries are stored as Envelopes carrying a soft expiry and the time the
+value took to compute. Past the soft expiry (SEARCH_CACHE_TIMEOUT) a value
+is still served for SEARCH_CACHE_STALE_TTL seconds while a background
+thread refreshes it, and fresh values are refreshed early at random
+(XFetch, SEARCH_CACHE_XFETCH_BETA) so refreshes of hot keys spread out.
+
+The a-prefixed methods (aget, aset, aget_or_compute) are the same operations
+for async views: they use the async cache and ORM APIs, coalesce misses on
+asyncio futures and refresh stale entries in asyncio tasks.
+
+A key of None bypasses every tier: get() misses, set() stores nothing and
+get_or_compute() just computes. lookup.cache_keys hands out None until a
+process knows the current key versions.
+
+Values returned from L1 are shared between requests and must not be mutated.
+"""
+import asyncio
+import atexit
+import inspect
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple, Union
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache import cache as django_cache
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import APIResponseCache
+
+logger = logging.getLogger(__name__)
+
+LEASE_KEY = 'tiered:lease:{}'
+LEASE_POLL_INTERVAL = 0.05
+
+INVALIDATION_SEQ_KEY = 'tiered:invalidation:seq'
+INVALIDATION_ENTRY_KEY = 'tiered:invalidation:{}'
+
+# How long invalidation log entries are kept in L2, and how far a worker
+# replays the log before giving up and clearing its whole L1.
+INVALIDATION_RETENTION = 3600
+MAX_INVALIDATION_REPLAY = 1000
+
+# Rows per query/insert for the durable tier's batch operations
+DB_BATCH_SIZE = 500
+
+# Marker stored in L1 for keys known to be missing from L2
+_NEGATIVE = object()
+
+
+def _is_shared(cache) -> bool:
+    """Whether other processes read and write the same cache"""
+    if cache is django_cache:
+        cache = caches[DEFAULT_CACHE_ALIAS]
+    return not isinstance(cache, (LocMemCache, DummyCache))
+
+
+class LocalCache:
+    """Thread-safe in-process TTL/LRU cache (the L1 tier)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, now: float):
+        """Return the stored value, _NEGATIVE, or None when absent/expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: float, now: float):
+        if self.max_entries <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (now + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DurableCache:
+    """
+    APIResponseCache-backed durable tier (L3).
+
+    Hits are counted in memory and flushed with one UPDATE per distinct
+    increment, either every ``hit_flush_interval`` seconds or once
+    ``hit_flush_threshold`` hits are pending, instead of a save per hit.
+    """
+
+    # APIResponseCache.cache_key max_length
+    MAX_KEY_LENGTH = 100
+
+    def __init__(self, hit_flush_interval: float = 60, hit_flush_threshold: int = 500):
+        self.hit_flush_interval = hit_flush_interval
+        self.hit_flush_threshold = hit_flush_threshold
+        self._pending_hits: Counter = Counter()
+        self._pending_total = 0
+        self._hits_lock = threading.Lock()
+        self._next_flush = time.monotonic() + hit_flush_interval
+
+    def accepts(self, key: str) -> bool:
+        return len(key) <= self.MAX_KEY_LENGTH
+
+    def get(self, key: str) -> Tuple[Optional[Any], float]:
+        """Return (value, seconds until expiry), or (None, 0) on a miss"""
+        if not self.accepts(key):
+            return None, 0
+        now = timezone.now()
+        row = (
+            APIResponseCache.objects
+            .filter(cache_key=key, expires_at__gt=now)
+            .values_list('response_data', 'expires_at')
+            .first()
+        )
+        if row is None:
+            return None, 0
+        self.record_hit(key)
+        response_data, expires_at = row
+        return response_data, (expires_at - now).total_seconds()
+
+    async def aget(self, key: str) -> Tuple[Optional[Any], float]:
+        if not self.accepts(key):
+            return None, 0
+        now = timezone.now()
+        row = await (
+            APIResponseCache.objects
+            .filter(cache_key=key, expires_at__gt=now)
+            .values_list('response_data', 'expires_at')
+            .afirst()
+        )
+        if row is None:
+            return None, 0
+        if self._count_hit(key):
+            await sync_to_async(self.flush_hits)()
+        response_data, expires_at = row
+        return response_data, (expires_at - now).total_seconds()
+
+    def set(self, key: str, value: Any, ttl: int, api_source: str):
+        if not self.accepts(key):
+            return
+        APIResponseCache.objects.update_or_create(
+            cache_key=key,
+            defaults={
+                'response_data': value,
+                'api_source': api_source,
+                'expires_at': timezone.now() + timedelta(seconds=ttl),
+            },
+        )
+
+    async def aset(self, key: str, value: Any, ttl: int, api_source: str):
+        if not self.accepts(key):
+            return
+        await APIResponseCache.objects.aupdate_or_create(
+            cache_key=key,
+            defaults={
+                'response_data': value,
+                'api_source': api_source,
+                'expires_at': timezone.now() + timedelta(seconds=ttl),
+            },
+        )
+
+    def get_many(self, keys) -> Dict[str, Tuple[Any, float]]:
+        """Return {key: (value, seconds until expiry)} for the unexpired keys found"""
+        keys = [key for key in keys if self.accepts(key)]
+        now = timezone.now()
+        found = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), DB_BATCH_SIZE):
+            rows = (
+                APIResponseCache.objects
+                .filter(cache_key__in=keys[start:start + DB_BATCH_SIZE], expires_at__gt=now)
+                .values_list('cache_key', 'response_data', 'expires_at')
+            )
+            for key, response_data, expires_at in rows:
+                found[key] = (response_data, (expires_at - now).total_seconds())
+        if found:
+            due = False
+            for key in found:
+                due = self._count_hit(key) or due
+            if due:
+                self.flush_hits()
+        return found
+
+    def set_many(self, items: Dict[str, Tuple[Any, int]], api_source: str):
+        """Insert or update many rows at once; items maps key -> (value, ttl)"""
+        now = timezone.now()
+        rows = [
+            APIResponseCache(
+                cache_key=key,
+                response_data=value,
+                api_source=api_source,
+                expires_at=now + timedelta(seconds=ttl),
+            )
+            for key, (value, ttl) in items.items()
+            if self.accepts(key)
+        ]
+        if rows:
+            APIResponseCache.objects.bulk_create(
+                rows,
+                batch_size=DB_BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['cache_key'],
+                update_fields=['response_data', 'api_source', 'expires_at'],
+            )
+
+    def record_hit(self, key: str):
+        if self._count_hit(key):
+            self.flush_hits()
+
+    def _count_hit(self, key: str) -> bool:
+        """Buffer a hit; returns True when the buffer is due to be flushed"""
+        with self._hits_lock:
+            self._pending_hits[key] += 1
+            self._pending_total += 1
+            return (self._pending_total >= self.hit_flush_threshold
+                    or time.monotonic() >= self._next_flush)
+
+    def flush_hits(self):
+        """Write buffered hit counts to the database"""
+        with self._hits_lock:
+            pending = self._pending_hits
+            self._pending_hits = Counter()
+            self._pending_total = 0
+            self._next_flush = time.monotonic() + self.hit_flush_interval
+        if not pending:
+            return
+
+        by_increment = defaultdict(list)
+        for key, hits in pending.items():
+            by_increment[hits].append(key)
+        try:
+            for hits, keys in by_increment.items():
+                APIResponseCache.objects.filter(cache_key__in=keys).update(
+                    hit_count=F('hit_count') + hits
+                )
+        except Exception as e:
+            logger.error(f"Failed to flush {sum(pending.values())} cache hit counts: {e}")
+
+
+class Envelope(NamedTuple):
+    """
+    What TieredCache stores in L1/L2 for each key.
+
+    ``soft_expiry`` (wall clock) is when the value stops being fresh; the
+    L2 entry itself lives stale_ttl seconds longer. ``delta`` is how long
+    the value took to compute, used for probabilistic early refresh.
+    """
+    value: Any
+    delta: float
+    soft_expiry: float
+
+
+class _Flight:
+    """A computation in progress that other threads can wait on"""
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TieredCache:
+    """In-process L1 in front of the shared Django cache (L2) and an optional durable L3"""
+
+    def __init__(self, l2=None, l3: Optional[DurableCache] = None, l1_max_entries: int = 2048,
+                 l1_ttl: float = 30, negative_ttl: float = 5, sync_interval: float = 1,
+                 fresh_ttl: float = 3600, stale_ttl: float = 86400, xfetch_beta: float = 1.0,
+                 refresh_workers: int = 4, lease_timeout: float = 10, lease_wait: float = 2,
+                 l2_shared: Optional[bool] = None):
+        self.l2 = l2 if l2 is not None else django_cache
+        self.l2_shared = _is_shared(self.l2) if l2_shared is None else l2_shared
+        self.l3 = l3
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.xfetch_beta = xfetch_beta
+        self.refresh_workers = refresh_workers
+        self.lease_timeout = lease_timeout
+        self.lease_wait = lease_wait
+        self._flights: Dict[str, _Flight] = {}
+        self._flights_lock = threading.Lock()
+        self._refreshing = set()
+        self._refresh_executor = None
+        self._async_flights: Dict[str, asyncio.Future] = {}
+        self._refresh_tasks = set()
+        self.l1 = LocalCache(l1_max_entries)
+        self.l1_ttl = l1_ttl
+        self.negative_ttl = negative_ttl
+        self.sync_interval = sync_interval
+
+        self._sync_lock = threading.Lock()
+        self._next_sync = 0.0
+        self._invalidation_seq = None
+
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.l3_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.lease_waits = 0
+        self.stale_hits = 0
+        self.early_refreshes = 0
+
+    def get(self, key: Optional[str]) -> Optional[Any]:
+        """Return the cached value for key (fresh or stale), or None"""
+        if key is None:
+            return None
+        envelope = self._get_envelope(key)
+        return envelope.value if envelope is not None else None
+
+    def _get_envelope(self, key: str) -> Optional[Envelope]:
+        now = time.monotonic()
+        self._maybe_sync(now)
+
+        envelope = self.l1.get(key, now)
+        if envelope is _NEGATIVE:
+            self.negative_hits += 1
+            return None
+        if envelope is not None:
+            self.l1_hits += 1
+            return envelope
+
+        envelope = self.l2.get(key)
+        if envelope is not None:
+            if not isinstance(envelope, Envelope):
+                # Written before envelopes existed; serve it but treat as stale
+                envelope = Envelope(envelope, 0.0, 0.0)
+            self.l2_hits += 1
+            self.l1.set(key, envelope, self.l1_ttl, now)
+            return envelope
+
+        if self.l3 is not None:
+            try:
+                value, remaining = self.l3.get(key)
+            except Exception as e:
+                logger.error(f"Durable cache lookup failed for {key}: {e}")
+                value = None
+            if value is not None:
+                self.l3_hits += 1
+                fresh = min(self.fresh_ttl, remaining)
+                envelope = Envelope(value, 0.0, time.time() + fresh)
+                self.l2.set(key, envelope, min(fresh + self.stale_ttl, remaining))
+                self.l1.set(key, envelope, min(self.l1_ttl, remaining), now)
+                return envelope
+
+        self.misses += 1
+        self._remember_miss(key, now)
+        return None
+
+    def _remember_miss(self, key: str, now: float):
+        # With a shared L2 a negative entry would hide another worker's write
+        if not self.l2_shared:
+            self.l1.set(key, _NEGATIVE, self.negative_ttl, now)
+
+    def set(self, key: Optional[str], value: Any, timeout: Optional[float] = None,
+            durable_ttl: Optional[int] = None, api_source: str = 'search', delta: float = 0.0):
+        """
+        Store value in L1 and L2, and in L3 when durable_ttl is given.
+
+        The value is fresh for ``timeout`` seconds (default fresh_ttl) and
+        can be served stale for stale_ttl seconds after that. L1 keeps it
+        for at most l1_ttl seconds.
+        """
+        if key is None:
+            return
+        timeout = self.fresh_ttl if timeout is None else timeout
+        envelope = Envelope(value, delta, time.time() + timeout)
+        self.l2.set(key, envelope, timeout + self.stale_ttl)
+        self.l1.set(key, envelope, min(self.l1_ttl, timeout + self.stale_ttl), time.monotonic())
+
+        if self.l3 is not None and durable_ttl:
+            try:
+                self.l3.set(key, value, durable_ttl, api_source)
+            except Exception as e:
+                logger.error(f"Durable cache write failed for {key}: {e}")
+
+    def get_or_compute(self, key: Optional[str], compute: Callable[[], Any],
+                       timeout: Union[float, Callable[[Any], float], None] = None,
+                       durable_ttl: Union[int, Callable[[Any], int], None] = None,
+                       api_source: str = 'search') -> Tuple[Any, bool]:
+        """
+        Return the cached value for key, computing and storing it on a miss.
+
+        Values past their soft expiry are returned immediately while a
+        background thread recomputes them (stale-while-revalidate). Fresh
+        values are also refreshed early with a probability that rises as
+        expiry approaches and with how long the value took to compute
+        (XFetch), so hot keys are normally replaced before going stale.
+
+        Only one caller per process computes a given key at a time; the rest
+        wait for its result. Across processes, the caller holding the L2
+        lease computes while others poll L2 for up to lease_wait seconds
+        before computing themselves.
+
+        Args:
+            key: Cache key, or None to compute without the cache
+            compute: Zero-argument callable producing the value
+            timeout: Seconds the value stays fresh (default fresh_ttl), or a
+                callable deriving it from the value
+            durable_ttl: L3 TTL in seconds, or a callable deriving it from the value
+            api_source: Source recorded on the L3 row
+
+        Returns:
+            Tuple of (value, served_from_cache)
+        """
+        if key is None:
+            return compute(), False
+        envelope = self._get_envelope(key)
+        if envelope is not None:
+            now = time.time()
+            if now >= envelope.soft_expiry:
+                self.stale_hits += 1
+                self._refresh_in_background(key, compute, timeout, durable_ttl, api_source)
+            elif self._should_refresh_early(envelope, now):
+                self.early_refreshes += 1
+                self._refresh_in_background(key, compute, timeout, durable_ttl, api_source)
+            return envelope.value, True
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            self.coalesced += 1
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, True
+
+        try:
+            value, computed = self._compute_with_lease(key, compute, timeout, durable_ttl, api_source)
+            flight.value = value
+            return value, not computed
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _should_refresh_early(self, envelope: Envelope, now: float) -> bool:
+        # XFetch: recompute when now - delta * beta * ln(U) passes expiry,
+        # with U uniform in (0, 1]
+        if self.xfetch_beta <= 0 or envelope.delta <= 0:
+            return False
+        gap = -envelope.delta * self.xfetch_beta * math.log(1.0 - random.random())
+        return now + gap >= envelope.soft_expiry
+
+    def _refresh_in_background(self, key, compute, timeout, durable_ttl, api_source):
+        with self._flights_lock:
+            if key in self._refreshing or key in self._flights:
+                return
+            self._refreshing.add(key)
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(
+                    max_workers=self.refresh_workers, thread_name_prefix='cache-refresh'
+                )
+        try:
+            self._refresh_executor.submit(self._refresh, key, compute, timeout, durable_ttl, api_source)
+        except RuntimeError:
+            # Executor shut down (interpreter exiting)
+            with self._flights_lock:
+                self._refreshing.discard(key)
+
+    def _refresh(self, key, compute, timeout, durable_ttl, api_source):
+        try:
+            lease_key = LEASE_KEY.format(key)
+            token = uuid.uuid4().hex
+            if not self.l2.add(lease_key, token, self.lease_timeout):
+                # Another worker is already refreshing this key
+                return
+            try:
+                self._compute_and_set(key, compute, timeout, durable_ttl, api_source)
+            finally:
+                self._release_lease(key, lease_key, token)
+        except Exception as e:
+            logger.error(f"Background refresh failed for {key}: {e}", exc_info=True)
+        finally:
+            with self._flights_lock:
+                self._refreshing.discard(key)
+            close_old_connections()
+
+    def _compute_and_set(self, key, compute, timeout, durable_ttl, api_source):
+        started = time.monotonic()
+        value = compute()
+        delta = time.monotonic() - started
+        if callable(timeout):
+            timeout = timeout(value)
+        if callable(durable_ttl):
+            durable_ttl = durable_ttl(value)
+        self.set(key, value, timeout, durable_ttl=durable_ttl, api_source=api_source, delta=delta)
+        return value
+
+    def _release_lease(self, key, lease_key, token):
+        try:
+            if self.l2.get(lease_key) == token:
+                self.l2.delete(lease_key)
+        except Exception as e:
+            logger.error(f"Failed to release cache lease for {key}: {e}")
+
+    def _compute_with_lease(self, key, compute, timeout, durable_ttl, api_source) -> Tuple[Any, bool]:
+        lease_key = LEASE_KEY.format(key)
+        token = uuid.uuid4().hex
+        try:
+            leased = self.l2.add(lease_key, token, self.lease_timeout)
+        except Exception as e:
+            logger.error(f"Failed to take cache lease for {key}: {e}")
+            leased = True
+
+        if not leased:
+            # Another worker is computing this key; wait for its result
+            self.lease_waits += 1
+            deadline = time.monotonic() + self.lease_wait
+            while time.monotonic() < deadline:
+                time.sleep(LEASE_POLL_INTERVAL)
+                envelope = self.l2.get(key)
+                if isinstance(envelope, Envelope):
+                    self.l1.set(key, envelope, self.l1_ttl, time.monotonic())
+                    return envelope.value, False
+            logger.warning(f"Timed out waiting for lease holder of {key}, computing locally")
+
+        try:
+            return self._compute_and_set(key, compute, timeout, durable_ttl, api_source), True
+        finally:
+            if leased:
+                self._release_lease(key, lease_key, token)
+
+    def get_many(self, keys) -> Dict[str, Any]:
+        """Return {key: value} for the keys cached in any tier (fresh or stale)"""
+        return {key: envelope.value for key, envelope in self._get_envelopes(keys).items()}
+
+    def _get_envelopes(self, keys) -> Dict[str, Envelope]:
+        now = time.monotonic()
+        self._maybe_sync(now)
+
+        found = {}
+        missing = []
+        for key in keys:
+            envelope = self.l1.get(key, now)
+            if envelope is _NEGATIVE:
+                self.negative_hits += 1
+            elif envelope is not None:
+                self.l1_hits += 1
+                found[key] = envelope
+            else:
+                missing.append(key)
+        if not missing:
+            return found
+
+        for key, envelope in self.l2.get_many(missing).items():
+            if not isinstance(envelope, Envelope):
+                envelope = Envelope(envelope, 0.0, 0.0)
+            self.l2_hits += 1
+            self.l1.set(key, envelope, self.l1_ttl, now)
+            found[key] = envelope
+
+        missing = [key for key in missing if key not in found]
+        if missing and self.l3 is not None:
+            try:
+                durable = self.l3.get_many(missing)
+            except Exception as e:
+                logger.error(f"Durable cache batch lookup failed: {e}")
+                durable = {}
+            for key, (value, remaining) in durable.items():
+                self.l3_hits += 1
+                fresh = min(self.fresh_ttl, remaining)
+                envelope = Envelope(value, 0.0, time.time() + fresh)
+                self.l2.set(key, envelope, min(fresh + self.stale_ttl, remaining))
+                self.l1.set(key, envelope, min(self.l1_ttl, remaining), now)
+                found[key] = envelope
+
+        self.misses += len(missing) - sum(1 for key in missing if key in found)
+        return found
+
+    def set_many(self, values: Dict[str, Any], timeout=None, durable_ttl=None,
+                 api_source: str = 'search', delta: float = 0.0):
+        """
+        Store many values, with one L2 set_many per distinct timeout and one
+        batched L3 write. timeout and durable_ttl may be callables taking the value.
+        """
+        now = time.time()
+        by_timeout = defaultdict(dict)
+        durable = {}
+        for key, value in values.items():
+            fresh = timeout(value) if callable(timeout) else timeout
+            fresh = self.fresh_ttl if fresh is None else fresh
+            envelope = Envelope(value, delta, now + fresh)
+            by_timeout[fresh][key] = envelope
+            self.l1.set(key, envelope, min(self.l1_ttl, fresh + self.stale_ttl), time.monotonic())
+            ttl = durable_ttl(value) if callable(durable_ttl) else durable_ttl
+            if ttl:
+                durable[key] = (value, ttl)
+
+        for fresh, envelopes in by_timeout.items():
+            self.l2.set_many(envelopes, fresh + self.stale_ttl)
+
+        if self.l3 is not None and durable:
+            try:
+                self.l3.set_many(durable, api_source)
+            except Exception as e:
+                logger.error(f"Durable cache batch write failed for {len(durable)} keys: {e}")
+
+    def get_many_or_compute(self, computes: Dict[str, Callable[[], Any]], timeout=None,
+                            durable_ttl=None, api_source: str = 'search',
+                            map_compute=map) -> Dict[str, Tuple[Any, bool]]:
+        """
+        Batch get_or_compute(): one multi-get per tier, then compute the misses
+        and write them back with set_many().
+
+        Stale or early-expiring hits are refreshed in the background as in
+        get_or_compute(). Misses are not coalesced with concurrent requests.
+
+        Args:
+            computes: Mapping of key -> zero-argument callable producing its value
+            timeout: Freshness in seconds, or a callable deriving it from the value
+            durable_ttl: L3 TTL in seconds, or a callable deriving it from the value
+            api_source: Source recorded on L3 rows
+            map_compute: map()-like function used to run the computations,
+                e.g. an executor's map to compute misses concurrently
+
+        Returns:
+            Mapping of key -> (value, served_from_cache)
+        """
+        envelopes = self._get_envelopes(list(computes))
+        results = {}
+        now = time.time()
+        for key, envelope in envelopes.items():
+            if now >= envelope.soft_expiry:
+                self.stale_hits += 1
+                self._refresh_in_background(key, computes[key], timeout, durable_ttl, api_source)
+            elif self._should_refresh_early(envelope, now):
+                self.early_refreshes += 1
+                self._refresh_in_background(key, computes[key], timeout, durable_ttl, api_source)
+            results[key] = (envelope.value, True)
+
+        missing = [key for key in computes if key not in envelopes]
+        if missing:
+            started = time.monotonic()
+            values = dict(zip(missing, map_compute(lambda key: computes[key](), missing)))
+            delta = (time.monotonic() - started) / len(missing)
+            self.set_many(values, timeout, durable_ttl=durable_ttl, api_source=api_source, delta=delta)
+            for key, value in values.items():
+                results[key] = (value, False)
+        return results
+
+    async def aget(self, key: Optional[str]) -> Optional[Any]:
+        if key is None:
+            return None
+        envelope = await self._aget_envelope(key)
+        return envelope.value if envelope is not None else None
+
+    async def _aget_envelope(self, key: str) -> Optional[Envelope]:
+        now = time.monotonic()
+        if now >= self._next_sync:
+            await sync_to_async(self._maybe_sync)(now)
+
+        envelope = self.l1.get(key, now)
+        if envelope is _NEGATIVE:
+            self.negative_hits += 1
+            return None
+        if envelope is not None:
+            self.l1_hits += 1
+            return envelope
+
+        envelope = await self.l2.aget(key)
+        if envelope is not None:
+            if not isinstance(envelope, Envelope):
+                envelope = Envelope(envelope, 0.0, 0.0)
+            self.l2_hits += 1
+            self.l1.set(key, envelope, self.l1_ttl, now)
+            return envelope
+
+        if self.l3 is not None:
+            try:
+                value, remaining = await self.l3.aget(key)
+            except Exception as e:
+                logger.error(f"Durable cache lookup failed for {key}: {e}")
+                value = None
+            if value is not None:
+                self.l3_hits += 1
+                fresh = min(self.fresh_ttl, remaining)
+                envelope = Envelope(value, 0.0, time.time() + fresh)
+                await self.l2.aset(key, envelope, min(fresh + self.stale_ttl, remaining))
+                self.l1.set(key, envelope, min(self.l1_ttl, remaining), now)
+                return envelope
+
+        self.misses += 1
+        self._remember_miss(key, now)
+        return None
+
+    async def aset(self, key: Optional[str], value: Any, timeout: Optional[float] = None,
+                   durable_ttl: Optional[int] = None, api_source: str = 'search', delta: float = 0.0):
+        if key is None:
+            return
+        timeout = self.fresh_ttl if timeout is None else timeout
+        envelope = Envelope(value, delta, time.time() + timeout)
+        await self.l2.aset(key, envelope, timeout + self.stale_ttl)
+        self.l1.set(key, envelope, min(self.l1_ttl, timeout + self.stale_ttl), time.monotonic())
+
+        if self.l3 is not None and durable_ttl:
+            try:
+                await self.l3.aset(key, value, durable_ttl, api_source)
+            except Exception as e:
+                logger.error(f"Durable cache write failed for {key}: {e}")
+
+    async def aget_or_compute(self, key: Optional[str], compute: Callable[[], Any],
+                              timeout: Union[float, Callable[[Any], float], None] = None,
+                              durable_ttl: Union[int, Callable[[Any], int], None] = None,
+                              api_source: str = 'search') -> Tuple[Any, bool]:
+        """
+        Async get_or_compute(). compute may be a plain callable or return an awaitable.
+
+        Misses are coalesced per process on a shared future rather than a
+        thread, and stale values are refreshed in an asyncio task.
+        """
+        if key is None:
+            value = compute()
+            if inspect.isawaitable(value):
+                value = await value
+            return value, False
+        envelope = await self._aget_envelope(key)
+        if envelope is not None:
+            now = time.time()
+            if now >= envelope.soft_expiry:
+                self.stale_hits += 1
+                self._arefresh_in_background(key, compute, timeout, durable_ttl, api_source)
+            elif self._should_refresh_early(envelope, now):
+                self.early_refreshes += 1
+                self._arefresh_in_background(key, compute, timeout, durable_ttl, api_source)
+            return envelope.value, True
+
+        flight = self._async_flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(flight), True
+
+        flight = self._async_flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            value, computed = await self._acompute_with_lease(key, compute, timeout, durable_ttl, api_source)
+            flight.set_result(value)
+            return value, not computed
+        except BaseException as e:
+            flight.set_exception(e)
+            # Don't warn about an unretrieved exception when nobody was waiting
+            flight.exception()
+            raise
+        finally:
+            self._async_flights.pop(key, None)
+
+    def _arefresh_in_background(self, key, compute, timeout, durable_ttl, api_source):
+        with self._flights_lock:
+            if key in self._refreshing or key in self._async_flights:
+                return
+            self._refreshing.add(key)
+        task = asyncio.ensure_future(self._arefresh(key, compute, timeout, durable_ttl, api_source))
+        # Keep a reference so the task isn't garbage collected mid-flight
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _arefresh(self, key, compute, timeout, durable_ttl, api_source):
+        try:
+            lease_key = LEASE_KEY.format(key)
+            token = uuid.uuid4().hex
+            if not await self.l2.aadd(lease_key, token, self.lease_timeout):
+                return
+            try:
+                await self._acompute_and_set(key, compute, timeout, durable_ttl, api_source)
+            finally:
+                await self._arelease_lease(key, lease_key, token)
+        except Exception as e:
+            logger.error(f"Background refresh failed for {key}: {e}", exc_info=True)
+        finally:
+            with self._flights_lock:
+                self._refreshing.discard(key)
+
+    async def _acompute_and_set(self, key, compute, timeout, durable_ttl, api_source):
+        started = time.monotonic()
+        value = compute()
+        if inspect.isawaitable(value):
+            value = await value
+        delta = time.monotonic() - started
+        if callable(timeout):
+            timeout = timeout(value)
+        if callable(durable_ttl):
+            durable_ttl = durable_ttl(value)
+        await self.aset(key, value, timeout, durable_ttl=durable_ttl, api_source=api_source, delta=delta)
+        return value
+
+    async def _arelease_lease(self, key, lease_key, token):
+        try:
+            if await self.l2.aget(lease_key) == token:
+                await self.l2.adelete(lease_key)
+        except Exception as e:
+            logger.error(f"Failed to release cache lease for {key}: {e}")
+
+    async def _acompute_with_lease(self, key, compute, timeout, durable_ttl, api_source) -> Tuple[Any, bool]:
+        lease_key = LEASE_KEY.format(key)
+        token = uuid.uuid4().hex
+        try:
+            leased = await self.l2.aadd(lease_key, token, self.lease_timeout)
+        except Exception as e:
+            logger.error(f"Failed to take cache lease for {key}: {e}")
+            leased = True
+
+        if not leased:
+            self.lease_waits += 1
+            deadline = time.monotonic() + self.lease_wait
+            while time.monotonic() < deadline:
+                await asyncio.sleep(LEASE_POLL_INTERVAL)
+                envelope = await self.l2.aget(key)
+                if isinstance(envelope, Envelope):
+                    self.l1.set(key, envelope, self.l1_ttl, time.monotonic())
+                    return envelope.value, False
+            logger.warning(f"Timed out waiting for lease holder of {key}, computing locally")
+
+        try:
+            return await self._acompute_and_set(key, compute, timeout, durable_ttl, api_source), True
+        finally:
+            if leased:
+                await self._arelease_lease(key, lease_key, token)
+
+    def invalidate(self, key: Optional[str]):
+        """Remove key from L2 and from the L1 of every worker"""
+        if key is None:
+            return
+        self.l2.delete(key)
+        self.l1.delete(key)
+        if self.l3 is not None:
+            APIResponseCache.objects.filter(cache_key=key).delete()
+        try:
+            self.l2.add(INVALIDATION_SEQ_KEY, 0, None)
+            seq = self.l2.incr(INVALIDATION_SEQ_KEY)
+            self.l2.set(INVALIDATION_ENTRY_KEY.format(seq), key, INVALIDATION_RETENTION)
+        except Exception as e:
+            # Other workers still converge once their L1 entries expire
+            logger.error(f"Failed to broadcast cache invalidation for {key}: {e}")
+
+    def _maybe_sync(self, now: float):
+        if now < self._next_sync or not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sync = now + self.sync_interval
+            self._replay_invalidations()
+        except Exception as e:
+            logger.error(f"Cache invalidation sync failed: {e}")
+        finally:
+            self._sync_lock.release()
+
+    def _replay_invalidations(self):
+        seq = self.l2.get(INVALIDATION_SEQ_KEY) or 0
+        last_seq = self._invalidation_seq
+        self._invalidation_seq = seq
+
+        # Nothing to replay on the first sync: L1 starts out empty
+        if last_seq is None or seq == last_seq:
+            return
+
+        if seq < last_seq or seq - last_seq > MAX_INVALIDATION_REPLAY:
+            # L2 was flushed or this worker fell too far behind
+            self.l1.clear()
+            return
+
+        entry_keys = [INVALIDATION_ENTRY_KEY.format(n) for n in range(last_seq + 1, seq + 1)]
+        invalidated = self.l2.get_many(entry_keys)
+        if len(invalidated) < len(entry_keys):
+            self.l1.clear()
+            return
+        for key in invalidated.values():
+            self.l1.delete(key)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'l1_size': len(self.l1),
+            'l1_hits': self.l1_hits,
+            'l2_hits': self.l2_hits,
+            'l3_hits': self.l3_hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'lease_waits': self.lease_waits,
+            'stale_hits': self.stale_hits,
+            'early_refreshes': self.early_refreshes,
+        }
+
+
+durable_cache = DurableCache(
+    hit_flush_interval=getattr(settings, 'SEARCH_CACHE_HIT_FLUSH_INTERVAL', 60),
+    hit_flush_threshold=getattr(settings, 'SEARCH_CACHE_HIT_FLUSH_THRESHOLD', 500),
+)
+atexit.register(durable_cache.flush_hits)
+
+search_cache = TieredCache(
+    l3=durable_cache if getattr(settings, 'SEARCH_CACHE_DURABLE', True) else None,
+    l1_max_entries=getattr(settings, 'SEARCH_CACHE_L1_MAX_ENTRIES', 2048),
+    l1_ttl=getattr(settings, 'SEARCH_CACHE_L1_TTL', 30),
+    negative_ttl=getattr(settings, 'SEARCH_CACHE_NEGATIVE_TTL', 5),
+    sync_interval=getattr(settings, 'SEARCH_CACHE_SYNC_INTERVAL', 1),
+    fresh_ttl=getattr(settings, 'SEARCH_CACHE_TIMEOUT', 3600),
+    stale_ttl=getattr(settings, 'SEARCH_CACHE_STALE_TTL', 86400),
+    xfetch_beta=getattr(settings, 'SEARCH_CACHE_XFETCH_BETA', 1.0),
+    refresh_workers=getattr(settings, 'SEARCH_CACHE_REFRESH_WORKERS', 4),
+    lease_timeout=getattr(settings, 'SEARCH_CACHE_LEASE_TIMEOUT', 10),
+    lease_wait=getattr(settings, 'SEARCH_CACHE_LEASE_WAIT', 2),
+)
@@ -0,0 +1,421 @@
+"""
+Background check jobs run outside the request cycle.
+
+POST /api/search/background/jobs/ stores a BackgroundCheckJob and returns
+at once; `manage.py run_job_worker` processes claim queued jobs, run the
+background check through the same fan-out and cache as
+background_check_search, and store the result for JOB_RESULT_TTL seconds.
+Clients poll GET /api/search/background/jobs/<id>/ or give a callback_url
+that is POSTed the finished job; every submitter of a shared job keeps its
+own callback (BackgroundCheckCallback). The database is the queue, so web and
+worker processes can be scaled separately without a broker.
+
+Jobs are keyed by a hash of the canonical query. Submitting a query that
+already has a queued or running job (enforced by a partial unique index),
+or a finished result that hasn't expired, returns that job instead of
+queueing another.
+
+A worker claims a job with a conditional UPDATE (status still 'queued'),
+which only one worker can win, and holds it for JOB_LEASE_SECONDS. Jobs
+whose worker died are requeued once the lease runs out, and failed after
+JOB_MAX_ATTEMPTS runs. Callbacks that fail are retried with exponential
+backoff up to JOB_CALLBACK_MAX_ATTEMPTS times.
+
+A callback carries personal data and the endpoint is open, so a callback
+URL must resolve only to public addresses (and, when
+JOB_CALLBACK_ALLOWED_HOSTS is set, name one of those hosts). It is
+checked when the job is submitted and again right before every delivery,
+and the delivery connects to the address that was just checked rather
+than resolving the host once more, so a host whose DNS changes in between
+(or between the check and the connection) can't point the worker at an
+internal address.
+"""
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from .background import get_background_fanout
+from .cache_keys import background_cache_key, canonical_params
+from .caching import search_cache
+from .models import BackgroundCheckCallback, BackgroundCheckJob
+from .search import people_query, result_cache_timeout, result_durable_ttl
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = (BackgroundCheckJob.QUEUED, BackgroundCheckJob.RUNNING)
+FINISHED_STATUSES = (BackgroundCheckJob.DONE, BackgroundCheckJob.FAILED)
+# Longest wait between callback attempts
+CALLBACK_MAX_BACKOFF = 3600
+
+
+def query_hash(query: Dict[str, Any]) -> str:
+    """sha256 of the canonical query (see lookup.cache_keys), the job dedup key"""
+    canonical = json.dumps(canonical_params(query), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def job_payload(job: BackgroundCheckJob) -> Dict[str, Any]:
+    """
+    The API representation of a job.
+
+    Args:
+        job: BackgroundCheckJob
+
+    Returns:
+        Dictionary with the job's status, timestamps and, once done, result
+    """
+    payload = {
+        'success': job.status != BackgroundCheckJob.FAILED,
+        'job_id': str(job.id),
+        'status': job.status,
+        'query': job.query,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'expires_at': job.expires_at.isoformat() if job.expires_at else None,
+    }
+    if job.status == BackgroundCheckJob.DONE:
+        payload['result'] = job.result
+    elif job.status == BackgroundCheckJob.FAILED:
+        payload['error'] = job.error
+    return payload
+
+
+def _host_allowed(host: str) -> bool:
+    allowed = getattr(settings, 'JOB_CALLBACK_ALLOWED_HOSTS', [])
+    if not allowed:
+        return True
+    # '.example.com' allows example.com and its subdomains, as in ALLOWED_HOSTS
+    return any(host == pattern or (pattern.startswith('.') and (host == pattern[1:] or host.endswith(pattern)))
+               for pattern in (pattern.strip().lower() for pattern in allowed if pattern.strip()))
+
+
+def vet_callback_url(url: str) -> Tuple[Optional[str], str]:
+    """
+    Check that a callback URL may be called, and pick the address to call.
+
+    The URL must be http(s), its host allowed by JOB_CALLBACK_ALLOWED_HOSTS
+    (if set), and every address it resolves to a public one: loopback,
+    private, link-local (cloud metadata), shared, multicast and reserved
+    ranges are refused.
+
+    Args:
+        url: Callback URL
+
+    Returns:
+        (error, address) tuple: an error message and '' if the URL must not
+        be called, else None and the first address the host resolved to
+    """
+    try:
+        URLValidator(schemes=['http', 'https'])(url)
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+    except (ValidationError, ValueError):
+        return 'callback_url must be an http or https URL', ''
+    host = (parts.hostname or '').rstrip('.').lower()
+    if not _host_allowed(host):
+        return 'callback_url host is not allowed', ''
+    try:
+        addresses = [info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)]
+    except (OSError, UnicodeError):
+        return 'callback_url host could not be resolved', ''
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if ip.version == 6 and ip.ipv4_mapped is not None:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            return 'callback_url must point to a public address', ''
+    return None, addresses[0].split('%')[0]
+
+
+def callback_url_error(url: str) -> Optional[str]:
+    """Why a callback URL must not be called (see vet_callback_url), or None if it may be"""
+    return vet_callback_url(url)[0]
+
+
+class PinnedAddressAdapter(HTTPAdapter):
+    """
+    Transport adapter for requests sent to an IP address in place of host.
+
+    The request URL names the vetted address, so nothing resolves the host
+    again; the Host header carries the host, and HTTPS connections send it
+    as SNI and check the certificate against it.
+    """
+
+    def __init__(self, host: str, **kwargs):
+        self.host = host
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs.update(server_hostname=self.host, assert_hostname=self.host)
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+
+
+def post_pinned(url: str, address: str, **kwargs) -> requests.Response:
+    """
+    POST to url, connecting to address instead of resolving its host.
+
+    Args:
+        url: http(s) URL
+        address: IP address to connect to
+        **kwargs: Passed to requests.Session.post()
+
+    Returns:
+        requests.Response
+    """
+    parts = urlsplit(url)
+    host = parts.netloc.rpartition('@')[2]
+    netloc = f"[{address}]" if ':' in address else address
+    if parts.port:
+        netloc = f"{netloc}:{parts.port}"
+    with requests.Session() as session:
+        # A proxy from the environment would resolve the host itself
+        session.trust_env = False
+        session.mount(f"{parts.scheme}://", PinnedAddressAdapter(parts.hostname))
+        return session.post(urlunsplit(parts._replace(netloc=netloc)), headers={'Host': host}, **kwargs)
+
+
+def _reusable_job(digest: str) -> Optional[BackgroundCheckJob]:
+    """An active job for the query, or a finished one whose result is still valid"""
+    return (
+        BackgroundCheckJob.objects
+        .filter(query_hash=digest)
+        .filter(Q(status__in=ACTIVE_STATUSES)
+                | Q(status=BackgroundCheckJob.DONE, expires_at__gt=timezone.now()))
+        .order_by('-created_at')
+        .first()
+    )
+
+
+def submit_job(first_name: str, last_name: str, city: str, state: str,
+               callback_url: str = '', ip_address: Optional[str] = None) -> Tuple[BackgroundCheckJob, bool]:
+    """
+    Queue a background check, or find the job already answering it.
+
+    Args:
+        first_name: First name to search
+        last_name: Last name to search
+        city: Optional city
+        state: Optional state
+        callback_url: URL to POST the finished job to, added to the job's
+            callbacks whether the job is new or not
+        ip_address: Client IP, for the admin
+
+    Returns:
+        (job, created) tuple
+    """
+    query = people_query(first_name, last_name, city, state)
+    digest = query_hash(query)
+    job = _reusable_job(digest)
+    created = False
+    if job is None:
+        try:
+            with transaction.atomic():
+                job = BackgroundCheckJob.objects.create(
+                    query_hash=digest,
+                    query=query,
+                    ip_address=ip_address,
+                )
+            created = True
+        except IntegrityError:
+            # Another request queued the same query between the check and the insert
+            job = _reusable_job(digest)
+            if job is None:
+                raise
+    if callback_url:
+        # Due now: deliver_callbacks() sends it once the job has finished
+        BackgroundCheckCallback.objects.get_or_create(
+            job=job, url=callback_url, defaults={'next_at': timezone.now()}
+        )
+    return job, created
+
+
+def claim_job(worker: str, lease_seconds: int) -> Optional[BackgroundCheckJob]:
+    """
+    Claim the oldest queued job for worker.
+
+    The claim is a conditional UPDATE, so when several workers pick the
+    same job only one of them gets it; the others try the next candidate.
+
+    Returns:
+        The claimed job, or None if nothing is queued
+    """
+    candidates = list(
+        BackgroundCheckJob.objects
+        .filter(status=BackgroundCheckJob.QUEUED)
+        .order_by('created_at')
+        .values_list('id', flat=True)[:10]
+    )
+    for job_id in candidates:
+        now = timezone.now()
+        claimed = BackgroundCheckJob.objects.filter(id=job_id, status=BackgroundCheckJob.QUEUED).update(
+            status=BackgroundCheckJob.RUNNING,
+            worker=worker,
+            claimed_until=now + timedelta(seconds=lease_seconds),
+            started_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return BackgroundCheckJob.objects.get(id=job_id)
+    return None
+
+
+def requeue_expired_claims(max_attempts: int) -> int:
+    """
+    Requeue running jobs whose worker's lease ran out, or fail them after
+    max_attempts runs.
+
+    Returns:
+        Number of jobs requeued or failed
+    """
+    now = timezone.now()
+    expired = BackgroundCheckJob.objects.filter(status=BackgroundCheckJob.RUNNING, claimed_until__lt=now)
+    failed = expired.filter(attempts__gte=max_attempts).update(
+        status=BackgroundCheckJob.FAILED,
+        error='The worker running the job stopped responding',
+        finished_at=now,
+        expires_at=now + timedelta(seconds=settings.JOB_RESULT_TTL),
+    )
+    requeued = expired.filter(attempts__lt=max_attempts).update(
+        status=BackgroundCheckJob.QUEUED, worker='', claimed_until=None,
+    )
+    if failed or requeued:
+        logger.warning(f"Expired job claims: {requeued} requeued, {failed} failed")
+    return failed + requeued
+
+
+def run_job(job: BackgroundCheckJob, worker: str) -> bool:
+    """
+    Run a claimed job and store its outcome.
+
+    The result goes through the search cache under the
+    background_check_search key, so a cached check is reused and the
+    endpoints benefit from the job's result.
+
+    Returns:
+        Whether the outcome was stored (False if the claim was lost meanwhile)
+    """
+    query = job.query
+    cache_key = background_cache_key(query['first_name'], query['last_name'], query['city'], query['state'])
+    status, result, error = BackgroundCheckJob.DONE, None, ''
+    try:
+        result, _ = search_cache.get_or_compute(
+            cache_key,
+            lambda: get_background_fanout().run(query),
+            timeout=result_cache_timeout,
+            durable_ttl=result_durable_ttl,
+            api_source='mock_data',
+        )
+    except Exception as e:
+        logger.error(f"Background check job {job.id} failed: {str(e)}", exc_info=True)
+        status, error = BackgroundCheckJob.FAILED, 'Background check failed'
+
+    now = timezone.now()
+    stored = BackgroundCheckJob.objects.filter(
+        id=job.id, status=BackgroundCheckJob.RUNNING, worker=worker
+    ).update(
+        status=status,
+        result=result,
+        error=error,
+        finished_at=now,
+        claimed_until=None,
+        expires_at=now + timedelta(seconds=settings.JOB_RESULT_TTL),
+    )
+    if not stored:
+        logger.warning(f"Background check job {job.id} was reclaimed before {worker} finished it")
+    return bool(stored)
+
+
+def deliver_callbacks(limit: int = 20) -> int:
+    """
+    POST finished jobs to their callback URLs.
+
+    A callback that doesn't get a 2xx response is retried after 30s, 60s,
+    120s, ... (at most CALLBACK_MAX_BACKOFF) until JOB_CALLBACK_MAX_ATTEMPTS.
+
+    Returns:
+        Number of callbacks delivered
+    """
+    now = timezone.now()
+    due = list(
+        BackgroundCheckCallback.objects
+        .filter(job__status__in=FINISHED_STATUSES, next_at__lte=now)
+        .select_related('job')
+        .order_by('next_at')[:limit]
+    )
+    delivered = 0
+    for callback in due:
+        job = callback.job
+        # Take the callback so concurrent workers don't send it twice
+        taken = BackgroundCheckCallback.objects.filter(id=callback.id, next_at=callback.next_at).update(
+            next_at=now + timedelta(seconds=settings.JOB_CALLBACK_TIMEOUT * 2),
+        )
+        if not taken:
+            continue
+        attempts = callback.attempts + 1
+        refused, address = vet_callback_url(callback.url)
+        if refused:
+            # The host now resolves somewhere it mustn't; retrying won't help
+            logger.warning(f"Callback for job {job.id} to {callback.url} refused: {refused}")
+            BackgroundCheckCallback.objects.filter(id=callback.id).update(
+                attempts=attempts, error=refused[:200], next_at=None,
+            )
+            continue
+        try:
+            response = post_pinned(
+                callback.url,
+                address,
+                json=job_payload(job),
+                timeout=settings.JOB_CALLBACK_TIMEOUT,
+                allow_redirects=False,
+            )
+            error = '' if 200 <= response.status_code < 300 else f"HTTP {response.status_code}"
+        except requests.RequestException as e:
+            error = str(e)[:200] or type(e).__name__
+
+        if not error:
+            delivered += 1
+            BackgroundCheckCallback.objects.filter(id=callback.id).update(
+                attempts=attempts, delivered_at=timezone.now(), next_at=None, error='',
+            )
+            continue
+        retry = attempts < settings.JOB_CALLBACK_MAX_ATTEMPTS
+        logger.warning(f"Callback for job {job.id} to {callback.url} failed ({error})"
+                       + (', will retry' if retry else ', giving up'))
+        BackgroundCheckCallback.objects.filter(id=callback.id).update(
+            attempts=attempts,
+            error=error[:200],
+            next_at=(timezone.now() + timedelta(seconds=min(30 * 2 ** (attempts - 1), CALLBACK_MAX_BACKOFF))
+                     if retry else None),
+        )
+    return delivered
+
+
+def purge_expired_jobs() -> int:
+    """Delete finished jobs past their expires_at; returns how many"""
+    deleted = BackgroundCheckJob.objects.filter(
+        status__in=FINISHED_STATUSES, expires_at__lt=timezone.now()
+    ).delete()[0]
+    if deleted:
+        logger.info(f"Deleted {deleted} expired background check jobs")
+    return deleted
@@ -0,0 +1,161 @@
+# backend/lookup/management/commands/benchmark_address_search.py
+import csv
+import os
+import random
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from lookup.addresses import (
+    DIRECTIONALS,
+    STREET_SUFFIXES,
+    UNIT_DESIGNATORS,
+    find_property,
+    normalize_address,
+    synthetic_properties,
+)
+from lookup.cache_keys import address_cache_key, key_versions
+from lookup.models import PropertyRecord
+
+FIELDS = ['street', 'city', 'state', 'zip_code', 'property_type', 'year_built', 'square_feet',
+          'lot_size_sqft', 'bedrooms', 'bathrooms', 'stories', 'estimated_value', 'tax_assessment',
+          'annual_tax', 'last_sale_price', 'last_sale_date', 'parcel_number']
+SOURCE = 'benchmark'
+
+
+def _percentile(ordered, fraction):
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _spellings(table):
+    spellings = {}
+    for spelling, standard in table.items():
+        spellings.setdefault(standard, []).append(spelling)
+    return spellings
+
+
+_SUFFIXES = _spellings(STREET_SUFFIXES)
+_DIRECTIONALS = _spellings(DIRECTIONALS)
+_UNITS = {standard: spellings for (standard, _), spellings in _spellings(UNIT_DESIGNATORS).items()}
+
+
+def _respell(rng, street):
+    """street written another way: other suffix, directional and unit spellings and case"""
+    words = []
+    for word in street.split():
+        bare = word.rstrip('.').upper()
+        for table, lookup in ((_SUFFIXES, STREET_SUFFIXES), (_DIRECTIONALS, DIRECTIONALS)):
+            if bare in lookup:
+                word = rng.choice(table[lookup[bare]])
+                break
+        else:
+            if bare in UNIT_DESIGNATORS and bare != '#':
+                word = rng.choice(_UNITS[UNIT_DESIGNATORS[bare][0]])
+        words.append(word)
+    respelled = ' '.join(words)
+    return rng.choice((respelled.upper(), respelled.lower(), respelled.title()))
+
+
+def _raw_cache_key(street, city, state, zip_code):
+    """address_search's cache key before addresses were normalized"""
+    key = f"address:{street.lower().replace(' ', '_')}:{city.lower()}:{state.lower()}"
+    return f"{key}:{zip_code}" if zip_code else key
+
+
+class Command(BaseCommand):
+    help = ('Benchmark address search: write a synthetic property file, bulk-load it with '
+            'load_property_records, then time normalized lookups of respelled addresses. '
+            f"Loads into PropertyRecord with source '{SOURCE}' and deletes those rows afterwards")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=2000000, help='Synthetic records to load')
+        parser.add_argument('--queries', type=int, default=5000, help='Lookups to time')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT')
+        parser.add_argument('--file', help='Write the synthetic CSV here and keep it (default: a temporary file)')
+        parser.add_argument('--keep', action='store_true', help='Keep the loaded records')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options['queries'] < 1 or options['records'] < 1:
+            raise CommandError('--queries and --records must be at least 1')
+        # Keys are None until the versions are loaded
+        key_versions.ensure_loaded()
+        rng = random.Random(options['seed'])
+        sample = set(rng.sample(range(options['records']), min(options['queries'], options['records'])))
+
+        path = options['file'] or tempfile.mkstemp(suffix='.csv')[1]
+        targets = []
+        started = time.perf_counter()
+        with open(path, 'w', newline='', encoding='utf-8') as output:
+            writer = csv.DictWriter(output, fieldnames=FIELDS)
+            writer.writeheader()
+            for index, row in enumerate(synthetic_properties(options['records'], options['seed'])):
+                writer.writerow(row)
+                if index in sample:
+                    targets.append(row)
+        self.stdout.write(f'Wrote {options["records"]} records to {path} in {time.perf_counter() - started:.1f}s '
+                          f'({os.path.getsize(path) / 2 ** 20:.0f} MiB)')
+
+        try:
+            self._load(path, options['batch_size'])
+            self._lookups(rng, targets)
+        finally:
+            if not options['file']:
+                os.remove(path)
+            if not options['keep']:
+                started = time.perf_counter()
+                deleted = PropertyRecord.objects.filter(source=SOURCE).delete()[0]
+                self.stdout.write(f'Deleted {deleted} benchmark records in {time.perf_counter() - started:.1f}s')
+
+    def _load(self, path, batch_size):
+        started = time.perf_counter()
+        call_command('load_property_records', path, source=SOURCE, replace=True, batch_size=batch_size,
+                     stdout=self.stdout, stderr=self.stderr)
+        self.stdout.write(f'Load including normalization: {time.perf_counter() - started:.1f}s')
+
+    def _lookups(self, rng, targets):
+        # Every target twice: as loaded and respelled, some without the ZIP
+        queries = []
+        for row in targets:
+            expected = normalize_address(row['street'], row['city'], row['state'], row['zip_code'])
+            zip_code = row['zip_code'] if rng.random() < 0.7 else ''
+            queries.append((expected.key, row['street'], row['city'], row['state'], row['zip_code']))
+            queries.append((expected.key, _respell(rng, row['street']), row['city'].upper(),
+                            rng.choice((row['state'], expected.state.lower())), zip_code))
+        rng.shuffle(queries)
+
+        normalize_timings, lookup_timings = [], []
+        found = 0
+        for expected_key, street, city, state, zip_code in queries:
+            started = time.perf_counter()
+            address = normalize_address(street, city, state, zip_code)
+            normalized = time.perf_counter()
+            record = find_property(address)
+            lookup_timings.append(time.perf_counter() - normalized)
+            normalize_timings.append(normalized - started)
+            found += record is not None and record.address_key == expected_key
+
+        normalize_timings.sort()
+        lookup_timings.sort()
+        self.stdout.write(
+            f'Normalize: p50 {_percentile(normalize_timings, 0.5) * 1e6:.0f}us, '
+            f'p99 {_percentile(normalize_timings, 0.99) * 1e6:.0f}us'
+        )
+        self.stdout.write(
+            f'Lookup: p50 {_percentile(lookup_timings, 0.5) * 1e6:.0f}us, '
+            f'p95 {_percentile(lookup_timings, 0.95) * 1e6:.0f}us, '
+            f'p99 {_percentile(lookup_timings, 0.99) * 1e6:.0f}us, '
+            f'{len(queries) / (sum(lookup_timings) + sum(normalize_timings)):.0f} lookups/s'
+        )
+
+        raw_keys, keys = set(), set()
+        for _, street, city, state, zip_code in queries:
+            raw_keys.add(_raw_cache_key(street, city, state, zip_code))
+            keys.add(address_cache_key(normalize_address(street, city, state, zip_code)))
+        self.stdout.write(self.style.SUCCESS(
+            f'Found the intended property for {found / len(queries):.1%} of {len(queries)} lookups; '
+            f'their spellings make {len(raw_keys)} raw cache keys but {len(keys)} normalized ones'
+        ))
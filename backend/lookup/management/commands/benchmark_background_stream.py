@@ -0,0 +1,107 @@
+# backend/lookup/management/commands/benchmark_background_stream.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lookup.background import RECORD_SOURCES, BackgroundFanOut, RecordSource
+from lookup.providers import BACKGROUND
+from lookup.providers.local import LocalProvider
+from lookup.providers.stub import StubProvider
+from lookup.search import build_background_check_result, people_query
+
+# Typical latencies of the record sources behind a background check (s)
+DEFAULT_LATENCIES = 'identity=0.05,address_history=0.15,relatives=0.3,employment=0.5,court=0.9,criminal=1.5'
+
+
+def _percentile(ordered, fraction):
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the background check fan-out against simulated record sources: '
+            'time to the first streamed section versus the whole check (no network access)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checks', type=int, default=100, help='Background checks to run')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent checks')
+        parser.add_argument('--latencies', default=DEFAULT_LATENCIES,
+                            help='Simulated latency per source, as source=seconds pairs')
+        parser.add_argument('--jitter', type=float, default=0.2, help='Latency jitter, as a share of the latency')
+        parser.add_argument('--tail-probability', type=float, default=0.05,
+                            help='Chance a source call is slow')
+        parser.add_argument('--tail-latency', type=float, default=5.0, help='Latency of a slow call (s)')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Chance a source call fails')
+        parser.add_argument('--timeout', type=float, default=3.0, help='Per-source deadline (s)')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def _fanout(self, options):
+        latencies = {}
+        for entry in options['latencies'].split(','):
+            name, _, value = entry.partition('=')
+            try:
+                latencies[name.strip()] = float(value)
+            except ValueError:
+                raise CommandError(f'Bad --latencies entry {entry!r}')
+        unknown = set(latencies) - set(RECORD_SOURCES)
+        if unknown:
+            raise CommandError(f"Unknown sources in --latencies: {', '.join(sorted(unknown))}")
+
+        sample = build_background_check_result('Sample', 'Subject', '', '')
+        sources = []
+        for n, (name, sections) in enumerate(RECORD_SOURCES.items()):
+            latency = latencies.get(name, 0.1)
+            provider = StubProvider(
+                name=f'{name}-stub',
+                kinds=[BACKGROUND],
+                latency=latency,
+                jitter=latency * options['jitter'],
+                tail_probability=options['tail_probability'],
+                tail_latency=options['tail_latency'],
+                failure_rate=options['failure_rate'],
+                fields={BACKGROUND: {section: sample[section] for section in sections}},
+                seed=options['seed'] + n,
+            )
+            sources.append(RecordSource(name, sections, provider, options['timeout']))
+        return BackgroundFanOut(LocalProvider(), sources,
+                                max_workers=options['concurrency'] * len(sources))
+
+    def handle(self, *args, **options):
+        if options['checks'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--checks and --concurrency must be at least 1')
+        fanout = self._fanout(options)
+
+        def one(n):
+            check = fanout.start(people_query('Sample', f'Subject{n}', '', ''))
+            started = time.perf_counter()
+            first = None
+            for _ in check:
+                if first is None:
+                    first = time.perf_counter() - started
+            total = time.perf_counter() - started
+            check.result()
+            # What one source after another would take, timeouts included
+            sequential = sum(outcome.latency for outcome in check.outcomes)
+            return first, total, sequential, sum(not outcome.ok for outcome in check.outcomes)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            runs = list(executor.map(one, range(options['checks'])))
+        elapsed = time.perf_counter() - started
+
+        for label, values in (('First section', [run[0] for run in runs]),
+                              ('All sections', [run[1] for run in runs]),
+                              ('Sequential', [run[2] for run in runs])):
+            values.sort()
+            self.stdout.write(
+                f'{label:>13}: p50 {_percentile(values, 0.5) * 1000:.0f}ms, '
+                f'p95 {_percentile(values, 0.95) * 1000:.0f}ms, '
+                f'max {values[-1] * 1000:.0f}ms'
+            )
+        failed = sum(run[3] for run in runs)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(runs)} checks in {elapsed:.1f}s ({len(runs) / elapsed:.1f}/s); "
+            f"{failed} of {len(runs) * len(fanout.sources)} source calls missed their "
+            f"{options['timeout']:g}s deadline or failed"
+        ))
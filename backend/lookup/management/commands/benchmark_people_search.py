@@ -0,0 +1,108 @@
+# backend/lookup/management/commands/benchmark_people_search.py
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lookup.models import PersonRecord
+from lookup.people import PeopleIndex, synthetic_people
+
+_LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def _percentile(ordered, fraction):
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _typo(rng, name):
+    """name with one deleted, replaced, inserted or swapped letter"""
+    if len(name) < 3:
+        return name
+    position = rng.randrange(1, len(name) - 1)
+    kind = rng.randrange(4)
+    if kind == 0:
+        return name[:position] + name[position + 1:]
+    if kind == 1:
+        return name[:position] + rng.choice(_LETTERS) + name[position + 1:]
+    if kind == 2:
+        return name[:position] + rng.choice(_LETTERS) + name[position:]
+    return name[:position - 1] + name[position] + name[position - 1] + name[position + 1:]
+
+
+class Command(BaseCommand):
+    help = ('Benchmark fuzzy people search: build the name index over synthetic (or the '
+            'loaded) records and time queries with misspelled names (no database writes)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=1000000, help='Synthetic records to index')
+        parser.add_argument('--from-db', action='store_true',
+                            help='Index the PersonRecord table instead of synthetic records')
+        parser.add_argument('--queries', type=int, default=5000, help='Queries to time')
+        parser.add_argument('--typo-rate', type=float, default=0.3,
+                            help='Share of query names with a spelling mistake')
+        parser.add_argument('--limit', type=int, default=10, help='Results per query')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options['queries'] < 1 or options['records'] < 1:
+            raise CommandError('--queries and --records must be at least 1')
+        rng = random.Random(options['seed'])
+
+        if options['from_db']:
+            rows = list(PersonRecord.objects.order_by()
+                        .values_list('id', 'first_name', 'last_name', 'city', 'state').iterator(chunk_size=10000))
+            if not rows:
+                raise CommandError('There are no person records; run load_people_records first')
+        else:
+            started = time.perf_counter()
+            rows = [
+                (record_id, person['first_name'], person['last_name'], person['city'], person['state'])
+                for record_id, person in enumerate(synthetic_people(options['records'], options['seed']), start=1)
+            ]
+            self.stdout.write(f'Generated {len(rows)} records in {time.perf_counter() - started:.1f}s')
+
+        started = time.perf_counter()
+        index = PeopleIndex.build(rows)
+        build_seconds = time.perf_counter() - started
+        stats = index.stats()
+        self.stdout.write(
+            f"Indexed {stats['records']} records ({stats['first_names']} first names, "
+            f"{stats['last_names']} last names) in {build_seconds:.1f}s, "
+            f"{stats['record_bytes'] / 2 ** 20:.0f} MiB of record columns"
+        )
+
+        # Query a sample of records by name, some misspelled, with their state
+        targets = [rows[rng.randrange(len(rows))] for _ in range(options['queries'])]
+        queries = []
+        for record_id, first, last, _, state in targets:
+            if rng.random() < options['typo_rate']:
+                if rng.random() < 0.5:
+                    first = _typo(rng, first)
+                else:
+                    last = _typo(rng, last)
+            queries.append((record_id, first, last, state))
+
+        # Common names repeat, so a hit is any record with the intended name and state
+        identity = {record_id: (first, last, state) for record_id, first, last, _, state in rows}
+        for label in ('cold', 'warm'):
+            timings = []
+            found = matched = 0
+            for record_id, first, last, state in queries:
+                started = time.perf_counter()
+                matches, total = index.search(first, last, state=state, limit=options['limit'])
+                timings.append(time.perf_counter() - started)
+                matched += total
+                found += any(identity[match.record_id] == identity[record_id] for match in matches)
+            timings.sort()
+            self.stdout.write(
+                f"{label:>5}: p50 {_percentile(timings, 0.5) * 1e6:.0f}us, "
+                f"p95 {_percentile(timings, 0.95) * 1e6:.0f}us, "
+                f"p99 {_percentile(timings, 0.99) * 1e6:.0f}us, "
+                f"{len(queries) / sum(timings):.0f} queries/s; "
+                f"{matched / len(queries):.0f} records matched per query"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Intended person in the top {options['limit']} for {found / len(queries):.1%} of queries "
+            f"(the warm run reuses the cached name candidates)"
+        ))
@@ -0,0 +1,96 @@
+# backend/lookup/management/commands/benchmark_providers.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lookup.providers import PHONE, LookupPipeline, ProviderRegistry
+from lookup.providers.local import LocalProvider
+from lookup.providers.stub import StubProvider
+from lookup.utils import parse_phone
+
+
+def _percentile(ordered, fraction):
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the provider pipeline against simulated providers, '
+            'with and without hedged requests (no network access)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Lookups per run')
+        parser.add_argument('--warmup', type=int, default=50,
+                            help='Lookups before measuring, to seed the p95 latency trackers')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent lookups')
+        parser.add_argument('--providers', type=int, default=2, help='Number of stub providers')
+        parser.add_argument('--latency', type=float, default=0.02, help='Typical provider latency (s)')
+        parser.add_argument('--jitter', type=float, default=0.005, help='Latency jitter (s)')
+        parser.add_argument('--tail-probability', type=float, default=0.05,
+                            help='Chance a provider call is slow')
+        parser.add_argument('--tail-latency', type=float, default=0.5, help='Latency of a slow call (s)')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Chance a provider call fails')
+        parser.add_argument('--timeout', type=float, default=2.0, help='Pipeline deadline (s)')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def _pipeline(self, options, hedging):
+        providers = [LocalProvider()]
+        for n in range(options['providers']):
+            providers.append(StubProvider(
+                name=f'stub{n + 1}',
+                latency=options['latency'],
+                jitter=options['jitter'],
+                tail_probability=options['tail_probability'],
+                tail_latency=options['tail_latency'],
+                failure_rate=options['failure_rate'],
+                seed=options['seed'] + n,
+                hedge_max_delay=options['timeout'],
+            ))
+        return LookupPipeline(
+            ProviderRegistry(providers), timeout=options['timeout'],
+            max_workers=options['concurrency'] * (options['providers'] * 2 + 1), hedging=hedging,
+        )
+
+    def _run(self, pipeline, query, count, concurrency):
+        def one(_):
+            started = time.perf_counter()
+            pipeline.run(PHONE, query)
+            return time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return sorted(pool.map(one, range(count)))
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['providers'] < 1:
+            raise CommandError('--requests and --providers must be at least 1')
+
+        parsed = parse_phone('+1 (718) 222-2222')
+        query = {'number': parsed.normalized, 'parsed': parsed}
+
+        self.stdout.write(
+            f"{options['requests']} lookups x {options['providers']} stub providers, "
+            f"concurrency {options['concurrency']}, latency {options['latency'] * 1000:.0f}ms, "
+            f"{options['tail_probability']:.0%} tail at {options['tail_latency'] * 1000:.0f}ms"
+        )
+        for hedging in (False, True):
+            pipeline = self._pipeline(options, hedging)
+            self._run(pipeline, query, options['warmup'], options['concurrency'])
+            warm = pipeline.stats()
+
+            started = time.perf_counter()
+            latencies = self._run(pipeline, query, options['requests'], options['concurrency'])
+            elapsed = time.perf_counter() - started
+            stats = pipeline.stats()
+
+            self.stdout.write(
+                f"{'hedged  ' if hedging else 'unhedged'}: "
+                f"p50 {_percentile(latencies, 0.50) * 1000:7.1f}ms  "
+                f"p95 {_percentile(latencies, 0.95) * 1000:7.1f}ms  "
+                f"p99 {_percentile(latencies, 0.99) * 1000:7.1f}ms  "
+                f"max {latencies[-1] * 1000:7.1f}ms  "
+                f"{options['requests'] / elapsed:7.1f} lookups/s  "
+                f"hedges {stats['hedges'] - warm['hedges']} "
+                f"(won {stats['hedge_wins'] - warm['hedge_wins']}), "
+                f"timeouts {stats['timeouts'] - warm['timeouts']}"
+            )
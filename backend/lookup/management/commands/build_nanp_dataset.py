@@ -0,0 +1,58 @@
+# backend/lookup/management/commands/build_nanp_dataset.py
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from lookup.nanp import NANPDatasetError, build_nanp_table, load_nanp_file, write_nanp_file
+
+
+class Command(BaseCommand):
+    help = 'Compile the NPA-NXX area code/carrier dataset into a memory-mappable binary file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--csv',
+            default=settings.NANP_EXCHANGE_DATASET,
+            help='NPA-NXX CSV dataset to layer over the built-in area codes '
+                 '(defaults to NANP_EXCHANGE_DATASET)',
+        )
+        parser.add_argument(
+            '--output',
+            default=settings.NANP_DATASET_FILE,
+            help='Destination file (defaults to NANP_DATASET_FILE)',
+        )
+        parser.add_argument(
+            '--dataset-version',
+            type=int,
+            default=None,
+            help='Version number stored in the file header (defaults to the current Unix time)',
+        )
+
+    def handle(self, *args, **options):
+        csv_path = options['csv']
+        output = options['output']
+        version = options['dataset_version'] or int(time.time())
+
+        if not output:
+            raise CommandError('No output file given and NANP_DATASET_FILE is not set')
+        if csv_path and not os.path.exists(csv_path):
+            raise CommandError(f'Dataset {csv_path} does not exist')
+
+        table = build_nanp_table(csv_path)
+        size = write_nanp_file(table, output, version)
+
+        # Read the file back to confirm it maps and checksums cleanly
+        try:
+            load_nanp_file(output).close()
+        except NANPDatasetError as e:
+            raise CommandError(f'Written dataset failed verification: {e}')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Wrote NANP dataset version {version} to {output} '
+                f'({size:,} bytes, {table.area_code_count} area codes, '
+                f'{table.exchange_count} exchanges, {len(table)} strings)'
+            )
+        )
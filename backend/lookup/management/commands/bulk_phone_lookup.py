@@ -0,0 +1,141 @@
+# backend/lookup/management/commands/bulk_phone_lookup.py
+import json
+import os
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from lookup.bulk import (
+    BulkLookupError,
+    BulkProgress,
+    csv_lines,
+    iter_numbers,
+    lookup_phone_stream,
+    ndjson_lines,
+)
+
+
+def _format_for(path, fallback):
+    if path.lower().endswith('.csv'):
+        return 'csv'
+    if path.lower().endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return fallback
+
+
+class Command(BaseCommand):
+    help = ('Look up every phone number in a CSV or NDJSON file, streaming results '
+            'to a CSV or NDJSON file chunk by chunk')
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="Input file, or '-' for stdin")
+        parser.add_argument('-o', '--output', default='-', help="Output file, or '-' for stdout")
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help='Input format (default: from the file extension, else ndjson)')
+        parser.add_argument('--output-format', choices=['csv', 'ndjson'],
+                            help='Output format (default: from the output extension, else the input format)')
+        parser.add_argument('--column', help='CSV column holding the number, by header name or index')
+        parser.add_argument('--chunk-size', type=int,
+                            default=getattr(settings, 'PHONE_BULK_CHUNK_SIZE', 500),
+                            help='Numbers looked up per batch')
+        parser.add_argument('--offset', type=int, default=0,
+                            help='Input rows to skip, to resume an interrupted run')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continue from the row after the last one in the output file '
+                                 '(appends to it)')
+        parser.add_argument('--log-searches', action='store_true',
+                            help='Record the lookups in the search log')
+
+    def _resume_offset(self, path, output_format):
+        """Next row after the last result already written to path"""
+        if path == '-' or not os.path.exists(path):
+            return 0
+        last = ''
+        with open(path, encoding='utf-8') as existing:
+            for line in existing:
+                if line.strip():
+                    last = line
+        if not last:
+            return 0
+        if output_format == 'csv':
+            row = last.split(',', 1)[0]
+            return int(row) + 1 if row.isdigit() else 0
+        # Progress lines carry next_offset; result lines carry their row
+        try:
+            record = json.loads(last)
+        except ValueError:
+            raise CommandError(f'Cannot resume: last line of {path} is not valid JSON')
+        if 'row' in record:
+            return record['row'] + 1
+        return (record.get('progress') or record.get('summary') or record).get('next_offset', 0)
+
+    def handle(self, *args, **options):
+        input_path = options['input']
+        output_path = options['output']
+        fmt = options['format'] or _format_for(input_path, 'ndjson')
+        output_format = options['output_format'] or _format_for(output_path, fmt)
+
+        offset = options['offset']
+        if options['resume']:
+            if output_path == '-':
+                raise CommandError('--resume needs an --output file')
+            offset = self._resume_offset(output_path, output_format)
+        if offset < 0 or options['chunk_size'] < 1:
+            raise CommandError('--offset must not be negative and --chunk-size must be at least 1')
+
+        appending = offset > 0 and output_path != '-' and os.path.exists(output_path)
+        source = sys.stdin.buffer if input_path == '-' else open(input_path, 'rb')
+        target = (self.stdout if output_path == '-'
+                  else open(output_path, 'a' if appending else 'w', encoding='utf-8', newline=''))
+
+        progress = BulkProgress(offset)
+        started = time.monotonic()
+        try:
+            items = lookup_phone_stream(
+                iter_numbers(source, fmt, options['column']),
+                client_ip='127.0.0.1' if options['log_searches'] else None,
+                user_agent='manage.py bulk_phone_lookup',
+                chunk_size=options['chunk_size'],
+                offset=offset,
+                progress=progress,
+            )
+            items = self._report(items, started)
+            if output_format == 'csv':
+                lines = csv_lines(items, header=not appending)
+            else:
+                lines = ndjson_lines(items, progress=False)
+            for line in lines:
+                if target is self.stdout:
+                    target.write(line, ending='')
+                else:
+                    target.write(line)
+        except BulkLookupError as e:
+            raise CommandError(str(e))
+        except KeyboardInterrupt:
+            self.stderr.write(f'Interrupted; resume with --offset {progress.next_offset}')
+            raise SystemExit(1)
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+            if target is not self.stdout:
+                target.close()
+
+        elapsed = time.monotonic() - started
+        self.stderr.write(self.style.SUCCESS(
+            f'Looked up {progress.rows} rows in {elapsed:.1f}s '
+            f'({progress.valid} valid, {progress.cache_hits} cache hits); '
+            f'next offset {progress.next_offset}'
+        ))
+
+    def _report(self, items, started):
+        """Pass items through, writing a progress line to stderr after every chunk"""
+        for kind, item in items:
+            if kind == 'progress':
+                elapsed = max(time.monotonic() - started, 1e-9)
+                self.stderr.write(
+                    f'{item.rows} rows ({item.rows / elapsed:.0f}/s), '
+                    f'{item.cache_hits} cache hits, next offset {item.next_offset}'
+                )
+            yield kind, item
@@ -0,0 +1,25 @@
+# backend/lookup/management/commands/bump_cache_version.py
+from django.core.management.base import BaseCommand, CommandError
+
+from lookup.cache_keys import bump_version, key_versions
+from lookup.providers import SEARCH_KINDS
+
+
+class Command(BaseCommand):
+    help = ('Invalidate every cached result of one or more search types by moving them to a '
+            'new cache key version. Workers switch within CACHE_KEY_VERSION_SYNC_INTERVAL seconds')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kinds', nargs='*', help=f"Search types: {', '.join(sorted(SEARCH_KINDS))}")
+        parser.add_argument('--all', action='store_true', help='Bump every search type')
+
+    def handle(self, *args, **options):
+        kinds = sorted(SEARCH_KINDS) if options['all'] else options['kinds']
+        if not kinds:
+            raise CommandError('Name the search types to invalidate, or pass --all')
+        unknown = set(kinds) - SEARCH_KINDS
+        if unknown:
+            raise CommandError(f"Unknown search types: {', '.join(sorted(unknown))}")
+        key_versions.load()
+        for kind in kinds:
+            self.stdout.write(self.style.SUCCESS(f'{kind}: now v{bump_version(kind)}'))
@@ -0,0 +1,154 @@
+# backend/lookup/management/commands/load_property_records.py
+import csv
+import io
+import json
+import sys
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from lookup.addresses import normalize_address, synthetic_properties
+from lookup.models import PropertyRecord
+
+TEXT_FIELDS = ['county', 'property_type', 'parcel_number', 'owner_name']
+NUMBER_FIELDS = ['year_built', 'square_feet', 'lot_size_sqft', 'bedrooms', 'stories',
+                 'estimated_value', 'tax_assessment', 'annual_tax', 'last_sale_price']
+KEY_LENGTH = PropertyRecord._meta.get_field('address_key').max_length
+# Rewritten when a loaded address is already stored
+UPDATE_FIELDS = TEXT_FIELDS + NUMBER_FIELDS + [
+    'street', 'city', 'state', 'zip_plus4', 'bathrooms', 'last_sale_date', 'source', 'updated_at',
+]
+
+
+def _read_csv(source):
+    reader = csv.DictReader(io.TextIOWrapper(source, encoding='utf-8-sig', newline=''))
+    for row in reader:
+        yield {key.strip().lower(): value for key, value in row.items() if key}
+
+
+def _read_ndjson(source):
+    for line_number, line in enumerate(io.TextIOWrapper(source, encoding='utf-8'), start=1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                raise CommandError(f'Line {line_number} is not valid JSON')
+
+
+def _number(value, cast=int):
+    """'$350,000' -> 350000; None for blanks and junk"""
+    text = str(value if value is not None else '').replace('$', '').replace(',', '').strip()
+    try:
+        number = cast(float(text)) if text else None
+    except ValueError:
+        return None
+    return number if number is None or 0 <= number < 2 ** 31 else None
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(str(value).strip()[:10]) if value else None
+    except ValueError:
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Load property records for address search from a CSV or NDJSON file, or generate '
+            'a synthetic dataset. Addresses are stored normalized; an address that is already '
+            'stored is updated')
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', nargs='?', help="CSV or NDJSON file, or '-' for stdin")
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help='Input format (default: from the file extension, else csv)')
+        parser.add_argument('--synthetic', type=int, metavar='COUNT',
+                            help='Generate COUNT synthetic records instead of reading a file')
+        parser.add_argument('--seed', type=int, default=1, help='Seed for --synthetic')
+        parser.add_argument('--source', help="Value for the source column (default: 'import' or 'synthetic')")
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT')
+        parser.add_argument('--replace', action='store_true',
+                            help='Delete the existing records with the same source first')
+
+    def handle(self, *args, **options):
+        if bool(options['input']) == bool(options['synthetic']):
+            raise CommandError('Give either an input file or --synthetic COUNT')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        source = None
+        if options['synthetic']:
+            rows = synthetic_properties(options['synthetic'], options['seed'])
+            record_source = options['source'] or 'synthetic'
+        else:
+            path = options['input']
+            fmt = options['format'] or ('ndjson' if path.lower().endswith(('.ndjson', '.jsonl')) else 'csv')
+            source = sys.stdin.buffer if path == '-' else open(path, 'rb')
+            rows = _read_csv(source) if fmt == 'csv' else _read_ndjson(source)
+            record_source = options['source'] or 'import'
+
+        started = time.monotonic()
+        loaded = skipped = 0
+        try:
+            with transaction.atomic():
+                if options['replace']:
+                    deleted = PropertyRecord.objects.filter(source=record_source).delete()[0]
+                    self.stdout.write(f'Deleted {deleted} existing {record_source} records')
+                # Keyed by (address_key, zip_code): a batch must not upsert the same row twice
+                batch = {}
+                for row in rows:
+                    record = self._record(row, record_source)
+                    if record is None:
+                        skipped += 1
+                        continue
+                    batch[record.address_key, record.zip_code] = record
+                    if len(batch) >= options['batch_size']:
+                        loaded += self._write(batch)
+                        batch = {}
+                        self.stderr.write(f'{loaded} records loaded', ending='\r')
+                if batch:
+                    loaded += self._write(batch)
+        finally:
+            if source is not None and source is not sys.stdin.buffer:
+                source.close()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {loaded} records in {elapsed:.1f}s ({loaded / max(elapsed, 1e-9):.0f} records/s)'
+            + (f', skipped {skipped} without a street, city and state' if skipped else '')
+        ))
+
+    @staticmethod
+    def _write(batch):
+        PropertyRecord.objects.bulk_create(
+            batch.values(),
+            update_conflicts=True,
+            unique_fields=['address_key', 'zip_code'],
+            update_fields=UPDATE_FIELDS,
+        )
+        return len(batch)
+
+    @staticmethod
+    def _record(row, record_source):
+        address = normalize_address(row.get('street'), row.get('city'), row.get('state'),
+                                    str(row.get('zip_code') or row.get('zip') or ''))
+        if not address.street or not address.city or len(address.state) != 2:
+            return None
+        if any(len(getattr(address, field)) > PropertyRecord._meta.get_field(field).max_length
+               for field in ('street', 'city')) or len(address.key) > KEY_LENGTH:
+            return None
+        return PropertyRecord(
+            address_key=address.key,
+            street=address.street,
+            city=address.city,
+            state=address.state,
+            zip_code=address.zip_code,
+            zip_plus4=address.zip_plus4,
+            **{field: str(row.get(field) or '').strip()[:PropertyRecord._meta.get_field(field).max_length]
+               for field in TEXT_FIELDS},
+            **{field: _number(row.get(field)) for field in NUMBER_FIELDS},
+            bathrooms=_number(row.get('bathrooms'), cast=float),
+            last_sale_date=_date(row.get('last_sale_date')),
+            source=record_source,
+        )
@@ -0,0 +1,129 @@
+# backend/lookup/management/commands/replay_search_log.py
+import random
+import unicodedata
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from lookup.cache_keys import key_versions, people_cache_key, phone_cache_key
+from lookup.models import SearchLog
+from lookup.utils import parse_phone
+
+# Full-width forms of the printable ASCII characters, which NFKC folds back
+_FULL_WIDTH = {code: code + 0xFEE0 for code in range(0x21, 0x7F)}
+
+
+def _legacy_phone_key(number):
+    return f"phone_us:{number}"
+
+
+def _legacy_people_key(first_name, last_name, city, state):
+    """people_search's cache key before lookup.cache_keys"""
+    full_name = f"{first_name} {last_name}".strip()
+    key = f"people:{full_name.lower().replace(' ', '_')}"
+    if city:
+        key += f":{city.lower()}"
+    if state:
+        key += f":{state.lower()}"
+    return key
+
+
+def _respell(rng, text):
+    """text as another client might send it: other case, spacing or Unicode form"""
+    kind = rng.randrange(5)
+    if kind == 0:
+        return text.upper()
+    if kind == 1:
+        return text.lower()
+    if kind == 2:
+        return '  ' + '  '.join(text.split()) + ' '
+    if kind == 3:
+        return text.translate(_FULL_WIDTH)
+    return unicodedata.normalize('NFD', text.title())
+
+
+class _Replay:
+    """A cache that only remembers keys and their expiry, replayed in log order"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.expiry = {}
+        self.hits = 0
+        self.lookups = 0
+        self.longest = 0
+
+    def lookup(self, key, now):
+        self.lookups += 1
+        self.longest = max(self.longest, len(key.encode('utf-8')))
+        if self.expiry.get(key, 0) > now:
+            self.hits += 1
+        else:
+            self.expiry[key] = now + self.ttl
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+
+class Command(BaseCommand):
+    help = ('Replay SearchLog traffic against the legacy and the canonical (lookup.cache_keys) '
+            'search cache keys and compare their hit rates. Name searches are replayed '
+            'without city and state, which SearchLog does not record')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ttl', type=int,
+                            help='Seconds a cached result is served '
+                                 '(default: SEARCH_CACHE_TIMEOUT + SEARCH_CACHE_STALE_TTL)')
+        parser.add_argument('--limit', type=int, help='Replay only the first LIMIT log rows')
+        parser.add_argument('--respell', type=float, default=0.0,
+                            help='Share of name searches to replay as another spelling of the same '
+                                 'name (case, spacing, full-width or decomposed Unicode)')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if not 0 <= options['respell'] <= 1:
+            raise CommandError('--respell must be between 0 and 1')
+        ttl = options['ttl'] or settings.SEARCH_CACHE_TIMEOUT + settings.SEARCH_CACHE_STALE_TTL
+        rng = random.Random(options['seed'])
+        # Keys are None until the versions are loaded
+        key_versions.ensure_loaded()
+
+        rows = SearchLog.objects.order_by('created_at').values_list('phone_number', 'normalized_number', 'created_at')
+        if options['limit']:
+            rows = rows[:options['limit']]
+        rows = list(rows.iterator(chunk_size=10000))
+        if not rows:
+            raise CommandError('There are no SearchLog rows to replay')
+
+        replays = {kind: (_Replay(ttl), _Replay(ttl)) for kind in ('phone', 'name')}
+        for raw, normalized, created_at in rows:
+            now = created_at.timestamp()
+            parsed = parse_phone(raw or normalized or '')
+            if parsed.valid:
+                legacy, canonical = replays['phone']
+                legacy.lookup(_legacy_phone_key(parsed.normalized), now)
+                canonical.lookup(phone_cache_key(parsed.normalized), now)
+                continue
+            first_name, _, last_name = (normalized or raw or '').strip().partition(' ')
+            if options['respell'] and rng.random() < options['respell']:
+                first_name, last_name = _respell(rng, first_name), _respell(rng, last_name)
+            legacy, canonical = replays['name']
+            legacy.lookup(_legacy_people_key(first_name, last_name, '', ''), now)
+            canonical.lookup(people_cache_key(first_name, last_name, '', ''), now)
+
+        total_legacy = total_canonical = total = 0
+        for kind, (legacy, canonical) in replays.items():
+            if not legacy.lookups:
+                continue
+            total += legacy.lookups
+            total_legacy += legacy.hits
+            total_canonical += canonical.hits
+            self.stdout.write(
+                f"{kind:>5}: {legacy.lookups} lookups; legacy keys {legacy.hit_rate:.1%} hits "
+                f"({len(legacy.expiry)} keys, longest {legacy.longest} bytes), canonical keys "
+                f"{canonical.hit_rate:.1%} hits ({len(canonical.expiry)} keys, longest {canonical.longest} bytes)"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Hit rate over {total} replayed searches: legacy {total_legacy / total:.1%}, "
+            f"canonical {total_canonical / total:.1%} ({(total_canonical - total_legacy) / total:+.1%})"
+        ))
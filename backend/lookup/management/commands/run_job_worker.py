@@ -0,0 +1,118 @@
+# backend/lookup/management/commands/run_job_worker.py
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+
+from lookup.jobs import (
+    claim_job,
+    deliver_callbacks,
+    purge_expired_jobs,
+    requeue_expired_claims,
+    run_job,
+    worker_id,
+)
+
+# Seconds between deletions of expired jobs
+PURGE_INTERVAL = 300
+
+
+class Command(BaseCommand):
+    help = ('Run queued background check jobs (POST /api/search/background/jobs/). '
+            'Workers claim jobs from the database, so start as many processes as needed; '
+            'SIGTERM or Ctrl-C lets the running jobs finish first')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Jobs run at once by this process')
+        parser.add_argument('--poll-interval', type=float,
+                            help='Seconds between checks for new jobs (default: JOB_POLL_INTERVAL)')
+        parser.add_argument('--once', action='store_true',
+                            help='Run the jobs queued now, deliver due callbacks and exit')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+        poll_interval = options['poll_interval'] or settings.JOB_POLL_INTERVAL
+        self.stop = threading.Event()
+        self.processed = 0
+        self.processed_lock = threading.Lock()
+
+        if not options['once']:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, self._request_stop)
+
+        self._housekeeping(purge=True)
+        threads = [
+            threading.Thread(target=self._work, args=(poll_interval, options['once']),
+                             name=f'job-worker-{n + 1}', daemon=True)
+            for n in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Job worker started with {len(threads)} threads")
+
+        last_purge = time.monotonic()
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=poll_interval / len(threads))
+            if self.stop.is_set() or options['once']:
+                continue
+            purge = time.monotonic() - last_purge >= PURGE_INTERVAL
+            self._housekeeping(purge=purge)
+            if purge:
+                last_purge = time.monotonic()
+
+        if options['once']:
+            self._housekeeping(purge=False)
+        connections.close_all()
+        self.stdout.write(self.style.SUCCESS(f"Job worker stopped after {self.processed} jobs"))
+
+    def _request_stop(self, signum, frame):
+        self.stderr.write('Stopping once the running jobs finish')
+        self.stop.set()
+
+    def _housekeeping(self, purge):
+        try:
+            requeue_expired_claims(settings.JOB_MAX_ATTEMPTS)
+            deliver_callbacks()
+            if purge:
+                purge_expired_jobs()
+        except Exception as e:
+            self.stderr.write(f"Job housekeeping failed: {e}")
+        finally:
+            close_old_connections()
+
+    def _work(self, poll_interval, once):
+        worker = worker_id()
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                try:
+                    job = claim_job(worker, settings.JOB_LEASE_SECONDS)
+                except Exception as e:
+                    self.stderr.write(f"Claiming a job failed: {e}")
+                    job = None
+                if job is None:
+                    if once:
+                        break
+                    self.stop.wait(poll_interval)
+                    continue
+
+                started = time.monotonic()
+                try:
+                    stored = run_job(job, worker)
+                except Exception as e:
+                    # The lease runs out and another worker retries the job
+                    self.stderr.write(f"Job {job.id} could not be stored: {e}")
+                    continue
+                with self.processed_lock:
+                    self.processed += 1
+                self.stdout.write(
+                    f"Job {job.id} ({' '.join((job.query['first_name'], job.query['last_name']))}) "
+                    f"{'finished' if stored else 'lost its claim'} in {time.monotonic() - started:.2f}s"
+                )
+        finally:
+            connections.close_all()
@@ -0,0 +1,86 @@
+# backend/lookup/management/commands/update_trending.py
+import time
+from datetime import timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from lookup.models import SearchLog, SearchTrendBucket
+from lookup.trending import BUCKET_SECONDS, trending
+
+
+class Command(BaseCommand):
+    help = ('Score numbers by their decayed searches over the trending window and '
+            'mark the top K as trending on PopularSearch')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=trending.top_k,
+                            help='Numbers to score and consider for trending')
+        parser.add_argument('--min-score', type=float, default=trending.min_score,
+                            help='Score a number needs to be marked trending')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running, refreshing every this many seconds '
+                                 '(only new buckets are read after the first run)')
+        parser.add_argument('--backfill', action='store_true',
+                            help='Rebuild the hourly buckets in the window from SearchLog first')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Show the top numbers without updating PopularSearch')
+
+    def handle(self, *args, **options):
+        if options['top'] < 1 or options['interval'] < 0:
+            raise CommandError('--top must be at least 1 and --interval must not be negative')
+        trending.top_k = options['top']
+        trending.min_score = options['min_score']
+
+        if options['backfill']:
+            self.stdout.write(f'Backfilled {self._backfill()} hourly buckets from SearchLog')
+
+        while True:
+            started = time.monotonic()
+            ranked = trending.refresh()
+            if options['dry_run']:
+                for entry in ranked[:20]:
+                    self.stdout.write(f'{entry.phone_number:<16} {entry.score:>10.2f} {entry.searches:>8} searches')
+            else:
+                pruned = trending.prune()
+                updated = trending.apply(ranked)
+                stats = trending.stats()
+                self.stdout.write(self.style.SUCCESS(
+                    f'Scored {len(ranked)} of {stats["numbers_in_window"]} numbers in '
+                    f'{time.monotonic() - started:.2f}s ({stats["buckets_read"]} buckets read so far); '
+                    f'{updated} rows updated, {pruned} expired buckets deleted'
+                ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def _backfill(self):
+        """Count SearchLog rows per number and hour into SearchTrendBucket"""
+        since = timezone.now() - timedelta(hours=trending.window_hours)
+        hourly = (
+            SearchLog.objects
+            # People and address searches share SearchLog; phone numbers are E.164
+            .filter(created_at__gte=since, found_results=True, normalized_number__startswith='+')
+            .annotate(bucket=TruncHour('created_at', tzinfo=dt_timezone.utc))
+            .values('normalized_number', 'bucket')
+            .annotate(searches=Count('id'))
+            .order_by()
+        )
+        rows = [
+            SearchTrendBucket(
+                phone_number=row['normalized_number'],
+                hour=int(row['bucket'].timestamp()) // BUCKET_SECONDS,
+                count=row['searches'],
+            )
+            for row in hourly.iterator()
+        ]
+        SearchTrendBucket.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['phone_number', 'hour'],
+            update_fields=['count'],
+        )
+        return len(rows)
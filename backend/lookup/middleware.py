@@ -1 +1,122 @@
-﻿# Placeholder middleware
+"""
+Request middleware for the lookup API.
+
+Both middlewares are sync and async capable, so under ASGI the async
+search views (LOOKUP_ASYNC_VIEWS) are called without a thread hop; the
+async path uses the async cache API for the limiter and blocklist.
+"""
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+
+from .blocklist import blocklist
+from .ratelimit import rate_limit_snapshots, rate_limited_response, rate_limiter, set_rate_limit_headers
+from .utils import get_trusted_client_ip
+
+logger = logging.getLogger(__name__)
+
+BLOCKED_RESPONSE_BODY = b'{"error": "Access denied", "success": false}'
+
+
+class BlocklistMiddleware:
+    """
+    Refuse requests from blocked IPs and networks before any view runs.
+    
+    Applies to paths starting with one of BLOCKLIST_PATHS. The check is an
+    in-memory range lookup (lookup.blocklist), and rejections aren't logged
+    individually, so a blocked scraper costs next to nothing.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'BLOCKLIST_ENABLED', True)
+        self.paths = tuple(getattr(settings, 'BLOCKLIST_PATHS', ['/api/']))
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if (self.enabled and request.path.startswith(self.paths)
+                and blocklist.is_blocked(get_trusted_client_ip(request))):
+            return _blocked_response()
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if (self.enabled and request.path.startswith(self.paths)
+                and await blocklist.ais_blocked(get_trusted_client_ip(request))):
+            return _blocked_response()
+        return await self.get_response(request)
+
+
+def _blocked_response():
+    return HttpResponse(BLOCKED_RESPONSE_BODY, content_type='application/json', status=403)
+
+
+class RateLimitMiddleware:
+    """
+    Limit search requests per client IP.
+
+    Applies MAX_PHONE_LOOKUPS_PER_IP_HOUR / _DAY to paths starting with one
+    of RATE_LIMIT_PATHS, using the cache-backed sliding window limiter in
+    lookup.ratelimit. Every request counts as one lookup, except for views
+    marked @rate_limit_exempt, which charge themselves (bulk lookups by
+    their size, job polling against its own limit). Allowed responses carry
+    X-RateLimit-Limit and X-RateLimit-Remaining for the tightest window;
+    rejected requests get a 429 with Retry-After.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'RATE_LIMIT_ENABLED', True)
+        self.paths = tuple(getattr(settings, 'RATE_LIMIT_PATHS', ['/api/search/']))
+        self.limiter = rate_limiter
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _charged(self, request) -> bool:
+        # CORS preflights aren't searches
+        if not self.enabled or request.method == 'OPTIONS' or not request.path.startswith(self.paths):
+            return False
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return True
+        return not getattr(match.func, 'rate_limit_exempt', False)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._charged(request):
+            return self.get_response(request)
+
+        rate_limit_snapshots.ensure_started()
+        client_ip = get_trusted_client_ip(request)
+        decision = self.limiter.hit(client_ip)
+
+        if not decision.allowed:
+            logger.warning(f"Rate limit ({decision.window.name}) exceeded for {client_ip}")
+            return rate_limited_response(decision)
+        return set_rate_limit_headers(self.get_response(request), decision)
+
+    async def __acall__(self, request):
+        if not self._charged(request):
+            return await self.get_response(request)
+
+        rate_limit_snapshots.ensure_started()
+        client_ip = get_trusted_client_ip(request)
+        decision = await self.limiter.ahit(client_ip)
+
+        if not decision.allowed:
+            logger.warning(f"Rate limit ({decision.window.name}) exceeded for {client_ip}")
+            return rate_limited_response(decision)
+        return set_rate_limit_headers(await self.get_response(request), decision)
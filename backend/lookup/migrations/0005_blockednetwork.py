@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lookup', '0004_apierrorlog_ipratelimit_phonenumberanalytics_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlockedNetwork',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('network', models.CharField(help_text='IP address or CIDR range, e.g. 203.0.113.0/24', max_length=64, unique=True)),
+                ('reason', models.CharField(blank=True, max_length=200)),
+                ('is_active', models.BooleanField(default=True)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Blocked Network',
+                'verbose_name_plural': 'Blocked Networks',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lookup', '0005_blockednetwork'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTrendBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone_number', models.CharField(max_length=20)),
+                ('hour', models.PositiveIntegerField(db_index=True, help_text='Hours since the Unix epoch (UTC)')),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Search Trend Bucket',
+                'verbose_name_plural': 'Search Trend Buckets',
+                'unique_together': {('phone_number', 'hour')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lookup', '0006_searchtrendbucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersonRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_name', models.CharField(max_length=100)),
+                ('middle_name', models.CharField(blank=True, max_length=100)),
+                ('last_name', models.CharField(max_length=100)),
+                ('age', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('street', models.CharField(blank=True, max_length=200)),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('state', models.CharField(blank=True, max_length=50)),
+                ('zip_code', models.CharField(blank=True, max_length=10)),
+                ('phone_number', models.CharField(blank=True, max_length=20)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('source', models.CharField(default='import', max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Person Record',
+                'verbose_name_plural': 'Person Records',
+                'indexes': [models.Index(fields=['last_name', 'first_name'], name='lookup_pers_last_na_401b64_idx')],
+            },
+        ),
+    ]
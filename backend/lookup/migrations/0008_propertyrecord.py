@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lookup', '0007_personrecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address_key', models.CharField(max_length=255)),
+                ('zip_code', models.CharField(blank=True, max_length=5)),
+                ('street', models.CharField(max_length=200)),
+                ('city', models.CharField(max_length=100)),
+                ('state', models.CharField(max_length=2)),
+                ('zip_plus4', models.CharField(blank=True, max_length=4)),
+                ('county', models.CharField(blank=True, max_length=100)),
+                ('property_type', models.CharField(blank=True, max_length=50)),
+                ('year_built', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('square_feet', models.PositiveIntegerField(blank=True, null=True)),
+                ('lot_size_sqft', models.PositiveIntegerField(blank=True, null=True)),
+                ('bedrooms', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('bathrooms', models.FloatField(blank=True, null=True)),
+                ('stories', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('estimated_value', models.PositiveIntegerField(blank=True, null=True)),
+                ('tax_assessment', models.PositiveIntegerField(blank=True, null=True)),
+                ('annual_tax', models.PositiveIntegerField(blank=True, null=True)),
+                ('last_sale_price', models.PositiveIntegerField(blank=True, null=True)),
+                ('last_sale_date', models.DateField(blank=True, null=True)),
+                ('parcel_number', models.CharField(blank=True, max_length=50)),
+                ('owner_name', models.CharField(blank=True, max_length=200)),
+                ('source', models.CharField(default='import', max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Property Record',
+                'verbose_name_plural': 'Property Records',
+                'indexes': [models.Index(fields=['zip_code', 'street'], name='lookup_prop_zip_cod_f8e945_idx')],
+                'unique_together': {('address_key', 'zip_code')},
+            },
+        ),
+    ]
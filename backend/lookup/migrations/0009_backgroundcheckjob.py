@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:04
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lookup', '0008_propertyrecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundCheckJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('query_hash', models.CharField(max_length=64)),
+                ('query', models.JSONField()),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('claimed_until', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('callback_url', models.URLField(blank=True, max_length=500)),
+                ('callback_attempts', models.PositiveSmallIntegerField(default=0)),
+                ('callback_next_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('callback_delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('callback_error', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Background Check Job',
+                'verbose_name_plural': 'Background Check Jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='lookup_back_status_b352b7_idx'), models.Index(fields=['query_hash', 'status'], name='lookup_back_query_h_2e82c1_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='backgroundcheckjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running'])), fields=('query_hash',), name='unique_active_background_check_job'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def copy_callbacks(apps, schema_editor):
+    """Move each job's callback into the new table"""
+    BackgroundCheckJob = apps.get_model('lookup', 'BackgroundCheckJob')
+    BackgroundCheckCallback = apps.get_model('lookup', 'BackgroundCheckCallback')
+    now = timezone.now()
+    BackgroundCheckCallback.objects.bulk_create(
+        BackgroundCheckCallback(
+            job=job,
+            url=job.callback_url,
+            attempts=job.callback_attempts,
+            # Callbacks of unfinished jobs used to be scheduled when the job finished
+            next_at=now if job.status in ('queued', 'running') else job.callback_next_at,
+            delivered_at=job.callback_delivered_at,
+            error=job.callback_error,
+        )
+        for job in BackgroundCheckJob.objects.exclude(callback_url='').iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lookup', '0009_backgroundcheckjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundCheckCallback',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='callbacks', to='lookup.backgroundcheckjob')),
+            ],
+            options={
+                'verbose_name': 'Background Check Callback',
+                'verbose_name_plural': 'Background Check Callbacks',
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='backgroundcheckcallback',
+            constraint=models.UniqueConstraint(fields=('job', 'url'), name='unique_background_check_callback'),
+        ),
+        migrations.RunPython(copy_callbacks, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='backgroundcheckjob',
+            name='callback_attempts',
+        ),
+        migrations.RemoveField(
+            model_name='backgroundcheckjob',
+            name='callback_delivered_at',
+        ),
+        migrations.RemoveField(
+            model_name='backgroundcheckjob',
+            name='callback_error',
+        ),
+        migrations.RemoveField(
+            model_name='backgroundcheckjob',
+            name='callback_next_at',
+        ),
+        migrations.RemoveField(
+            model_name='backgroundcheckjob',
+            name='callback_url',
+        ),
+    ]
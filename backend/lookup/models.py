@@ -1,3 +1,7 @@
+import ipaddress
+import uuid
+
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -106,7 +110,7 @@ class SiteConfiguration(models.Model):
 
 
 class PhoneNumberAnalytics(models.Model):
-    """Store analytics data for phone numbers"""
+    """Store analytics data for phone numbers (counts are flushed by lookup.analytics)"""
     
     phone_number = models.CharField(max_length=20, unique=True, db_index=True)
     search_count = models.PositiveIntegerField(default=1)
@@ -122,17 +126,19 @@ class PhoneNumberAnalytics(models.Model):
         verbose_name = 'Phone Number Analytics'
         verbose_name_plural = 'Phone Number Analytics'
     
-    def increment_search_count(self):
-        self.search_count += 1
-        self.last_searched = timezone.now()
-        self.save(update_fields=['search_count', 'last_searched'])
-    
     def __str__(self):
         return f"{self.phone_number} ({self.search_count} searches)"
 
 
 class IPRateLimit(models.Model):
-    """Track API rate limits per IP address"""
+    """
+    Per-IP rate limit usage, for the admin.
+    
+    Limits are enforced by lookup.ratelimit on cache counters; rows here are
+    snapshots of those counters, refreshed every RATE_LIMIT_SNAPSHOT_INTERVAL
+    seconds. Rows with is_blocked set are refused by lookup.blocklist until
+    blocked_until (indefinitely when it is empty).
+    """
     
     ip_address = models.GenericIPAddressField(unique=True, db_index=True)
     hour_count = models.PositiveIntegerField(default=0)
@@ -152,34 +158,207 @@ class IPRateLimit(models.Model):
         verbose_name = 'IP Rate Limit'
         verbose_name_plural = 'IP Rate Limits'
     
-    def is_hour_limit_exceeded(self, max_per_hour=50):
-        """Check if hourly limit is exceeded"""
-        if timezone.now() > self.hour_reset + timezone.timedelta(hours=1):
-            # Reset hourly counter
-            self.hour_count = 0
-            self.hour_reset = timezone.now()
-            self.save()
-        
-        return self.hour_count >= max_per_hour
-    
-    def is_day_limit_exceeded(self, max_per_day=100):
-        """Check if daily limit is exceeded"""
-        if timezone.now() > self.day_reset + timezone.timedelta(days=1):
-            # Reset daily counter
-            self.day_count = 0
-            self.day_reset = timezone.now()
-            self.save()
-        
-        return self.day_count >= max_per_day
+    def __str__(self):
+        return f"{self.ip_address} - {self.hour_count}/hr, {self.day_count}/day"
+
+
+class BlockedNetwork(models.Model):
+    """IP address or CIDR range refused by lookup.middleware.BlocklistMiddleware"""
+    
+    network = models.CharField(max_length=64, unique=True, help_text='IP address or CIDR range, e.g. 203.0.113.0/24')
+    reason = models.CharField(max_length=200, blank=True)
+    is_active = models.BooleanField(default=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Blocked Network'
+        verbose_name_plural = 'Blocked Networks'
+    
+    def clean(self):
+        try:
+            self.network = str(ipaddress.ip_network(self.network.strip(), strict=False))
+        except ValueError:
+            raise ValidationError({'network': 'Enter an IP address or CIDR range'})
     
-    def increment_counters(self):
-        """Increment both hourly and daily counters"""
-        self.hour_count += 1
-        self.day_count += 1
-        self.save()
+    def save(self, *args, **kwargs):
+        # Store the canonical form (host bits cleared) whatever was entered
+        self.network = str(ipaddress.ip_network(self.network.strip(), strict=False))
+        super().save(*args, **kwargs)
     
     def __str__(self):
-        return f"{self.ip_address} - {self.hour_count}/hr, {self.day_count}/day"
+        return f"{self.network}{' (inactive)' if not self.is_active else ''}"
+
+
+class PersonRecord(models.Model):
+    """A person searchable through people_search (see lookup.people)"""
+    
+    first_name = models.CharField(max_length=100)
+    middle_name = models.CharField(max_length=100, blank=True)
+    last_name = models.CharField(max_length=100)
+    age = models.PositiveSmallIntegerField(null=True, blank=True)
+    
+    street = models.CharField(max_length=200, blank=True)
+    city = models.CharField(max_length=100, blank=True)
+    state = models.CharField(max_length=50, blank=True)
+    zip_code = models.CharField(max_length=10, blank=True)
+    
+    phone_number = models.CharField(max_length=20, blank=True)
+    email = models.EmailField(blank=True)
+    
+    source = models.CharField(max_length=50, default='import')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_name', 'first_name']),
+        ]
+        verbose_name = 'Person Record'
+        verbose_name_plural = 'Person Records'
+    
+    @property
+    def full_name(self):
+        return ' '.join(part for part in (self.first_name, self.middle_name, self.last_name) if part)
+    
+    def __str__(self):
+        location = ', '.join(part for part in (self.city, self.state) if part)
+        return f"{self.full_name} ({location})" if location else self.full_name
+
+
+class PropertyRecord(models.Model):
+    """A property searchable through address_search, stored under its normalized address (see lookup.addresses)"""
+    
+    # "<street>|<city>|<state>" in USPS standard form
+    address_key = models.CharField(max_length=255)
+    zip_code = models.CharField(max_length=5, blank=True)
+    
+    street = models.CharField(max_length=200)
+    city = models.CharField(max_length=100)
+    state = models.CharField(max_length=2)
+    zip_plus4 = models.CharField(max_length=4, blank=True)
+    county = models.CharField(max_length=100, blank=True)
+    
+    property_type = models.CharField(max_length=50, blank=True)
+    year_built = models.PositiveSmallIntegerField(null=True, blank=True)
+    square_feet = models.PositiveIntegerField(null=True, blank=True)
+    lot_size_sqft = models.PositiveIntegerField(null=True, blank=True)
+    bedrooms = models.PositiveSmallIntegerField(null=True, blank=True)
+    bathrooms = models.FloatField(null=True, blank=True)
+    stories = models.PositiveSmallIntegerField(null=True, blank=True)
+    
+    estimated_value = models.PositiveIntegerField(null=True, blank=True)
+    tax_assessment = models.PositiveIntegerField(null=True, blank=True)
+    annual_tax = models.PositiveIntegerField(null=True, blank=True)
+    last_sale_price = models.PositiveIntegerField(null=True, blank=True)
+    last_sale_date = models.DateField(null=True, blank=True)
+    parcel_number = models.CharField(max_length=50, blank=True)
+    owner_name = models.CharField(max_length=200, blank=True)
+    
+    source = models.CharField(max_length=50, default='import')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['address_key', 'zip_code']
+        indexes = [
+            # Lookups by ZIP when the city is spelled differently
+            models.Index(fields=['zip_code', 'street']),
+        ]
+        verbose_name = 'Property Record'
+        verbose_name_plural = 'Property Records'
+    
+    def __str__(self):
+        return f"{self.street}, {self.city}, {self.state} {self.zip_code}".strip()
+
+
+class BackgroundCheckJob(models.Model):
+    """A background check run out of the request cycle by run_job_worker (see lookup.jobs)"""
+    
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # sha256 of the canonical query; identical queued or running jobs are shared
+    query_hash = models.CharField(max_length=64)
+    query = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    
+    # "<host>:<pid>:<thread>" of the worker holding the job until claimed_until
+    worker = models.CharField(max_length=100, blank=True)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Finished jobs are deleted after this (JOB_RESULT_TTL)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Workers claim the oldest queued job and requeue expired claims
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['query_hash', 'status']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['query_hash'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='unique_active_background_check_job',
+            ),
+        ]
+        verbose_name = 'Background Check Job'
+        verbose_name_plural = 'Background Check Jobs'
+    
+    def __str__(self):
+        name = ' '.join(part for part in (self.query.get('first_name'), self.query.get('last_name')) if part)
+        return f"{name} ({self.status})"
+
+
+class BackgroundCheckCallback(models.Model):
+    """A URL to POST a finished BackgroundCheckJob to, one per submitter (see lookup.jobs)"""
+    
+    job = models.ForeignKey(BackgroundCheckJob, on_delete=models.CASCADE, related_name='callbacks')
+    url = models.URLField(max_length=500)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Delivered once the job has finished and this has passed; cleared when delivered or given up
+    next_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    error = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'url'], name='unique_background_check_callback'),
+        ]
+        verbose_name = 'Background Check Callback'
+        verbose_name_plural = 'Background Check Callbacks'
+    
+    def __str__(self):
+        return f"{self.url} ({self.status})"
+    
+    @property
+    def status(self) -> str:
+        if self.delivered_at:
+            return 'Delivered'
+        return self.error or 'Pending'
 
 
 class UserFeedback(models.Model):
@@ -235,20 +414,11 @@ class PopularSearch(models.Model):
         verbose_name_plural = 'Popular Searches'
     
     def update_trend_score(self):
-        """Calculate trending score based on recent activity"""
-        from datetime import timedelta
+        """Recalculate this number's trend score from its hourly search buckets"""
+        from .trending import score_number, trending
         
-        recent_searches = SearchLog.objects.filter(
-            normalized_number__icontains=self.phone_number.replace('+', ''),
-            created_at__gte=timezone.now() - timedelta(days=7)
-        ).count()
-        
-        # Simple trending algorithm
-        self.trend_score = recent_searches * 1.0
-        if recent_searches > 10:
-            self.is_trending = True
-        else:
-            self.is_trending = False
+        self.trend_score = score_number(self.phone_number)
+        self.is_trending = self.trend_score >= trending.min_score
         
         self.save(update_fields=['trend_score', 'is_trending'])
     
@@ -256,6 +426,22 @@ class PopularSearch(models.Model):
         return f"{self.phone_number} ({self.search_count} searches)"
 
 
+class SearchTrendBucket(models.Model):
+    """Searches for a number within one hour, the input to lookup.trending"""
+    
+    phone_number = models.CharField(max_length=20)
+    hour = models.PositiveIntegerField(db_index=True, help_text='Hours since the Unix epoch (UTC)')
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['phone_number', 'hour']
+        verbose_name = 'Search Trend Bucket'
+        verbose_name_plural = 'Search Trend Buckets'
+    
+    def __str__(self):
+        return f"{self.phone_number} @ {self.hour}: {self.count}"
+
+
 class APIErrorLog(models.Model):
     """Log API errors for monitoring and debugging"""
     
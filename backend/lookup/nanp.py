@@ -0,0 +1,462 @@
+"""
+NANP (North American Numbering Plan) lookup engine.
+
+Location and carrier data is held in two flat arrays covering every
+NPA-NXX (area code + exchange) combination, 1000 x 1000 slots each. A slot
+holds an index into a pool of interned strings, so resolving a number is two
+array reads and never allocates.
+
+The table is seeded from the built-in area code data in ``lookup.area_codes``
+and, when ``settings.NANP_EXCHANGE_DATASET`` points to a CSV file, refined
+with exchange-level rows from that dataset.
+
+The ``build_nanp_dataset`` management command compiles the table into a
+versioned binary file (``settings.NANP_DATASET_FILE``). Workers open that
+file with mmap, so the arrays live once in the page cache rather than once
+per process, and pick up a replaced file without a restart.
+
+File layout (little endian)::
+
+    header   magic 'NANP', format version, item size, dataset version,
+             string count, string pool size, area code count,
+             exchange count, CRC32 of everything after the header
+    offsets  (string count + 1) x uint32 offsets into the string pool
+    pool     UTF-8 string bytes, padded to a 4-byte boundary
+    arrays   locations then carriers, TABLE_SIZE items each
+"""
+import csv
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .area_codes import US_AREA_CODE_CARRIERS, US_AREA_CODE_LOCATIONS
+
+logger = logging.getLogger(__name__)
+
+TABLE_SIZE = 1000 * 1000
+
+DEFAULT_CARRIER = 'Wireless Carrier'
+
+FILE_MAGIC = b'NANP'
+FILE_FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHIIIIII')
+
+
+class NANPDatasetError(Exception):
+    """Raised when a compiled dataset file is missing, corrupt or incompatible"""
+
+
+class NANPTable:
+    """Read-only NPA-NXX table resolving (location, carrier) in O(1)"""
+
+    __slots__ = ('strings', 'locations', 'carriers', 'area_code_count', 'exchange_count',
+                 'version', 'source', 'mapping')
+
+    def __init__(self, strings: List[str], locations, carriers,
+                 area_code_count: int = 0, exchange_count: int = 0,
+                 version: int = 0, source: str = 'memory', mapping=None):
+        # locations/carriers are arrays or memoryviews over a mapped file
+        self.strings = strings
+        self.locations = locations
+        self.carriers = carriers
+        self.area_code_count = area_code_count
+        self.exchange_count = exchange_count
+        self.version = version
+        self.source = source
+        self.mapping = mapping
+
+    def close(self):
+        """
+        Unmap the dataset file backing this table.
+
+        Lookups on a closed table raise ValueError, so only close a table
+        once nothing can still be holding it.
+        """
+        if self.mapping is None:
+            return
+        self.locations.release()
+        self.carriers.release()
+        self.mapping.close()
+        self.mapping = None
+
+    def lookup(self, npa: int, nxx: int) -> Tuple[str, str]:
+        """
+        Resolve location and carrier for an area code and exchange.
+
+        Args:
+            npa: Area code as an integer (200-999)
+            nxx: Exchange as an integer (000-999)
+
+        Returns:
+            Tuple of (location, carrier)
+        """
+        index = npa * 1000 + nxx
+        strings = self.strings
+        return strings[self.locations[index]], strings[self.carriers[index]]
+
+    def lookup_national(self, national_number: str) -> Tuple[str, str]:
+        """Resolve a 10-digit national number string (e.g. '7182222222')"""
+        return self.lookup(int(national_number[:3]), int(national_number[3:6]))
+
+    def __len__(self):
+        return len(self.strings)
+
+
+class NANPTableBuilder:
+    """Collects area code and exchange rows and compiles them into a NANPTable"""
+
+    def __init__(self):
+        self._pool: Dict[str, int] = {}
+        self._strings: List[str] = []
+        self._locations = array('I', [0]) * TABLE_SIZE
+        self._carriers = array('I', [0]) * TABLE_SIZE
+        self._area_codes = set()
+        self._exchange_count = 0
+
+        # Every dialable area code resolves to something, so lookups never
+        # need a per-request fallback string.
+        default_carrier = self.intern(DEFAULT_CARRIER)
+        for npa in range(200, 1000):
+            self._fill(npa, self.intern(f'Area Code {npa}, United States'), default_carrier)
+
+    def intern(self, value: str) -> int:
+        """Return the pool index for a string, adding it if needed"""
+        index = self._pool.get(value)
+        if index is None:
+            index = len(self._strings)
+            self._pool[value] = index
+            self._strings.append(value)
+        return index
+
+    def _fill(self, npa: int, location_index: int, carrier_index: int):
+        start = npa * 1000
+        if location_index is not None:
+            self._locations[start:start + 1000] = array('I', [location_index]) * 1000
+        if carrier_index is not None:
+            self._carriers[start:start + 1000] = array('I', [carrier_index]) * 1000
+
+    def add_area_code(self, npa: int, location: Optional[str] = None, carrier: Optional[str] = None):
+        """Set the default location/carrier for every exchange in an area code"""
+        self._fill(
+            npa,
+            self.intern(location) if location else None,
+            self.intern(carrier) if carrier else None,
+        )
+        self._area_codes.add(npa)
+
+    def add_exchange(self, npa: int, nxx: int, location: Optional[str] = None, carrier: Optional[str] = None):
+        """Set the location/carrier for a single NPA-NXX"""
+        index = npa * 1000 + nxx
+        if location:
+            self._locations[index] = self.intern(location)
+        if carrier:
+            self._carriers[index] = self.intern(carrier)
+        self._area_codes.add(npa)
+        self._exchange_count += 1
+
+    def load_builtin(self):
+        """Seed the table with the built-in area code data"""
+        for area_code in set(US_AREA_CODE_LOCATIONS) | set(US_AREA_CODE_CARRIERS):
+            self.add_area_code(
+                int(area_code),
+                US_AREA_CODE_LOCATIONS.get(area_code),
+                US_AREA_CODE_CARRIERS.get(area_code),
+            )
+
+    def load_csv(self, path) -> int:
+        """
+        Load NPA-NXX rows from a CSV file.
+
+        The file needs ``npa``, ``nxx``, ``location`` and ``carrier`` columns.
+        Rows with an empty ``nxx`` apply to the whole area code and should
+        come before the exchange rows they are refined by.
+
+        Returns:
+            Number of rows loaded
+        """
+        loaded = 0
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                try:
+                    npa = int(row['npa'])
+                    nxx = (row.get('nxx') or '').strip()
+                    if not 200 <= npa <= 999:
+                        raise ValueError(f'area code out of range: {npa}')
+                    location = (row.get('location') or '').strip()
+                    carrier = (row.get('carrier') or '').strip()
+                    if nxx:
+                        self.add_exchange(npa, int(nxx) % 1000, location, carrier)
+                    else:
+                        self.add_area_code(npa, location, carrier)
+                    loaded += 1
+                except (KeyError, ValueError) as e:
+                    logger.warning(f"Skipping NANP dataset row {row}: {e}")
+        return loaded
+
+    def build(self) -> NANPTable:
+        """Compile the collected rows into a read-only table"""
+        typecode = 'H' if len(self._strings) <= 0xFFFF else 'I'
+        return NANPTable(
+            list(self._strings),
+            array(typecode, self._locations),
+            array(typecode, self._carriers),
+            area_code_count=len(self._area_codes),
+            exchange_count=self._exchange_count,
+        )
+
+
+def write_nanp_file(table: NANPTable, path, version: int) -> int:
+    """
+    Serialize a table to the binary dataset format.
+
+    The file is written next to its destination and moved into place with
+    os.replace(), so readers only ever see a complete file.
+
+    Returns:
+        Size of the written file in bytes
+    """
+    encoded = [value.encode('utf-8') for value in table.strings]
+    offsets = array('I', [0])
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    pool = b''.join(encoded)
+    pool += b'\0' * (-len(pool) % 4)
+
+    typecode = 'H' if len(encoded) <= 0xFFFF else 'I'
+    locations = array(typecode, table.locations)
+    carriers = array(typecode, table.carriers)
+    body = offsets.tobytes() + pool + locations.tobytes() + carriers.tobytes()
+
+    header = HEADER.pack(
+        FILE_MAGIC, FILE_FORMAT_VERSION, locations.itemsize, version,
+        len(encoded), len(pool), table.area_code_count, table.exchange_count,
+        zlib.crc32(body),
+    )
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.nanp-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    return HEADER.size + len(body)
+
+
+def load_nanp_file(path, verify: bool = True) -> NANPTable:
+    """
+    Open a compiled dataset file as a memory-mapped table.
+
+    Only the string pool is decoded into the process; the location and
+    carrier arrays are read straight from the shared mapping.
+    """
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        raise NANPDatasetError(f'Cannot map {path}: {e}')
+
+    try:
+        return _map_table(path, mapped, verify)
+    except BaseException:
+        mapped.close()
+        raise
+
+
+def _map_table(path, mapped: mmap.mmap, verify: bool) -> NANPTable:
+    if len(mapped) < HEADER.size:
+        raise NANPDatasetError(f'{path} is truncated')
+
+    (magic, format_version, item_size, version, string_count, pool_size,
+     area_code_count, exchange_count, checksum) = HEADER.unpack_from(mapped, 0)
+
+    if magic != FILE_MAGIC:
+        raise NANPDatasetError(f'{path} is not a NANP dataset file')
+    if format_version != FILE_FORMAT_VERSION:
+        raise NANPDatasetError(f'{path} has unsupported format version {format_version}')
+    if item_size not in (2, 4):
+        raise NANPDatasetError(f'{path} has invalid item size {item_size}')
+
+    offsets_start = HEADER.size
+    pool_start = offsets_start + (string_count + 1) * 4
+    locations_start = pool_start + pool_size
+    carriers_start = locations_start + TABLE_SIZE * item_size
+    end = carriers_start + TABLE_SIZE * item_size
+
+    if len(mapped) != end:
+        raise NANPDatasetError(f'{path} has size {len(mapped)}, expected {end}')
+
+    # Every view taken here is released before returning, so the only
+    # exports left on the mapping are the two arrays NANPTable.close() drops
+    with memoryview(mapped) as view:
+        with view[offsets_start:] as body:
+            if verify and zlib.crc32(body) != checksum:
+                raise NANPDatasetError(f'{path} failed checksum verification')
+
+        with view[offsets_start:pool_start] as raw, raw.cast('I') as offsets:
+            pool = bytes(view[pool_start:locations_start])
+            strings = [
+                pool[offsets[i]:offsets[i + 1]].decode('utf-8')
+                for i in range(string_count)
+            ]
+
+        typecode = 'H' if item_size == 2 else 'I'
+        with view[locations_start:carriers_start] as raw:
+            locations = raw.cast(typecode)
+        with view[carriers_start:end] as raw:
+            carriers = raw.cast(typecode)
+
+    return NANPTable(
+        strings,
+        locations,
+        carriers,
+        area_code_count=area_code_count,
+        exchange_count=exchange_count,
+        version=version,
+        source=str(path),
+        mapping=mapped,
+    )
+
+
+def build_nanp_table(dataset_path=None) -> NANPTable:
+    """Build a table from the built-in data plus an optional CSV dataset"""
+    builder = NANPTableBuilder()
+    builder.load_builtin()
+    if dataset_path:
+        try:
+            rows = builder.load_csv(dataset_path)
+            logger.info(f"Loaded {rows} NANP dataset rows from {dataset_path}")
+        except OSError as e:
+            logger.error(f"Failed to load NANP dataset {dataset_path}: {e}")
+    return builder.build()
+
+
+_table: Optional[NANPTable] = None
+# Serializes loads and swaps; readers never take it
+_table_lock = threading.Lock()
+_file_stat = None
+_next_check = 0.0
+_reloading = False
+
+
+def _stat_dataset_file(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _load_table(path, stat) -> NANPTable:
+    if stat is not None:
+        try:
+            table = load_nanp_file(path)
+            logger.info(f"Mapped NANP dataset version {table.version} from {path}")
+            return table
+        except NANPDatasetError as e:
+            logger.error(f"Ignoring NANP dataset file: {e}")
+    return build_nanp_table(getattr(settings, 'NANP_EXCHANGE_DATASET', None))
+
+
+def _reload_interval() -> float:
+    return getattr(settings, 'NANP_RELOAD_INTERVAL', 5)
+
+
+def _schedule_next_check():
+    global _next_check
+    _next_check = time.monotonic() + _reload_interval()
+
+
+def _retire(table: Optional[NANPTable]):
+    """Unmap a replaced table once requests that already hold it are done"""
+    if table is None or table.mapping is None:
+        return
+    # A lookup holds the table for microseconds; the grace period only has
+    # to outlast a thread that fetched it just before the swap.
+    timer = threading.Timer(max(_reload_interval(), 1), table.close)
+    timer.daemon = True
+    timer.start()
+
+
+def _swap_table(path, stat) -> NANPTable:
+    # Caller holds _table_lock
+    global _table, _file_stat
+    old = _table
+    _table = _load_table(path, stat)
+    _file_stat = stat
+    _schedule_next_check()
+    _retire(old)
+    return _table
+
+
+def reload_nanp_table() -> NANPTable:
+    """Reload the process-wide table from disk unconditionally"""
+    path = getattr(settings, 'NANP_DATASET_FILE', None)
+    with _table_lock:
+        return _swap_table(path, _stat_dataset_file(path) if path else None)
+
+
+def _background_reload():
+    global _reloading
+    path = getattr(settings, 'NANP_DATASET_FILE', None)
+    try:
+        with _table_lock:
+            stat = _stat_dataset_file(path) if path else None
+            if stat != _file_stat:
+                _swap_table(path, stat)
+    except Exception as e:
+        logger.error(f"NANP dataset reload failed: {e}")
+        _schedule_next_check()
+    finally:
+        _reloading = False
+
+
+def get_nanp_table() -> NANPTable:
+    """
+    Return the process-wide NANP table.
+
+    Uses the compiled dataset file when one exists, falling back to an
+    in-memory build. The file is re-checked every NANP_RELOAD_INTERVAL
+    seconds; a replaced file is mapped on a background thread while
+    requests keep using the current table.
+    """
+    global _reloading
+    table = _table
+    if table is None:
+        with _table_lock:
+            # Concurrent first callers wait for one load instead of each
+            # building their own
+            if _table is None:
+                path = getattr(settings, 'NANP_DATASET_FILE', None)
+                _swap_table(path, _stat_dataset_file(path) if path else None)
+            return _table
+
+    if time.monotonic() >= _next_check and not _reloading:
+        path = getattr(settings, 'NANP_DATASET_FILE', None)
+        stat = _stat_dataset_file(path) if path else None
+        if stat != _file_stat:
+            logger.info("NANP dataset file changed, reloading in the background")
+            _reloading = True
+            threading.Thread(target=_background_reload, name='nanp-reload', daemon=True).start()
+        else:
+            _schedule_next_check()
+
+    return table
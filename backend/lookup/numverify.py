@@ -0,0 +1,373 @@
+"""
+Pooled HTTP client for the NumVerify phone validation API.
+
+Each process keeps one requests.Session (and, for async views, one httpx
+AsyncClient per event loop) with a bounded keep-alive connection pool, so
+lookups reuse open connections instead of paying for a TCP handshake each
+time. Connect and read timeouts are set separately, and connection errors,
+timeouts, 429s and 5xx responses are retried with full-jitter exponential
+backoff; validation is a read-only GET, so retrying it is safe.
+
+Every attempt goes through a CircuitBreaker, and the read timeout follows
+the provider's recent latency (AdaptiveTimeout), so a slow or failing
+NumVerify costs callers little before they fall back to local data.
+
+At most pool_size attempts run at once per process (per event loop for
+the async client). An attempt waits up to pool_timeout seconds for one of
+those slots and then fails with NumVerifyError instead of queueing behind
+a stalled provider. An async client is closed when its event loop shuts
+down, so the per-request loops of async views under WSGI don't leak
+sockets.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from typing import Any, Dict, NamedTuple, Optional
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .resilience import AdaptiveTimeout, CircuitBreaker, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class NumVerifyError(Exception):
+    """Raised when NumVerify can't be reached or keeps failing after retries"""
+
+
+class NumVerifyUnavailable(NumVerifyError, CircuitOpenError):
+    """Raised without calling NumVerify while its circuit breaker is open"""
+
+
+class _AsyncPool(NamedTuple):
+    """An event loop's httpx client, its attempt slots and the generator that closes it"""
+    client: httpx.AsyncClient
+    slots: asyncio.Semaphore
+    lifetime: Any
+
+
+async def _close_with_loop(client: httpx.AsyncClient):
+    # The loop finalizes async generators when it shuts down (asyncio.run()
+    # and asgiref's per-call loops both do), which runs the finally clause
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+class NumVerifyClient:
+    """Keep-alive NumVerify client with retries and pool metrics"""
+
+    def __init__(self, url: str, pool_size: int = 10, connect_timeout: float = 3.05,
+                 read_timeout: float = 10, max_retries: int = 2,
+                 backoff_base: float = 0.2, backoff_max: float = 2.0,
+                 breaker: Optional[CircuitBreaker] = None,
+                 adaptive_timeout: Optional[AdaptiveTimeout] = None,
+                 pool_timeout: float = 1.0):
+        self.url = url
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker
+        self.adaptive_timeout = adaptive_timeout
+
+        self._lock = threading.Lock()
+        self._session = None
+        self._slots = None
+        self._pid = None
+        self._async_pools = weakref.WeakKeyDictionary()
+
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.pool_waits = 0
+        self.pool_timeouts = 0
+
+    def _get_session(self) -> requests.Session:
+        pid = os.getpid()
+        if self._session is None or self._pid != pid:
+            with self._lock:
+                # Sockets inherited across fork can't be shared with the parent
+                if self._session is None or self._pid != pid:
+                    # _slots keeps attempts within the pool, so the adapter
+                    # never has to block (which it would do without a timeout)
+                    adapter = HTTPAdapter(
+                        pool_connections=1,
+                        pool_maxsize=self.pool_size,
+                        pool_block=False,
+                    )
+                    session = requests.Session()
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._slots = threading.BoundedSemaphore(self.pool_size)
+                    self._session = session
+                    self._pid = pid
+        return self._session
+
+    async def _get_async_pool(self) -> _AsyncPool:
+        # httpx clients are bound to the event loop they were first used on
+        loop = asyncio.get_running_loop()
+        pool = self._async_pools.get(loop)
+        if pool is None or pool.client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                ),
+            )
+            lifetime = _close_with_loop(client)
+            await lifetime.asend(None)
+            pool = self._async_pools[loop] = _AsyncPool(client, asyncio.Semaphore(self.pool_size), lifetime)
+        return pool
+
+    def _pool_exhausted(self) -> NumVerifyError:
+        with self._lock:
+            self.pool_timeouts += 1
+        return NumVerifyError(f"No NumVerify connection free within {self.pool_timeout}s")
+
+    def _acquire_slot(self):
+        if self._slots.acquire(blocking=False):
+            return
+        with self._lock:
+            self.pool_waits += 1
+        if not self._slots.acquire(timeout=self.pool_timeout):
+            raise self._pool_exhausted()
+
+    async def _aacquire_slot(self, slots: asyncio.Semaphore):
+        if not slots.locked():
+            await slots.acquire()
+            return
+        with self._lock:
+            self.pool_waits += 1
+        try:
+            await asyncio.wait_for(slots.acquire(), self.pool_timeout)
+        except asyncio.TimeoutError:
+            raise self._pool_exhausted() from None
+
+    def _params(self, phone_number: str, api_key: str) -> Dict[str, Any]:
+        return {
+            'access_key': api_key,
+            'number': phone_number.lstrip('+'),
+            'country_code': '',  # Auto-detect
+            'format': 1  # JSON format
+        }
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _start(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _finish(self, failed: bool):
+        with self._lock:
+            self.in_flight -= 1
+            if failed:
+                self.failures += 1
+
+    def _should_retry(self, attempt: int, error: str, phone_number: str) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        with self._lock:
+            self.retries += 1
+        logger.warning(
+            f"NumVerify request for {phone_number} failed ({error}), "
+            f"retry {attempt + 1}/{self.max_retries}"
+        )
+        return True
+
+    def _begin_attempt(self) -> float:
+        """Check the breaker and return the read timeout for the next attempt"""
+        if self.breaker is not None and not self.breaker.allow():
+            raise NumVerifyUnavailable('NumVerify circuit is open')
+        if self.adaptive_timeout is not None:
+            return self.adaptive_timeout.current()
+        return self.read_timeout
+
+    def _end_attempt(self, started: float, healthy: bool, read_timeout: float, timed_out: bool = False):
+        if self.adaptive_timeout is not None:
+            # A timed-out call took at least its timeout; recording that lets
+            # the timeout grow again if the provider has slowed down
+            latency = read_timeout if timed_out else time.monotonic() - started
+            self.adaptive_timeout.record(latency)
+        if self.breaker is not None:
+            if healthy:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    def validate(self, phone_number: str, api_key: str) -> Dict[str, Any]:
+        """
+        Look up a number.
+
+        Args:
+            phone_number: E.164 formatted phone number (with or without +)
+            api_key: NumVerify API key
+
+        Returns:
+            API response as dictionary
+
+        Raises:
+            NumVerifyUnavailable: if the circuit breaker is open
+            NumVerifyError: if every attempt failed
+        """
+        session = self._get_session()
+        params = self._params(phone_number, api_key)
+        self._start()
+        failed = True
+        try:
+            attempt = 0
+            while True:
+                # Take a slot first, so waiting for one never uses up a
+                # half-open breaker's trial calls
+                self._acquire_slot()
+                try:
+                    read_timeout = self._begin_attempt()
+                    started = time.monotonic()
+                    try:
+                        response = session.get(
+                            self.url, params=params,
+                            timeout=(self.connect_timeout, read_timeout),
+                        )
+                    except requests.RequestException as e:
+                        self._end_attempt(started, False, read_timeout,
+                                          timed_out=isinstance(e, requests.ReadTimeout))
+                        error = str(e)
+                    else:
+                        healthy = response.status_code not in RETRY_STATUSES
+                        self._end_attempt(started, healthy, read_timeout)
+                        if healthy:
+                            try:
+                                response.raise_for_status()
+                                data = response.json()
+                            except ValueError as e:
+                                raise NumVerifyError(f"Invalid NumVerify response: {e}") from e
+                            except requests.RequestException as e:
+                                raise NumVerifyError(str(e)) from e
+                            failed = False
+                            return data
+                        error = f"HTTP {response.status_code}"
+                        response.close()
+                finally:
+                    self._slots.release()
+
+                if not self._should_retry(attempt, error, phone_number):
+                    raise NumVerifyError(error)
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+        finally:
+            self._finish(failed)
+
+    async def avalidate(self, phone_number: str, api_key: str) -> Dict[str, Any]:
+        """Async validate(), for the ASGI views"""
+        pool = await self._get_async_pool()
+        params = self._params(phone_number, api_key)
+        self._start()
+        failed = True
+        try:
+            attempt = 0
+            while True:
+                await self._aacquire_slot(pool.slots)
+                try:
+                    read_timeout = self._begin_attempt()
+                    started = time.monotonic()
+                    try:
+                        response = await pool.client.get(
+                            self.url, params=params,
+                            timeout=httpx.Timeout(read_timeout, connect=self.connect_timeout,
+                                                  pool=self.pool_timeout),
+                        )
+                    except httpx.RequestError as e:
+                        self._end_attempt(started, False, read_timeout,
+                                          timed_out=isinstance(e, httpx.ReadTimeout))
+                        error = str(e) or type(e).__name__
+                    else:
+                        healthy = response.status_code not in RETRY_STATUSES
+                        self._end_attempt(started, healthy, read_timeout)
+                        if healthy:
+                            try:
+                                response.raise_for_status()
+                                data = response.json()
+                            except ValueError as e:
+                                raise NumVerifyError(f"Invalid NumVerify response: {e}") from e
+                            except httpx.HTTPError as e:
+                                raise NumVerifyError(str(e)) from e
+                            failed = False
+                            return data
+                        error = f"HTTP {response.status_code}"
+                finally:
+                    pool.slots.release()
+
+                if not self._should_retry(attempt, error, phone_number):
+                    raise NumVerifyError(error)
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+        finally:
+            self._finish(failed)
+
+    def pool_stats(self) -> Dict[str, int]:
+        """How often attempts had to wait for a free connection, and gave up waiting"""
+        return {'pool_waits': self.pool_waits, 'pool_timeouts': self.pool_timeouts}
+
+    async def aclose(self):
+        """Close the current event loop's client now rather than at loop shutdown"""
+        pool = self._async_pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool.lifetime.aclose()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'pool_size': self.pool_size,
+            'requests': self.requests,
+            'retries': self.retries,
+            'failures': self.failures,
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
+            **self.pool_stats(),
+            'circuit': self.breaker.stats() if self.breaker is not None else None,
+            'adaptive_timeout': self.adaptive_timeout.stats() if self.adaptive_timeout is not None else None,
+        }
+
+
+numverify_client = NumVerifyClient(
+    url=getattr(settings, 'NUMVERIFY_API_URL', 'http://apilayer.net/api/validate'),
+    pool_size=getattr(settings, 'NUMVERIFY_POOL_SIZE', 10),
+    connect_timeout=getattr(settings, 'NUMVERIFY_CONNECT_TIMEOUT', 3.05),
+    read_timeout=getattr(settings, 'NUMVERIFY_READ_TIMEOUT', 10),
+    max_retries=getattr(settings, 'NUMVERIFY_MAX_RETRIES', 2),
+    backoff_base=getattr(settings, 'NUMVERIFY_BACKOFF_BASE', 0.2),
+    backoff_max=getattr(settings, 'NUMVERIFY_BACKOFF_MAX', 2.0),
+    pool_timeout=getattr(settings, 'NUMVERIFY_POOL_TIMEOUT', 1.0),
+    breaker=CircuitBreaker(
+        'numverify',
+        window=getattr(settings, 'NUMVERIFY_BREAKER_WINDOW', 30),
+        min_calls=getattr(settings, 'NUMVERIFY_BREAKER_MIN_CALLS', 20),
+        failure_rate=getattr(settings, 'NUMVERIFY_BREAKER_FAILURE_RATE', 0.5),
+        open_seconds=getattr(settings, 'NUMVERIFY_BREAKER_OPEN_SECONDS', 30),
+        half_open_calls=getattr(settings, 'NUMVERIFY_BREAKER_HALF_OPEN_CALLS', 3),
+    ),
+    adaptive_timeout=AdaptiveTimeout(
+        minimum=getattr(settings, 'NUMVERIFY_MIN_READ_TIMEOUT', 0.5),
+        maximum=getattr(settings, 'NUMVERIFY_READ_TIMEOUT', 10),
+        percentile=getattr(settings, 'NUMVERIFY_TIMEOUT_PERCENTILE', 0.99),
+        multiplier=getattr(settings, 'NUMVERIFY_TIMEOUT_MULTIPLIER', 2.0),
+    ),
+)
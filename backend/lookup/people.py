@@ -0,0 +1,559 @@
+"""
+Fuzzy name search over PersonRecord.
+
+PeopleIndex holds every record as a few integer columns (first name, last
+name, city, state), each an id into a vocabulary of distinct normalized
+values. A query name is matched against the vocabulary rather than the
+records, two ways:
+
+- phonetically: names with the same Soundex code ("Jon", "John", "Jhon")
+- by spelling: names sharing character trigrams with it, padded the way
+  PostgreSQL's pg_trgm pads them, scored by the Dice coefficient, plus
+  names one typo away, which short names often don't share trigrams with
+
+A few hundred thousand distinct surnames cover most of the US, so this
+stays small however many records there are, and the candidates for a name
+are remembered per index. Records are sorted by (last name id, first name
+id), so the records for every pair of candidate names are found with one
+vectorized binary search, and only the matched rows are scored, with NumPy.
+
+Each worker builds the index on its first people search. Saving or
+deleting a PersonRecord, or running load_people_records, bumps a version
+counter in CACHES['default']; workers check it at most every
+PEOPLE_INDEX_SYNC_INTERVAL seconds and rebuild in a background thread,
+serving the old index until the new one is ready.
+"""
+import logging
+import random
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import PersonRecord
+
+logger = logging.getLogger(__name__)
+
+PEOPLE_INDEX_VERSION_KEY = 'people_index:version'
+
+# A shared Soundex code lifts a name's score to at least
+# PHONETIC_FLOOR + (1 - PHONETIC_FLOOR) * Dice
+PHONETIC_FLOOR = 0.4
+# Names one typo apart (and at least EDIT_MIN_LENGTH long) score at least this
+EDIT_SCORE = 0.85
+EDIT_MIN_LENGTH = 3
+# Only the exact name scores 1
+NEAR_MATCH_CAP = 0.95
+MIN_NAME_SCORE = 0.6
+MAX_NAME_CANDIDATES = 32
+
+# Lowest trigram similarity that can still reach MIN_NAME_SCORE with a
+# phonetic match
+_MIN_DICE = (MIN_NAME_SCORE - PHONETIC_FLOOR) / (1.0 - PHONETIC_FLOOR)
+
+LAST_NAME_WEIGHT = 0.5
+FIRST_NAME_WEIGHT = 0.4
+STATE_WEIGHT = 0.05
+CITY_WEIGHT = 0.05
+
+# Query names whose candidates each vocabulary remembers
+NAME_CACHE_SIZE = 4096
+
+US_STATES = {
+    'alabama': 'AL', 'alaska': 'AK', 'arizona': 'AZ', 'arkansas': 'AR', 'california': 'CA',
+    'colorado': 'CO', 'connecticut': 'CT', 'delaware': 'DE', 'district of columbia': 'DC',
+    'florida': 'FL', 'georgia': 'GA', 'hawaii': 'HI', 'idaho': 'ID', 'illinois': 'IL',
+    'indiana': 'IN', 'iowa': 'IA', 'kansas': 'KS', 'kentucky': 'KY', 'louisiana': 'LA',
+    'maine': 'ME', 'maryland': 'MD', 'massachusetts': 'MA', 'michigan': 'MI', 'minnesota': 'MN',
+    'mississippi': 'MS', 'missouri': 'MO', 'montana': 'MT', 'nebraska': 'NE', 'nevada': 'NV',
+    'new hampshire': 'NH', 'new jersey': 'NJ', 'new mexico': 'NM', 'new york': 'NY',
+    'north carolina': 'NC', 'north dakota': 'ND', 'ohio': 'OH', 'oklahoma': 'OK', 'oregon': 'OR',
+    'pennsylvania': 'PA', 'rhode island': 'RI', 'south carolina': 'SC', 'south dakota': 'SD',
+    'tennessee': 'TN', 'texas': 'TX', 'utah': 'UT', 'vermont': 'VT', 'virginia': 'VA',
+    'washington': 'WA', 'west virginia': 'WV', 'wisconsin': 'WI', 'wyoming': 'WY',
+    'puerto rico': 'PR',
+}
+
+_APOSTROPHES = re.compile(r"['’`]")
+_NON_LETTERS = re.compile(r'[^a-z]+')
+
+# Soundex digits; vowels (0) separate repeated codes, h and w don't
+_SOUNDEX_CODES = {
+    letter: str(code)
+    for code, letters in enumerate(('aeiouyhw', 'bfpv', 'cgjkqsxz', 'dt', 'l', 'mn', 'r'))
+    for letter in letters
+}
+
+
+def normalize_name(value: Optional[str]) -> str:
+    """Lowercase ASCII words: "José  O'Brien-Smith" -> 'jose obrien smith'"""
+    decomposed = unicodedata.normalize('NFKD', value or '')
+    text = ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+    return ' '.join(_NON_LETTERS.sub(' ', _APOSTROPHES.sub('', text)).split())
+
+
+def name_key(value: Optional[str]) -> str:
+    """Vocabulary key of a name: normalized with the spaces dropped ('De la Cruz' -> 'delacruz')"""
+    return normalize_name(value).replace(' ', '')
+
+
+def state_key(value: Optional[str]) -> str:
+    """Two-letter code for a state code or name ('Texas' -> 'TX'); other values normalized"""
+    normalized = normalize_name(value)
+    if len(normalized) == 2:
+        return normalized.upper()
+    return US_STATES.get(normalized, normalized)
+
+
+def soundex(value: Optional[str]) -> str:
+    """American Soundex code of a name ('Robert' -> 'R163'), '' if it has no letters"""
+    key = name_key(value)
+    if not key:
+        return ''
+    digits = []
+    previous = _SOUNDEX_CODES[key[0]]
+    for letter in key[1:]:
+        code = _SOUNDEX_CODES[letter]
+        if code == '0':
+            if letter not in 'hw':
+                previous = '0'
+            continue
+        if code != previous:
+            digits.append(code)
+        previous = code
+    return (key[0].upper() + ''.join(digits) + '000')[:4]
+
+
+def deletions(key: str) -> set:
+    """key and every way of dropping one letter from it"""
+    return {key} | {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+def trigrams(key: str) -> set:
+    """Character trigrams of a name key, padded as pg_trgm does ('  j', ' jo', 'jon', 'on ')"""
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Vocabulary:
+    """Distinct name keys with trigram, Soundex and one-typo postings"""
+
+    def __init__(self, keys: List[str]):
+        self.keys = keys
+        self.ids = {key: name_id for name_id, key in enumerate(keys)}
+        gram_counts = np.zeros(len(keys), dtype=np.int16)
+        postings: Dict[str, List[int]] = {}
+        codes: Dict[str, List[int]] = {}
+        variants, owners = array('q'), array('i')
+        for name_id, key in enumerate(keys):
+            grams = trigrams(key) if key else ()
+            gram_counts[name_id] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(name_id)
+            codes.setdefault(soundex(key), []).append(name_id)
+            if len(key) >= EDIT_MIN_LENGTH:
+                for variant in deletions(key):
+                    variants.append(hash(variant))
+                    owners.append(name_id)
+        self.gram_counts = gram_counts
+        self.postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.codes = {code: np.asarray(ids, dtype=np.int32) for code, ids in codes.items() if code}
+        # Two names are at most one insertion, deletion, substitution or swap
+        # apart when they share a single-deletion variant (symmetric delete);
+        # the variants are kept as sorted hashes rather than strings
+        variants = np.frombuffer(variants, dtype=np.int64)
+        order = np.argsort(variants, kind='stable')
+        self.variant_hashes = variants[order]
+        self.variant_owners = np.frombuffer(owners, dtype=np.int32)[order]
+        self._cache: 'OrderedDict[str, Tuple[np.ndarray, np.ndarray]]' = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def similar(self, key: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Names resembling a name key.
+
+        Returns:
+            (name ids in ascending order, their scores in [0, 1])
+        """
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        grams = trigrams(key)
+        lists = [self.postings[gram] for gram in grams if gram in self.postings]
+        if lists:
+            postings = np.concatenate(lists)
+            if len(postings) * 8 > len(self.keys):
+                # Common trigrams: counting over the whole vocabulary beats sorting
+                shared = np.bincount(postings, minlength=len(self.keys))
+                scores = 2.0 * shared / (len(grams) + self.gram_counts)
+                ids = np.flatnonzero(scores >= _MIN_DICE).astype(np.int32)
+                scores = scores[ids]
+            else:
+                ids, shared = np.unique(postings, return_counts=True)
+                scores = 2.0 * shared / (len(grams) + self.gram_counts[ids])
+                keep = scores >= _MIN_DICE
+                ids, scores = ids[keep], scores[keep]
+        else:
+            ids, scores = np.zeros(0, dtype=np.int32), np.zeros(0)
+
+        phonetic = self.codes.get(soundex(key))
+        if phonetic is not None and len(ids):
+            # Both are sorted, so membership is one binary search. Names that
+            # only sound alike would score PHONETIC_FLOOR, under MIN_NAME_SCORE,
+            # so they needn't be added.
+            found = phonetic[np.searchsorted(phonetic, ids).clip(max=len(phonetic) - 1)] == ids
+            scores = np.where(found, PHONETIC_FLOOR + (1.0 - PHONETIC_FLOOR) * scores, scores)
+
+        if len(key) >= EDIT_MIN_LENGTH:
+            hashes = np.fromiter((hash(variant) for variant in deletions(key)), dtype=np.int64)
+            found = _ranges(np.searchsorted(self.variant_hashes, hashes, 'left'),
+                            np.searchsorted(self.variant_hashes, hashes, 'right'))
+            if len(found):
+                ids = np.concatenate([ids, self.variant_owners[found]])
+                scores = np.concatenate([scores, np.full(len(found), EDIT_SCORE)])
+                # Keep the best score per name, in id order
+                order = np.lexsort((-scores, ids))
+                ids, scores = ids[order], scores[order]
+                first = np.ones(len(ids), dtype=bool)
+                first[1:] = ids[1:] != ids[:-1]
+                ids, scores = ids[first], scores[first]
+
+        # Different names can share every trigram ('anan', 'ananan')
+        scores = np.minimum(scores, NEAR_MATCH_CAP)
+        exact = self.ids.get(key)
+        if exact is not None:
+            scores[np.searchsorted(ids, exact)] = 1.0
+
+        keep = scores >= MIN_NAME_SCORE
+        ids, scores = ids[keep], scores[keep]
+        if len(ids) > MAX_NAME_CANDIDATES:
+            best = np.sort(np.argpartition(-scores, MAX_NAME_CANDIDATES - 1)[:MAX_NAME_CANDIDATES])
+            ids, scores = ids[best], scores[best]
+
+        result = (ids.astype(np.int32), scores)
+        with self._cache_lock:
+            self._cache[key] = result
+            if len(self._cache) > NAME_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
+
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenation of arange(start, end) for each pair, without a Python loop"""
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if not total:
+        return np.zeros(0, dtype=np.int64)
+    shift = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return shift + np.arange(total)
+
+
+class PersonMatch(NamedTuple):
+    record_id: int
+    score: float
+
+
+class PeopleIndex:
+    """Immutable in-memory index of (id, first name, last name, city, state) rows"""
+
+    def __init__(self, ids: np.ndarray, first: np.ndarray, last: np.ndarray,
+                 city: np.ndarray, state: np.ndarray, first_names: List[str],
+                 last_names: List[str], cities: Dict[str, int], states: Dict[str, int]):
+        # Rows sorted by name = last id * first name count + first id, so each
+        # last name is one slice and each (last, first) pair one run in it
+        self.name_stride = max(len(first_names), 1)
+        name = last.astype(np.int64) * self.name_stride + first
+        order = np.argsort(name, kind='stable')
+        self.ids = ids[order]
+        self.name = name[order]
+        self.city = city[order]
+        self.state = state[order]
+        self.first_names = _Vocabulary(first_names)
+        self.last_names = _Vocabulary(last_names)
+        self.cities = cities
+        self.states = states
+        self.last_offsets = np.searchsorted(self.name, np.arange(len(last_names) + 1) * self.name_stride)
+        sorted_first = first[order]
+        self.by_first = np.argsort(sorted_first, kind='stable').astype(np.int32)
+        self.first_offsets = np.searchsorted(sorted_first[self.by_first], np.arange(len(first_names) + 1))
+
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[int, str, str, str, str]]) -> 'PeopleIndex':
+        """Build from (id, first name, last name, city, state) tuples"""
+        columns = [(name_key, {}, {}), (name_key, {}, {}), (normalize_name, {}, {}), (state_key, {}, {})]
+        ids = array('q')
+        values = [array('i') for _ in columns]
+        for record_id, *fields in rows:
+            ids.append(record_id)
+            for value, column, (normalize, raw_ids, key_ids) in zip(fields, values, columns):
+                # Raw values repeat far more than they differ, so each is
+                # normalized once
+                value_id = raw_ids.get(value)
+                if value_id is None:
+                    value_id = raw_ids[value] = key_ids.setdefault(normalize(value), len(key_ids))
+                column.append(value_id)
+        first, last, city, state = (np.frombuffer(column, dtype=np.int32) for column in values)
+        return cls(
+            np.frombuffer(ids, dtype=np.int64), first, last, city, state.astype(np.int16),
+            list(columns[0][2]), list(columns[1][2]), columns[2][2], columns[3][2],
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _pair_rows(self, last_ids, last_scores, first_ids, first_scores):
+        """Rows matching a candidate last name and a candidate first name"""
+        # Every candidate pair, as sorted name values, found in one binary search
+        names = (last_ids.astype(np.int64)[:, None] * self.name_stride + first_ids[None, :]).ravel()
+        starts = np.searchsorted(self.name, names, 'left')
+        ends = np.searchsorted(self.name, names, 'right')
+        scores = (LAST_NAME_WEIGHT * last_scores[:, None] + FIRST_NAME_WEIGHT * first_scores[None, :]).ravel()
+        hit = ends > starts
+        starts, ends = starts[hit], ends[hit]
+        return _ranges(starts, ends), np.repeat(scores[hit], ends - starts)
+
+    def search(self, first_name: str = '', last_name: str = '', city: str = '', state: str = '',
+               limit: int = 10) -> Tuple[List[PersonMatch], int]:
+        """
+        Rank the records resembling a name, favouring ones in city/state.
+
+        When both names are given a record must resemble both.
+
+        Args:
+            first_name: First name as typed
+            last_name: Last name as typed
+            city: Optional city, boosts records there
+            state: Optional state code or name, boosts records there
+            limit: Matches to return
+
+        Returns:
+            (best matches, highest score first; number of records matched)
+        """
+        first_key, last_key = name_key(first_name), name_key(last_name)
+        if not first_key and not last_key:
+            return [], 0
+
+        if first_key and last_key:
+            last_ids, last_scores = self.last_names.similar(last_key)
+            first_ids, first_scores = self.first_names.similar(first_key)
+            rows, scores = self._pair_rows(last_ids, last_scores, first_ids, first_scores)
+            weight = LAST_NAME_WEIGHT + FIRST_NAME_WEIGHT
+        elif last_key:
+            last_ids, last_scores = self.last_names.similar(last_key)
+            starts, ends = self.last_offsets[last_ids], self.last_offsets[last_ids + 1]
+            rows = _ranges(starts, ends)
+            scores = np.repeat(last_scores, ends - starts)
+            weight = 1.0
+        else:
+            first_ids, first_scores = self.first_names.similar(first_key)
+            starts, ends = self.first_offsets[first_ids], self.first_offsets[first_ids + 1]
+            rows = self.by_first[_ranges(starts, ends)]
+            scores = np.repeat(first_scores, ends - starts)
+            weight = 1.0
+
+        if not len(rows):
+            return [], 0
+        if state:
+            state_id = self.states.get(state_key(state), -1)
+            scores = scores + STATE_WEIGHT * (self.state[rows] == state_id)
+            weight += STATE_WEIGHT
+        if city:
+            city_id = self.cities.get(normalize_name(city), -1)
+            scores = scores + CITY_WEIGHT * (self.city[rows] == city_id)
+            weight += CITY_WEIGHT
+        scores = scores / weight
+
+        count = min(limit, len(rows))
+        best = np.argpartition(-scores, count - 1)[:count] if count < len(rows) else np.arange(len(rows))
+        ids = self.ids[rows[best]]
+        # Highest score first, then lowest id, so equal scores keep a stable order
+        ranked = np.lexsort((ids, -scores[best]))
+        matches = [
+            PersonMatch(record_id, round(score, 4))
+            for record_id, score in zip(ids[ranked].tolist(), scores[best][ranked].tolist())
+        ]
+        return matches, len(rows)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'records': len(self),
+            'first_names': len(self.first_names),
+            'last_names': len(self.last_names),
+            'record_bytes': sum(column.nbytes for column in (
+                self.ids, self.name, self.city, self.state, self.by_first)),
+        }
+
+
+def bump_version():
+    """Tell every worker to rebuild its people index"""
+    cache = caches['default']
+    try:
+        try:
+            cache.incr(PEOPLE_INDEX_VERSION_KEY)
+        except ValueError:
+            if not cache.add(PEOPLE_INDEX_VERSION_KEY, 1, None):
+                cache.incr(PEOPLE_INDEX_VERSION_KEY)
+    except Exception as e:
+        logger.error(f"Failed to bump {PEOPLE_INDEX_VERSION_KEY}: {e}")
+
+
+# Never equal to a cached version, so a failed load is retried
+_RETRY = object()
+
+
+class SharedPeopleIndex:
+    """Per-process PeopleIndex over PersonRecord, rebuilt when the version moves"""
+
+    def __init__(self, sync_interval: float = 30.0, cache_alias: str = 'default'):
+        self.sync_interval = sync_interval
+        self.cache_alias = cache_alias
+        self._index: Optional[PeopleIndex] = None
+        self._version = None
+        self._next_sync = 0.0
+        self._load_lock = threading.Lock()
+        self._reloading = False
+
+        self.loads = 0
+        self.last_load_seconds = 0.0
+
+    def _cached_version(self):
+        try:
+            return caches[self.cache_alias].get(PEOPLE_INDEX_VERSION_KEY)
+        except Exception as e:
+            logger.error(f"People index version check failed: {e}")
+            return self._version
+
+    def get(self) -> PeopleIndex:
+        """The current index, building it on first use"""
+        index = self._index
+        if index is None:
+            with self._load_lock:
+                if self._index is None:
+                    self._load(self._cached_version())
+            return self._index
+
+        now = time.monotonic()
+        if now >= self._next_sync and not self._reloading:
+            self._next_sync = now + self.sync_interval
+            version = self._cached_version()
+            if version != self._version or self._version is _RETRY:
+                self._reloading = True
+                threading.Thread(target=self._reload, args=(version,),
+                                 name='people-index', daemon=True).start()
+        return index
+
+    def _reload(self, version):
+        try:
+            with self._load_lock:
+                self._load(version)
+        finally:
+            self._reloading = False
+            close_old_connections()
+
+    def _load(self, version):
+        started = time.perf_counter()
+        try:
+            rows = (PersonRecord.objects.order_by()
+                    .values_list('id', 'first_name', 'last_name', 'city', 'state')
+                    .iterator(chunk_size=10000))
+            index = PeopleIndex.build(rows)
+        except DatabaseError as e:
+            logger.error(f"Failed to load person records: {e}")
+            if self._index is None:
+                self._index = PeopleIndex.build([])
+            self._version = _RETRY
+            self._next_sync = time.monotonic() + self.sync_interval
+            return
+
+        self._index = index
+        self._version = version
+        self._next_sync = time.monotonic() + self.sync_interval
+        self.loads += 1
+        self.last_load_seconds = time.perf_counter() - started
+        logger.info(f"People index loaded: {len(index)} records in {self.last_load_seconds:.1f}s")
+
+    def stats(self) -> Dict[str, object]:
+        stats = self._index.stats() if self._index is not None else {'records': None}
+        stats.update(loads=self.loads, last_load_seconds=round(self.last_load_seconds, 3))
+        return stats
+
+
+people_index = SharedPeopleIndex(sync_interval=getattr(settings, 'PEOPLE_INDEX_SYNC_INTERVAL', 30))
+
+
+@receiver(post_save, sender=PersonRecord)
+@receiver(post_delete, sender=PersonRecord)
+def _person_record_changed(sender, instance, **kwargs):
+    transaction.on_commit(bump_version)
+
+
+# Synthetic data for load_people_records --synthetic and benchmark_people_search
+
+_SYLLABLES = ('an', 'ar', 'be', 'bo', 'ca', 'da', 'de', 'el', 'en', 'er', 'fa', 'ga', 'ha', 'in',
+              'ja', 'ka', 'la', 'le', 'li', 'lo', 'ma', 'mi', 'mo', 'na', 'ne', 'ni', 'no', 'or',
+              'pa', 'ra', 're', 'ri', 'ro', 'sa', 'se', 'ta', 'te', 'th', 'to', 'va', 'wa',
+              'son', 'ton', 'man', 'ley', 'ez', 'sky', 'berg', 'well', 'ford')
+_STREET_SUFFIXES = ('St', 'Ave', 'Rd', 'Blvd', 'Dr', 'Ln', 'Ct', 'Way')
+
+
+def _synthetic_names(rng: random.Random, count: int, syllables: Tuple[int, int]) -> List[str]:
+    names = set()
+    while len(names) < count:
+        parts = rng.randint(*syllables)
+        names.add(''.join(rng.choice(_SYLLABLES) for _ in range(parts)).capitalize())
+    return sorted(names)
+
+
+def synthetic_people(count: int, seed: int = 1) -> Iterator[Dict[str, object]]:
+    """
+    Generate realistic-looking person records.
+
+    Names and cities are drawn with Zipf-like frequencies, so a few are
+    very common and most are rare, as in real population data.
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    last_names = _synthetic_names(rng, max(100, min(count // 8, 200000)), (2, 4))
+    first_names = _synthetic_names(rng, max(50, min(count // 100, 8000)), (1, 3))
+    cities = _synthetic_names(rng, max(20, min(count // 500, 5000)), (2, 3))
+    states = sorted(set(US_STATES.values()))
+    streets = _synthetic_names(rng, 500, (1, 3))
+
+    def draw(size, vocabulary):
+        weights = 1.0 / np.arange(1, len(vocabulary) + 1) ** 1.05
+        return np_rng.choice(len(vocabulary), size=size, p=weights / weights.sum())
+
+    block = 10000
+    for start in range(0, count, block):
+        size = min(block, count - start)
+        for first, last, city, state, street, age, number in zip(
+                draw(size, first_names).tolist(), draw(size, last_names).tolist(),
+                draw(size, cities).tolist(), np_rng.integers(0, len(states), size).tolist(),
+                np_rng.integers(0, len(streets), size).tolist(), np_rng.integers(18, 90, size).tolist(),
+                np_rng.integers(0, 10 ** 7, size).tolist()):
+            yield {
+                'first_name': first_names[first],
+                'last_name': last_names[last],
+                'age': age,
+                'street': f"{number % 9000 + 100} {streets[street]} {_STREET_SUFFIXES[number % len(_STREET_SUFFIXES)]}",
+                'city': cities[city],
+                'state': states[state],
+                'zip_code': f"{number % 90000 + 10000:05d}",
+                'phone_number': f"+1{200 + number % 800}{200 + number // 10000 % 800}{number % 10000:04d}",
+            }
@@ -0,0 +1,42 @@
+"""
+Pluggable data providers for the search endpoints.
+
+A Provider fetches data for one or more search kinds and maps it to result
+fields with per-field confidence. The registry holds the providers named in
+LOOKUP_PROVIDERS (plus the always-present local provider), and the pipeline
+queries them concurrently, hedges slow requests and merges the results.
+"""
+import threading
+
+from django.conf import settings
+
+from .base import (
+    ADDRESS,
+    BACKGROUND,
+    PEOPLE,
+    PHONE,
+    SEARCH_KINDS,
+    Provider,
+    ProviderError,
+    ProviderResult,
+)
+from .pipeline import LookupPipeline, PipelineResult, merge_results
+from .registry import PROVIDER_FACTORIES, ProviderRegistry, build_registry, get_registry
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline() -> LookupPipeline:
+    """The process-wide pipeline over get_registry()"""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = LookupPipeline(
+                    get_registry(),
+                    timeout=getattr(settings, 'PROVIDER_TIMEOUT', 5.0),
+                    max_workers=getattr(settings, 'PROVIDER_MAX_WORKERS', 32),
+                    hedging=getattr(settings, 'PROVIDER_HEDGING', True),
+                )
+    return _pipeline
@@ -0,0 +1,131 @@
+"""
+Common interface for lookup data providers.
+"""
+import logging
+from typing import Any, Callable, Dict, FrozenSet, Optional
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from ..resilience import AdaptiveTimeout
+
+logger = logging.getLogger(__name__)
+
+PHONE = 'phone'
+PEOPLE = 'people'
+ADDRESS = 'address'
+BACKGROUND = 'background'
+SEARCH_KINDS = frozenset({PHONE, PEOPLE, ADDRESS, BACKGROUND})
+
+
+class ProviderError(Exception):
+    """Raised by a provider that couldn't produce a result"""
+
+
+async def run_in_thread(func: Callable[..., Any], *args) -> Any:
+    """
+    Run blocking func(*args) on one of asgiref's shared executor threads.
+
+    Calls run concurrently rather than queueing on the single thread that
+    thread_sensitive=True would use. Those threads never finish a request,
+    so database connections func opened are released here the way Django
+    releases them at the end of one.
+    """
+    def call():
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+
+    return await sync_to_async(call, thread_sensitive=False)()
+
+
+class Provider:
+    """
+    A source of search data.
+
+    Subclasses set ``name`` and ``kinds`` and implement fetch() (talk to the
+    source) and map() (turn its response into result fields). Each field
+    gets a confidence in [0, 1] from ``field_confidence``, falling back to
+    ``default_confidence``; the pipeline uses it to pick between providers
+    that disagree.
+
+    Providers marked ``inline`` are cheap local computations the pipeline
+    runs on the calling thread; the rest run on its executor and, when
+    ``hedge`` is set, get a second concurrent request if the first is
+    slower than the provider's recent p95 latency. Inline lookups for the
+    kinds in ``blocking_kinds`` touch the database, so async callers run
+    those in a worker thread.
+    """
+
+    name = 'provider'
+    kinds: FrozenSet[str] = frozenset()
+    field_confidence: Dict[str, float] = {}
+    default_confidence = 0.5
+    inline = False
+    blocking_kinds: FrozenSet[str] = frozenset()
+    hedge = True
+
+    def __init__(self, hedge_min_delay: float = 0.05, hedge_max_delay: float = 5.0):
+        # p95 of recent latencies, used as the delay before hedging
+        self.latency = AdaptiveTimeout(
+            minimum=hedge_min_delay, maximum=hedge_max_delay,
+            percentile=0.95, multiplier=1.0,
+        )
+
+    def available(self) -> bool:
+        """Whether the provider is configured and should be queried"""
+        return True
+
+    def supports(self, kind: str) -> bool:
+        return kind in self.kinds
+
+    def confidence(self, field_name: str) -> float:
+        return self.field_confidence.get(field_name, self.default_confidence)
+
+    def fetch(self, kind: str, query: Dict[str, Any]) -> Any:
+        raise NotImplementedError
+
+    async def afetch(self, kind: str, query: Dict[str, Any]) -> Any:
+        """Async fetch(); defaults to running fetch() in a worker thread"""
+        return await run_in_thread(self.fetch, kind, query)
+
+    def map(self, kind: str, raw: Any, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn a fetch() response into result fields (default: raw is already a dict)"""
+        return dict(raw or {})
+
+    def lookup(self, kind: str, query: Dict[str, Any]) -> Dict[str, Any]:
+        return self.map(kind, self.fetch(kind, query), query)
+
+    async def alookup(self, kind: str, query: Dict[str, Any]) -> Dict[str, Any]:
+        return self.map(kind, await self.afetch(kind, query), query)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name}>"
+
+
+class ProviderResult:
+    """Outcome of one provider's part in a pipeline run"""
+
+    __slots__ = ('provider', 'fields', 'latency', 'hedged', 'error')
+
+    def __init__(self, provider: str, fields: Optional[Dict[str, Any]] = None,
+                 latency: float = 0.0, hedged: bool = False, error: Optional[str] = None):
+        self.provider = provider
+        self.fields = fields or {}
+        self.latency = latency
+        self.hedged = hedged
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'provider': self.provider,
+            'ok': self.ok,
+            'latency_ms': round(self.latency * 1000, 1),
+            'hedged': self.hedged,
+            'error': self.error,
+        }
@@ -0,0 +1,49 @@
+"""
+Provider backed by the data this service computes itself.
+"""
+from typing import Any, Dict
+
+from .base import ADDRESS, BACKGROUND, PEOPLE, PHONE, SEARCH_KINDS, Provider
+
+
+class LocalProvider(Provider):
+    """
+    phonenumbers metadata and the NPA-NXX table for phones, and the built-in
+    sample records for the other searches.
+
+    It always takes part so every result has its full set of fields, but
+    with low confidence, so any external provider that returns a field wins.
+    """
+
+    name = 'local'
+    kinds = SEARCH_KINDS
+    inline = True
+    # People and address results come from PersonRecord and PropertyRecord
+    blocking_kinds = frozenset({PEOPLE, ADDRESS})
+    hedge = False
+    field_confidence = {
+        'location': 0.6,
+        'line_type': 0.5,
+        'carrier': 0.3,
+    }
+    default_confidence = 0.2
+
+    def fetch(self, kind: str, query: Dict[str, Any]) -> Dict[str, Any]:
+        # Imported here: lookup.search itself builds on the provider pipeline
+        from .. import search
+
+        if kind == PHONE:
+            return search.build_phone_result(query['parsed'])
+        if kind == PEOPLE:
+            return search.build_people_result(
+                query['first_name'], query['last_name'], query['city'], query['state']
+            )
+        if kind == ADDRESS:
+            return search.build_address_result(
+                query['street'], query['city'], query['state'], query['zip_code']
+            )
+        if kind == BACKGROUND:
+            return search.build_background_check_result(
+                query['first_name'], query['last_name'], query['city'], query['state']
+            )
+        raise ValueError(f"Unsupported search kind: {kind}")
@@ -0,0 +1,42 @@
+"""
+NumVerify phone validation as a lookup provider.
+"""
+from typing import Any, Dict
+
+from django.conf import settings
+
+from ..utils import aquery_numverify_api, map_numverify_response, query_numverify_api
+from .base import PHONE, Provider
+
+MAPPED_FIELDS = ('location', 'carrier', 'line_type')
+
+
+class NumVerifyProvider(Provider):
+    """Carrier, line type and location from NumVerify (NUMVERIFY_ENABLED)"""
+
+    name = 'numverify'
+    kinds = frozenset({PHONE})
+    field_confidence = {
+        'carrier': 0.9,
+        'line_type': 0.9,
+        'location': 0.7,
+    }
+
+    def available(self) -> bool:
+        return bool(getattr(settings, 'NUMVERIFY_ENABLED', False) and settings.NUMVERIFY_API_KEY)
+
+    def fetch(self, kind: str, query: Dict[str, Any]) -> Dict[str, Any]:
+        return query_numverify_api(query['number'], settings.NUMVERIFY_API_KEY)
+
+    async def afetch(self, kind: str, query: Dict[str, Any]) -> Dict[str, Any]:
+        return await aquery_numverify_api(query['number'], settings.NUMVERIFY_API_KEY)
+
+    def map(self, kind: str, raw: Any, query: Dict[str, Any]) -> Dict[str, Any]:
+        mapped = map_numverify_response(raw, query['number'])
+        if not mapped.get('valid'):
+            # phonenumbers has already validated the number; add nothing
+            return {}
+        fields = {name: mapped[name] for name in MAPPED_FIELDS if mapped.get(name)}
+        if fields.get('line_type') == 'unknown':
+            del fields['line_type']
+        return fields
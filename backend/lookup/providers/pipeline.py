@@ -0,0 +1,323 @@
+"""
+Concurrent multi-provider lookups.
+
+LookupPipeline.run() sends a query to every provider that supports the
+search at once, runs inline (local) providers on the calling thread while
+the others are in flight, and merges whatever came back within the
+deadline. A provider still outstanding after its recent p95 latency gets a
+second, hedged request and the first response of the two is used, which
+cuts the tail caused by one slow upstream call.
+
+Results are merged field by field. Providers that return the same value
+for a field pool their confidence (noisy-OR: 1 - prod(1 - c)); the value
+with the highest combined confidence wins, ties going to the provider
+registered first.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+from .base import Provider, ProviderResult, run_in_thread
+from .registry import ProviderRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineResult:
+    """Merged fields plus where each came from and how sure we are of it"""
+
+    __slots__ = ('fields', 'sources', 'confidence', 'providers')
+
+    def __init__(self, fields: Dict[str, Any], sources: Dict[str, str],
+                 confidence: Dict[str, float], providers: List[ProviderResult]):
+        self.fields = fields
+        self.sources = sources
+        self.confidence = confidence
+        self.providers = providers
+
+
+def _value_key(value: Any) -> str:
+    # Lists and dicts aren't hashable; compare them by their JSON form
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def merge_results(results: List[Tuple[Provider, ProviderResult]]) -> PipelineResult:
+    """Merge provider results by field-level confidence"""
+    candidates: Dict[str, Dict[str, list]] = {}
+    for provider, result in results:
+        if not result.ok:
+            continue
+        for name, value in result.fields.items():
+            if value is None or value == '':
+                continue
+            # [probability every supporter is wrong, value, first supporter]
+            entry = candidates.setdefault(name, {}).setdefault(
+                _value_key(value), [1.0, value, provider.name]
+            )
+            entry[0] *= 1.0 - provider.confidence(name)
+
+    fields, sources, confidence = {}, {}, {}
+    for name, options in candidates.items():
+        # min() keeps the first of equal entries, i.e. registry order
+        miss, value, source = min(options.values(), key=lambda entry: entry[0])
+        fields[name] = value
+        sources[name] = source
+        confidence[name] = round(1.0 - miss, 3)
+    return PipelineResult(fields, sources, confidence, [result for _, result in results])
+
+
+def _timed_lookup(provider: Provider, kind: str, query: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
+    started = time.monotonic()
+    fields = provider.lookup(kind, query)
+    return fields, time.monotonic() - started
+
+
+async def _atimed_lookup(provider: Provider, kind: str, query: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
+    started = time.monotonic()
+    fields = await provider.alookup(kind, query)
+    return fields, time.monotonic() - started
+
+
+class _Call:
+    """Book-keeping for one provider during a run"""
+
+    __slots__ = ('provider', 'started', 'pending', 'hedged', 'result')
+
+    def __init__(self, provider: Provider, started: float):
+        self.provider = provider
+        self.started = started
+        self.pending = set()
+        self.hedged = False
+        self.result: Optional[ProviderResult] = None
+
+    def hedge_at(self) -> float:
+        return self.started + self.provider.latency.current()
+
+
+class LookupPipeline:
+    """Fan a query out to providers, hedge slow ones and merge the results"""
+
+    def __init__(self, registry: ProviderRegistry, timeout: float = 5.0,
+                 max_workers: int = 32, hedging: bool = True):
+        self.registry = registry
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.hedging = hedging
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+        self.runs = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def providers_for(self, kind: str) -> List[Provider]:
+        return self.registry.for_kind(kind)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix='lookup-provider'
+                    )
+        return self._executor
+
+    def _should_hedge(self, call: _Call) -> bool:
+        return (self.hedging and call.provider.hedge and not call.hedged
+                and call.result is None)
+
+    def _complete(self, call: _Call, fields: Dict[str, Any], latency: float, hedge: bool):
+        call.provider.latency.record(latency)
+        call.result = ProviderResult(call.provider.name, fields, latency, hedged=call.hedged)
+        if hedge:
+            self.hedge_wins += 1
+
+    def _fail(self, call: _Call, error: BaseException):
+        # Wait for the other attempt if one is still running
+        if call.pending:
+            return
+        self.errors += 1
+        logger.warning(f"Provider {call.provider.name} failed: {error}")
+        call.result = ProviderResult(
+            call.provider.name, latency=time.monotonic() - call.started,
+            hedged=call.hedged, error=str(error) or type(error).__name__,
+        )
+
+    def _time_out(self, calls: List[_Call], now: float):
+        for call in calls:
+            if call.result is None:
+                self.timeouts += 1
+                call.result = ProviderResult(
+                    call.provider.name, latency=now - call.started,
+                    hedged=call.hedged, error='timeout',
+                )
+
+    def _run_inline(self, calls: List[_Call], kind: str, query: Dict[str, Any]):
+        for call in calls:
+            try:
+                fields, latency = _timed_lookup(call.provider, kind, query)
+            except Exception as e:
+                self._fail(call, e)
+            else:
+                self._complete(call, fields, latency, hedge=False)
+
+    def _finish(self, calls: List[_Call]) -> PipelineResult:
+        return merge_results([(call.provider, call.result) for call in calls])
+
+    def run(self, kind: str, query: Dict[str, Any],
+            providers: Optional[List[Provider]] = None) -> PipelineResult:
+        """
+        Query every provider for kind and merge their results.
+
+        Args:
+            kind: Search kind ('phone', 'people', 'address', 'background')
+            query: Search parameters passed to each provider
+            providers: Providers to use (default: all available for kind)
+
+        Returns:
+            PipelineResult with merged fields and per-provider outcomes
+        """
+        self.runs += 1
+        providers = self.providers_for(kind) if providers is None else providers
+        now = time.monotonic()
+        deadline = now + self.timeout
+        calls = [_Call(provider, now) for provider in providers]
+        remote = [call for call in calls if not call.provider.inline]
+
+        attempts = {}
+        if remote:
+            executor = self._get_executor()
+            for call in remote:
+                future = executor.submit(_timed_lookup, call.provider, kind, query)
+                attempts[future] = (call, False)
+                call.pending.add(future)
+
+        # Local data is computed while the remote calls are in flight
+        self._run_inline([call for call in calls if call.provider.inline], kind, query)
+
+        while True:
+            outstanding = [call for call in remote if call.result is None]
+            if not outstanding:
+                break
+            now = time.monotonic()
+            if now >= deadline:
+                self._time_out(outstanding, now)
+                break
+
+            for call in outstanding:
+                if self._should_hedge(call) and now >= call.hedge_at():
+                    self.hedges += 1
+                    call.hedged = True
+                    future = self._get_executor().submit(_timed_lookup, call.provider, kind, query)
+                    attempts[future] = (call, True)
+                    call.pending.add(future)
+
+            wake = deadline
+            for call in outstanding:
+                if self._should_hedge(call):
+                    wake = min(wake, call.hedge_at())
+            pending = [future for call in outstanding for future in call.pending]
+            done, _ = wait(pending, timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                call, hedge = attempts.pop(future)
+                call.pending.discard(future)
+                if call.result is not None:
+                    continue
+                try:
+                    fields, latency = future.result()
+                except Exception as e:
+                    self._fail(call, e)
+                else:
+                    self._complete(call, fields, latency, hedge)
+
+        # Losing and timed-out attempts finish in the background; drop them
+        for future in attempts:
+            future.cancel()
+        return self._finish(calls)
+
+    async def arun(self, kind: str, query: Dict[str, Any],
+                   providers: Optional[List[Provider]] = None) -> PipelineResult:
+        """Async run(): providers are awaited as tasks and losers cancelled"""
+        self.runs += 1
+        providers = self.providers_for(kind) if providers is None else providers
+        now = time.monotonic()
+        deadline = now + self.timeout
+        calls = [_Call(provider, now) for provider in providers]
+        remote = [call for call in calls if not call.provider.inline]
+
+        attempts = {}
+        for call in remote:
+            task = asyncio.ensure_future(_atimed_lookup(call.provider, kind, query))
+            attempts[task] = (call, False)
+            call.pending.add(task)
+
+        inline = [call for call in calls if call.provider.inline]
+        if any(kind in call.provider.blocking_kinds for call in inline):
+            await run_in_thread(self._run_inline, inline, kind, query)
+        else:
+            self._run_inline(inline, kind, query)
+
+        try:
+            while True:
+                outstanding = [call for call in remote if call.result is None]
+                if not outstanding:
+                    break
+                now = time.monotonic()
+                if now >= deadline:
+                    self._time_out(outstanding, now)
+                    break
+
+                for call in outstanding:
+                    if self._should_hedge(call) and now >= call.hedge_at():
+                        self.hedges += 1
+                        call.hedged = True
+                        task = asyncio.ensure_future(_atimed_lookup(call.provider, kind, query))
+                        attempts[task] = (call, True)
+                        call.pending.add(task)
+
+                wake = deadline
+                for call in outstanding:
+                    if self._should_hedge(call):
+                        wake = min(wake, call.hedge_at())
+                pending = [task for call in outstanding for task in call.pending]
+                done, _ = await asyncio.wait(
+                    pending, timeout=max(0.0, wake - now), return_when=asyncio.FIRST_COMPLETED
+                )
+
+                for task in done:
+                    call, hedge = attempts.pop(task)
+                    call.pending.discard(task)
+                    if call.result is not None:
+                        continue
+                    try:
+                        fields, latency = task.result()
+                    except Exception as e:
+                        self._fail(call, e)
+                    else:
+                        self._complete(call, fields, latency, hedge)
+        finally:
+            for task in attempts:
+                if task.done():
+                    # Retrieve it so asyncio doesn't log an unretrieved error
+                    if not task.cancelled():
+                        task.exception()
+                else:
+                    task.cancel()
+        return self._finish(calls)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'providers': self.registry.names(),
+            'runs': self.runs,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+        }
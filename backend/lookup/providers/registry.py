@@ -0,0 +1,100 @@
+"""
+Registry of the providers each search can draw on.
+"""
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from .base import Provider
+
+logger = logging.getLogger(__name__)
+
+
+def _local_provider(**kwargs) -> Provider:
+    from .local import LocalProvider
+    return LocalProvider(**kwargs)
+
+
+def _numverify_provider(**kwargs) -> Provider:
+    from .numverify import NumVerifyProvider
+    return NumVerifyProvider(**kwargs)
+
+
+def _stub_provider(**kwargs) -> Provider:
+    from .stub import StubProvider
+    return StubProvider(**kwargs)
+
+
+# Names accepted in LOOKUP_PROVIDERS
+PROVIDER_FACTORIES = {
+    'local': _local_provider,
+    'numverify': _numverify_provider,
+    'stub': _stub_provider,
+}
+
+
+class ProviderRegistry:
+    """Ordered set of providers; earlier providers win ties when merging"""
+
+    def __init__(self, providers: Optional[List[Provider]] = None):
+        self._providers: Dict[str, Provider] = {}
+        for provider in providers or []:
+            self.register(provider)
+
+    def register(self, provider: Provider):
+        if provider.name in self._providers:
+            raise ValueError(f"Provider {provider.name} is already registered")
+        self._providers[provider.name] = provider
+
+    def unregister(self, name: str):
+        self._providers.pop(name, None)
+
+    def get(self, name: str) -> Provider:
+        return self._providers[name]
+
+    def names(self) -> List[str]:
+        return list(self._providers)
+
+    def for_kind(self, kind: str) -> List[Provider]:
+        """Available providers supporting a search kind, in registration order"""
+        return [p for p in self._providers.values() if p.supports(kind) and p.available()]
+
+
+def build_registry(names: List[str]) -> ProviderRegistry:
+    """
+    Build a registry from provider names.
+
+    The local provider is always registered first: it supplies the fields
+    external providers don't, and is what's left when they all fail.
+    """
+    hedge_kwargs = {
+        'hedge_min_delay': getattr(settings, 'PROVIDER_HEDGE_MIN_DELAY', 0.05),
+        'hedge_max_delay': getattr(settings, 'PROVIDER_TIMEOUT', 5.0),
+    }
+    registry = ProviderRegistry([_local_provider(**hedge_kwargs)])
+    for name in names:
+        name = name.strip()
+        if not name or name == 'local':
+            continue
+        factory = PROVIDER_FACTORIES.get(name)
+        if factory is None:
+            logger.error(f"Unknown lookup provider {name!r} in LOOKUP_PROVIDERS, skipping")
+            continue
+        registry.register(factory(**hedge_kwargs))
+    return registry
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ProviderRegistry:
+    """The process-wide registry built from LOOKUP_PROVIDERS"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = build_registry(getattr(settings, 'LOOKUP_PROVIDERS', ['numverify']))
+    return _registry
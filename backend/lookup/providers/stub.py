@@ -0,0 +1,72 @@
+"""
+Configurable fake provider for tests and benchmarks.
+"""
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from .base import PHONE, SEARCH_KINDS, Provider, ProviderError
+
+DEFAULT_FIELDS = {
+    PHONE: {'carrier': 'Stub Wireless', 'line_type': 'mobile'},
+}
+
+
+class StubProvider(Provider):
+    """
+    Returns fixed fields after a simulated network delay, without any I/O.
+
+    Each call sleeps ``latency`` +/- ``jitter`` seconds, or ``tail_latency``
+    with probability ``tail_probability``, and fails with probability
+    ``failure_rate``. Pass ``seed`` for a reproducible sequence.
+    """
+
+    def __init__(self, name: str = 'stub', kinds: Iterable[str] = SEARCH_KINDS,
+                 latency: float = 0.02, jitter: float = 0.005,
+                 tail_probability: float = 0.0, tail_latency: float = 0.5,
+                 failure_rate: float = 0.0, fields: Optional[Dict[str, Dict[str, Any]]] = None,
+                 field_confidence: Optional[Dict[str, float]] = None,
+                 default_confidence: float = 0.5, seed: Optional[int] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+        self.kinds = frozenset(kinds)
+        self.latency_mean = latency
+        self.jitter = jitter
+        self.tail_probability = tail_probability
+        self.tail_latency = tail_latency
+        self.failure_rate = failure_rate
+        self.fields = DEFAULT_FIELDS if fields is None else fields
+        self.field_confidence = field_confidence or {}
+        self.default_confidence = default_confidence
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.calls = 0
+
+    def _draw(self):
+        with self._random_lock:
+            self.calls += 1
+            if self._random.random() < self.tail_probability:
+                delay = self.tail_latency
+            else:
+                delay = max(0.0, self._random.uniform(
+                    self.latency_mean - self.jitter, self.latency_mean + self.jitter
+                ))
+            fail = self._random.random() < self.failure_rate
+        return delay, fail
+
+    def _respond(self, kind: str, fail: bool) -> Dict[str, Any]:
+        if fail:
+            raise ProviderError(f"{self.name}: simulated failure")
+        return dict(self.fields.get(kind, {}))
+
+    def fetch(self, kind: str, query: Dict[str, Any]) -> Dict[str, Any]:
+        delay, fail = self._draw()
+        time.sleep(delay)
+        return self._respond(kind, fail)
+
+    async def afetch(self, kind: str, query: Dict[str, Any]) -> Dict[str, Any]:
+        delay, fail = self._draw()
+        await asyncio.sleep(delay)
+        return self._respond(kind, fail)
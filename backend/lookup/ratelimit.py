@@ -0,0 +1,487 @@
+"""
+Per-IP rate limiting on shared cache counters.
+
+SlidingWindowLimiter counts requests per client in fixed windows (an hour,
+a day) held in CACHES['default'] and estimates the sliding-window total as
+
+    previous window count * (share of the sliding window still in it)
+    + current window count
+
+which smooths the burst a plain fixed window allows at its boundary. The
+current window is bumped with cache.incr(), which is atomic in Redis and
+locmem, before the limit is checked, so concurrent requests from one
+client can't all squeeze through on a stale count; a rejected request
+gives its increment back. A check is one get_many() plus one incr() per
+window and never touches the database.
+
+Requests are charged by RateLimitMiddleware, one lookup each. Views marked
+with @rate_limit_exempt are skipped there and charge themselves with
+charge(): the bulk endpoints by the number of numbers they look up, and
+job status polling against its own per-minute poll_rate_limiter, so
+polling neither spends the lookup allowance nor gets a client blocked.
+A bulk request can never cost more than the smallest limit (max_cost), and
+streamed bulk lookups size each chunk to remaining_allowance().
+
+The IPRateLimit table is not read on requests: clients seen since the last
+snapshot are collected in memory, and every RATE_LIMIT_SNAPSHOT_INTERVAL
+seconds a background thread reads their current totals from the cache and
+upserts them in one statement. Clients that were refused and are still at
+a limit are also marked is_blocked until they may retry, which
+lookup.blocklist picks up. The snapshot only ever sets is_blocked: it
+never clears a block or shortens one set in the admin.
+"""
+import atexit
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections
+from django.http import JsonResponse
+
+from .blocklist import bump_version
+from .models import IPRateLimit
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+DAY = 86400
+
+# Clients remembered between snapshots; more are still limited, just not
+# recorded until the next snapshot
+MAX_TRACKED_CLIENTS = 10000
+
+
+class Window(NamedTuple):
+    name: str
+    seconds: int
+    limit: int
+
+
+class RateLimitDecision(NamedTuple):
+    allowed: bool
+    # The most constrained window, used for the X-RateLimit-* headers
+    window: Window
+    remaining: int
+    retry_after: int
+
+
+class SlidingWindowLimiter:
+    """Sliding-window request limits per client, shared through the cache"""
+
+    def __init__(self, windows: List[Window], cache_alias: str = 'default',
+                 prefix: str = 'ratelimit', track_clients: bool = True):
+        self.windows = windows
+        self.cache_alias = cache_alias
+        self.prefix = prefix
+        # Only tracked clients are snapshotted into IPRateLimit (and blocked)
+        self.track_clients = track_clients
+        self._lock = threading.Lock()
+        self._seen = set()
+        self._refused = set()
+
+        self.allowed = 0
+        self.rejected = 0
+        self.errors = 0
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    @property
+    def max_cost(self) -> int:
+        """Largest cost a single request can ever be allowed"""
+        return min(window.limit for window in self.windows)
+
+    def _key(self, window: Window, client: str, index: int) -> str:
+        return f"{self.prefix}:{window.name}:{client}:{index}"
+
+    def _incr(self, key: str, amount: int, timeout: int) -> int:
+        cache = self.cache
+        try:
+            return cache.incr(key, amount)
+        except ValueError:
+            # First hit in this window; add() is atomic, so only one
+            # concurrent request creates the counter
+            if cache.add(key, amount, timeout):
+                return amount
+            return cache.incr(key, amount)
+
+    async def _aincr(self, key: str, amount: int, timeout: int) -> int:
+        cache = self.cache
+        try:
+            return await cache.aincr(key, amount)
+        except ValueError:
+            if await cache.aadd(key, amount, timeout):
+                return amount
+            return await cache.aincr(key, amount)
+
+    def _window_keys(self, client: str, now: float) -> List[str]:
+        """Previous and current counter keys, per window"""
+        keys = []
+        for window in self.windows:
+            index = int(now // window.seconds)
+            keys.append(self._key(window, client, index - 1))
+            keys.append(self._key(window, client, index))
+        return keys
+
+    def _estimates(self, client: str, now: float,
+                   counts: Optional[Dict[str, int]] = None) -> List[Tuple[Window, float, int, int, float]]:
+        """(window, previous count weight, previous, current, elapsed share) per window"""
+        keys = self._window_keys(client, now)
+        if counts is None:
+            counts = self.cache.get_many(keys)
+
+        rows = []
+        for n, window in enumerate(self.windows):
+            elapsed = (now % window.seconds) / window.seconds
+            previous = int(counts.get(keys[2 * n]) or 0)
+            current = int(counts.get(keys[2 * n + 1]) or 0)
+            rows.append((window, previous * (1.0 - elapsed), previous, current, elapsed))
+        return rows
+
+    @staticmethod
+    def _retry_after(window: Window, previous: int, current: int, elapsed: float, cost: int = 1) -> int:
+        """Seconds until a request of cost would fit in the window again"""
+        room = window.limit - cost - current
+        if room >= 0 and previous:
+            # Enough of the previous window has to slide out
+            share = 1.0 - room / previous
+            return max(1, math.ceil((share - elapsed) * window.seconds))
+        # Not before the next window, once enough of this one slides out
+        share = max(0.0, 1.0 - (window.limit - cost) / current) if current else 0.0
+        return max(1, math.ceil((1.0 - elapsed + share) * window.seconds))
+
+    def _decide(self, decision: Optional[RateLimitDecision], window: Window, weighted: float,
+                previous: int, current: int, elapsed: float, cost: int) -> RateLimitDecision:
+        """Fold one window's count (after this request) into the decision so far"""
+        total = weighted + current
+        if total > window.limit:
+            return RateLimitDecision(
+                False, window, 0, self._retry_after(window, previous, current - cost, elapsed, cost),
+            )
+        remaining = max(0, math.floor(window.limit - total))
+        if decision is None or remaining < decision.remaining:
+            return RateLimitDecision(True, window, remaining, 0)
+        return decision
+
+    def _failed_open(self, client: str, error: Exception) -> RateLimitDecision:
+        # Fail open: a cache outage shouldn't take the API down with it
+        with self._lock:
+            self.errors += 1
+        logger.error(f"Rate limit check failed for {client}: {str(error)}")
+        return RateLimitDecision(True, self.windows[0], self.windows[0].limit, 0)
+
+    def _record(self, client: str, decision: RateLimitDecision) -> RateLimitDecision:
+        with self._lock:
+            if decision.allowed:
+                self.allowed += 1
+            else:
+                self.rejected += 1
+            if self.track_clients and len(self._seen) < MAX_TRACKED_CLIENTS:
+                self._seen.add(client)
+                if not decision.allowed:
+                    self._refused.add(client)
+        return decision
+
+    def hit(self, client: str, cost: int = 1, now: Optional[float] = None) -> RateLimitDecision:
+        """
+        Count a request from client and decide whether to serve it.
+
+        Args:
+            client: Client identifier (IP address)
+            cost: Requests this counts as
+            now: Current time (default: time.time())
+
+        Returns:
+            RateLimitDecision; allowed is True when the cache is unavailable
+        """
+        now = time.time() if now is None else now
+        try:
+            counted = []
+            decision = None
+            for window, weighted, previous, _, elapsed in self._estimates(client, now):
+                key = self._key(window, client, int(now // window.seconds))
+                current = self._incr(key, cost, timeout=2 * window.seconds)
+                counted.append(key)
+                decision = self._decide(decision, window, weighted, previous, current, elapsed, cost)
+                if not decision.allowed:
+                    break
+
+            if not decision.allowed:
+                # Rejected requests don't use up the client's allowance
+                for key in counted:
+                    try:
+                        self.cache.decr(key, cost)
+                    except ValueError:
+                        pass
+        except Exception as e:
+            return self._failed_open(client, e)
+        return self._record(client, decision)
+
+    async def ahit(self, client: str, cost: int = 1, now: Optional[float] = None) -> RateLimitDecision:
+        """hit() for async callers, on the async cache API"""
+        now = time.time() if now is None else now
+        try:
+            counts = await self.cache.aget_many(self._window_keys(client, now))
+            counted = []
+            decision = None
+            for window, weighted, previous, _, elapsed in self._estimates(client, now, counts):
+                key = self._key(window, client, int(now // window.seconds))
+                current = await self._aincr(key, cost, timeout=2 * window.seconds)
+                counted.append(key)
+                decision = self._decide(decision, window, weighted, previous, current, elapsed, cost)
+                if not decision.allowed:
+                    break
+
+            if not decision.allowed:
+                for key in counted:
+                    try:
+                        await self.cache.adecr(key, cost)
+                    except ValueError:
+                        pass
+        except Exception as e:
+            return self._failed_open(client, e)
+        return self._record(client, decision)
+
+    def usage(self, clients: List[str], now: Optional[float] = None) -> Dict[str, Dict[str, Tuple[int, int]]]:
+        """
+        Current sliding-window totals for several clients, in one cache read.
+
+        Returns:
+            {client: {window name: (estimated count, retry after seconds)}}
+        """
+        now = time.time() if now is None else now
+        keys = []
+        for client in clients:
+            keys.extend(self._window_keys(client, now))
+        counts = self.cache.get_many(keys)
+
+        usage = {}
+        for client in clients:
+            usage[client] = {}
+            for window, weighted, previous, current, elapsed in self._estimates(client, now, counts):
+                total = int(round(weighted + current))
+                retry_after = (self._retry_after(window, previous, current, elapsed)
+                               if total >= window.limit else 0)
+                usage[client][window.name] = (total, retry_after)
+        return usage
+
+    def remaining(self, client: str, now: Optional[float] = None) -> int:
+        """
+        Lookups client may still make now, without charging for any.
+
+        Returns:
+            The smallest room left in any window; max_cost when the cache is
+            unavailable, as hit() fails open too
+        """
+        now = time.time() if now is None else now
+        try:
+            estimates = self._estimates(client, now)
+        except Exception as e:
+            logger.error(f"Rate limit check failed for {client}: {str(e)}")
+            return self.max_cost
+        return max(0, min(math.floor(window.limit - weighted - current)
+                          for window, weighted, _, current, _ in estimates))
+
+    def take_seen(self) -> Tuple[List[str], Set[str]]:
+        """Clients seen since the last call, and those of them that were refused"""
+        with self._lock:
+            seen, self._seen = self._seen, set()
+            refused, self._refused = self._refused, set()
+        return list(seen), refused
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            'limits': {window.name: window.limit for window in self.windows},
+            'allowed': self.allowed,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'tracked_clients': len(self._seen),
+        }
+
+
+class RateLimitSnapshotter:
+    """Copy limiter totals into IPRateLimit from a background thread"""
+
+    def __init__(self, limiter: SlidingWindowLimiter, interval: float = 60.0, batch_size: int = 500):
+        self.limiter = limiter
+        self.interval = interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+
+        self.snapshots = 0
+        self.rows_written = 0
+        self.failed = 0
+
+    def ensure_started(self):
+        if self.interval <= 0:
+            return
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None:
+            return
+        with self._lock:
+            # A forked worker inherits the object but not the thread
+            if self._pid != pid or self._thread is None:
+                self._pid = pid
+                self._thread = threading.Thread(
+                    target=self._run, name='ratelimit-snapshot', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.snapshot()
+            close_old_connections()
+
+    def snapshot(self) -> int:
+        """Upsert the clients seen since the last snapshot; returns rows written"""
+        clients, refused = self.limiter.take_seen()
+        if not clients:
+            return 0
+
+        now = time.time()
+        stamp = datetime.fromtimestamp(now, dt_timezone.utc)
+        written = 0
+        blocked = False
+        for start in range(0, len(clients), self.batch_size):
+            chunk = clients[start:start + self.batch_size]
+            try:
+                usage = self.limiter.usage(chunk, now)
+                rows = []
+                blocks = []
+                for client in chunk:
+                    hour_count, hour_retry = usage[client].get('hour', (0, 0))
+                    day_count, day_retry = usage[client].get('day', (0, 0))
+                    rows.append(IPRateLimit(ip_address=client, hour_count=hour_count, day_count=day_count))
+                    # Reaching a limit isn't enough; the client has to have
+                    # been refused for it since the last snapshot
+                    retry_after = max(hour_retry, day_retry)
+                    if retry_after and client in refused:
+                        blocks.append((client, stamp + timedelta(seconds=retry_after)))
+                IPRateLimit.objects.bulk_create(
+                    rows,
+                    update_conflicts=True,
+                    unique_fields=['ip_address'],
+                    # hour_reset/day_reset are auto_now_add, so they can't be
+                    # set here; the windows are aligned to the hour and day.
+                    # Blocks are left alone: an admin may have set them.
+                    update_fields=['hour_count', 'day_count', 'updated_at'],
+                )
+                written += len(rows)
+                for client, until in blocks:
+                    blocked = self._block(client, until, stamp) or blocked
+            except Exception as e:
+                with self._lock:
+                    self.failed += len(chunk)
+                logger.error(f"Failed to snapshot rate limits for {len(chunk)} clients: {str(e)}")
+
+        if blocked:
+            # Blocked clients are refused by the blocklist until blocked_until
+            bump_version()
+        with self._lock:
+            self.snapshots += 1
+            self.rows_written += written
+        return written
+
+    @staticmethod
+    def _block(client: str, until: datetime, stamp: datetime) -> bool:
+        """Block client until ``until`` unless it is already blocked for longer"""
+        return IPRateLimit.objects.filter(ip_address=client).exclude(
+            is_blocked=True, blocked_until__isnull=True,
+        ).exclude(
+            is_blocked=True, blocked_until__gte=until,
+        ).update(is_blocked=True, blocked_until=until, updated_at=stamp) > 0
+
+    def shutdown(self):
+        self._stop.set()
+        if self._pid == os.getpid():
+            self.snapshot()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'interval': self.interval,
+            'snapshots': self.snapshots,
+            'rows_written': self.rows_written,
+            'failed': self.failed,
+        }
+
+
+rate_limiter = SlidingWindowLimiter([
+    Window('hour', HOUR, getattr(settings, 'MAX_PHONE_LOOKUPS_PER_IP_HOUR', 50)),
+    Window('day', DAY, getattr(settings, 'MAX_PHONE_LOOKUPS_PER_IP_DAY', 100)),
+])
+
+rate_limit_snapshots = RateLimitSnapshotter(
+    rate_limiter,
+    interval=getattr(settings, 'RATE_LIMIT_SNAPSHOT_INTERVAL', 60),
+)
+atexit.register(rate_limit_snapshots.shutdown)
+
+# Job status polling: its own short window, never snapshotted or blocked
+poll_rate_limiter = SlidingWindowLimiter(
+    [Window('minute', 60, getattr(settings, 'JOB_POLL_RATE_LIMIT_PER_MINUTE', 120))],
+    prefix='ratelimit:poll',
+    track_clients=False,
+)
+
+
+def rate_limit_exempt(view):
+    """Skip a view in RateLimitMiddleware; the view charges itself with charge()"""
+    view.rate_limit_exempt = True
+    return view
+
+
+def charge(client: str, cost: int = 1,
+           limiter: SlidingWindowLimiter = rate_limiter) -> Optional[RateLimitDecision]:
+    """
+    Charge a client for cost lookups, as RateLimitMiddleware does for one.
+
+    Args:
+        client: Client IP (lookup.utils.get_trusted_client_ip)
+        cost: Lookups to charge
+        limiter: Limiter to charge (default: the per-IP lookup limits)
+
+    Returns:
+        RateLimitDecision, or None when RATE_LIMIT_ENABLED is off
+    """
+    if not getattr(settings, 'RATE_LIMIT_ENABLED', True):
+        return None
+    if limiter.track_clients:
+        rate_limit_snapshots.ensure_started()
+    return limiter.hit(client, cost=cost)
+
+
+def remaining_allowance(client: str, limiter: SlidingWindowLimiter = rate_limiter) -> Optional[int]:
+    """Lookups client may still make now, or None when RATE_LIMIT_ENABLED is off"""
+    if not getattr(settings, 'RATE_LIMIT_ENABLED', True):
+        return None
+    return limiter.remaining(client)
+
+
+def rate_limited_response(decision: RateLimitDecision) -> JsonResponse:
+    """429 response for a rejected decision"""
+    response = JsonResponse({
+        'error': 'Rate limit exceeded',
+        'success': False,
+        'message': f'Too many searches, please try again in {decision.retry_after} seconds',
+        'retry_after': decision.retry_after
+    }, status=429)
+    response['Retry-After'] = str(decision.retry_after)
+    return set_rate_limit_headers(response, decision)
+
+
+def set_rate_limit_headers(response, decision: Optional[RateLimitDecision]):
+    """Add X-RateLimit-Limit / X-RateLimit-Remaining for the tightest window"""
+    if decision is not None:
+        response['X-RateLimit-Limit'] = str(decision.window.limit)
+        response['X-RateLimit-Remaining'] = str(decision.remaining)
+    return response
@@ -0,0 +1,201 @@
+"""
+Failure handling for calls to external data providers.
+
+CircuitBreaker stops calling a provider once too many recent calls have
+failed, so a brownout costs a fast local fallback instead of a blocked
+worker per request. AdaptiveTimeout derives the read timeout from the
+provider's recent latency instead of a fixed worst case.
+
+Both are per process; every worker learns a provider's health on its own.
+"""
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker over a rolling time window.
+
+    Outcomes are counted in one-second buckets covering the last
+    ``window`` seconds. Once at least ``min_calls`` calls have been made in
+    the window and ``failure_rate`` of them failed, the circuit opens and
+    allow() returns False for ``open_seconds``. It then goes half-open and
+    lets ``half_open_calls`` trial calls through: if they all succeed it
+    closes again, and any failure reopens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, window: int = 30, min_calls: int = 20,
+                 failure_rate: float = 0.5, open_seconds: float = 30, half_open_calls: int = 3):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        # (second, successes, failures), oldest first
+        self._buckets = deque()
+        self._trials_started = 0
+        self._trials_succeeded = 0
+
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return self._state
+
+    def _maybe_half_open(self, now: float):
+        if self._state == self.OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._trials_started = 0
+            self._trials_succeeded = 0
+            logger.info(f"Circuit {self.name} half-open, sending trial calls")
+
+    def allow(self) -> bool:
+        """Return True if a call may go ahead; every allowed call must be recorded"""
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._trials_started < self.half_open_calls:
+                self._trials_started += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._trials_succeeded += 1
+                if self._trials_succeeded >= self.half_open_calls:
+                    self._state = self.CLOSED
+                    self._buckets.clear()
+                    logger.info(f"Circuit {self.name} closed")
+                return
+            self._count(time.monotonic(), failed=False)
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.HALF_OPEN:
+                self._open(now)
+                return
+            if self._state == self.OPEN:
+                return
+            self._count(now, failed=True)
+            calls, failures = self._totals(now)
+            if calls >= self.min_calls and failures >= calls * self.failure_rate:
+                self._open(now)
+
+    def _open(self, now: float):
+        self._state = self.OPEN
+        self._opened_at = now
+        self.times_opened += 1
+        logger.warning(f"Circuit {self.name} opened for {self.open_seconds}s")
+
+    def _count(self, now: float, failed: bool):
+        second = int(now)
+        if self._buckets and self._buckets[-1][0] == second:
+            _, successes, failures = self._buckets[-1]
+        else:
+            successes = failures = 0
+            self._buckets.append(None)
+        if failed:
+            failures += 1
+        else:
+            successes += 1
+        self._buckets[-1] = (second, successes, failures)
+        self._expire(second)
+
+    def _expire(self, second: int):
+        while self._buckets and self._buckets[0][0] <= second - self.window:
+            self._buckets.popleft()
+
+    def _totals(self, now: float):
+        self._expire(int(now))
+        calls = failures = 0
+        for _, s, f in self._buckets:
+            calls += s + f
+            failures += f
+        return calls, failures
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            now = time.monotonic()
+            self._maybe_half_open(now)
+            calls, failures = self._totals(now)
+            return {
+                'state': self._state,
+                'window_calls': calls,
+                'window_failures': failures,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+            }
+
+
+class AdaptiveTimeout:
+    """
+    Timeout tracking a latency percentile of recent calls.
+
+    current() is ``multiplier`` times the ``percentile`` latency of the last
+    ``samples`` calls, clamped to [minimum, maximum]. Until ``min_samples``
+    calls have been recorded it returns ``maximum``. Calls that time out
+    should be recorded with the timeout they were given, so a slowing
+    provider pushes the timeout back up rather than being cut off.
+    """
+
+    def __init__(self, minimum: float, maximum: float, percentile: float = 0.99,
+                 multiplier: float = 2.0, samples: int = 256, min_samples: int = 20):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=samples)
+        self._lock = threading.Lock()
+        self._current: Optional[float] = None
+
+    def record(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+            self._current = None
+
+    def current(self) -> float:
+        with self._lock:
+            if self._current is None:
+                self._current = self._compute()
+            return self._current
+
+    def _compute(self) -> float:
+        if len(self._latencies) < self.min_samples:
+            return self.maximum
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, math.ceil(self.percentile * len(ordered)) - 1)
+        timeout = ordered[index] * self.multiplier
+        return min(self.maximum, max(self.minimum, timeout))
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'timeout': round(self.current(), 3),
+            'samples': len(self._latencies),
+        }
@@ -0,0 +1,613 @@
+"""
+Search result builders shared by the search views.
+
+The build_* functions compute the local (uncached) result for one search
+type; run_search() combines it with any external providers configured in
+LOOKUP_PROVIDERS. The views wrap that in the tiered cache and handle
+validation, logging and the HTTP response.
+"""
+import logging
+import zlib
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from .addresses import NormalizedAddress, find_property, normalize_address
+from .models import PersonRecord
+from .nanp import get_nanp_table
+from .people import people_index
+from .providers import PHONE, PipelineResult, get_pipeline
+from .utils import ParsedPhone, calculate_cache_ttl, parse_phone
+
+logger = logging.getLogger(__name__)
+
+
+def build_phone_result(parsed: ParsedPhone) -> Dict[str, Any]:
+    """
+    Build the phone lookup result for a valid US number.
+
+    Args:
+        parsed: ParsedPhone for a valid number with region_code 'US'
+
+    Returns:
+        Phone information dictionary
+    """
+    normalized_number = parsed.normalized
+
+    # Get area code and resolve location/carrier from the NPA-NXX table
+    area_code = parsed.area_code
+
+    location = 'United States'
+    carrier = 'Wireless Carrier'
+
+    if area_code:
+        location, carrier = get_nanp_table().lookup_national(parsed.national_number)
+
+    # Build result
+    result = {
+        'number': normalized_number,
+        'formatted_number': parsed.formatted,
+        'valid': True,
+        'country_code': 'US',
+        'country_name': 'United States',
+        'location': location,
+        'carrier': carrier,
+        'line_type': parsed.line_type,
+        'area_code': area_code,
+        'source': 'phonenumbers',
+        'cached': False,
+        'affiliate_url': 'https://www.truthfinder.com/?a=default&o=100265&utm_source=numberlookup'
+    }
+
+    logger.info(f"Result: Location={location}, Carrier={carrier}")
+
+    return result
+
+
+def _pipeline_result(kind: str, merged: PipelineResult, providers) -> Dict[str, Any]:
+    result = merged.fields
+    external = {p.name for p in providers if not p.inline}
+    outcomes = [r for r in merged.providers if r.provider in external]
+    if outcomes and not any(r.ok for r in outcomes):
+        errors = ', '.join(f"{r.provider}: {r.error}" for r in outcomes)
+        logger.warning(f"No {kind} provider answered, using local data ({errors})")
+        result['provider_fallback'] = True
+    contributors = [name for name in dict.fromkeys(merged.sources.values()) if name in external]
+    if contributors and kind == PHONE:
+        result['source'] = contributors[0]
+    return result
+
+
+def run_search(kind: str, query: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a search result from every provider configured for kind.
+
+    With only the local provider available the result is built directly;
+    otherwise the providers are queried concurrently and merged field by
+    field. If every external provider fails, the local result is returned
+    marked ``provider_fallback``.
+
+    Args:
+        kind: Search kind (providers.PHONE, PEOPLE, ADDRESS or BACKGROUND)
+        query: Search parameters for the providers
+
+    Returns:
+        Result dictionary
+    """
+    pipeline = get_pipeline()
+    providers = pipeline.providers_for(kind)
+    if all(p.inline for p in providers):
+        return pipeline.registry.get('local').lookup(kind, query)
+    return _pipeline_result(kind, pipeline.run(kind, query, providers), providers)
+
+
+async def arun_search(kind: str, query: Dict[str, Any]) -> Dict[str, Any]:
+    """Async run_search(), for the ASGI views"""
+    pipeline = get_pipeline()
+    providers = pipeline.providers_for(kind)
+    if all(p.inline for p in providers):
+        local = pipeline.registry.get('local')
+        if kind in local.blocking_kinds:
+            return await local.alookup(kind, query)
+        return local.lookup(kind, query)
+    return _pipeline_result(kind, await pipeline.arun(kind, query, providers), providers)
+
+
+def phone_query(parsed: ParsedPhone) -> Dict[str, Any]:
+    return {'number': parsed.normalized, 'parsed': parsed}
+
+
+def people_query(first_name: str, last_name: str, city: str, state: str) -> Dict[str, Any]:
+    return {'first_name': first_name, 'last_name': last_name, 'city': city, 'state': state}
+
+
+def address_query(street: str, city: str, state: str, zip_code: str) -> Dict[str, Any]:
+    return {'street': street, 'city': city, 'state': state, 'zip_code': zip_code}
+
+
+def result_cache_timeout(result: Dict[str, Any]) -> Optional[int]:
+    """Freshness for a search result; provider fallbacks are retried soon"""
+    if result.get('provider_fallback'):
+        return settings.PROVIDER_FALLBACK_CACHE_TTL
+    return None
+
+
+def result_durable_ttl(result: Dict[str, Any]) -> Optional[int]:
+    """APIResponseCache TTL for a search result; fallbacks aren't stored durably"""
+    if result.get('provider_fallback'):
+        return None
+    return calculate_cache_ttl(result)
+
+
+def _person_phone(number: str) -> Dict[str, Any]:
+    parsed = parse_phone(number)
+    if not parsed.valid:
+        return {'number': number, 'type': 'Unknown', 'carrier': None}
+    carrier = None
+    if parsed.region_code == 'US' and parsed.area_code:
+        carrier = get_nanp_table().lookup_national(parsed.national_number)[1]
+    return {'number': parsed.formatted, 'type': parsed.line_type, 'carrier': carrier}
+
+
+def build_people_result(first_name: str, last_name: str, city: str, state: str) -> Dict[str, Any]:
+    """
+    Build the people search result for a name and optional location.
+
+    Names are matched fuzzily against the PersonRecord index (lookup.people);
+    while no records are loaded the demo result is returned.
+
+    Returns:
+        People search result dictionary
+    """
+    full_name = f"{first_name} {last_name}".strip()
+    index = people_index.get()
+    if not len(index):
+        return _demo_people_result(first_name, last_name, city, state)
+
+    matches, total = index.search(
+        first_name, last_name, city, state,
+        limit=getattr(settings, 'PEOPLE_SEARCH_MAX_RESULTS', 10),
+    )
+    records = PersonRecord.objects.in_bulk([match.record_id for match in matches])
+    results = []
+    for match in matches:
+        record = records.get(match.record_id)
+        if record is None:
+            # Deleted since the index was built
+            continue
+        results.append({
+            'id': record.id,
+            'name': record.full_name,
+            'age': record.age,
+            'current_address': {
+                'street': record.street,
+                'city': record.city,
+                'state': record.state,
+                'zip': record.zip_code,
+            },
+            'phone_numbers': [_person_phone(record.phone_number)] if record.phone_number else [],
+            'email_addresses': [record.email] if record.email else [],
+            'match_score': match.score,
+        })
+
+    return {
+        'success': True,
+        'query': {
+            'first_name': first_name,
+            'last_name': last_name,
+            'city': city,
+            'state': state,
+            'full_name': full_name
+        },
+        'results': results,
+        'total_results': total,
+        'source': 'people_index',
+        'cached': False,
+        'affiliate_url': 'https://www.truthfinder.com/?a=default&o=100265&utm_source=numberlookup',
+    }
+
+
+def _demo_people_result(first_name: str, last_name: str, city: str, state: str) -> Dict[str, Any]:
+    full_name = f"{first_name} {last_name}".strip()
+
+    # Since we don't have a real people search API, return mock data
+    # In production, you would integrate with services like:
+    # - Whitepages API
+    # - Pipl API
+    # - PeopleFinders API
+    # - TruthFinder API
+
+    # Mock response based on name
+    result = {
+        'success': True,
+        'query': {
+            'first_name': first_name,
+            'last_name': last_name,
+            'city': city,
+            'state': state,
+            'full_name': full_name
+        },
+        'results': [
+            {
+                'name': full_name,
+                'age': '35-40',
+                'current_address': {
+                    'street': '123 Main Street',
+                    'city': city if city else 'New York',
+                    'state': state if state else 'NY',
+                    'zip': '10001'
+                },
+                'phone_numbers': [
+                    {
+                        'number': '(555) 123-4567',
+                        'type': 'Mobile',
+                        'carrier': 'Verizon Wireless'
+                    }
+                ],
+                'relatives': [
+                    'Jane Doe (Spouse)',
+                    'John Doe Sr. (Parent)',
+                    'Emily Doe (Child)'
+                ],
+                'past_addresses': [
+                    {
+                        'street': '456 Oak Avenue',
+                        'city': 'Los Angeles',
+                        'state': 'CA',
+                        'zip': '90001',
+                        'years': '2015-2020'
+                    }
+                ],
+                'email_addresses': [
+                    f"{first_name.lower()}.{last_name.lower()}@example.com"
+                ],
+                'social_media': {
+                    'facebook': f"https://facebook.com/{first_name.lower()}{last_name.lower()}",
+                    'linkedin': f"https://linkedin.com/in/{first_name.lower()}-{last_name.lower()}"
+                }
+            }
+        ],
+        'total_results': 1,
+        'source': 'mock_data',
+        'cached': False,
+        'affiliate_url': 'https://www.truthfinder.com/?a=default&o=100265&utm_source=numberlookup',
+        'message': 'This is demo data. Connect a real people search API for production use.'
+    }
+
+    return result
+
+
+def build_address_result(street: str, city: str, state: str, zip_code: str) -> Dict[str, Any]:
+    """
+    Build the property record result for an address.
+
+    The address is normalized (lookup.addresses) and looked up in
+    PropertyRecord; addresses without a record get the demo result.
+
+    Returns:
+        Property information dictionary
+    """
+    address = normalize_address(street, city, state, zip_code)
+    record = find_property(address)
+    if record is None:
+        return _demo_address_result(address)
+
+    formatted = str(record)
+    sqft = record.square_feet
+    value = record.estimated_value
+    owned_years = None
+    sale_history = []
+    if record.last_sale_date:
+        owned_years = max(0, timezone.now().year - record.last_sale_date.year)
+        sale_history.append({
+            'date': record.last_sale_date.isoformat(),
+            'price': _dollars(record.last_sale_price),
+            'type': 'Sold'
+        })
+
+    return {
+        'success': True,
+        'query': _address_query(address),
+        'property': {
+            'address': {
+                'street': record.street,
+                'city': record.city,
+                'state': record.state,
+                'zip_code': record.zip_code,
+                'county': record.county,
+                'formatted': formatted
+            },
+            'details': {
+                'property_type': record.property_type,
+                'year_built': record.year_built,
+                'square_feet': sqft or 0,
+                'lot_size': f"{record.lot_size_sqft:,} sqft" if record.lot_size_sqft else None,
+                'bedrooms': record.bedrooms,
+                'bathrooms': record.bathrooms,
+                'stories': record.stories
+            },
+            'value': {
+                'estimated_value': _dollars(value),
+                'tax_assessment': _dollars(record.tax_assessment),
+                'last_sale_price': _dollars(record.last_sale_price),
+                'last_sale_date': record.last_sale_date.isoformat() if record.last_sale_date else None,
+                'price_per_sqft': _dollars(value // sqft) if value and sqft else None
+            },
+            'tax_info': {
+                'annual_tax': _dollars(record.annual_tax),
+                'parcel_number': record.parcel_number,
+                'exemptions': []
+            },
+            'owner': {
+                'name': record.owner_name,
+                'ownership_years': f"{owned_years} years" if owned_years is not None else None,
+                'mailing_address': formatted
+            },
+            'residents': [],
+            'past_residents': [],
+            'sale_history': sale_history
+        },
+        'source': 'property_records',
+        'cached': False,
+        'affiliate_url': 'https://www.truthfinder.com/?a=default&o=100265&utm_source=numberlookup',
+    }
+
+
+def _dollars(value: Optional[int]) -> Optional[str]:
+    return f"${value:,}" if value is not None else None
+
+
+def _address_query(address: NormalizedAddress) -> Dict[str, Any]:
+    # Every spelling of an address shares one cached result, so the query
+    # is reported in its normalized form
+    return {
+        'street': address.street,
+        'city': address.city,
+        'state': address.state,
+        'zip_code': address.zip_code,
+        'full_address': address.formatted
+    }
+
+
+def _demo_address_result(address: NormalizedAddress) -> Dict[str, Any]:
+    street, city, zip_code = address.street, address.city, address.zip_code
+    full_address = address.formatted
+
+    # In production, integrate with real property APIs like:
+    # - Zillow API
+    # - Redfin API
+    # - Attom Data Solutions
+    # - CoreLogic
+    # For now, return mock data
+
+    # Generate mock property data based on address. crc32, unlike hash(),
+    # gives every worker process the same values for an address.
+    property_value = 250000 + (zlib.crc32(street.encode()) % 500000)
+    year_built = 1950 + (zlib.crc32(city.encode()) % 70)
+    sqft = 1200 + (zlib.crc32((street + city).encode()) % 2000)
+
+    result = {
+        'success': True,
+        'query': _address_query(address),
+        'property': {
+            'address': {
+                'street': street,
+                'city': city,
+                'state': address.state,
+                'zip_code': zip_code or '10001',
+                'county': 'Sample County',
+                'formatted': full_address
+            },
+            'details': {
+                'property_type': 'Single Family Home',
+                'year_built': year_built,
+                'square_feet': sqft,
+                'lot_size': f"{sqft * 2} sqft",
+                'bedrooms': 3,
+                'bathrooms': 2,
+                'stories': 2,
+                'garage': '2-car attached',
+                'heating': 'Forced air, natural gas',
+                'cooling': 'Central A/C'
+            },
+            'value': {
+                'estimated_value': f"${property_value:,}",
+                'tax_assessment': f"${int(property_value * 0.85):,}",
+                'last_sale_price': f"${int(property_value * 0.92):,}",
+                'last_sale_date': '2020-03-15',
+                'price_per_sqft': f"${int(property_value / sqft)}"
+            },
+            'tax_info': {
+                'annual_tax': f"${int(property_value * 0.012):,}",
+                'tax_year': '2024',
+                'parcel_number': f"APN-{zlib.crc32(street.encode()) % 10000:04d}",
+                'exemptions': []
+            },
+            'owner': {
+                'name': 'John & Jane Doe',
+                'owner_type': 'Individual',
+                'ownership_years': '5 years',
+                'mailing_address': full_address
+            },
+            'residents': [
+                {
+                    'name': 'John Doe',
+                    'age_range': '45-50',
+                    'length_of_residence': '5 years',
+                    'phone_numbers': ['(555) 123-4567']
+                },
+                {
+                    'name': 'Jane Doe',
+                    'age_range': '40-45',
+                    'length_of_residence': '5 years',
+                    'phone_numbers': ['(555) 123-4568']
+                }
+            ],
+            'past_residents': [
+                {
+                    'name': 'Robert Smith',
+                    'years_lived': '2015-2019',
+                    'age_range': '55-60'
+                },
+                {
+                    'name': 'Mary Smith',
+                    'years_lived': '2015-2019',
+                    'age_range': '50-55'
+                }
+            ],
+            'sale_history': [
+                {
+                    'date': '2020-03-15',
+                    'price': f"${int(property_value * 0.92):,}",
+                    'type': 'Sold'
+                },
+                {
+                    'date': '2019-11-20',
+                    'price': f"${int(property_value * 0.91):,}",
+                    'type': 'Listed'
+                },
+                {
+                    'date': '2015-07-10',
+                    'price': f"${int(property_value * 0.75):,}",
+                    'type': 'Sold'
+                }
+            ],
+            'neighborhood': {
+                'school_rating': '8/10',
+                'crime_rating': 'Low',
+                'walkability_score': 65,
+                'transit_score': 45,
+                'median_home_value': f"${property_value:,}",
+                'median_rent': f"${int(property_value * 0.004):,}/month"
+            }
+        },
+        'source': 'mock_data',
+        'cached': False,
+        'affiliate_url': 'https://www.truthfinder.com/?a=default&o=100265&utm_source=numberlookup',
+        'message': 'This is demo data. Connect a real property API for production use.'
+    }
+
+    return result
+
+
+def build_background_check_result(first_name: str, last_name: str, city: str, state: str) -> Dict[str, Any]:
+    """
+    Build the background check result for a name and optional location.
+
+    Returns:
+        Background check result dictionary
+    """
+    full_name = f"{first_name} {last_name}".strip()
+
+    # In production, integrate with background check APIs like:
+    # - Checkr API
+    # - GoodHire API
+    # - Accurate Background
+    # - Sterling Check
+    # For now, return mock data
+
+    # Mock background check data
+    result = {
+        'success': True,
+        'query': {
+            'first_name': first_name,
+            'last_name': last_name,
+            'city': city,
+            'state': state,
+            'full_name': full_name
+        },
+        'subject': {
+            'name': full_name,
+            'age': '35-40',
+            'current_address': {
+                'street': '123 Main Street',
+                'city': city if city else 'New York',
+                'state': state if state else 'NY',
+                'zip': '10001'
+            },
+            'aliases': [f'{first_name} D.', f'{first_name[:3]}']
+        },
+        'criminal_records': {
+            'summary': 'No serious criminal records found',
+            'records_found': 0,
+            'details': []
+        },
+        'court_records': {
+            'civil_cases': 1,
+            'traffic_violations': 2,
+            'small_claims': 0,
+            'details': [
+                {
+                    'type': 'Civil Case',
+                    'case_number': 'CV-2019-12345',
+                    'date': '2019-05-15',
+                    'court': 'County Superior Court',
+                    'status': 'Closed',
+                    'description': 'Contract Dispute'
+                },
+                {
+                    'type': 'Traffic Violation',
+                    'case_number': 'TR-2020-67890',
+                    'date': '2020-08-22',
+                    'court': 'Municipal Court',
+                    'status': 'Resolved',
+                    'description': 'Speeding - 15 over limit'
+                }
+            ]
+        },
+        'property_records': [
+            {
+                'address': '123 Main Street',
+                'city': city if city else 'New York',
+                'state': state if state else 'NY',
+                'ownership_type': 'Owner',
+                'value': '$450,000',
+                'purchase_date': '2018-03-10',
+                'purchase_price': '$420,000'
+            }
+        ],
+        'phone_numbers': [
+            {'number': '(555) 123-4567', 'type': 'Mobile', 'carrier': 'Verizon'},
+            {'number': '(555) 987-6543', 'type': 'Landline', 'carrier': 'AT&T'}
+        ],
+        'email_addresses': [
+            f"{first_name.lower()}.{last_name.lower()}@email.com",
+            f"{first_name.lower()}{last_name.lower()}@gmail.com"
+        ],
+        'employment_history': [
+            {
+                'company': 'Tech Corp Inc.',
+                'position': 'Senior Developer',
+                'years': '2015 - Present',
+                'location': f'{city if city else "New York"}, {state if state else "NY"}'
+            }
+        ],
+        'education': [
+            {
+                'institution': 'State University',
+                'degree': 'Bachelor of Science',
+                'field': 'Computer Science',
+                'year': '2012'
+            }
+        ],
+        'relatives': [
+            f'{first_name[0]}ane {last_name} (Spouse)',
+            f'{first_name} {last_name} Sr. (Parent)',
+            f'Emily {last_name} (Sibling)'
+        ],
+        'social_media': [
+            {'platform': 'LinkedIn', 'url': f'linkedin.com/in/{first_name.lower()}{last_name.lower()}', 'verified': True},
+            {'platform': 'Facebook', 'url': f'facebook.com/{first_name.lower()}{last_name.lower()}', 'verified': False}
+        ],
+        'bankruptcies': [],
+        'liens_judgments': [],
+        'sex_offender_check': 'Clear - Not on registry',
+        'report_date': timezone.now().date().isoformat(),
+        'source': 'mock_data',
+        'cached': False,
+        'affiliate_url': 'https://www.truthfinder.com/?a=default&o=100265&utm_source=numberlookup',
+        'message': 'This is demo data. Connect a real background check API for production use.'
+    }
+
+    return result
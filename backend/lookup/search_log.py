@@ -0,0 +1,229 @@
+"""
+Buffered SearchLog writer.
+
+Search views hand their log rows to ``search_log.log()``, which puts them on
+a bounded in-process queue and returns immediately. A daemon thread drains
+the queue and writes the rows with ``bulk_create`` once SEARCH_LOG_BATCH_SIZE
+rows are waiting or SEARCH_LOG_FLUSH_INTERVAL seconds have passed since the
+first one arrived. When the queue is full new rows are dropped and counted
+rather than blocking the request. Pending rows are flushed at interpreter
+exit, so a worker shutting down cleanly does not lose its buffer.
+
+Because SearchLog.created_at is auto_now_add, buffered rows are stamped when
+they are flushed, up to SEARCH_LOG_FLUSH_INTERVAL seconds after the request.
+
+With SEARCH_LOG_ASYNC off every row is written inline, as before.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import SearchLog
+
+logger = logging.getLogger(__name__)
+
+# Queued by shutdown() to wake the writer thread and make it exit
+_STOP = object()
+
+
+class SearchLogWriter:
+    """Queue SearchLog rows and write them in batches from a background thread"""
+
+    def __init__(self, enabled: bool = True, batch_size: int = 100,
+                 flush_interval: float = 2.0, queue_size: int = 10000):
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def log(self, **fields) -> bool:
+        """
+        Record a search.
+
+        Args:
+            **fields: SearchLog field values
+
+        Returns:
+            False if the row was dropped or could not be written
+        """
+        if not self.enabled or self._stopping:
+            return self._write_inline(fields)
+
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(SearchLog(**fields))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                dropped = self.dropped
+            # Log the first drop and then every thousandth to avoid flooding
+            if dropped % 1000 == 1:
+                logger.warning(f"Search log queue full, {dropped} rows dropped so far")
+            return False
+
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def log_many(self, rows) -> int:
+        """
+        Record several searches, e.g. from one bulk request.
+
+        Args:
+            rows: Iterable of SearchLog field dicts
+
+        Returns:
+            Number of rows queued or written
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        if self.enabled and not self._stopping:
+            return sum(1 for fields in rows if self.log(**fields))
+        self._write_batch([SearchLog(**fields) for fields in rows])
+        return len(rows)
+
+    async def alog(self, **fields) -> bool:
+        """Async log(); only the inline (SEARCH_LOG_ASYNC off) path touches the database"""
+        if self.enabled and not self._stopping:
+            return self.log(**fields)
+        try:
+            await SearchLog.objects.acreate(**fields)
+            with self._lock:
+                self.written += 1
+            return True
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.error(f"Failed to log search: {e}")
+            return False
+
+    def _write_inline(self, fields) -> bool:
+        try:
+            SearchLog.objects.create(**fields)
+            with self._lock:
+                self.written += 1
+            return True
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.error(f"Failed to log search: {e}")
+            return False
+
+    def _ensure_worker(self):
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None:
+            return
+        with self._lock:
+            # A forked worker inherits the object but not the thread
+            if self._pid != pid or self._thread is None:
+                self._pid = pid
+                self._thread = threading.Thread(
+                    target=self._run, name='search-log-writer', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    row = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if row is _STOP:
+                    stop = True
+                    break
+                batch.append(row)
+            self._write_batch(batch)
+            close_old_connections()
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                row = self._queue.get_nowait()
+            except queue.Empty:
+                return batch
+            if row is not _STOP:
+                batch.append(row)
+
+    def _write_batch(self, batch):
+        if not batch:
+            return
+        with self._flush_lock:
+            try:
+                SearchLog.objects.bulk_create(batch, batch_size=self.batch_size)
+            except Exception as e:
+                with self._lock:
+                    self.failed += len(batch)
+                logger.error(f"Failed to write {len(batch)} search log rows: {e}")
+                return
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
+
+    def flush(self):
+        """Write every queued row now, on the calling thread"""
+        batch = self._drain()
+        for start in range(0, len(batch), self.batch_size):
+            self._write_batch(batch[start:start + self.batch_size])
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop queueing (later rows are written inline) and flush what is pending"""
+        self._stopping = True
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            # Let the writer finish the batch it is holding, then take the rest
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            thread.join(timeout)
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'async': self.enabled,
+            'queued': self._queue.qsize(),
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'batches': self.batches,
+        }
+
+
+search_log = SearchLogWriter(
+    enabled=getattr(settings, 'SEARCH_LOG_ASYNC', True),
+    batch_size=getattr(settings, 'SEARCH_LOG_BATCH_SIZE', 100),
+    flush_interval=getattr(settings, 'SEARCH_LOG_FLUSH_INTERVAL', 2.0),
+    queue_size=getattr(settings, 'SEARCH_LOG_QUEUE_SIZE', 10000),
+)
+atexit.register(search_log.shutdown)
@@ -0,0 +1,72 @@
+from django.test import SimpleTestCase, TestCase
+
+from lookup.addresses import (
+    find_property, normalize_address, normalize_city, normalize_state, normalize_street, normalize_zip,
+    synthetic_properties,
+)
+from lookup.models import PropertyRecord
+
+
+class NormalizeAddressTests(SimpleTestCase):
+    def test_spellings_of_one_address_normalize_alike(self):
+        variants = ['123 north Main Street, Apt. #4', '123 N MAIN ST APT 4', '123 North Main St Apt4']
+        self.assertEqual({normalize_street(v) for v in variants}, {('123', 'N', 'MAIN', 'ST', '', 'APT 4')})
+        # A bare "#" is its own designator
+        self.assertEqual(normalize_street('123 N. Main St. #4')[5], '# 4')
+
+    def test_table_words_only_count_where_they_can_stand(self):
+        self.assertEqual(normalize_street('123 North St'), ('123', '', 'NORTH', 'ST', '', ''))
+        self.assertEqual(normalize_street('123 Park Ave'), ('123', '', 'PARK', 'AVE', '', ''))
+        self.assertEqual(normalize_street('500 Avenue of the Americas'),
+                         ('500', '', 'AVENUE OF THE AMERICAS', '', '', ''))
+        self.assertEqual(normalize_street('77 Main Street Southwest'), ('77', '', 'MAIN', 'ST', 'SW', ''))
+
+    def test_house_numbers_and_units(self):
+        self.assertEqual(normalize_street('12 1/2 Elm Rd Rear')[:1], ('12 1/2',))
+        self.assertEqual(normalize_street('12 1/2 Elm Rd Rear')[5], 'REAR')
+        self.assertEqual(normalize_street('4-B Oak Court Suite 200')[::5], ('4-B', 'STE 200'))
+        # A designator that takes no value only counts as the last word
+        self.assertEqual(normalize_street('9 Front St'), ('9', '', 'FRONT', 'ST', '', ''))
+        self.assertEqual(normalize_street('Main'), ('', '', 'MAIN', '', '', ''))
+
+    def test_city_state_and_zip(self):
+        self.assertEqual(normalize_city('Saint Louis'), 'ST LOUIS')
+        self.assertEqual(normalize_city('Mount  Pleasant.'), 'MT PLEASANT')
+        self.assertEqual(normalize_state('New York'), 'NY')
+        self.assertEqual(normalize_state('ny'), 'NY')
+        self.assertEqual(normalize_zip('02134-1234'), ('02134', '1234'))
+        self.assertEqual(normalize_zip('2134'), ('02134', ''))
+        self.assertEqual(normalize_zip('12'), ('', ''))
+
+    def test_key_and_formatting(self):
+        address = normalize_address('123 north Main Street, Apt. #4', 'Springfield', 'Illinois', '62701')
+        self.assertEqual(address.key, '123 N MAIN ST APT 4|SPRINGFIELD|IL')
+        self.assertEqual(address.formatted, '123 N MAIN ST APT 4, SPRINGFIELD, IL 62701')
+
+    def test_normalizing_twice_changes_nothing(self):
+        for record in synthetic_properties(50, seed=2):
+            address = normalize_address(record['street'], record['city'], record['state'], record['zip_code'])
+            self.assertEqual(normalize_address(address.street, address.city, address.state,
+                                               address.zip_code + address.zip_plus4), address)
+
+
+class FindPropertyTests(TestCase):
+    def setUp(self):
+        address = normalize_address('123 Main Street', 'Springfield', 'IL', '62701')
+        self.record = PropertyRecord.objects.create(
+            address_key=address.key, zip_code=address.zip_code,
+            street=address.street, city=address.city, state=address.state,
+        )
+
+    def test_found_under_any_spelling(self):
+        self.assertEqual(find_property(normalize_address('123 main st.', 'springfield', 'illinois')), self.record)
+        self.assertEqual(find_property(normalize_address('123 Main St', 'Springfield', 'IL', '62701')), self.record)
+
+    def test_zip_code_overrides_a_different_city_name(self):
+        self.assertEqual(find_property(normalize_address('123 Main St', 'Springfeld', 'IL', '62701')), self.record)
+        self.assertIsNone(find_property(normalize_address('123 Main St', 'Springfeld', 'IL')))
+        self.assertIsNone(find_property(normalize_address('123 Main St', 'Springfield', 'IL', '62702')))
+
+    def test_empty_street_is_not_looked_up(self):
+        with self.assertNumQueries(0):
+            self.assertIsNone(find_property(normalize_address('', 'Springfield', 'IL')))
@@ -0,0 +1,86 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from lookup import analytics
+from lookup.analytics import SearchCounterBuffer
+from lookup.models import PhoneNumberAnalytics, PopularSearch, SearchTrendBucket
+from lookup.trending import current_hour
+
+
+class SearchCounterBufferTests(TestCase):
+    def _buffer(self, **kwargs):
+        buffer = SearchCounterBuffer(**kwargs)
+        # Flushed on this thread by the tests rather than by the daemon
+        patcher = mock.patch.object(buffer, '_ensure_worker')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return buffer
+
+    def test_repeat_searches_are_aggregated_before_writing(self):
+        buffer = self._buffer()
+        for _ in range(3):
+            buffer.record('+12125551234', 'Manhattan, New York', 'Verizon', 'mobile')
+        buffer.record('+17182345678')
+        self.assertFalse(PhoneNumberAnalytics.objects.exists())
+        self.assertEqual(buffer.stats()['buffered'], 2)
+
+        self.assertEqual(buffer.flush(), 2)
+        counts = dict(PhoneNumberAnalytics.objects.values_list('phone_number', 'search_count'))
+        self.assertEqual(counts, {'+12125551234': 3, '+17182345678': 1})
+        popular = PopularSearch.objects.get(phone_number='+12125551234')
+        self.assertEqual((popular.search_count, popular.location), (3, 'Manhattan, New York'))
+        bucket = SearchTrendBucket.objects.get(phone_number='+12125551234')
+        self.assertEqual((bucket.hour, bucket.count), (current_hour(), 3))
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_flushes_add_to_existing_counts(self):
+        PhoneNumberAnalytics.objects.create(phone_number='+12125551234', search_count=10)
+        buffer = self._buffer()
+        buffer.record('+12125551234')
+        buffer.record('+12125551234')
+        buffer.flush()
+        buffer.record('+12125551234')
+        buffer.flush()
+
+        self.assertEqual(PhoneNumberAnalytics.objects.get().search_count, 13)
+        self.assertEqual(SearchTrendBucket.objects.get().count, 3)
+
+    def test_each_distinct_increment_is_one_update(self):
+        buffer = self._buffer()
+        for number, count in (('+12125550001', 1), ('+12125550002', 1), ('+12125550003', 2)):
+            for _ in range(count):
+                buffer.record(number)
+        # Per table: existing rows, insert, one UPDATE per increment (1 and 2)
+        with self.assertNumQueries(12):
+            buffer.flush()
+
+    def test_full_buffer_wakes_the_worker(self):
+        buffer = self._buffer(max_buffer=2)
+        buffer.record('+12125550001')
+        self.assertFalse(buffer._wake.is_set())
+        buffer.record('+12125550002')
+        self.assertTrue(buffer._wake.is_set())
+
+    def test_only_valid_results_are_counted(self):
+        buffer = self._buffer()
+        buffer.record_many([
+            {'valid': True, 'number': '+12125551234', 'location': 'Manhattan, New York'},
+            {'valid': False, 'number': 'bad'},
+        ])
+        buffer.record('')
+        self.assertEqual(buffer.stats()['recorded'], 1)
+
+        disabled = self._buffer(enabled=False)
+        disabled.record('+12125551234')
+        self.assertEqual(disabled.stats()['buffered'], 0)
+
+    def test_failed_chunks_are_counted_and_dropped(self):
+        buffer = self._buffer()
+        buffer.record('+12125551234')
+        with mock.patch.object(analytics.PhoneNumberAnalytics.objects, 'bulk_create',
+                               side_effect=RuntimeError('db down')), \
+                self.assertLogs('lookup.analytics', 'ERROR'):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(buffer.stats()['failed'], 1)
+        self.assertEqual(buffer.stats()['buffered'], 0)
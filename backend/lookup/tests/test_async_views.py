@@ -0,0 +1,109 @@
+import asyncio
+import json
+import threading
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase
+
+from lookup import async_views, views
+from lookup.analytics import SearchCounterBuffer
+from lookup.providers import PHONE, LookupPipeline, ProviderRegistry
+from lookup.providers.base import run_in_thread
+from lookup.providers.stub import StubProvider
+from lookup.search_log import SearchLogWriter
+
+
+class BlockingInlineProvider(StubProvider):
+    """An inline provider whose phone lookups touch the database"""
+
+    inline = True
+    blocking_kinds = frozenset({PHONE})
+
+    def fetch(self, kind, query):
+        self.thread = threading.get_ident()
+        return super().fetch(kind, query)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        # Private writers whose rows stay queued instead of going to the
+        # database from daemon threads
+        self.search_log = SearchLogWriter()
+        self.search_counters = SearchCounterBuffer(enabled=False)
+        mock.patch.object(self.search_log, '_ensure_worker').start()
+        for module in (async_views, views):
+            mock.patch.object(module, 'search_log', self.search_log).start()
+            mock.patch.object(module, 'search_counters', self.search_counters).start()
+        self.addCleanup(mock.patch.stopall)
+        self.factory = AsyncRequestFactory()
+
+    async def test_phone_search_matches_the_sync_view(self):
+        request = self.factory.get('/api/search/phone/7182222222/')
+        response = await async_views.phone_search(request, '(718) 222-2222')
+        self.assertEqual(response.status_code, 200)
+
+        sync_response = await sync_to_async(views.phone_search)(
+            RequestFactory().get('/api/search/phone/7182222222/'), '7182222222')
+        result, expected = json.loads(response.content), json.loads(sync_response.content)
+        result.pop('cached')
+        expected.pop('cached')
+        self.assertEqual(result, expected)
+        self.assertEqual(result['location'], 'Brooklyn/Queens, New York')
+
+    async def test_repeat_search_is_served_from_the_cache(self):
+        request = self.factory.get('/api/search/phone/3125550147/')
+        await async_views.phone_search(request, '3125550147')
+        response = await async_views.phone_search(request, '312-555-0147')
+        self.assertTrue(json.loads(response.content)['cached'])
+
+    async def test_invalid_and_foreign_numbers_are_refused(self):
+        request = self.factory.get('/api/search/phone/123/')
+        response = await async_views.phone_search(request, '123')
+        self.assertEqual(response.status_code, 400)
+
+        response = await async_views.phone_search(request, '+442079460958')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content)['error'], 'Only US phone numbers are supported')
+
+    async def test_only_get_is_allowed(self):
+        with self.assertLogs('django.request', 'WARNING'):
+            response = await async_views.people_search(self.factory.post('/api/search/people/'))
+        self.assertEqual(response.status_code, 405)
+
+    async def test_people_search_needs_a_name(self):
+        response = await async_views.people_search(self.factory.get('/api/search/people/', {'city': 'Austin'}))
+        self.assertEqual(response.status_code, 400)
+
+    async def test_searches_are_logged_without_blocking(self):
+        await async_views.phone_search(self.factory.get('/'), '2025550123')
+        self.assertEqual(self.search_log.stats()['queued'], 1)
+
+
+class RunInThreadTests(SimpleTestCase):
+    def test_database_connections_are_released_after_each_call(self):
+        threads = []
+        with mock.patch('lookup.providers.base.close_old_connections') as close:
+            result = asyncio.run(run_in_thread(lambda value: threads.append(threading.get_ident()) or value, 7))
+        self.assertEqual(result, 7)
+        self.assertNotEqual(threads, [threading.get_ident()])
+        close.assert_called_once_with()
+
+    def test_connections_are_released_when_the_call_fails(self):
+        def fail():
+            raise RuntimeError('boom')
+
+        with mock.patch('lookup.providers.base.close_old_connections') as close, \
+                self.assertRaises(RuntimeError):
+            asyncio.run(run_in_thread(fail))
+        close.assert_called_once_with()
+
+    def test_blocking_inline_providers_run_off_the_event_loop(self):
+        provider = BlockingInlineProvider(name='local', kinds=[PHONE], fields={PHONE: {'carrier': 'X'}},
+                                          latency=0.0, jitter=0.0)
+        pipeline = LookupPipeline(ProviderRegistry([provider]), timeout=1.0)
+        with mock.patch('lookup.providers.base.close_old_connections') as close:
+            result = asyncio.run(pipeline.arun(PHONE, {}))
+        self.assertEqual(result.fields, {'carrier': 'X'})
+        self.assertNotEqual(provider.thread, threading.get_ident())
+        close.assert_called_once_with()
@@ -0,0 +1,103 @@
+import json
+
+from django.test import SimpleTestCase
+
+from lookup.background import RECORD_SOURCES, BackgroundFanOut, RecordSource, build_sources, sse_event
+from lookup.providers import BACKGROUND, PHONE, ProviderRegistry
+from lookup.providers.stub import StubProvider
+
+LOCAL_SECTIONS = {section: 'local' for sections in RECORD_SOURCES.values() for section in sections}
+
+
+def _local():
+    return StubProvider('local', latency=0.0, jitter=0.0, fields={BACKGROUND: dict(LOCAL_SECTIONS)})
+
+
+def _remote(name, latency=0.01, **kwargs):
+    return StubProvider(name, latency=latency, jitter=0.0, fields={BACKGROUND: {
+        'court_records': [name], 'bankruptcies': [], 'liens_judgments': [],
+        'criminal_records': [name], 'sex_offender_check': False,
+    }}, **kwargs)
+
+
+class BackgroundFanOutTests(SimpleTestCase):
+    def _fanout(self, court=None, criminal=None, deadline=1.0):
+        local = _local()
+        providers = {'court': court or local, 'criminal': criminal or local}
+        sources = [RecordSource(name, sections, providers.get(name, local), deadline)
+                   for name, sections in RECORD_SOURCES.items()]
+        return BackgroundFanOut(local, sources, max_workers=4)
+
+    def test_local_sections_come_first_and_answers_are_merged(self):
+        check = self._fanout(court=_remote('fast', 0.01), criminal=_remote('slow', 0.1)).start({})
+        names = [outcome.source for outcome in check]
+        self.assertEqual(names, ['identity', 'address_history', 'relatives', 'employment', 'court', 'criminal'])
+
+        result = check.result()
+        self.assertEqual((result['court_records'], result['criminal_records']), (['fast'], ['slow']))
+        self.assertEqual(result['subject'], 'local')
+        self.assertNotIn('provider_fallback', result)
+        # Each source only contributes its own sections
+        self.assertEqual(set(check.outcomes[4].sections), set(RECORD_SOURCES['court']))
+
+    def test_source_past_its_deadline_keeps_the_local_sections(self):
+        fanout = self._fanout(court=_remote('fast', 0.01), criminal=_remote('slow', 2.0), deadline=0.2)
+        check = fanout.start({})
+        with self.assertLogs('lookup.background', 'WARNING') as logs:
+            outcomes = list(check)
+        self.assertIn('criminal (slow) failed: timeout', logs.output[0])
+        self.assertEqual((outcomes[-1].source, outcomes[-1].error, outcomes[-1].sections), ('criminal', 'timeout', {}))
+        self.assertLess(outcomes[-1].latency, 1.0)
+
+        result = check.result()
+        self.assertEqual((result['court_records'], result['criminal_records']), (['fast'], 'local'))
+        self.assertTrue(result['provider_fallback'])
+
+    def test_failing_source_is_reported(self):
+        check = self._fanout(court=_remote('broken', failure_rate=1.0)).start({})
+        with self.assertLogs('lookup.background', 'WARNING'):
+            outcomes = {outcome.source: outcome for outcome in check}
+        self.assertEqual(outcomes['court'].error, 'broken: simulated failure')
+        self.assertFalse(outcomes['court'].as_dict()['ok'])
+        self.assertTrue(check.result()['provider_fallback'])
+
+    def test_result_needs_every_source_to_report(self):
+        check = self._fanout(court=_remote('fast')).start({})
+        with self.assertRaises(RuntimeError):
+            check.result()
+        next(iter(check))
+        with self.assertRaises(RuntimeError):
+            check.result()
+
+    async def test_async_checks_share_the_deadlines(self):
+        fanout = self._fanout(court=_remote('fast', 0.01), criminal=_remote('slow', 2.0), deadline=0.2)
+        with self.assertLogs('lookup.background', 'WARNING'):
+            result = await fanout.arun({})
+        self.assertEqual((result['court_records'], result['criminal_records']), (['fast'], 'local'))
+        self.assertTrue(result['provider_fallback'])
+
+
+class BuildSourcesTests(SimpleTestCase):
+    def test_unknown_or_unsuitable_providers_fall_back_to_local(self):
+        registry = ProviderRegistry([_local(), _remote('stub'), StubProvider('phones', kinds=[PHONE])])
+        with self.assertLogs('lookup.background', 'ERROR') as logs:
+            sources = build_sources(registry, {'court': 'stub', 'criminal': 'missing', 'relatives': 'phones'},
+                                    timeout=8.0, timeouts={'court': 2.5})
+        self.assertEqual(len(logs.output), 2)
+
+        by_name = {source.name: source for source in sources}
+        self.assertEqual(list(by_name), list(RECORD_SOURCES))
+        self.assertEqual(by_name['court'].as_dict(), {
+            'name': 'court', 'sections': list(RECORD_SOURCES['court']), 'provider': 'stub', 'deadline_ms': 2500,
+        })
+        self.assertEqual({by_name[name].provider.name for name in ('criminal', 'relatives', 'identity')},
+                         {'local'})
+        self.assertEqual(by_name['criminal'].deadline, 8.0)
+
+
+class SSEEventTests(SimpleTestCase):
+    def test_event_format(self):
+        message = sse_event('source', {'source': 'court', 'ok': True})
+        self.assertTrue(message.startswith('event: source\ndata: '))
+        self.assertTrue(message.endswith('\n\n'))
+        self.assertEqual(json.loads(message.split('data: ', 1)[1]), {'source': 'court', 'ok': True})
@@ -0,0 +1,93 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from lookup import blocklist as blocklist_module
+from lookup.blocklist import (
+    BLOCKLIST_RESET_KEY, BLOCKLIST_VERSION_KEY, IntervalSet, IPBlocklist, address_key, network_range,
+)
+from lookup.models import BlockedNetwork, IPRateLimit
+
+
+class BlocklistTests(TestCase):
+    def test_interval_set_merges_overlapping_and_adjacent_ranges(self):
+        ranges = IntervalSet([(10, 20), (15, 30), (31, 40), (50, 60)])
+        self.assertEqual(len(ranges), 2)
+        self.assertIn(10, ranges)
+        self.assertIn(40, ranges)
+        self.assertNotIn(45, ranges)
+        self.assertNotIn(9, ranges)
+
+    def test_ipv4_ipv6_and_mapped_addresses(self):
+        family, first, last = network_range('10.0.0.0/8')
+        ipv4 = IntervalSet([(first, last)])
+        family6, first6, last6 = network_range('2001:db8::/32')
+        ipv6 = IntervalSet([(first6, last6)])
+        self.assertEqual((family, family6), (4, 6))
+
+        self.assertEqual(address_key('10.1.2.3')[0], 4)
+        self.assertIn(address_key('10.1.2.3')[1], ipv4)
+        self.assertNotIn(address_key('11.0.0.1')[1], ipv4)
+        # An IPv4 client on a dual-stack socket is checked as IPv4
+        self.assertEqual(address_key('::ffff:10.9.8.7'), address_key('10.9.8.7'))
+        self.assertEqual(address_key('2001:db8::1')[0], 6)
+        self.assertIn(address_key('2001:db8::1')[1], ipv6)
+        self.assertNotIn(address_key('2001:db9::1')[1], ipv6)
+        self.assertIsNone(address_key('not an ip'))
+
+    def test_blocked_networks_are_loaded(self):
+        BlockedNetwork.objects.create(network='203.0.113.0/24')
+        BlockedNetwork.objects.create(network='2001:db8::/48')
+        BlockedNetwork.objects.create(network='198.51.100.7', is_active=False)
+        blocklist = IPBlocklist(sync_interval=3600)
+
+        self.assertTrue(blocklist.is_blocked('203.0.113.9'))
+        self.assertTrue(blocklist.is_blocked('::ffff:203.0.113.9'))
+        self.assertTrue(blocklist.is_blocked('2001:db8:0:1::5'))
+        self.assertFalse(blocklist.is_blocked('2001:db8:1::5'))
+        self.assertFalse(blocklist.is_blocked('198.51.100.7'))
+
+
+class BlocklistSyncTests(TestCase):
+    def setUp(self):
+        cache.delete_many([BLOCKLIST_VERSION_KEY, BLOCKLIST_RESET_KEY])
+        self.blocklist = IPBlocklist(sync_interval=0)
+        self.assertFalse(self.blocklist.is_blocked('203.0.113.9'))
+
+    def test_saved_rows_are_picked_up_incrementally(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            BlockedNetwork.objects.create(network='203.0.113.0/24')
+            IPRateLimit.objects.create(ip_address='198.51.100.7', is_blocked=True)
+
+        self.assertTrue(self.blocklist.is_blocked('203.0.113.9'))
+        self.assertTrue(self.blocklist.is_blocked('198.51.100.7'))
+        self.assertEqual((self.blocklist.loads, self.blocklist.full_loads), (2, 1))
+
+    def test_deleted_rows_force_a_full_reload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            network = BlockedNetwork.objects.create(network='203.0.113.0/24')
+        self.assertTrue(self.blocklist.is_blocked('203.0.113.9'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            network.delete()
+        self.assertFalse(self.blocklist.is_blocked('203.0.113.9'))
+        self.assertEqual(self.blocklist.full_loads, 2)
+
+    def test_expired_entries_drop_out_without_a_reload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            network = BlockedNetwork.objects.create(network='203.0.113.0/24',
+                                                    expires_at=timezone.now() + timedelta(hours=1))
+        self.assertTrue(self.blocklist.is_blocked('203.0.113.9'))
+
+        loads = self.blocklist.loads
+        with mock.patch.object(blocklist_module.time, 'time', return_value=network.expires_at.timestamp() + 1):
+            self.assertFalse(self.blocklist.is_blocked('203.0.113.9'))
+        self.assertEqual(self.blocklist.loads, loads)
+
+    async def test_async_check_matches_the_sync_one(self):
+        await BlockedNetwork.objects.acreate(network='2001:db8::/32')
+        self.assertTrue(await IPBlocklist(sync_interval=3600).ais_blocked('2001:db8::1'))
+        self.assertFalse(await IPBlocklist(sync_interval=3600).ais_blocked('2001:db9::1'))
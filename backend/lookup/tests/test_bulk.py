@@ -0,0 +1,201 @@
+import asyncio
+import csv
+import io
+import json
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.client import ASGIRequest
+
+from lookup import bulk, views
+from lookup.analytics import SearchCounterBuffer
+from lookup.bulk import (
+    BulkLookupError, BulkProgress, BulkRateLimited, csv_lines, csv_trailer, iter_csv_numbers,
+    iter_ndjson_numbers, lookup_phone_numbers, lookup_phone_stream, parse_numbers,
+)
+from lookup.search_log import SearchLogWriter
+
+
+def _lines(text):
+    return io.BytesIO(text.encode()).readlines()
+
+
+class ParseNumbersTests(SimpleTestCase):
+    def test_formatting_variants_are_parsed_once(self):
+        parsed = parse_numbers(['(718) 234-5678', '718.234.5678', '+1 718 234 5678'])
+        self.assertEqual({p.normalized for p in parsed}, {'+17182345678'})
+        self.assertIs(parsed[0], parsed[2])
+
+    def test_values_that_cannot_be_numbers_are_rejected(self):
+        parsed = parse_numbers([['7182345678'], {'n': 1}, None, '+44 20 7946 0958'])
+        self.assertEqual([p.valid for p in parsed], [False, False, False, True])
+        self.assertEqual(parsed[3].region_code, 'GB')
+
+
+class CSVInputTests(SimpleTestCase):
+    def test_phone_column_is_found_by_header_name(self):
+        source = _lines('name,Phone\nAnn,718-234-5678\n\nBob,212-555-0100\n')
+        self.assertEqual(list(iter_csv_numbers(source)), ['718-234-5678', '212-555-0100'])
+
+    def test_column_can_be_chosen_by_name_or_index(self):
+        text = 'home,work\n7182345678,2125550100\n'
+        self.assertEqual(list(iter_csv_numbers(_lines(text), 'work')), ['2125550100'])
+        # An index keeps the first row unless it is a recognised header
+        self.assertEqual(list(iter_csv_numbers(_lines(text), '1')), ['work', '2125550100'])
+
+    def test_file_without_a_header_uses_the_first_column(self):
+        self.assertEqual(list(iter_csv_numbers(_lines('7182345678,x\n2125550100\n'))),
+                         ['7182345678', '2125550100'])
+        self.assertEqual(list(iter_csv_numbers(_lines(''))), [])
+
+    def test_unknown_column_fails_before_any_lookups(self):
+        with self.assertRaisesMessage(BulkLookupError, "'mobile' not found"):
+            iter_csv_numbers(_lines('phone\n7182345678\n'), 'mobile')
+
+
+class NDJSONInputTests(SimpleTestCase):
+    def test_strings_numbers_and_objects_are_accepted(self):
+        source = _lines('"7182345678"\n2125550100\n{"phone": "3125550147"}\n\nnot json\n')
+        self.assertEqual(list(iter_ndjson_numbers(source)),
+                         ['7182345678', 2125550100, '3125550147', 'not json'])
+
+
+class BulkLookupTests(TestCase):
+    def test_batch_results_are_in_input_order_and_deduplicated(self):
+        result = lookup_phone_numbers(['7182345678', 'bad', '(718) 234-5678', '+442079460958'], None)
+        self.assertEqual(result['count'], 4)
+        self.assertEqual(result['unique'], 1)
+        self.assertEqual(result['valid'], 2)
+        self.assertEqual([r['input'] for r in result['results']],
+                         ['7182345678', 'bad', '(718) 234-5678', '+442079460958'])
+        self.assertEqual(result['results'][3]['error'], bulk.NOT_US_ERROR)
+
+    @override_settings(PHONE_BULK_MAX_NUMBERS=2)
+    def test_empty_and_oversized_batches_are_refused(self):
+        with self.assertRaises(BulkLookupError):
+            lookup_phone_numbers([], None)
+        with self.assertRaisesMessage(BulkLookupError, 'At most 2'):
+            lookup_phone_numbers(['1', '2', '3'], None)
+
+    def test_stream_is_looked_up_in_chunks(self):
+        progress = BulkProgress()
+        charges = []
+        items = list(lookup_phone_stream(
+            (f'71823456{n:02}' for n in range(5)), chunk_size=2, progress=progress,
+            charge=charges.append,
+        ))
+        results = [item for kind, item in items if kind == 'result']
+        self.assertEqual([r['row'] for r in results], [0, 1, 2, 3, 4])
+        self.assertEqual([kind for kind, _ in items].count('progress'), 3)
+        self.assertEqual(charges, [2, 2, 1])
+        self.assertEqual(progress.as_dict()['next_offset'], 5)
+
+    def test_chunks_are_cut_to_the_remaining_allowance(self):
+        left = [3]
+        charges = []
+
+        def charge(cost):
+            if cost > left[0]:
+                raise BulkRateLimited(30)
+            left[0] -= cost
+            charges.append(cost)
+
+        progress = BulkProgress()
+        with self.assertRaises(BulkRateLimited):
+            for _ in lookup_phone_stream((f'71823456{n:02}' for n in range(10)), chunk_size=2,
+                                         progress=progress, charge=charge, allowance=lambda: left[0]):
+                pass
+        self.assertEqual(charges, [2, 1])
+        self.assertEqual(progress.next_offset, 3)
+
+    def test_offset_resumes_where_a_stream_stopped(self):
+        numbers = [f'71823456{n:02}' for n in range(5)]
+
+        def charge(cost):
+            if progress.chunks == 1:
+                raise BulkRateLimited(30)
+
+        progress = BulkProgress()
+        with self.assertRaises(BulkRateLimited):
+            for _ in lookup_phone_stream(numbers, chunk_size=2, progress=progress, charge=charge):
+                pass
+        self.assertEqual(progress.next_offset, 2)
+
+        resumed = [item for kind, item in lookup_phone_stream(numbers, chunk_size=2, offset=2)
+                   if kind == 'result']
+        self.assertEqual([r['row'] for r in resumed], [2, 3, 4])
+        self.assertEqual(resumed[0]['input'], numbers[2])
+
+    def test_csv_output_and_trailer(self):
+        rows = list(csv.DictReader(io.StringIO(''.join([
+            *csv_lines(lookup_phone_stream(['7182345678'])),
+            csv_trailer(1, 'Rate limit exceeded'),
+        ]))))
+        self.assertEqual(rows[0]['number'], '+17182345678')
+        self.assertEqual((rows[1]['row'], rows[1]['input'], rows[1]['error']), ('1', '', 'Rate limit exceeded'))
+
+
+class BulkStreamViewTests(TestCase):
+    def setUp(self):
+        self.search_log = SearchLogWriter()
+        mock.patch.object(self.search_log, '_ensure_worker').start()
+        for module in (bulk, views):
+            mock.patch.object(module, 'search_log', self.search_log).start()
+            mock.patch.object(module, 'search_counters', SearchCounterBuffer(enabled=False)).start()
+        self.addCleanup(mock.patch.stopall)
+        self.factory = RequestFactory()
+
+    def _stream(self, body, content_type='text/csv', **params):
+        query = '&'.join(f'{k}={v}' for k, v in params.items())
+        request = self.factory.post(f'/api/search/phone/bulk/stream/?{query}', body, content_type=content_type)
+        response = views.phone_bulk_stream(request)
+        return ''.join(chunk.decode() for chunk in response.streaming_content)
+
+    def _stop_after_first_chunk(self, client_ip, cost):
+        if self.charged:
+            raise BulkRateLimited(30)
+        self.charged = True
+
+    def test_rate_limited_csv_stream_ends_with_a_trailer(self):
+        self.charged = False
+        with mock.patch.object(views, '_charge_chunk', self._stop_after_first_chunk), \
+                self.assertLogs('lookup.views', 'WARNING'):
+            text = self._stream('phone\n7182345678\n2125550100\n3125550147\n', chunk_size=2)
+        rows = list(csv.DictReader(io.StringIO(text)))
+        self.assertEqual([row['input'] for row in rows], ['7182345678', '2125550100', ''])
+        self.assertEqual(rows[-1]['row'], '2')
+        self.assertEqual(rows[-1]['error'], 'Rate limit exceeded, retry after 30 seconds')
+
+    def test_failed_csv_stream_ends_with_a_trailer(self):
+        with mock.patch.object(bulk, '_lookup_batch', side_effect=RuntimeError('boom')), \
+                mock.patch.object(views, '_charge_chunk'), \
+                self.assertLogs('lookup.views', 'ERROR'):
+            text = self._stream('phone\n7182345678\n', offset=0)
+        rows = list(csv.DictReader(io.StringIO(text)))
+        self.assertEqual([(row['row'], row['error']) for row in rows], [('0', 'Bulk search failed')])
+
+    def test_rate_limited_ndjson_stream_reports_next_offset(self):
+        self.charged = False
+        with mock.patch.object(views, '_charge_chunk', self._stop_after_first_chunk), \
+                self.assertLogs('lookup.views', 'WARNING'):
+            text = self._stream('"7182345678"\n"2125550100"\n', 'application/x-ndjson', chunk_size=1)
+        last = json.loads(text.splitlines()[-1])
+        self.assertEqual((last['next_offset'], last['retry_after']), (1, 30))
+
+    def test_asgi_requests_get_an_async_iterator(self):
+        scope = {
+            'type': 'http', 'method': 'POST', 'path': '/api/search/phone/bulk/stream/',
+            'query_string': b'format=ndjson', 'headers': [(b'content-type', b'application/x-ndjson')],
+        }
+        request = ASGIRequest(scope, io.BytesIO(b'"7182345678"\n'))
+        with mock.patch.object(views, '_charge_chunk'):
+            response = views.phone_bulk_stream(request)
+            self.assertTrue(response.is_async)
+
+            async def read():
+                return [json.loads(chunk) async for chunk in response.streaming_content]
+
+            with mock.patch('lookup.providers.base.close_old_connections'):
+                lines = asyncio.run(read())
+        self.assertEqual(lines[0]['number'], '+17182345678')
+        self.assertTrue(lines[-1]['success'])
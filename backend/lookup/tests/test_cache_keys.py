@@ -0,0 +1,138 @@
+import json
+import time
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import RequestFactory, TestCase
+
+from lookup import bulk, cache_keys, views
+from lookup.analytics import SearchCounterBuffer
+from lookup.cache_keys import KeyVersions, UNLOADED_VERSION, canonical_params, canonical_text, params_digest
+from lookup.caching import DurableCache, TieredCache
+from lookup.models import APIResponseCache, SiteConfiguration
+from lookup.providers import PHONE
+from lookup.search_log import SearchLogWriter
+
+
+def _versions(test):
+    versions = KeyVersions(sync_interval=3600)
+    # Tests drive loading themselves instead of the background thread
+    patcher = mock.patch.object(versions, '_ensure_worker')
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return versions
+
+
+class CacheKeyTests(TestCase):
+    def setUp(self):
+        self.versions = _versions(self)
+
+    def _load(self):
+        self.versions.load()
+        self.versions._loaded.set()
+
+    def test_canonical_text(self):
+        self.assertEqual(canonical_text('  ＪＯＨＮ \t Smith '), 'john smith')
+        self.assertEqual(canonical_text('JOSÉ'), canonical_text('josé'))
+        self.assertEqual(canonical_text(None), '')
+        self.assertEqual(canonical_params({'a': ' X ', 'b': 7}), {'a': 'x', 'b': '7'})
+
+    def test_equivalent_queries_share_a_digest(self):
+        self.assertEqual(params_digest({'first_name': 'José', 'last_name': 'Smith'}),
+                         params_digest({'last_name': 'ＳＭＩＴＨ', 'first_name': '  JOSÉ '}))
+        # Fields stay apart, so moving a word between them changes the key
+        self.assertNotEqual(params_digest({'first_name': 'Mary Ann', 'last_name': 'Lee'}),
+                            params_digest({'first_name': 'Mary', 'last_name': 'Ann Lee'}))
+
+    def test_keys_are_fixed_length(self):
+        with mock.patch.object(cache_keys, 'key_versions', self.versions):
+            self._load()
+            short = cache_keys.address_cache_key(mock.Mock(street='1 A St', city='', state='', zip_code=''))
+            long = cache_keys.cache_key('address', street='9' * 500)
+        self.assertEqual(len(short), len(long))
+        self.assertTrue(short.startswith('address:v1:'))
+
+    def test_unloaded_versions_never_block(self):
+        started = time.monotonic()
+        self.assertEqual(self.versions.get(PHONE), UNLOADED_VERSION)
+        with mock.patch.object(cache_keys, 'key_versions', self.versions):
+            self.assertIsNone(cache_keys.phone_cache_key('+12125551234'))
+        self.assertLess(time.monotonic() - started, 0.1)
+        self._load()
+        self.assertEqual(self.versions.get(PHONE), 1)
+
+    def test_bump_moves_one_kind_to_a_new_key(self):
+        self._load()
+        with mock.patch.object(cache_keys, 'key_versions', self.versions):
+            before = cache_keys.phone_cache_key('+12125551234')
+            people_before = cache_keys.people_cache_key('John', 'Smith', '', '')
+            with self.assertLogs('lookup.cache_keys', 'INFO'):
+                self.assertEqual(cache_keys.bump_version(PHONE), 2)
+            self.assertNotEqual(cache_keys.phone_cache_key('+12125551234'), before)
+            self.assertEqual(cache_keys.people_cache_key('John', 'Smith', '', ''), people_before)
+
+        self.assertEqual(SiteConfiguration.objects.get(key='cache_key_version.phone').value, '2')
+        # Other processes pick the bump up on their next load
+        other = KeyVersions()
+        other.load()
+        self.assertEqual(other._versions[PHONE], 2)
+
+
+class UncachedKeyTests(TestCase):
+    def setUp(self):
+        l2 = LocMemCache('lookup-tests-uncached', {})
+        l2.clear()
+        self.cache = TieredCache(l2=l2, l3=DurableCache(), sync_interval=0)
+        self.calls = 0
+
+    def _compute(self):
+        self.calls += 1
+        return {'n': self.calls}
+
+    def test_none_key_is_computed_every_time_and_never_stored(self):
+        self.assertEqual(self.cache.get_or_compute(None, self._compute, durable_ttl=60), ({'n': 1}, False))
+        self.assertEqual(self.cache.get_or_compute(None, self._compute, durable_ttl=60), ({'n': 2}, False))
+        self.cache.set(None, {'n': 0}, durable_ttl=60)
+        self.assertIsNone(self.cache.get(None))
+        self.assertEqual(len(self.cache.l1), 0)
+        self.assertFalse(APIResponseCache.objects.exists())
+        self.assertEqual(self.cache.stats()['misses'], 0)
+
+    async def test_async_none_key_is_computed_every_time(self):
+        async def compute():
+            return self._compute()
+
+        self.assertEqual(await self.cache.aget_or_compute(None, compute), ({'n': 1}, False))
+        self.assertEqual(await self.cache.aget_or_compute(None, self._compute), ({'n': 2}, False))
+        await self.cache.aset(None, {'n': 0})
+        self.assertIsNone(await self.cache.aget(None))
+        self.assertEqual(len(self.cache.l1), 0)
+
+
+class UnloadedVersionSearchTests(TestCase):
+    def setUp(self):
+        mock.patch.object(cache_keys, 'key_versions', _versions(self)).start()
+        search_log = SearchLogWriter()
+        mock.patch.object(search_log, '_ensure_worker').start()
+        for module in (bulk, views):
+            mock.patch.object(module, 'search_log', search_log).start()
+            mock.patch.object(module, 'search_counters', SearchCounterBuffer(enabled=False)).start()
+        self.addCleanup(mock.patch.stopall)
+        self.factory = RequestFactory()
+
+    def test_phone_search_skips_the_cache(self):
+        with mock.patch.object(views, 'run_search', wraps=views.run_search) as run_search, \
+                self.assertLogs('lookup', 'INFO'):
+            for _ in range(2):
+                response = views.phone_search(self.factory.get('/api/search/phone/7182345678/'), '7182345678')
+                self.assertFalse(json.loads(response.content)['cached'])
+        self.assertEqual(run_search.call_count, 2)
+        self.assertFalse(APIResponseCache.objects.exists())
+
+    def test_bulk_numbers_stay_apart_without_keys(self):
+        with self.assertLogs('lookup', 'INFO'):
+            result = bulk.lookup_phone_numbers(['7182345678', '2125550100', '(718) 234-5678'], None)
+        self.assertEqual([r['number'] for r in result['results']],
+                         ['+17182345678', '+12125550100', '+17182345678'])
+        self.assertEqual((result['unique'], result['cache_hits']), (2, 0))
+        self.assertFalse(APIResponseCache.objects.exists())
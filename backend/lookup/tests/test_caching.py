@@ -0,0 +1,359 @@
+import asyncio
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from lookup import cache_keys
+from lookup.addresses import normalize_address
+from lookup.cache_keys import address_cache_key, background_cache_key, people_cache_key
+from lookup.caching import LEASE_KEY, DurableCache, TieredCache, search_cache
+from lookup.models import APIResponseCache, PersonRecord, PropertyRecord
+
+
+def _l2(name):
+    l2 = LocMemCache(name, {})
+    l2.clear()
+    return l2
+
+
+class TieredCacheL1Tests(SimpleTestCase):
+    def setUp(self):
+        self.l2 = _l2('lookup-tests-l1')
+
+    def _worker(self, **kwargs):
+        # One TieredCache per simulated worker process, all on the same L2
+        return TieredCache(l2=self.l2, sync_interval=0, **kwargs)
+
+    def test_l1_serves_repeat_reads_without_l2(self):
+        cache = self._worker(l2_shared=False)
+        cache.sync_interval = 3600
+        cache.set('key', {'value': 1})
+        self.assertEqual(cache.get('key'), {'value': 1})
+        with mock.patch.object(self.l2, 'get', side_effect=AssertionError):
+            self.assertEqual(cache.get('key'), {'value': 1})
+        self.assertEqual((cache.l1_hits, cache.l2_hits), (2, 0))
+
+    def test_l1_entries_expire(self):
+        cache = self._worker(l1_ttl=0.01)
+        cache.set('key', 'value')
+        with mock.patch('lookup.caching.time.monotonic', return_value=10 ** 9):
+            self.assertEqual(cache.get('key'), 'value')
+        self.assertEqual((cache.l1_hits, cache.l2_hits), (0, 1))
+
+    def test_invalidation_reaches_the_l1_of_other_workers(self):
+        writer, reader = self._worker(), self._worker()
+        reader.get('unrelated')  # first sync only records the log position
+        writer.set('key', 'old')
+        self.assertEqual(reader.get('key'), 'old')
+
+        writer.invalidate('key')
+        self.assertIsNone(self.l2.get('key'))
+        self.assertIsNone(reader.get('key'))
+        self.assertIsNone(writer.get('key'))
+
+    def test_reader_that_fell_behind_the_log_clears_its_l1(self):
+        writer, reader = self._worker(), self._worker()
+        reader.get('unrelated')
+        writer.set('key', 'old')
+        reader.get('key')
+        writer.invalidate('other')
+        self.l2.delete('tiered:invalidation:1')  # the entry expired before the reader replayed it
+
+        with mock.patch.object(self.l2, 'get', wraps=self.l2.get) as l2_get:
+            self.assertEqual(reader.get('key'), 'old')
+        self.assertIn(mock.call('key'), l2_get.call_args_list)
+
+    def test_misses_are_remembered_when_l2_is_process_local(self):
+        cache = self._worker(l2_shared=False)
+        self.assertIsNone(cache.get('key'))
+        self.l2.set('key', 'late')
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.negative_hits, 1)
+
+    def test_misses_are_not_remembered_when_l2_is_shared(self):
+        cache, other = self._worker(l2_shared=True), self._worker(l2_shared=True)
+        self.assertIsNone(cache.get('key'))
+        other.set('key', 'from another worker')
+        self.assertEqual(cache.get('key'), 'from another worker')
+        self.assertEqual(cache.negative_hits, 0)
+
+    def test_locmem_l2_is_detected_as_process_local(self):
+        self.assertFalse(TieredCache(l2=self.l2).l2_shared)
+        self.assertFalse(TieredCache().l2_shared)  # tests run on LocMemCache
+
+
+class RecordInvalidationTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(cache_keys.key_versions, '_ensure_worker')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache_keys.key_versions.ensure_loaded()
+
+    def _cached(self, key):
+        search_cache.set(key, {'stale': True})
+        self.addCleanup(search_cache.invalidate, key)
+        return key
+
+    def test_saving_a_property_drops_its_address_searches(self):
+        address = normalize_address('123 North Main Street', 'Springfield', 'Illinois', '62701')
+        with_zip = self._cached(address_cache_key(address))
+        without_zip = self._cached(address_cache_key(address._replace(zip_code='')))
+        elsewhere = self._cached(address_cache_key(address._replace(number='125')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PropertyRecord.objects.create(address_key=address.key, zip_code='62701', street=address.street,
+                                          city=address.city, state=address.state)
+
+        self.assertIsNone(search_cache.get(with_zip))
+        self.assertIsNone(search_cache.get(without_zip))
+        self.assertEqual(search_cache.get(elsewhere), {'stale': True})
+
+    def test_saving_or_deleting_a_person_drops_their_name_searches(self):
+        keys = [
+            self._cached(people_cache_key('john', 'SMITH', 'austin', 'TX')),
+            self._cached(people_cache_key('John', 'Smith', '', '')),
+            self._cached(background_cache_key('John', 'Smith', '', 'TX')),
+        ]
+        other = self._cached(people_cache_key('Jane', 'Smith', '', ''))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            person = PersonRecord.objects.create(first_name='John', last_name='Smith', city='Austin', state='TX')
+        for key in keys:
+            self.assertIsNone(search_cache.get(key))
+        self.assertEqual(search_cache.get(other), {'stale': True})
+
+        self._cached(keys[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            person.delete()
+        self.assertIsNone(search_cache.get(keys[1]))
+
+
+class DurableCacheTests(TestCase):
+    def setUp(self):
+        self.l3 = DurableCache(hit_flush_interval=3600, hit_flush_threshold=3)
+
+    def test_round_trip_and_expiry(self):
+        self.l3.set('key', {'value': 1}, ttl=60, api_source='test')
+        value, remaining = self.l3.get('key')
+        self.assertEqual(value, {'value': 1})
+        self.assertTrue(55 < remaining <= 60)
+
+        APIResponseCache.objects.filter(cache_key='key').update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.l3.get('key'), (None, 0))
+
+    def test_keys_longer_than_the_column_are_skipped(self):
+        key = 'k' * (DurableCache.MAX_KEY_LENGTH + 1)
+        self.l3.set(key, 'value', ttl=60, api_source='test')
+        self.l3.set_many({key: ('value', 60)}, api_source='test')
+        self.assertFalse(APIResponseCache.objects.exists())
+        self.assertEqual(self.l3.get(key), (None, 0))
+
+    def test_hits_are_flushed_in_batches(self):
+        self.l3.set_many({'a': ('A', 60), 'b': ('B', 60)}, api_source='test')
+        self.l3.get('a')
+        self.l3.get('a')
+        self.assertEqual(APIResponseCache.objects.get(cache_key='a').hit_count, 0)
+
+        with self.assertNumQueries(3):  # the read, then one UPDATE per distinct increment
+            self.l3.get_many(['b', 'missing'])
+        hits = dict(APIResponseCache.objects.values_list('cache_key', 'hit_count'))
+        self.assertEqual(hits, {'a': 2, 'b': 1})
+
+    def test_set_many_overwrites_existing_rows(self):
+        self.l3.set('a', 'old', ttl=60, api_source='test')
+        self.l3.set_many({'a': ('new', 60), 'b': ('B', 60)}, api_source='bulk')
+        self.assertEqual({key: value for key, (value, _) in self.l3.get_many(['a', 'b']).items()},
+                         {'a': 'new', 'b': 'B'})
+        self.assertEqual(APIResponseCache.objects.get(cache_key='a').api_source, 'bulk')
+
+    async def test_async_get_matches_get(self):
+        await self.l3.aset('key', [1, 2], ttl=60, api_source='test')
+        value, _ = await self.l3.aget('key')
+        self.assertEqual(value, [1, 2])
+
+
+class TieredCacheL3Tests(TestCase):
+    def setUp(self):
+        self.l2 = _l2('lookup-tests-l3')
+        self.cache = TieredCache(l2=self.l2, l3=DurableCache(), xfetch_beta=0)
+
+    def test_l3_survives_an_l2_flush_and_back_fills_it(self):
+        value, cached = self.cache.get_or_compute('key', lambda: {'value': 1}, durable_ttl=600)
+        self.assertFalse(cached)
+        self.assertTrue(APIResponseCache.objects.filter(cache_key='key').exists())
+
+        self.l2.clear()
+        fresh = TieredCache(l2=self.l2, l3=DurableCache(), xfetch_beta=0)
+        self.assertEqual(fresh.get_or_compute('key', lambda: self.fail('recomputed')), ({'value': 1}, True))
+        self.assertEqual(fresh.l3_hits, 1)
+        self.assertIsNotNone(self.l2.get('key'))
+
+    def test_results_without_a_durable_ttl_stay_out_of_l3(self):
+        self.cache.get_or_compute('key', lambda: 'value')
+        self.assertFalse(APIResponseCache.objects.exists())
+
+    def test_batch_reads_fall_through_to_l3(self):
+        self.cache.set_many({'a': 'A', 'b': 'B'}, durable_ttl=600)
+        self.l2.clear()
+        fresh = TieredCache(l2=self.l2, l3=DurableCache(), xfetch_beta=0)
+
+        results = fresh.get_many_or_compute({key: (lambda key=key: key.upper() + '!') for key in 'abc'})
+        self.assertEqual(results, {'a': ('A', True), 'b': ('B', True), 'c': ('C!', False)})
+        self.assertEqual(fresh.l3_hits, 2)
+
+    def test_l3_errors_are_treated_as_misses(self):
+        with mock.patch.object(self.cache.l3, 'get', side_effect=RuntimeError('db down')), \
+                self.assertLogs('lookup.caching', 'ERROR'):
+            self.assertEqual(self.cache.get_or_compute('key', lambda: 'value'), ('value', False))
+
+
+class TieredCacheCoalescingTests(SimpleTestCase):
+    def setUp(self):
+        self.l2 = _l2('lookup-tests-coalescing')
+        self.cache = TieredCache(l2=self.l2, xfetch_beta=0, lease_wait=1)
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+        barrier = threading.Barrier(8)
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'value': 42}
+
+        def worker():
+            barrier.wait()
+            results.append(self.cache.get_or_compute('key', compute))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([value for value, _ in results], [{'value': 42}] * 8)
+        self.assertEqual(sum(not cached for _, cached in results), 1)
+        self.assertEqual(self.cache.coalesced, 7)
+
+    def test_errors_reach_every_waiter_and_are_not_cached(self):
+        def compute():
+            raise RuntimeError('upstream down')
+
+        with self.assertRaises(RuntimeError):
+            self.cache.get_or_compute('key', compute)
+        self.assertEqual(self.cache.get_or_compute('key', lambda: 'ok'), ('ok', False))
+        self.assertIsNone(self.l2.get(LEASE_KEY.format('key')))
+
+    def test_other_worker_waits_for_the_lease_holder(self):
+        other = TieredCache(l2=self.l2, xfetch_beta=0, lease_wait=2)
+        self.l2.add(LEASE_KEY.format('key'), 'holder', 10)
+        timer = threading.Timer(0.1, self.cache.set, ('key', 'from the holder'))
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        value = other.get_or_compute('key', lambda: self.fail('computed while leased'))
+        self.assertEqual(value, ('from the holder', True))
+        self.assertEqual(other.lease_waits, 1)
+
+    def test_lease_wait_gives_up_and_computes(self):
+        self.cache.lease_wait = 0.1
+        self.l2.add(LEASE_KEY.format('key'), 'stuck holder', 10)
+        with self.assertLogs('lookup.caching', 'WARNING'):
+            self.assertEqual(self.cache.get_or_compute('key', lambda: 'local'), ('local', False))
+        # The lease belongs to the other worker and is left alone
+        self.assertEqual(self.l2.get(LEASE_KEY.format('key')), 'stuck holder')
+
+    def test_async_misses_compute_once(self):
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'value'
+
+        async def main():
+            return await asyncio.gather(*(self.cache.aget_or_compute('key', compute) for _ in range(5)))
+
+        results = asyncio.run(main())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(cached for _, cached in results), [False, True, True, True, True])
+
+
+class TieredCacheStaleTests(SimpleTestCase):
+    def setUp(self):
+        self.l2 = _l2('lookup-tests-stale')
+        self.cache = TieredCache(l2=self.l2, xfetch_beta=0)
+
+    def _wait_for(self, key, value):
+        deadline = time.monotonic() + 2
+        while self.cache.get(key) != value and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.cache.get(key), value)
+
+    def test_stale_value_is_served_while_it_refreshes(self):
+        self.cache.set('key', 'old', timeout=0.05)
+        time.sleep(0.1)
+
+        value, cached = self.cache.get_or_compute('key', lambda: 'new')
+        self.assertEqual((value, cached), ('old', True))
+        self.assertEqual(self.cache.stale_hits, 1)
+        self._wait_for('key', 'new')
+
+    def test_stale_entries_outlive_their_soft_expiry_in_l2(self):
+        self.cache.stale_ttl = 60
+        with mock.patch.object(self.l2, 'set', wraps=self.l2.set) as l2_set:
+            self.cache.set('key', 'value', timeout=10)
+        self.assertEqual(l2_set.call_args[0][2], 70)
+
+    def test_one_refresh_per_key_at_a_time(self):
+        calls = []
+        started = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            time.sleep(0.1)
+            return 'new'
+
+        self.cache.set('key', 'old', timeout=0)
+        for _ in range(5):
+            self.assertEqual(self.cache.get_or_compute('key', compute), ('old', True))
+        started.wait(1)
+        self._wait_for('key', 'new')
+        self.assertEqual(len(calls), 1)
+
+    def test_refresh_is_skipped_while_another_worker_holds_the_lease(self):
+        self.l2.add(LEASE_KEY.format('key'), 'other worker', 10)
+        self.cache.set('key', 'old', timeout=0)
+        calls = []
+        self.cache.get_or_compute('key', lambda: calls.append(1))
+        deadline = time.monotonic() + 1
+        while self.cache._refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(calls, [])
+        self.assertEqual(self.cache.get('key'), 'old')
+
+    def test_xfetch_refreshes_slow_values_early(self):
+        self.cache.xfetch_beta = 1.0
+        self.cache.set('key', 'value', timeout=10, delta=1.0)
+        # log(1 - 0.99999) * 1s is about 11.5s, past the remaining 10s
+        with mock.patch('lookup.caching.random.random', return_value=0.99999):
+            self.assertEqual(self.cache.get_or_compute('key', lambda: 'early'), ('value', True))
+        with mock.patch('lookup.caching.random.random', return_value=0.5):
+            self.cache.get_or_compute('key', lambda: 'early')
+        self.assertEqual(self.cache.early_refreshes, 1)
+        self._wait_for('key', 'early')
+
+    def test_values_that_compute_instantly_are_not_refreshed_early(self):
+        self.cache.xfetch_beta = 1.0
+        self.cache.set('key', 'value', timeout=10, delta=0.0)
+        with mock.patch('lookup.caching.random.random', return_value=0.99999):
+            self.cache.get_or_compute('key', lambda: 'early')
+        self.assertEqual(self.cache.early_refreshes, 0)
@@ -0,0 +1,184 @@
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from lookup import jobs
+from lookup.jobs import (
+    callback_url_error, claim_job, deliver_callbacks, post_pinned, query_hash, requeue_expired_claims, submit_job,
+    vet_callback_url,
+)
+from lookup.models import BackgroundCheckCallback, BackgroundCheckJob
+
+PUBLIC = '93.184.216.34'
+
+
+def _resolves_to(*addresses):
+    return mock.patch.object(jobs.socket, 'getaddrinfo', return_value=[
+        (None, None, None, '', (address, 443)) for address in addresses
+    ])
+
+
+class JobTests(TestCase):
+    def test_equivalent_queries_share_a_job(self):
+        job, created = submit_job('John', 'Smith', 'Austin', 'TX')
+        same, created_again = submit_job('  JOHN ', 'smith', 'austin', 'tx')
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(same.id, job.id)
+        self.assertEqual(query_hash(job.query), job.query_hash)
+
+    def test_finished_job_is_reused_until_it_expires(self):
+        job, _ = submit_job('John', 'Smith', '', '')
+        BackgroundCheckJob.objects.filter(id=job.id).update(
+            status=BackgroundCheckJob.DONE, expires_at=timezone.now() + timedelta(hours=1),
+        )
+        self.assertEqual(submit_job('John', 'Smith', '', '')[0].id, job.id)
+
+        BackgroundCheckJob.objects.filter(id=job.id).update(expires_at=timezone.now() - timedelta(seconds=1))
+        new, created = submit_job('John', 'Smith', '', '')
+        self.assertTrue(created)
+        self.assertNotEqual(new.id, job.id)
+
+    def test_a_job_is_claimed_once(self):
+        first, _ = submit_job('Ann', 'Lee', '', '')
+        second, _ = submit_job('Bob', 'Ray', '', '')
+
+        claimed = claim_job('worker-1', lease_seconds=60)
+        self.assertEqual(claimed.id, first.id)
+        self.assertEqual((claimed.status, claimed.worker, claimed.attempts),
+                         (BackgroundCheckJob.RUNNING, 'worker-1', 1))
+        self.assertEqual(claim_job('worker-2', lease_seconds=60).id, second.id)
+        self.assertIsNone(claim_job('worker-3', lease_seconds=60))
+
+    def test_expired_lease_is_requeued_then_failed(self):
+        job, _ = submit_job('Ann', 'Lee', '', '')
+        claim_job('worker-1', lease_seconds=60)
+        self.assertEqual(requeue_expired_claims(max_attempts=2), 0)
+
+        BackgroundCheckJob.objects.filter(id=job.id).update(claimed_until=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs('lookup.jobs', 'WARNING'):
+            self.assertEqual(requeue_expired_claims(max_attempts=2), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), (BackgroundCheckJob.QUEUED, ''))
+
+        claim_job('worker-2', lease_seconds=60)
+        BackgroundCheckJob.objects.filter(id=job.id).update(claimed_until=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs('lookup.jobs', 'WARNING'):
+            requeue_expired_claims(max_attempts=2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (BackgroundCheckJob.FAILED, 2))
+        self.assertIsNotNone(job.expires_at)
+
+
+class CallbackURLTests(SimpleTestCase):
+    def test_public_hosts_are_accepted_and_pinned(self):
+        with _resolves_to(PUBLIC, '93.184.216.35'):
+            self.assertEqual(vet_callback_url('https://hooks.example.com/done'), (None, PUBLIC))
+
+    def test_internal_addresses_are_refused(self):
+        for address in ('127.0.0.1', '10.0.0.5', '169.254.169.254', '::ffff:192.168.0.1', 'fe80::1%eth0'):
+            with _resolves_to(PUBLIC, address):
+                self.assertEqual(callback_url_error('https://hooks.example.com/done'),
+                                 'callback_url must point to a public address', address)
+
+    def test_malformed_urls_are_refused(self):
+        for url in ('ftp://hooks.example.com/', 'hooks.example.com', 'http://'):
+            self.assertEqual(vet_callback_url(url), ('callback_url must be an http or https URL', ''))
+
+
+class _CallbackHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append((self.headers['Host'], json.loads(body)))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class PinnedDeliveryTests(SimpleTestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), _CallbackHandler)
+        self.server.received = []
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def test_connects_to_the_address_and_keeps_the_host(self):
+        port = self.server.server_address[1]
+        # The name doesn't resolve; only the pinned address is used
+        response = post_pinned(f'http://hooks.invalid:{port}/done', '127.0.0.1', json={'ok': True}, timeout=5)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.server.received, [(f'hooks.invalid:{port}', {'ok': True})])
+
+
+class CallbackDeliveryTests(TestCase):
+    def _finish(self, job):
+        BackgroundCheckJob.objects.filter(id=job.id).update(
+            status=BackgroundCheckJob.DONE, result={'subject': 'x'}, finished_at=timezone.now(),
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+
+    def test_every_submitter_of_a_shared_job_is_called_back(self):
+        with _resolves_to(PUBLIC):
+            job, _ = submit_job('John', 'Smith', '', '', 'https://a.example.com/cb')
+            submit_job('john', 'smith', '', '', 'https://b.example.com/cb')
+            submit_job('John', 'Smith', '', '', 'https://a.example.com/cb')
+        self.assertEqual(list(job.callbacks.values_list('url', flat=True)),
+                         ['https://a.example.com/cb', 'https://b.example.com/cb'])
+
+        # Nothing is sent before the job finishes
+        with mock.patch.object(jobs, 'post_pinned') as post:
+            self.assertEqual(deliver_callbacks(), 0)
+        post.assert_not_called()
+
+        self._finish(job)
+        with _resolves_to(PUBLIC), mock.patch.object(jobs, 'post_pinned') as post:
+            post.return_value.status_code = 200
+            self.assertEqual(deliver_callbacks(), 2)
+        self.assertEqual([(c.args[:2], c.kwargs['json']['result']) for c in post.call_args_list], [
+            (('https://a.example.com/cb', PUBLIC), {'subject': 'x'}),
+            (('https://b.example.com/cb', PUBLIC), {'subject': 'x'}),
+        ])
+        self.assertFalse(BackgroundCheckCallback.objects.filter(delivered_at=None).exists())
+
+    def test_host_that_now_resolves_internally_is_not_called(self):
+        with _resolves_to(PUBLIC):
+            job, _ = submit_job('John', 'Smith', '', '', 'https://hooks.example.com/cb')
+        self._finish(job)
+
+        with _resolves_to('10.0.0.5'), mock.patch.object(jobs, 'post_pinned') as post, \
+                self.assertLogs('lookup.jobs', 'WARNING'):
+            self.assertEqual(deliver_callbacks(), 0)
+        post.assert_not_called()
+        callback = job.callbacks.get()
+        self.assertEqual((callback.next_at, callback.error), (None, 'callback_url must point to a public address'))
+
+    def test_failed_callbacks_back_off_then_give_up(self):
+        with _resolves_to(PUBLIC):
+            job, _ = submit_job('John', 'Smith', '', '', 'https://hooks.example.com/cb')
+        self._finish(job)
+
+        with _resolves_to(PUBLIC), \
+                mock.patch.object(jobs, 'post_pinned', side_effect=requests.ConnectionError('refused')), \
+                self.settings(JOB_CALLBACK_MAX_ATTEMPTS=2):
+            with self.assertLogs('lookup.jobs', 'WARNING') as logs:
+                deliver_callbacks()
+            self.assertIn('will retry', logs.output[0])
+            callback = job.callbacks.get()
+            self.assertGreater(callback.next_at, timezone.now() + timedelta(seconds=25))
+
+            BackgroundCheckCallback.objects.update(next_at=timezone.now())
+            with self.assertLogs('lookup.jobs', 'WARNING') as logs:
+                deliver_callbacks()
+            self.assertIn('giving up', logs.output[0])
+        callback.refresh_from_db()
+        self.assertEqual((callback.attempts, callback.next_at, callback.error), (2, None, 'refused'))
@@ -0,0 +1,218 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from lookup import nanp
+from lookup.nanp import (
+    DEFAULT_CARRIER, HEADER, NANPDatasetError, NANPTableBuilder, build_nanp_table, load_nanp_file,
+    write_nanp_file,
+)
+
+
+class NANPTableTests(SimpleTestCase):
+    def test_builtin_area_codes_resolve_for_every_exchange(self):
+        table = build_nanp_table()
+        self.assertEqual(table.lookup(718, 0), ('Brooklyn/Queens, New York', 'T-Mobile'))
+        self.assertEqual(table.lookup(718, 999), ('Brooklyn/Queens, New York', 'T-Mobile'))
+        self.assertEqual(table.lookup_national('2125551234'), ('Manhattan, New York', 'Verizon Wireless'))
+
+    def test_unknown_area_code_gets_a_generic_location(self):
+        builder = NANPTableBuilder()
+        table = builder.build()
+        self.assertEqual(table.lookup(555, 123), ('Area Code 555, United States', DEFAULT_CARRIER))
+        self.assertEqual(table.area_code_count, 0)
+
+    def test_exchange_rows_refine_their_area_code(self):
+        builder = NANPTableBuilder()
+        builder.add_area_code(718, 'Brooklyn', 'T-Mobile')
+        builder.add_exchange(718, 222, 'Park Slope', 'Verizon')
+        builder.add_exchange(718, 223, carrier='AT&T')
+        table = builder.build()
+
+        self.assertEqual(table.lookup(718, 222), ('Park Slope', 'Verizon'))
+        self.assertEqual(table.lookup(718, 223), ('Brooklyn', 'AT&T'))
+        self.assertEqual(table.lookup(718, 224), ('Brooklyn', 'T-Mobile'))
+        self.assertEqual(table.area_code_count, 1)
+        self.assertEqual(table.exchange_count, 2)
+
+    def test_strings_are_interned_once(self):
+        builder = NANPTableBuilder()
+        before = len(builder.build())
+        builder.add_area_code(212, 'Manhattan', 'Verizon')
+        builder.add_area_code(646, 'Manhattan', 'Verizon')
+        self.assertEqual(len(builder.build()), before + 2)
+
+    def test_csv_rows_are_loaded_and_bad_rows_skipped(self):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        self.addCleanup(os.unlink, path)
+        with os.fdopen(fd, 'w') as f:
+            f.write('npa,nxx,location,carrier\n'
+                    '718,,Brooklyn,T-Mobile\n'
+                    '718,222,Park Slope,Verizon\n'
+                    '100,222,Nowhere,Nobody\n'
+                    'abc,,Bad,Row\n')
+
+        builder = NANPTableBuilder()
+        with self.assertLogs('lookup.nanp', 'WARNING'):
+            self.assertEqual(builder.load_csv(path), 2)
+        table = builder.build()
+        self.assertEqual(table.lookup(718, 222), ('Park Slope', 'Verizon'))
+        self.assertEqual(table.lookup(718, 221), ('Brooklyn', 'T-Mobile'))
+
+    def test_small_pools_use_two_byte_slots(self):
+        table = build_nanp_table()
+        self.assertEqual(table.locations.itemsize, 2)
+        self.assertEqual(len(table.locations), 1000 * 1000)
+
+
+def _table(location):
+    builder = NANPTableBuilder()
+    builder.add_area_code(718, location, 'T-Mobile')
+    return builder.build()
+
+
+class NANPFileTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, 'nanp.bin')
+
+    def test_round_trip_maps_the_same_table(self):
+        size = write_nanp_file(_table('Brooklyn'), self.path, version=7)
+        self.assertEqual(os.path.getsize(self.path), size)
+
+        table = load_nanp_file(self.path)
+        self.addCleanup(table.close)
+        self.assertEqual(table.version, 7)
+        self.assertEqual(table.source, self.path)
+        self.assertEqual(table.area_code_count, 1)
+        self.assertEqual(table.lookup(718, 222), ('Brooklyn', 'T-Mobile'))
+        self.assertEqual(table.lookup(555, 1), ('Area Code 555, United States', DEFAULT_CARRIER))
+
+    def test_close_unmaps_the_file(self):
+        write_nanp_file(_table('Brooklyn'), self.path, version=1)
+        table = load_nanp_file(self.path)
+        mapping = table.mapping
+        table.close()
+        self.assertTrue(mapping.closed)
+        self.assertIsNone(table.mapping)
+        with self.assertRaises(ValueError):
+            table.lookup(718, 222)
+        table.close()
+
+    def test_corrupt_body_fails_the_checksum(self):
+        write_nanp_file(_table('Brooklyn'), self.path, version=1)
+        with open(self.path, 'r+b') as f:
+            f.seek(HEADER.size + 10)
+            byte = f.read(1)
+            f.seek(HEADER.size + 10)
+            f.write(bytes([byte[0] ^ 0xFF]))
+
+        with self.assertRaisesMessage(NANPDatasetError, 'checksum'):
+            load_nanp_file(self.path)
+        load_nanp_file(self.path, verify=False).close()
+
+    def test_truncated_and_foreign_files_are_refused(self):
+        write_nanp_file(_table('Brooklyn'), self.path, version=1)
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 2)
+        with self.assertRaisesMessage(NANPDatasetError, 'expected'):
+            load_nanp_file(self.path)
+
+        with open(self.path, 'wb') as f:
+            f.write(b'PK' + b'\0' * HEADER.size)
+        with self.assertRaisesMessage(NANPDatasetError, 'not a NANP dataset'):
+            load_nanp_file(self.path)
+
+        with self.assertRaises(NANPDatasetError):
+            load_nanp_file(os.path.join(self.dir, 'missing.bin'))
+
+
+class GetNANPTableTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, 'nanp.bin')
+        write_nanp_file(_table('Brooklyn'), self.path, version=1)
+
+        state = (nanp._table, nanp._file_stat, nanp._next_check, nanp._reloading)
+        self.addCleanup(self._restore, state)
+        nanp._table, nanp._file_stat, nanp._next_check, nanp._reloading = None, None, 0.0, False
+
+        settings = override_settings(NANP_DATASET_FILE=self.path, NANP_RELOAD_INTERVAL=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def _restore(self, state):
+        nanp._table, nanp._file_stat, nanp._next_check, nanp._reloading = state
+
+    def _replace_file(self, location, version):
+        write_nanp_file(_table(location), self.path, version=version)
+
+    def test_concurrent_first_calls_load_once(self):
+        barrier = threading.Barrier(4)
+        tables = []
+
+        def first_call():
+            barrier.wait()
+            tables.append(nanp.get_nanp_table())
+
+        with mock.patch.object(nanp, '_load_table', wraps=nanp._load_table) as load:
+            threads = [threading.Thread(target=first_call) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual(len({id(table) for table in tables}), 1)
+
+    def test_replaced_file_is_swapped_in_the_background(self):
+        old = nanp.get_nanp_table()
+        self.assertEqual(old.version, 1)
+        self._replace_file('Queens', version=2)
+
+        started = []
+        with mock.patch.object(nanp.threading, 'Thread') as thread, \
+                mock.patch.object(nanp, '_retire') as retire:
+            thread.side_effect = lambda **kwargs: started.append(kwargs) or mock.Mock()
+            # The request that notices the change keeps the old table
+            self.assertIs(nanp.get_nanp_table(), old)
+            self.assertIs(nanp.get_nanp_table(), old)
+            self.assertEqual(len(started), 1)
+
+            started[0]['target']()
+            retire.assert_called_once_with(old)
+
+        new = nanp.get_nanp_table()
+        self.assertEqual(new.version, 2)
+        self.assertEqual(new.lookup(718, 222), ('Queens', 'T-Mobile'))
+        self.assertFalse(nanp._reloading)
+        old.close()
+
+    def test_retired_tables_are_unmapped_after_a_grace_period(self):
+        old = nanp.get_nanp_table()
+        mapping = old.mapping
+        with mock.patch.object(nanp.threading, 'Timer') as timer:
+            nanp.reload_nanp_table()
+        delay, close = timer.call_args[0]
+        self.assertGreaterEqual(delay, 1)
+        self.assertFalse(mapping.closed)
+
+        close()
+        self.assertTrue(mapping.closed)
+        self.assertEqual(nanp.get_nanp_table().lookup(718, 1), ('Brooklyn', 'T-Mobile'))
+
+    def test_corrupt_replacement_falls_back_to_the_builtin_table(self):
+        nanp.get_nanp_table()
+        with open(self.path, 'wb') as f:
+            f.write(b'garbage')
+
+        with self.assertLogs('lookup.nanp', 'ERROR'):
+            table = nanp.reload_nanp_table()
+        self.assertEqual(table.source, 'memory')
+        self.assertEqual(table.lookup(718, 1), ('Brooklyn/Queens, New York', 'T-Mobile'))
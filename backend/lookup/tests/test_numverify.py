@@ -0,0 +1,132 @@
+import asyncio
+import threading
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from lookup.numverify import NumVerifyClient, NumVerifyError, NumVerifyUnavailable
+from lookup.resilience import CircuitBreaker
+
+
+def _response(status=200, data=None):
+    response = mock.Mock(status_code=status)
+    response.json.return_value = data if data is not None else {'valid': True}
+    return response
+
+
+class NumVerifyClientTests(SimpleTestCase):
+    def _client(self, **kwargs):
+        kwargs.setdefault('backoff_base', 0)
+        return NumVerifyClient('http://numverify.test/validate', **kwargs)
+
+    def test_transient_failures_are_retried(self):
+        client = self._client(max_retries=2)
+        session = client._get_session()
+        with mock.patch.object(session, 'get', side_effect=[_response(503), _response(data={'valid': False})]), \
+                self.assertLogs('lookup.numverify', 'WARNING'):
+            self.assertEqual(client.validate('12125551234', 'key'), {'valid': False})
+        self.assertEqual(client.stats()['retries'], 1)
+        self.assertEqual(client.stats()['failures'], 0)
+
+    def test_last_error_is_raised_when_retries_run_out(self):
+        client = self._client(max_retries=1)
+        session = client._get_session()
+        with mock.patch.object(session, 'get', side_effect=requests.ConnectionError('refused')), \
+                self.assertLogs('lookup.numverify', 'WARNING'), \
+                self.assertRaisesMessage(NumVerifyError, 'refused'):
+            client.validate('12125551234', 'key')
+        self.assertEqual(client.stats()['failures'], 1)
+        self.assertEqual(client.stats()['in_flight'], 0)
+
+    def test_open_circuit_fails_fast(self):
+        breaker = CircuitBreaker('test', min_calls=1)
+        breaker.record_failure()
+        client = self._client(breaker=breaker)
+        session = client._get_session()
+        with mock.patch.object(session, 'get') as get, self.assertRaises(NumVerifyUnavailable):
+            client.validate('12125551234', 'key')
+        get.assert_not_called()
+        # The slot was handed back even though no request went out
+        self.assertTrue(client._slots.acquire(blocking=False))
+
+    def test_waiting_for_a_connection_is_bounded(self):
+        breaker = mock.Mock(wraps=CircuitBreaker('test'))
+        client = self._client(pool_size=1, pool_timeout=0.05, breaker=breaker)
+        session = client._get_session()
+        release, entered = threading.Event(), threading.Event()
+
+        def slow_get(*args, **kwargs):
+            entered.set()
+            release.wait(5)
+            return _response()
+
+        with mock.patch.object(session, 'get', side_effect=slow_get):
+            holder = threading.Thread(target=client.validate, args=('12125551234', 'key'))
+            holder.start()
+            entered.wait(5)
+            with self.assertRaisesMessage(NumVerifyError, 'No NumVerify connection free'):
+                client.validate('12125559876', 'key')
+            release.set()
+            holder.join()
+
+        # Only the call that got a connection went through the breaker
+        self.assertEqual(breaker.allow.call_count, 1)
+        self.assertEqual(client.pool_stats(), {'pool_waits': 1, 'pool_timeouts': 1})
+        self.assertEqual(client.stats()['failures'], 1)
+
+    def test_adapter_does_not_block_on_the_urllib3_pool(self):
+        adapter = self._client()._get_session().get_adapter('https://numverify.test/')
+        self.assertFalse(adapter._pool_block)
+
+
+class AsyncNumVerifyClientTests(SimpleTestCase):
+    def _client(self, **kwargs):
+        return NumVerifyClient('http://numverify.test/validate', backoff_base=0, **kwargs)
+
+    def test_client_is_closed_when_its_loop_shuts_down(self):
+        client = self._client()
+
+        async def lookup():
+            pool = await client._get_async_pool()
+            with mock.patch.object(pool.client, 'get', return_value=_response()):
+                self.assertEqual(await client.avalidate('12125551234', 'key'), {'valid': True})
+            self.assertIs(await client._get_async_pool(), pool)
+            return pool.client
+
+        http = asyncio.run(lookup())
+        self.assertTrue(http.is_closed)
+
+    def test_aclose_closes_the_current_loops_client(self):
+        client = self._client()
+
+        async def lookup():
+            first = await client._get_async_pool()
+            await client.aclose()
+            self.assertTrue(first.client.is_closed)
+            second = await client._get_async_pool()
+            self.assertIsNot(second.client, first.client)
+
+        asyncio.run(lookup())
+
+    def test_waiting_for_a_connection_is_bounded(self):
+        client = self._client(pool_size=1, pool_timeout=0.05)
+
+        async def lookups():
+            pool = await client._get_async_pool()
+            release = asyncio.Event()
+
+            async def slow_get(*args, **kwargs):
+                await release.wait()
+                return _response()
+
+            with mock.patch.object(pool.client, 'get', side_effect=slow_get):
+                holder = asyncio.create_task(client.avalidate('12125551234', 'key'))
+                await asyncio.sleep(0)
+                with self.assertRaisesMessage(NumVerifyError, 'No NumVerify connection free'):
+                    await client.avalidate('12125559876', 'key')
+                release.set()
+                self.assertEqual(await holder, {'valid': True})
+
+        asyncio.run(lookups())
+        self.assertEqual(client.pool_stats(), {'pool_waits': 1, 'pool_timeouts': 1})
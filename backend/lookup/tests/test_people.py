@@ -0,0 +1,115 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase
+
+from lookup import people
+from lookup.models import PersonRecord
+from lookup.people import (
+    PEOPLE_INDEX_VERSION_KEY, PeopleIndex, SharedPeopleIndex, name_key, normalize_name, soundex, state_key,
+    synthetic_people, trigrams,
+)
+
+ROWS = [
+    (1, 'John', 'Smith', 'Austin', 'TX'),
+    (2, 'Jon', 'Smith', 'Dallas', 'Texas'),
+    (3, 'John', 'Smyth', 'Austin', 'TX'),
+    (4, 'Jane', 'Smith', 'Boston', 'MA'),
+    (5, 'John', 'Smithson', 'Austin', 'TX'),
+    (6, 'Maria', 'De la Cruz', 'Miami', 'FL'),
+    (7, 'John', 'Smith', 'Boston', 'MA'),
+    (8, 'Xavier', 'Quinn', 'Austin', 'TX'),
+]
+
+
+class NameKeyTests(SimpleTestCase):
+    def test_names_are_normalized_to_ascii_words(self):
+        self.assertEqual(normalize_name("  José  O'Brien-Smith "), 'jose obrien smith')
+        self.assertEqual(name_key('De la Cruz'), 'delacruz')
+        self.assertEqual(state_key('texas'), 'TX')
+        self.assertEqual(state_key('tx'), 'TX')
+
+    def test_soundex_codes(self):
+        for name, code in (('Robert', 'R163'), ('Rupert', 'R163'), ('Ashcraft', 'A261'),
+                           ('Tymczak', 'T522'), ('Pfister', 'P236'), ('Lee', 'L000'), ('', '')):
+            self.assertEqual(soundex(name), code, name)
+
+    def test_trigrams_are_padded_like_pg_trgm(self):
+        self.assertEqual(trigrams('jon'), {'  j', ' jo', 'jon', 'on '})
+
+
+class PeopleIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = PeopleIndex.build(ROWS)
+
+    def test_exact_name_in_the_right_place_ranks_first(self):
+        matches, count = self.index.search('John', 'Smith', city='Austin', state='TX')
+        self.assertEqual(matches[0], (1, 1.0))
+        self.assertEqual({m.record_id for m in matches}, {1, 2, 3, 5, 7})
+        self.assertEqual([m.score for m in matches], sorted((m.score for m in matches), reverse=True))
+        # The same name elsewhere only misses the location share
+        self.assertEqual(dict(matches)[7], 0.9)
+        self.assertEqual(count, 5)
+
+    def test_misspelled_and_phonetic_names_match(self):
+        matches, _ = self.index.search('Jhon', 'Smithe')
+        self.assertIn(1, [m.record_id for m in matches])
+        self.assertLess(matches[0].score, 1.0)
+
+    def test_single_name_searches(self):
+        matches, count = self.index.search(last_name='delacruz')
+        self.assertEqual((matches[0].record_id, count), (6, 1))
+        matches, _ = self.index.search(first_name='Xavier')
+        self.assertEqual([m.record_id for m in matches], [8])
+        self.assertEqual(self.index.search(), ([], 0))
+        self.assertEqual(self.index.search('Zzyzx', 'Qwerty'), ([], 0))
+
+    def test_state_names_and_codes_are_the_same_state(self):
+        matches, _ = self.index.search('Jon', 'Smith', state='Texas')
+        self.assertEqual(matches[0].record_id, 2)
+
+    def test_limit_keeps_the_best_matches_in_a_stable_order(self):
+        matches, count = self.index.search('John', 'Smith', limit=2)
+        self.assertEqual([m.record_id for m in matches], [1, 7])
+        self.assertEqual(count, 5)
+
+    def test_synthetic_records_are_searchable(self):
+        records = list(synthetic_people(500, seed=3))
+        index = PeopleIndex.build(
+            (n, r['first_name'], r['last_name'], r['city'], r['state']) for n, r in enumerate(records)
+        )
+        target = records[123]
+        matches, _ = index.search(target['first_name'], target['last_name'], target['city'], target['state'])
+        self.assertEqual(matches[0].score, 1.0)
+        self.assertEqual(records[matches[0].record_id]['last_name'], target['last_name'])
+
+
+class SharedPeopleIndexTests(TestCase):
+    def setUp(self):
+        cache.delete(PEOPLE_INDEX_VERSION_KEY)
+        PersonRecord.objects.create(first_name='John', last_name='Smith', city='Austin', state='TX')
+
+    def test_saves_trigger_a_background_rebuild(self):
+        shared = SharedPeopleIndex(sync_interval=0)
+        with self.assertLogs('lookup.people', 'INFO'):
+            self.assertEqual(len(shared.get()), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PersonRecord.objects.create(first_name='Jane', last_name='Doe')
+        with mock.patch.object(people.threading, 'Thread') as thread:
+            old = shared.get()
+        self.assertEqual(len(old), 1)
+        target, (version,) = thread.call_args.kwargs['target'], thread.call_args.kwargs['args']
+
+        with self.assertLogs('lookup.people', 'INFO'):
+            target(version)
+        self.assertEqual(len(shared.get()), 2)
+        self.assertEqual(shared.loads, 2)
+
+    def test_failed_load_serves_an_empty_index_and_retries(self):
+        shared = SharedPeopleIndex(sync_interval=0)
+        with mock.patch.object(PeopleIndex, 'build', side_effect=[DatabaseError('gone'), PeopleIndex.build([])]), \
+                self.assertLogs('lookup.people', 'ERROR'):
+            self.assertEqual(len(shared.get()), 0)
+        self.assertIs(shared._version, people._RETRY)
@@ -0,0 +1,107 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from lookup import utils
+from lookup.area_codes import FAST_PATH_AREA_CODES
+from lookup.utils import (
+    ParseCache, ParsedPhone, _parse_cleaned, _parse_nanp_fast, get_parse_cache_stats, parse_phone,
+)
+
+
+def _fields(parsed):
+    return (parsed.valid, parsed.normalized, parsed.region_code, parsed.national_number,
+            parsed.formatted, parsed.line_type)
+
+
+class NANPFastPathTests(SimpleTestCase):
+    def test_fast_path_matches_phonenumbers_for_every_area_code(self):
+        for npa in sorted(FAST_PATH_AREA_CODES):
+            for cleaned in (f'{npa}2345678', f'1{npa}2345678', f'+1{npa}2345678'):
+                fast = _parse_nanp_fast(cleaned, 'US')
+                self.assertIsNotNone(fast, cleaned)
+                with mock.patch.object(utils, '_FAST_PATH_ENABLED', False):
+                    slow = _parse_cleaned(cleaned, 'US')
+                self.assertEqual(_fields(fast), _fields(slow), cleaned)
+
+    def test_inputs_with_unknown_outcome_fall_back(self):
+        self.assertIsNone(_parse_nanp_fast('7181234567', 'US'))   # exchange starts with 1
+        self.assertIsNone(_parse_nanp_fast('7180234567', 'US'))   # exchange starts with 0
+        self.assertIsNone(_parse_nanp_fast('5552345678', 'US'))   # not a fast-path area code
+        self.assertIsNone(_parse_nanp_fast('718234567', 'US'))    # too short
+        self.assertIsNone(_parse_nanp_fast('+447911123456', 'US'))
+        self.assertIsNone(_parse_nanp_fast('7182345678', 'GB'))
+        self.assertIsNone(_parse_nanp_fast('718२345678', 'US'))   # non-ASCII digit
+
+    def test_fast_path_is_used_for_plain_us_numbers(self):
+        with mock.patch.object(utils.phonenumbers, 'parse', side_effect=AssertionError):
+            parsed = _parse_cleaned('7182345678', 'US')
+        self.assertEqual(parsed.normalized, '+17182345678')
+        self.assertEqual(parsed.area_code, '718')
+
+    def test_fast_path_switches_off_for_other_phonenumbers_versions(self):
+        with mock.patch.object(utils, '_FAST_PATH_ENABLED', False), \
+                mock.patch.object(utils, '_parse_nanp_fast', side_effect=AssertionError):
+            parsed = _parse_cleaned('7182345678', 'US')
+        self.assertTrue(parsed.valid)
+
+    def test_slow_path_keeps_invalid_numbers_formattable(self):
+        parsed = _parse_cleaned('7181234567', 'US')
+        self.assertFalse(parsed.valid)
+        self.assertEqual(parsed.error, 'Phone number is not valid')
+        self.assertIsNone(parsed.normalized)
+        self.assertEqual(parsed.national_number, '7181234567')
+
+    def test_parse_phone_reports_unparseable_input(self):
+        self.assertEqual(parse_phone('').error, 'Phone number is required')
+        self.assertTrue(parse_phone('+99').error.startswith('Invalid phone number format'))
+        self.assertEqual(parse_phone('+44 7911 123456').formatted, '+44 7911 123456')
+
+
+class ParseCacheTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(utils, '_parse_cache', ParseCache(maxsize=2))
+        self.cache = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        a, b, c = (ParsedPhone(valid=False, error=name) for name in 'abc')
+        self.cache.put(('1', 'US'), a)
+        self.cache.put(('2', 'US'), b)
+        self.assertIs(self.cache.get(('1', 'US')), a)
+        self.cache.put(('3', 'US'), c)
+
+        self.assertIsNone(self.cache.get(('2', 'US')))
+        self.assertIs(self.cache.get(('1', 'US')), a)
+        self.assertIs(self.cache.get(('3', 'US')), c)
+        self.assertEqual(self.cache.stats(), {
+            'size': 2, 'maxsize': 2, 'hits': 3, 'misses': 1, 'evictions': 1,
+        })
+
+    def test_zero_size_disables_caching(self):
+        cache = ParseCache(maxsize=0)
+        cache.put(('1', 'US'), ParsedPhone(valid=False))
+        self.assertIsNone(cache.get(('1', 'US')))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_formatting_variants_share_one_entry(self):
+        first = parse_phone('(718) 234-5678')
+        with mock.patch.object(utils, '_parse_cleaned', side_effect=AssertionError):
+            self.assertIs(parse_phone('718.234.5678'), first)
+            self.assertIs(parse_phone(' 718 234 5678 '), first)
+        self.assertEqual(get_parse_cache_stats()['hits'], 2)
+
+    def test_default_region_is_part_of_the_key(self):
+        us = parse_phone('2071234567', 'US')
+        gb = parse_phone('2071234567', 'GB')
+        self.assertIsNot(us, gb)
+        self.assertEqual(gb.region_code, 'GB')
+        self.assertEqual(self.cache.stats()['size'], 2)
+
+    def test_errors_are_not_cached(self):
+        with mock.patch.object(utils, '_parse_cleaned', side_effect=RuntimeError('boom')):
+            with self.assertLogs('lookup.utils', 'ERROR'):
+                parsed = parse_phone('7182345678')
+        self.assertEqual(parsed.error, 'Phone number validation failed')
+        self.assertEqual(self.cache.stats()['size'], 0)
+        self.assertTrue(parse_phone('7182345678').valid)
@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+from django.test import SimpleTestCase
+
+from lookup.providers import PHONE, LookupPipeline, ProviderRegistry, ProviderResult, build_registry, merge_results
+from lookup.providers.stub import StubProvider
+
+
+def _stub(name, fields, confidence=None, **kwargs):
+    return StubProvider(name=name, kinds=[PHONE], fields={PHONE: fields},
+                        field_confidence=confidence, latency=0.0, jitter=0.0, **kwargs)
+
+
+class SlowFirstCallProvider(StubProvider):
+    """Answers the first call after tail_latency and every later call at once"""
+
+    def _draw(self):
+        with self._random_lock:
+            self.calls += 1
+            return (self.tail_latency if self.calls == 1 else 0.0), False
+
+
+class MergeResultsTests(SimpleTestCase):
+    def test_agreeing_providers_pool_their_confidence(self):
+        a = _stub('a', {}, {'carrier': 0.6})
+        b = _stub('b', {}, {'carrier': 0.5})
+        c = _stub('c', {}, {'carrier': 0.7})
+        merged = merge_results([
+            (a, ProviderResult('a', {'carrier': 'Verizon'})),
+            (b, ProviderResult('b', {'carrier': 'Verizon'})),
+            (c, ProviderResult('c', {'carrier': 'AT&T'})),
+        ])
+        # 1 - (1 - 0.6) * (1 - 0.5) = 0.8 beats a lone 0.7
+        self.assertEqual(merged.fields['carrier'], 'Verizon')
+        self.assertEqual(merged.sources['carrier'], 'a')
+        self.assertEqual(merged.confidence['carrier'], 0.8)
+
+    def test_ties_go_to_the_first_provider(self):
+        a = _stub('a', {}, default_confidence=0.5)
+        b = _stub('b', {}, default_confidence=0.5)
+        merged = merge_results([
+            (a, ProviderResult('a', {'line_type': 'mobile'})),
+            (b, ProviderResult('b', {'line_type': 'landline'})),
+        ])
+        self.assertEqual(merged.fields['line_type'], 'mobile')
+
+    def test_failed_results_and_empty_values_are_ignored(self):
+        a = _stub('a', {}, default_confidence=0.9)
+        b = _stub('b', {}, default_confidence=0.1)
+        merged = merge_results([
+            (a, ProviderResult('a', error='timeout')),
+            (b, ProviderResult('b', {'carrier': 'T-Mobile', 'location': ''})),
+        ])
+        self.assertEqual(merged.fields, {'carrier': 'T-Mobile'})
+        self.assertEqual(len(merged.providers), 2)
+
+
+class LookupPipelineTests(SimpleTestCase):
+    def test_slow_provider_is_hedged(self):
+        provider = SlowFirstCallProvider(name='slow', kinds=[PHONE], fields={PHONE: {'carrier': 'X'}},
+                                         tail_latency=1.0, hedge_min_delay=0.01, hedge_max_delay=0.1)
+        pipeline = LookupPipeline(ProviderRegistry([provider]), timeout=2.0, hedging=True)
+
+        started = time.monotonic()
+        result = pipeline.run(PHONE, {})
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(result.fields, {'carrier': 'X'})
+        self.assertTrue(result.providers[0].hedged)
+        self.assertEqual(pipeline.hedge_wins, 1)
+        self.assertLess(elapsed, 0.8)
+
+    def test_provider_past_the_deadline_times_out(self):
+        fast = _stub('fast', {'carrier': 'Fast'})
+        slow = StubProvider(name='slow', kinds=[PHONE], fields={PHONE: {'line_type': 'voip'}},
+                            latency=1.0, jitter=0.0)
+        pipeline = LookupPipeline(ProviderRegistry([fast, slow]), timeout=0.1, hedging=False)
+
+        started = time.monotonic()
+        result = pipeline.run(PHONE, {})
+
+        self.assertLess(time.monotonic() - started, 0.8)
+        self.assertEqual(result.fields, {'carrier': 'Fast'})
+        self.assertEqual([r.error for r in result.providers], [None, 'timeout'])
+        self.assertEqual(pipeline.timeouts, 1)
+
+    def test_async_run_times_out_and_merges(self):
+        fast = _stub('fast', {'carrier': 'Fast'})
+        slow = StubProvider(name='slow', kinds=[PHONE], fields={PHONE: {'carrier': 'Slow'}},
+                            latency=1.0, jitter=0.0)
+        pipeline = LookupPipeline(ProviderRegistry([fast, slow]), timeout=0.1, hedging=False)
+
+        result = asyncio.run(pipeline.arun(PHONE, {}))
+
+        self.assertEqual(result.fields, {'carrier': 'Fast'})
+        self.assertEqual(result.providers[1].error, 'timeout')
+
+    def test_failing_provider_is_reported(self):
+        broken = _stub('broken', {'carrier': 'X'}, failure_rate=1.0)
+        result = LookupPipeline(ProviderRegistry([broken]), timeout=1.0).run(PHONE, {})
+        self.assertEqual(result.fields, {})
+        self.assertIn('simulated failure', result.providers[0].error)
+
+
+class ProviderRegistryTests(SimpleTestCase):
+    def test_for_kind_keeps_registration_order(self):
+        phone = _stub('phone', {})
+        people = StubProvider(name='people', kinds=['people'])
+        both = StubProvider(name='both', kinds=[PHONE, 'people'])
+        registry = ProviderRegistry([phone, people, both])
+        self.assertEqual([p.name for p in registry.for_kind(PHONE)], ['phone', 'both'])
+        self.assertEqual([p.name for p in registry.for_kind('people')], ['people', 'both'])
+
+    def test_duplicate_names_are_refused(self):
+        registry = ProviderRegistry([_stub('a', {})])
+        with self.assertRaises(ValueError):
+            registry.register(_stub('a', {}))
+
+    def test_local_provider_comes_first_and_unknown_names_are_skipped(self):
+        registry = build_registry(['stub', 'no-such-provider', 'local'])
+        self.assertEqual(registry.names(), ['local', 'stub'])
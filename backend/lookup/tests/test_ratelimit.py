@@ -0,0 +1,149 @@
+import asyncio
+import functools
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from lookup import ratelimit, views
+from lookup.models import IPRateLimit
+from lookup.ratelimit import HOUR, RateLimitSnapshotter, SlidingWindowLimiter, Window
+
+
+class SlidingWindowLimiterTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.limiter = SlidingWindowLimiter([Window('minute', 60, 3)], prefix='test-ratelimit')
+
+    def test_limit_within_a_window(self):
+        now = 6000.0
+        decisions = [self.limiter.hit('1.2.3.4', now=now) for _ in range(4)]
+        self.assertEqual([d.allowed for d in decisions], [True, True, True, False])
+        self.assertEqual(decisions[2].remaining, 0)
+        self.assertGreater(decisions[3].retry_after, 0)
+        # Other clients have their own count
+        self.assertTrue(self.limiter.hit('5.6.7.8', now=now).allowed)
+
+    def test_previous_window_slides_out(self):
+        for _ in range(3):
+            self.limiter.hit('1.2.3.4', now=6000.0)
+        # Start of the next window: the whole previous count still applies
+        self.assertFalse(self.limiter.hit('1.2.3.4', now=6060.0).allowed)
+        # Halfway through it, half of the previous count does
+        self.assertTrue(self.limiter.hit('1.2.3.4', now=6090.0).allowed)
+        # Two windows on, nothing is left of it
+        decision = self.limiter.hit('1.2.3.4', now=6180.0)
+        self.assertTrue(decision.allowed)
+        self.assertEqual(decision.remaining, 2)
+
+    def test_rejected_requests_are_not_counted(self):
+        for _ in range(10):
+            self.limiter.hit('1.2.3.4', now=6000.0)
+        self.assertEqual(self.limiter.usage(['1.2.3.4'], now=6000.0)['1.2.3.4']['minute'][0], 3)
+
+    def test_cost_counts_several_lookups(self):
+        self.assertFalse(self.limiter.hit('1.2.3.4', cost=4, now=6000.0).allowed)
+        self.assertTrue(self.limiter.hit('1.2.3.4', cost=3, now=6000.0).allowed)
+
+    def test_async_hit_matches_hit(self):
+        async def hits():
+            return [await self.limiter.ahit('1.2.3.4', now=6000.0) for _ in range(4)]
+
+        self.assertEqual([d.allowed for d in asyncio.run(hits())], [True, True, True, False])
+
+    def test_remaining_is_read_without_charging(self):
+        self.assertEqual(self.limiter.max_cost, 3)
+        self.limiter.hit('1.2.3.4', cost=2, now=6000.0)
+        self.assertEqual(self.limiter.remaining('1.2.3.4', now=6000.0), 1)
+        self.assertEqual(self.limiter.remaining('1.2.3.4', now=6000.0), 1)
+        self.assertEqual(self.limiter.remaining('5.6.7.8', now=6000.0), 3)
+
+    def test_refused_clients_are_tracked_separately(self):
+        for _ in range(4):
+            self.limiter.hit('1.2.3.4', now=6000.0)
+        self.limiter.hit('5.6.7.8', now=6000.0)
+        seen, refused = self.limiter.take_seen()
+        self.assertEqual(sorted(seen), ['1.2.3.4', '5.6.7.8'])
+        self.assertEqual(refused, {'1.2.3.4'})
+        self.assertEqual(self.limiter.take_seen(), ([], set()))
+
+
+class RateLimitSnapshotterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.limiter = SlidingWindowLimiter([Window('hour', HOUR, 3)], prefix='test-ratelimit')
+        self.snapshots = RateLimitSnapshotter(self.limiter, interval=0)
+
+    def _hits(self, client, count):
+        for _ in range(count):
+            self.limiter.hit(client)
+
+    def test_counts_are_upserted(self):
+        self._hits('1.2.3.4', 2)
+        self.assertEqual(self.snapshots.snapshot(), 1)
+        self._hits('1.2.3.4', 1)
+        self.snapshots.snapshot()
+
+        row = IPRateLimit.objects.get(ip_address='1.2.3.4')
+        self.assertEqual(row.hour_count, 3)
+        self.assertFalse(row.is_blocked)
+
+    def test_only_refused_clients_are_blocked(self):
+        # At the limit, but never refused
+        self._hits('1.2.3.4', 3)
+        self._hits('5.6.7.8', 4)
+        self.snapshots.snapshot()
+
+        self.assertFalse(IPRateLimit.objects.get(ip_address='1.2.3.4').is_blocked)
+        refused = IPRateLimit.objects.get(ip_address='5.6.7.8')
+        self.assertTrue(refused.is_blocked)
+        self.assertGreater(refused.blocked_until, timezone.now())
+
+    def test_admin_blocks_are_never_cleared_or_shortened(self):
+        IPRateLimit.objects.create(ip_address='1.2.3.4', is_blocked=True)
+        later = timezone.now() + timedelta(days=7)
+        IPRateLimit.objects.create(ip_address='5.6.7.8', is_blocked=True, blocked_until=later)
+        self._hits('1.2.3.4', 1)
+        self._hits('5.6.7.8', 4)
+        self.snapshots.snapshot()
+
+        indefinite = IPRateLimit.objects.get(ip_address='1.2.3.4')
+        self.assertTrue(indefinite.is_blocked)
+        self.assertIsNone(indefinite.blocked_until)
+        self.assertEqual(indefinite.hour_count, 1)
+        self.assertEqual(IPRateLimit.objects.get(ip_address='5.6.7.8').blocked_until, later)
+
+
+@override_settings(RATE_LIMIT_ENABLED=True)
+class BulkChargeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        limiter = SlidingWindowLimiter([Window('hour', HOUR, 3)], prefix='test-ratelimit')
+        self.limiter = limiter
+        for patcher in (mock.patch.object(views, 'rate_limiter', limiter),
+                        mock.patch.object(views, 'charge', functools.partial(ratelimit.charge, limiter=limiter)),
+                        mock.patch.object(ratelimit.rate_limit_snapshots, 'ensure_started')):
+            patcher.start()
+        self.addCleanup(mock.patch.stopall)
+        self.factory = RequestFactory()
+
+    def _bulk(self, numbers):
+        request = self.factory.post('/api/search/phone/bulk/', json.dumps(numbers), content_type='application/json')
+        return views.phone_bulk_search(request)
+
+    def test_batch_over_the_limit_is_refused_without_charging(self):
+        response = self._bulk(['7182345678'] * 4)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('At most 3 numbers', json.loads(response.content)['error'])
+        self.assertEqual(self.limiter.remaining('127.0.0.1'), 3)
+
+    def test_batch_within_the_limit_is_charged_per_number(self):
+        with mock.patch.object(views, 'lookup_phone_numbers', return_value={}):
+            response = self._bulk(['7182345678'] * 2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-RateLimit-Remaining'], '1')
+        with self.assertLogs('lookup.views', 'WARNING'):
+            self.assertEqual(self._bulk(['7182345678'] * 2).status_code, 429)
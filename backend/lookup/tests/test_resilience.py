@@ -0,0 +1,111 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from lookup import resilience
+from lookup.resilience import AdaptiveTimeout, CircuitBreaker
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(resilience.time, 'monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _breaker(self, **kwargs):
+        kwargs.setdefault('min_calls', 4)
+        kwargs.setdefault('open_seconds', 10)
+        kwargs.setdefault('half_open_calls', 2)
+        return CircuitBreaker('test', window=30, **kwargs)
+
+    def _open(self, breaker):
+        with self.assertLogs('lookup.resilience', 'WARNING'):
+            for _ in range(breaker.min_calls):
+                self.assertTrue(breaker.allow())
+                breaker.record_failure()
+
+    def test_opens_once_enough_calls_fail(self):
+        breaker = self._breaker()
+        for _ in range(2):
+            breaker.record_success()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+        with self.assertLogs('lookup.resilience', 'WARNING'):
+            breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.stats()['rejected'], 1)
+        self.assertEqual(breaker.stats()['times_opened'], 1)
+
+    def test_few_calls_never_open_the_circuit(self):
+        breaker = self._breaker()
+        for _ in range(3):
+            breaker.record_failure()
+        self.assertTrue(breaker.allow())
+
+    def test_old_failures_leave_the_window(self):
+        breaker = self._breaker()
+        for _ in range(3):
+            breaker.record_failure()
+        self.now += 31
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.stats()['window_calls'], 1)
+
+    def test_half_open_trials_close_the_circuit(self):
+        breaker = self._breaker()
+        self._open(breaker)
+        self.now += 10
+
+        with self.assertLogs('lookup.resilience', 'INFO'):
+            self.assertTrue(breaker.allow())
+            self.assertTrue(breaker.allow())
+            # Only half_open_calls trials are let through
+            self.assertFalse(breaker.allow())
+            breaker.record_success()
+            breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.stats()['window_calls'], 0)
+
+    def test_failed_trial_reopens_the_circuit(self):
+        breaker = self._breaker()
+        self._open(breaker)
+        self.now += 10
+
+        with self.assertLogs('lookup.resilience', 'INFO'):
+            self.assertTrue(breaker.allow())
+            breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(breaker.stats()['times_opened'], 2)
+
+        self.now += 9
+        self.assertFalse(breaker.allow())
+
+
+class AdaptiveTimeoutTests(SimpleTestCase):
+    def test_maximum_is_used_until_enough_samples(self):
+        timeout = AdaptiveTimeout(minimum=0.5, maximum=10, min_samples=3)
+        timeout.record(0.1)
+        timeout.record(0.1)
+        self.assertEqual(timeout.current(), 10)
+        timeout.record(0.1)
+        self.assertEqual(timeout.current(), 0.5)
+
+    def test_timeout_follows_the_latency_percentile(self):
+        timeout = AdaptiveTimeout(minimum=0.1, maximum=10, percentile=0.9, multiplier=2, min_samples=10)
+        for latency in range(1, 11):
+            timeout.record(latency / 10)
+        self.assertAlmostEqual(timeout.current(), 1.8)
+        self.assertEqual(timeout.stats(), {'timeout': 1.8, 'samples': 10})
+
+    def test_slow_calls_push_the_timeout_back_up_to_the_maximum(self):
+        timeout = AdaptiveTimeout(minimum=0.1, maximum=3, percentile=0.5, samples=4, min_samples=4)
+        for _ in range(4):
+            timeout.record(0.2)
+        self.assertAlmostEqual(timeout.current(), 0.4)
+        # Timed-out calls are recorded at their timeout
+        for _ in range(10):
+            timeout.record(timeout.current())
+        self.assertEqual(timeout.current(), 3)
@@ -0,0 +1,83 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from lookup.models import SearchLog
+from lookup.search_log import _STOP, SearchLogWriter
+
+
+def _row(number='+12125551234', **fields):
+    return dict(phone_number=number, normalized_number=number, ip_address='9.9.9.9', **fields)
+
+
+class SearchLogWriterTests(TestCase):
+    def _writer(self, **kwargs):
+        writer = SearchLogWriter(**kwargs)
+        # The tests drain the queue on this thread instead of the daemon
+        patcher = mock.patch.object(writer, '_ensure_worker')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return writer
+
+    def test_rows_are_queued_and_written_in_batches(self):
+        writer = self._writer(batch_size=2)
+        for n in range(5):
+            self.assertTrue(writer.log(**_row(f'+1212555000{n}')))
+        self.assertFalse(SearchLog.objects.exists())
+
+        with self.assertNumQueries(3):
+            writer.flush()
+        self.assertEqual(SearchLog.objects.count(), 5)
+        self.assertEqual(writer.stats()['written'], 5)
+        self.assertEqual(writer.stats()['batches'], 3)
+
+    def test_worker_loop_batches_until_stopped(self):
+        writer = self._writer(batch_size=3, flush_interval=60)
+        writer.log_many([_row(f'+1212555000{n}') for n in range(4)])
+        writer._queue.put(_STOP)
+
+        with mock.patch('lookup.search_log.close_old_connections'):
+            writer._run()
+        self.assertEqual(SearchLog.objects.count(), 4)
+        self.assertEqual(writer.batches, 2)
+
+    def test_full_queue_drops_rows_instead_of_blocking(self):
+        writer = self._writer(queue_size=2)
+        with self.assertLogs('lookup.search_log', 'WARNING'):
+            results = [writer.log(**_row()) for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(writer.stats()['dropped'], 1)
+
+    def test_disabled_writer_writes_inline(self):
+        writer = self._writer(enabled=False)
+        self.assertTrue(writer.log(**_row(cache_hit=True)))
+        self.assertTrue(SearchLog.objects.get().cache_hit)
+        self.assertEqual(writer.log_many([_row(), _row()]), 2)
+        self.assertEqual(SearchLog.objects.count(), 3)
+
+    def test_shutdown_flushes_and_later_rows_are_inline(self):
+        writer = self._writer()
+        writer.log(**_row())
+        writer.shutdown()
+        self.assertEqual(SearchLog.objects.count(), 1)
+
+        writer.log(**_row())
+        self.assertEqual(SearchLog.objects.count(), 2)
+        self.assertEqual(writer.stats()['queued'], 0)
+
+    def test_failed_batches_are_counted(self):
+        writer = self._writer()
+        writer.log(**_row())
+        with mock.patch.object(SearchLog.objects, 'bulk_create', side_effect=RuntimeError('db down')), \
+                self.assertLogs('lookup.search_log', 'ERROR'):
+            writer.flush()
+        self.assertEqual(writer.stats()['failed'], 1)
+
+    async def test_async_log_queues_without_the_database(self):
+        writer = self._writer()
+        self.assertTrue(await writer.alog(**_row()))
+        self.assertEqual(writer.stats()['queued'], 1)
+
+        inline = self._writer(enabled=False)
+        self.assertTrue(await inline.alog(**_row()))
+        self.assertEqual(await SearchLog.objects.acount(), 1)
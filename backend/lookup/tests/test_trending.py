@@ -0,0 +1,105 @@
+from django.test import SimpleTestCase, TestCase
+
+from lookup.models import PopularSearch, SearchTrendBucket
+from lookup.trending import BUCKET_SECONDS, HourlyRing, TrendingEngine, decay_weights, score_number
+
+HOUR = 500000
+NOW = HOUR * BUCKET_SECONDS + 60
+
+
+class HourlyRingTests(SimpleTestCase):
+    def test_buckets_outside_the_window_are_ignored(self):
+        ring = HourlyRing(4)
+        ring.advance(HOUR)
+        ring.store([('a', HOUR, 5), ('a', HOUR - 3, 2), ('a', HOUR - 4, 9), ('b', HOUR + 1, 1)])
+        self.assertEqual(ring.numbers, ['a'])
+        self.assertEqual(int(ring.counts[0].sum()), 7)
+
+    def test_advancing_clears_only_the_expired_hours(self):
+        ring = HourlyRing(4)
+        ring.advance(HOUR)
+        ring.store([('a', HOUR, 5), ('a', HOUR - 1, 3)])
+        ring.advance(HOUR + 3)
+        self.assertEqual(ring.scores(1.0)[1].tolist(), [5])
+        # Going back in time is a no-op
+        ring.advance(HOUR)
+        self.assertEqual(ring.head, HOUR + 3)
+        ring.advance(HOUR + 10)
+        self.assertEqual(ring.scores(1.0)[1].tolist(), [0])
+
+    def test_stored_buckets_replace_their_slot(self):
+        ring = HourlyRing(4)
+        ring.advance(HOUR)
+        ring.store([('a', HOUR, 5)])
+        ring.store([('a', HOUR, 7)])
+        self.assertEqual(ring.scores(1.0)[1].tolist(), [7])
+
+    def test_scores_decay_with_age(self):
+        ring = HourlyRing(8)
+        ring.advance(HOUR)
+        ring.store([('new', HOUR, 4), ('old', HOUR - 2, 4)])
+        scores, totals = ring.scores(half_life_hours=2.0)
+        self.assertEqual(scores.tolist(), [4.0, 2.0])
+        self.assertEqual(totals.tolist(), [4, 4])
+
+    def test_compact_drops_numbers_without_searches(self):
+        ring = HourlyRing(2)
+        ring.advance(HOUR)
+        ring.store([('a', HOUR, 1), ('b', HOUR - 1, 1)])
+        ring.advance(HOUR + 1)
+        self.assertEqual(ring.compact(), 1)
+        self.assertEqual(ring.numbers, ['a'])
+        self.assertEqual(ring.rows, {'a': 0})
+
+    def test_weights_halve_every_half_life(self):
+        self.assertEqual(decay_weights([0, 24, 48], 24).tolist(), [1.0, 0.5, 0.25])
+
+
+class TrendingEngineTests(TestCase):
+    def setUp(self):
+        self.engine = TrendingEngine(window_hours=24, half_life_hours=1.0, top_k=2, min_score=3.0)
+
+    def _bucket(self, number, age, count):
+        SearchTrendBucket.objects.update_or_create(phone_number=number, hour=HOUR - age,
+                                                   defaults={'count': count})
+
+    def test_top_numbers_are_ranked_by_decayed_score(self):
+        self._bucket('+12125550001', 0, 4)
+        self._bucket('+12125550002', 1, 10)
+        self._bucket('+12125550003', 3, 16)
+        self._bucket('+12125550004', 24, 100)
+
+        top = self.engine.refresh(NOW)
+        self.assertEqual([(t.phone_number, t.score, t.searches) for t in top],
+                         [('+12125550002', 5.0, 10), ('+12125550001', 4.0, 4)])
+        self.assertEqual(score_number('+12125550003', NOW, 24, 1.0), 2.0)
+
+    def test_later_refreshes_only_read_recent_buckets(self):
+        self._bucket('+12125550001', 5, 4)
+        self.engine.refresh(NOW)
+        self._bucket('+12125550002', 0, 2)
+        self.engine.refresh(NOW)
+        self.assertEqual(self.engine.stats()['buckets_read'], 2)
+        self.assertEqual(self.engine.stats()['numbers_in_window'], 2)
+
+    def test_apply_publishes_scores_and_clears_dropped_numbers(self):
+        for number in ('+12125550001', '+12125550002', '+12125550009'):
+            PopularSearch.objects.create(phone_number=number)
+        PopularSearch.objects.filter(phone_number='+12125550009').update(is_trending=True, trend_score=50)
+        self._bucket('+12125550001', 0, 4)
+        self._bucket('+12125550002', 0, 2)
+
+        with self.assertLogs('lookup.trending', 'INFO'):
+            self.assertEqual(self.engine.apply(self.engine.refresh(NOW)), 3)
+        rows = {row.phone_number: (row.is_trending, row.trend_score) for row in PopularSearch.objects.all()}
+        self.assertEqual(rows, {
+            '+12125550001': (True, 4.0),
+            '+12125550002': (False, 2.0),
+            '+12125550009': (False, 0.0),
+        })
+
+    def test_prune_deletes_buckets_older_than_the_window(self):
+        self._bucket('+12125550001', 0, 1)
+        self._bucket('+12125550001', 24, 1)
+        self.assertEqual(self.engine.prune(NOW), 1)
+        self.assertEqual(SearchTrendBucket.objects.get().hour, HOUR)
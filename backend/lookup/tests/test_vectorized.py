@@ -0,0 +1,52 @@
+from django.test import SimpleTestCase
+
+from lookup.utils import parse_phone
+from lookup.vectorized import (
+    ERROR_AREA_CODE, ERROR_COUNTRY, ERROR_EXCHANGE, ERROR_INPUT, ERROR_LENGTH, ERROR_MESSAGES, OK,
+    normalize_nanp,
+)
+
+
+class NormalizeNANPTests(SimpleTestCase):
+    INPUTS = [
+        '2125551234', '(212) 555-1234', '212.555.1234', '+1 212 555 1234', '1-212-555-1234',
+        '+12125551234', ' 212 555 1234 ext', '7182222222', '3105550199', '9175550000',
+        '2025550123', '8005551212', '212555123', '212555123456', '1212555123',
+        '+442079460958', '+1 112 555 1234', '0125551234', '9115551234', '2120551234',
+        '2121551234', '', 'call me', '+', '1', '+1', '(646) 555-0000 x12',
+    ]
+
+    def test_matches_parse_phone(self):
+        batch = normalize_nanp(self.INPUTS)
+        for raw, e164, valid in zip(self.INPUTS, batch.e164_list(), batch.valid.tolist()):
+            parsed = parse_phone(raw)
+            with self.subTest(raw=raw):
+                if parsed.valid and parsed.region_code == 'US':
+                    self.assertTrue(valid)
+                    self.assertEqual(e164, parsed.normalized)
+                if valid:
+                    self.assertEqual(e164, parse_phone(e164).normalized)
+
+    def test_error_codes(self):
+        batch = normalize_nanp(['(212) 555-1234', '212555123', '+442079460958', '9115551234', '2120551234'])
+        self.assertEqual(batch.error.tolist()[:4], [OK, ERROR_LENGTH, ERROR_COUNTRY, ERROR_AREA_CODE])
+        self.assertFalse(batch.valid[4])
+        self.assertEqual(batch.formatted()[0], b'(212) 555-1234')
+
+    def test_unusable_inputs_are_rejected_per_row(self):
+        batch = normalize_nanp([['2125551234', '3105551234'], '2125551234', '9' * 200000, 2125551234, None])
+        self.assertEqual(batch.error.tolist(), [ERROR_INPUT, OK, ERROR_INPUT, OK, ERROR_LENGTH])
+        self.assertEqual(batch.e164_list()[1], '+12125551234')
+        self.assertEqual(batch.e164_list()[3], '+12125551234')
+
+    def test_exchange_codes_starting_with_0_or_1_are_invalid(self):
+        batch = normalize_nanp(['2120551234', '2121551234'])
+        self.assertEqual(batch.error.tolist(), [ERROR_EXCHANGE, ERROR_EXCHANGE])
+        self.assertEqual(batch.error_messages()[0], ERROR_MESSAGES[ERROR_EXCHANGE])
+        self.assertEqual(batch.e164_list(), [None, None])
+
+    def test_results_do_not_depend_on_the_block_size(self):
+        whole = normalize_nanp(self.INPUTS)
+        blocked = normalize_nanp(self.INPUTS, block_rows=4)
+        self.assertEqual(blocked.e164_list(), whole.e164_list())
+        self.assertEqual(blocked.error.tolist(), whole.error.tolist())
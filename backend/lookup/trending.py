@@ -0,0 +1,249 @@
+"""
+Trending phone numbers from hourly search buckets.
+
+lookup.analytics adds every flushed search count to a SearchTrendBucket
+row for (number, current hour), so the searches for a number over the
+last week are at most TRENDING_WINDOW_HOURS rows found through the
+``hour`` index, never a scan of SearchLog.
+
+TrendingEngine keeps those buckets for every number searched within the
+window in an HourlyRing: one (numbers x window hours) count array in
+which hour h lives in column h % window hours. Moving the ring forward
+only clears the columns of the hours that fell out of the window, and a
+refresh re-reads only the buckets written since the previous one, so a
+long-running engine (``manage.py update_trending --interval``) does work
+proportional to the numbers searched recently. A number's score is its
+bucket counts weighted by 0.5 ** (age in hours / TRENDING_HALF_LIFE_HOURS),
+a single matrix-vector product over the ring.
+
+apply() writes the TRENDING_TOP_K best scores to PopularSearch in one
+bulk update and clears is_trending/trend_score on numbers that dropped
+out; numbers that have no searches left in the window leave the ring.
+"""
+import logging
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import PopularSearch, SearchTrendBucket
+
+logger = logging.getLogger(__name__)
+
+BUCKET_SECONDS = 3600
+
+# Buckets of the previous refresh's last hours are read again, in case a
+# worker flushed counts for them after that refresh
+SETTLE_HOURS = 1
+
+
+def current_hour(now: Optional[float] = None) -> int:
+    """Bucket (hours since the Unix epoch) for a timestamp, default now"""
+    return int((time.time() if now is None else now) // BUCKET_SECONDS)
+
+
+def decay_weights(ages: np.ndarray, half_life_hours: float) -> np.ndarray:
+    """Weight of a search ages hours old; halves every half_life_hours"""
+    return np.exp2(-np.asarray(ages, dtype=np.float64) / half_life_hours)
+
+
+class TrendingNumber(NamedTuple):
+    phone_number: str
+    score: float
+    # Searches within the window, undecayed
+    searches: int
+
+
+class HourlyRing:
+    """Per-number search counts for the last ``hours`` hours, one ring row per number"""
+
+    def __init__(self, hours: int):
+        self.hours = hours
+        self.head: Optional[int] = None
+        self.numbers: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.counts = np.zeros((0, hours), dtype=np.uint32)
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def advance(self, hour: int):
+        """Move the newest hour to hour, clearing the columns that left the window"""
+        if self.head is not None and hour <= self.head:
+            return
+        if self.head is None or hour - self.head >= self.hours:
+            self.counts[:] = 0
+        else:
+            expired = np.arange(self.head + 1, hour + 1) % self.hours
+            self.counts[:, expired] = 0
+        self.head = hour
+
+    def _row_indexes(self, numbers: Iterable[str]) -> np.ndarray:
+        indexes = []
+        for number in numbers:
+            row = self.rows.get(number)
+            if row is None:
+                row = self.rows[number] = len(self.numbers)
+                self.numbers.append(number)
+            indexes.append(row)
+        if len(self.numbers) > len(self.counts):
+            grown = np.zeros((max(len(self.numbers), 2 * len(self.counts)), self.hours), dtype=np.uint32)
+            grown[:len(self.counts)] = self.counts
+            self.counts = grown
+        return np.asarray(indexes, dtype=np.int64)
+
+    def store(self, buckets: List[Tuple[str, int, int]]):
+        """Set (number, hour, count) buckets; hours outside the window are ignored"""
+        buckets = [bucket for bucket in buckets if self.head - self.hours < bucket[1] <= self.head]
+        if not buckets:
+            return
+        numbers, hours, counts = zip(*buckets)
+        rows = self._row_indexes(numbers)
+        # Bucket rows hold running totals, so they replace, not add to, the slot
+        self.counts[rows, np.asarray(hours, dtype=np.int64) % self.hours] = counts
+
+    def compact(self) -> int:
+        """Drop numbers with no searches left in the window; returns how many"""
+        used = self.counts[:len(self.numbers)]
+        active = used.any(axis=1)
+        dropped = len(self.numbers) - int(active.sum())
+        if dropped:
+            self.counts = used[active].copy()
+            self.numbers = [number for number, keep in zip(self.numbers, active.tolist()) if keep]
+            self.rows = {number: row for row, number in enumerate(self.numbers)}
+        return dropped
+
+    def scores(self, half_life_hours: float) -> Tuple[np.ndarray, np.ndarray]:
+        """(decayed score, undecayed total) per number, in self.numbers order"""
+        used = self.counts[:len(self.numbers)]
+        if self.head is None:
+            return np.zeros(0), np.zeros(0, dtype=np.int64)
+        # Column c holds the hour that is (head - c) % hours old
+        ages = (self.head - np.arange(self.hours)) % self.hours
+        return used @ decay_weights(ages, half_life_hours), used.sum(axis=1, dtype=np.int64)
+
+
+class TrendingEngine:
+    """Rank numbers by decayed recent searches and publish the top K to PopularSearch"""
+
+    def __init__(self, window_hours: int = 168, half_life_hours: float = 24.0,
+                 top_k: int = 100, min_score: float = 10.0):
+        self.window_hours = window_hours
+        self.half_life_hours = half_life_hours
+        self.top_k = top_k
+        self.min_score = min_score
+        self.ring = HourlyRing(window_hours)
+        # Numbers given a trend score by the last apply()
+        self._published = None
+
+        self.refreshes = 0
+        self.buckets_read = 0
+
+    def refresh(self, now: Optional[float] = None) -> List[TrendingNumber]:
+        """
+        Bring the ring up to date and rank the numbers in it.
+
+        The first refresh reads the whole window; later ones only the
+        buckets from SETTLE_HOURS before the previous refresh onwards.
+
+        Returns:
+            Up to top_k TrendingNumbers, highest score first
+        """
+        hour = current_hour(now)
+        since = hour - self.window_hours + 1
+        if self.ring.head is not None:
+            since = max(since, self.ring.head - SETTLE_HOURS)
+
+        buckets = list(
+            SearchTrendBucket.objects
+            .filter(hour__gte=since, hour__lte=hour)
+            .values_list('phone_number', 'hour', 'count')
+            .iterator()
+        )
+        self.ring.advance(hour)
+        self.ring.store(buckets)
+        self.ring.compact()
+        self.refreshes += 1
+        self.buckets_read += len(buckets)
+        return self.top()
+
+    def top(self) -> List[TrendingNumber]:
+        scores, totals = self.ring.scores(self.half_life_hours)
+        if not len(scores):
+            return []
+        k = min(self.top_k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [
+            TrendingNumber(self.ring.numbers[row], float(scores[row]), int(totals[row]))
+            for row in best.tolist()
+        ]
+
+    def apply(self, trending: List[TrendingNumber]) -> int:
+        """
+        Store trend scores for the ranked numbers and clear them on the rest.
+
+        Returns:
+            Number of PopularSearch rows updated
+        """
+        scores = {entry.phone_number: entry.score for entry in trending}
+        with transaction.atomic():
+            stale = PopularSearch.objects.exclude(phone_number__in=scores)
+            if self._published is None:
+                # First run in this process: whatever an earlier run published
+                stale = stale.filter(Q(is_trending=True) | Q(trend_score__gt=0))
+            else:
+                stale = stale.filter(phone_number__in=self._published - scores.keys())
+            cleared = stale.update(is_trending=False, trend_score=0.0)
+
+            rows = list(PopularSearch.objects.filter(phone_number__in=scores).only('id', 'phone_number'))
+            for row in rows:
+                row.trend_score = round(scores[row.phone_number], 4)
+                row.is_trending = row.trend_score >= self.min_score
+            PopularSearch.objects.bulk_update(rows, ['trend_score', 'is_trending'], batch_size=500)
+
+        self._published = set(scores)
+        logger.info(
+            f"Trending: {sum(row.is_trending for row in rows)} trending of {len(rows)} scored, "
+            f"{cleared} cleared, {len(self.ring)} numbers in window"
+        )
+        return len(rows) + cleared
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Delete buckets older than the window; returns rows deleted"""
+        oldest = current_hour(now) - self.window_hours + 1
+        return SearchTrendBucket.objects.filter(hour__lt=oldest).delete()[0]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'numbers_in_window': len(self.ring),
+            'refreshes': self.refreshes,
+            'buckets_read': self.buckets_read,
+        }
+
+
+def score_number(phone_number: str, now: Optional[float] = None,
+                 window_hours: Optional[int] = None, half_life_hours: Optional[float] = None) -> float:
+    """Decayed trend score of one number, from its buckets in the window"""
+    window_hours = window_hours or trending.window_hours
+    half_life_hours = half_life_hours or trending.half_life_hours
+    hour = current_hour(now)
+    buckets = SearchTrendBucket.objects.filter(
+        phone_number=phone_number, hour__gt=hour - window_hours, hour__lte=hour
+    ).values_list('hour', 'count')
+    if not buckets:
+        return 0.0
+    hours, counts = zip(*buckets)
+    ages = hour - np.asarray(hours, dtype=np.int64)
+    return round(float(np.dot(counts, decay_weights(ages, half_life_hours))), 4)
+
+
+trending = TrendingEngine(
+    window_hours=getattr(settings, 'TRENDING_WINDOW_HOURS', 168),
+    half_life_hours=getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 24),
+    top_k=getattr(settings, 'TRENDING_TOP_K', 100),
+    min_score=getattr(settings, 'TRENDING_MIN_SCORE', 10.0),
+)
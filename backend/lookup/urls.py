@@ -1,14 +1,26 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Serve the search endpoints from the async views under an ASGI server
+search_views = views
+if settings.LOOKUP_ASYNC_VIEWS:
+    from . import async_views as search_views
+
 app_name = 'lookup'
 
 urlpatterns = [
-    path('health/', views.health_check, name='health_check'),
-    path('search/people/', views.people_search, name='people_search'),  
-    path('search/address/', views.address_search, name='address_search'), 
-    path('search/phone/<str:number>/', views.phone_search, name='phone_search'),
-    path('search/background/', views.background_check_search, name='background_check_search'),  # NEW
+    path('health/', search_views.health_check, name='health_check'),
+    path('search/people/', search_views.people_search, name='people_search'),  
+    path('search/address/', search_views.address_search, name='address_search'), 
+    # Must precede the <str:number> route, which would also match "bulk"
+    path('search/phone/bulk/', views.phone_bulk_search, name='phone_bulk_search'),
+    path('search/phone/bulk/stream/', views.phone_bulk_stream, name='phone_bulk_stream'),
+    path('search/phone/<str:number>/', search_views.phone_search, name='phone_search'),
+    path('search/background/', search_views.background_check_search, name='background_check_search'),  # NEW
+    path('search/background/stream/', search_views.background_check_stream, name='background_check_stream'),
+    path('search/background/jobs/', views.background_check_jobs, name='background_check_jobs'),
+    path('search/background/jobs/<uuid:job_id>/', views.background_check_job, name='background_check_job'),
     path('track/affiliate-click/', views.track_affiliate_click, name='track_affiliate_click'),
     #path('test-api/', views.test_api, name='test_api'),
 ]
\ No newline at end of file
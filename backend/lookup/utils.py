@@ -1,9 +1,13 @@
 import re
 import logging
+import threading
+from collections import OrderedDict
 import phonenumbers
 from phonenumbers import NumberParseException
-import requests
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+from django.conf import settings
+from .area_codes import FAST_PATH_AREA_CODES, FAST_PATH_PHONENUMBERS_VERSION
+from .numverify import NumVerifyUnavailable, numverify_client
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +16,9 @@ def get_client_ip(request) -> str:
     """
     Get the real client IP address from the request.
     Handles proxy headers like X-Forwarded-For.
+
+    The first X-Forwarded-For entry is whatever the client sent, so this is
+    for logging only; rate limits and blocks use get_trusted_client_ip().
     """
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
     if x_forwarded_for:
@@ -23,70 +30,272 @@ def get_client_ip(request) -> str:
     return ip
 
 
-def validate_phone_number(phone_input: str) -> Dict[str, Any]:
+def get_trusted_client_ip(request) -> str:
+    """
+    Get the client IP address that rate limits and blocks are enforced on.
+
+    With TRUSTED_PROXY_COUNT = 0 (no proxy in front of Django) this is
+    REMOTE_ADDR. Behind N trusted proxies it is the Nth X-Forwarded-For
+    entry from the right: each proxy appends the address it received the
+    request from, so entries further left were written by the client and
+    can't be trusted.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR', '127.0.0.1')
+    proxies = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
+    if proxies <= 0:
+        return remote_addr
+    forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+    if not forwarded:
+        return remote_addr
+    # Fewer entries than proxies: the left-most was still added by one of ours
+    return forwarded[-proxies] if len(forwarded) >= proxies else forwarded[0]
+
+
+LINE_TYPE_MAP = {
+    phonenumbers.PhoneNumberType.MOBILE: 'mobile',
+    phonenumbers.PhoneNumberType.FIXED_LINE: 'landline',
+    phonenumbers.PhoneNumberType.FIXED_LINE_OR_MOBILE: 'mobile',
+    phonenumbers.PhoneNumberType.TOLL_FREE: 'toll_free',
+    phonenumbers.PhoneNumberType.VOIP: 'voip',
+}
+
+_FAST_PATH_ENABLED = phonenumbers.__version__ == FAST_PATH_PHONENUMBERS_VERSION
+if not _FAST_PATH_ENABLED:
+    logger.warning(
+        f"phonenumbers {phonenumbers.__version__} installed, fast-path area codes were "
+        f"generated for {FAST_PATH_PHONENUMBERS_VERSION}; NANP fast path disabled"
+    )
+
+
+class ParsedPhone:
+    """
+    Result of parsing a phone number once.
+
+    Produced by parse_phone() and passed through the rest of the request so
+    the number is never parsed twice. Parsed-but-invalid numbers keep their
+    national number and display format so formatting helpers still work.
+    """
+
+    __slots__ = ('valid', 'error', 'normalized', 'region_code', 'national_number',
+                 'formatted', '_line_type', '_number')
+
+    def __init__(self, valid: bool, error: Optional[str] = None, normalized: Optional[str] = None,
+                 region_code: Optional[str] = None, national_number: Optional[str] = None,
+                 formatted: Optional[str] = None, line_type: Optional[str] = None,
+                 number: Optional[phonenumbers.PhoneNumber] = None):
+        self.valid = valid
+        self.error = error
+        self.normalized = normalized
+        self.region_code = region_code
+        self.national_number = national_number
+        self.formatted = formatted
+        self._line_type = line_type
+        self._number = number
+
+    @property
+    def area_code(self) -> Optional[str]:
+        """Area code for US/Canada numbers, None otherwise"""
+        if self.region_code in ('US', 'CA') and self.national_number and len(self.national_number) >= 10:
+            return self.national_number[:3]
+        return None
+
+    @property
+    def line_type(self) -> Optional[str]:
+        """Line type ('mobile', 'landline', ...), resolved on first access"""
+        if self._line_type is None and self.valid and self._number is not None:
+            self._line_type = LINE_TYPE_MAP.get(phonenumbers.number_type(self._number), 'mobile')
+        return self._line_type
+
+    def __repr__(self):
+        return f"<ParsedPhone {self.normalized or self.error}>"
+
+
+class ParseCache:
+    """
+    Bounded, thread-safe LRU of ParsedPhone results for this process.
+
+    Keyed on (cleaned input, default region), so every formatting variant of
+    a number that cleans to the same string shares one entry.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Tuple[str, Optional[str]], ParsedPhone]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple[str, Optional[str]]) -> Optional[ParsedPhone]:
+        with self._lock:
+            parsed = self._data.get(key)
+            if parsed is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return parsed
+
+    def put(self, key: Tuple[str, Optional[str]], parsed: ParsedPhone):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = parsed
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+_parse_cache = ParseCache(getattr(settings, 'PHONE_PARSE_CACHE_SIZE', 10000))
+
+
+def get_parse_cache_stats() -> Dict[str, int]:
+    """Hit/miss/eviction counters of the process-local parse cache"""
+    return _parse_cache.stats()
+
+
+def _parse_nanp_fast(cleaned: str, default_region: Optional[str]) -> Optional[ParsedPhone]:
     """
-    Validate and parse phone number using phonenumbers library.
-    
+    Parse plain 10/11-digit US input without phonenumbers.
+
+    Only handles input whose outcome is known in advance: a [2-9]XX exchange
+    in one of FAST_PATH_AREA_CODES is always a valid US fixed line/mobile
+    number. Returns None for anything else so the caller falls back to
+    phonenumbers.
+    """
+    if cleaned[:2] == '+1':
+        digits = cleaned[2:]
+    elif default_region != 'US':
+        return None
+    elif len(cleaned) == 11 and cleaned[0] == '1':
+        digits = cleaned[1:]
+    else:
+        digits = cleaned
+
+    if len(digits) != 10 or not (digits.isascii() and digits.isdigit()):
+        return None
+    if digits[3] in '01' or digits[:3] not in FAST_PATH_AREA_CODES:
+        return None
+
+    return ParsedPhone(
+        valid=True,
+        normalized='+1' + digits,
+        region_code='US',
+        national_number=digits,
+        formatted=f"({digits[:3]}) {digits[3:6]}-{digits[6:]}",
+        line_type='mobile',
+    )
+
+
+def parse_phone(phone_input: str, default_region: Optional[str] = "US") -> ParsedPhone:
+    """
+    Parse and validate a phone number once.
+
+    Results are memoized per process (PHONE_PARSE_CACHE_SIZE entries), so
+    repeat lookups of popular numbers skip parsing altogether. On a cache
+    miss, plain US numbers in well-known area codes take a pure-Python fast
+    path; everything else goes through phonenumbers.
+
     Args:
         phone_input: Raw phone number string
-        
+        default_region: Region assumed when the input has no country code
+
     Returns:
-        Dict with validation results and normalized number
+        ParsedPhone with validation results and normalized number
     """
     try:
-        # Clean the input
         cleaned_input = clean_phone_input(phone_input)
-        
+
         if not cleaned_input:
-            return {
-                'valid': False,
-                'error': 'Phone number is required',
-                'normalized': None
-            }
-        
-        # Parse the number (default to US if no country code)
-        try:
-            # Try parsing with country code first
-            if cleaned_input.startswith('+'):
-                parsed_number = phonenumbers.parse(cleaned_input, None)
-            else:
-                # Assume US if no country code
-                parsed_number = phonenumbers.parse(cleaned_input, "US")
-        except NumberParseException as e:
-            return {
-                'valid': False,
-                'error': f'Invalid phone number format: {str(e)}',
-                'normalized': None
-            }
-        
-        # Validate the parsed number
-        if not phonenumbers.is_valid_number(parsed_number):
-            return {
-                'valid': False,
-                'error': 'Phone number is not valid',
-                'normalized': None
-            }
-        
-        # Normalize to E.164 format
-        normalized = phonenumbers.format_number(parsed_number, phonenumbers.PhoneNumberFormat.E164)
-        
-        # Get country information
-        country_code = phonenumbers.region_code_for_number(parsed_number)
-        
-        return {
-            'valid': True,
-            'normalized': normalized,
-            'country_code': country_code,
-            'error': None
-        }
-        
+            return ParsedPhone(valid=False, error='Phone number is required')
+
+        cache_key = (cleaned_input, default_region)
+        parsed = _parse_cache.get(cache_key)
+        if parsed is None:
+            parsed = _parse_cleaned(cleaned_input, default_region)
+            _parse_cache.put(cache_key, parsed)
+        return parsed
+
     except Exception as e:
         logger.error(f"Phone validation error for '{phone_input}': {str(e)}")
+        return ParsedPhone(valid=False, error='Phone number validation failed')
+
+
+def _parse_cleaned(cleaned_input: str, default_region: Optional[str]) -> ParsedPhone:
+    if _FAST_PATH_ENABLED:
+        fast = _parse_nanp_fast(cleaned_input, default_region)
+        if fast is not None:
+            return fast
+
+    # Parse the number (default to US if no country code)
+    try:
+        if cleaned_input.startswith('+'):
+            parsed_number = phonenumbers.parse(cleaned_input, None)
+        else:
+            parsed_number = phonenumbers.parse(cleaned_input, default_region)
+    except NumberParseException as e:
+        return ParsedPhone(valid=False, error=f'Invalid phone number format: {str(e)}')
+
+    valid = phonenumbers.is_valid_number(parsed_number)
+    region_code = phonenumbers.region_code_for_number(parsed_number)
+
+    # US numbers display as (XXX) XXX-XXXX, everything else internationally
+    if region_code == 'US':
+        formatted = phonenumbers.format_number(parsed_number, phonenumbers.PhoneNumberFormat.NATIONAL)
+    else:
+        formatted = phonenumbers.format_number(parsed_number, phonenumbers.PhoneNumberFormat.INTERNATIONAL)
+
+    return ParsedPhone(
+        valid=valid,
+        error=None if valid else 'Phone number is not valid',
+        normalized=phonenumbers.format_number(
+            parsed_number, phonenumbers.PhoneNumberFormat.E164
+        ) if valid else None,
+        region_code=region_code,
+        national_number=str(parsed_number.national_number),
+        formatted=formatted,
+        number=parsed_number,
+    )
+
+
+def validate_phone_number(phone_input: str) -> Dict[str, Any]:
+    """
+    Validate and parse phone number using phonenumbers library.
+    
+    Args:
+        phone_input: Raw phone number string
+        
+    Returns:
+        Dict with validation results and normalized number
+    """
+    parsed = parse_phone(phone_input)
+    if not parsed.valid:
         return {
             'valid': False,
-            'error': 'Phone number validation failed',
+            'error': parsed.error,
             'normalized': None
         }
+    
+    return {
+        'valid': True,
+        'normalized': parsed.normalized,
+        'country_code': parsed.region_code,
+        'error': None
+    }
 
 
 def clean_phone_input(phone_input: str) -> str:
@@ -125,14 +334,16 @@ def normalize_phone_number(phone_input: str, default_country: str = "US") -> Opt
     Returns:
         E.164 formatted phone number or None if invalid
     """
-    validation_result = validate_phone_number(phone_input)
-    return validation_result.get('normalized') if validation_result['valid'] else None
+    parsed = parse_phone(phone_input, default_country)
+    return parsed.normalized if parsed.valid else None
 
 
 def query_numverify_api(phone_number: str, api_key: str) -> Dict[str, Any]:
     """
     Query the NumVerify API for phone number information.
     
+    Uses the shared keep-alive client, which retries transient failures.
+    
     Args:
         phone_number: E.164 formatted phone number (without +)
         api_key: NumVerify API key
@@ -141,24 +352,29 @@ def query_numverify_api(phone_number: str, api_key: str) -> Dict[str, Any]:
         API response as dictionary
     """
     try:
-        # Remove + if present
-        clean_number = phone_number.lstrip('+')
-        
-        url = "http://apilayer.net/api/validate"
-        params = {
-            'access_key': api_key,
-            'number': clean_number,
-            'country_code': '',  # Auto-detect
-            'format': 1  # JSON format
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        
-        return response.json()
+        return numverify_client.validate(phone_number, api_key)
+    except NumVerifyUnavailable:
+        # Circuit open: expected during an outage, not worth an error per call
+        raise
+    except Exception as e:
+        logger.error(f"NumVerify API error: {str(e)}")
+        raise
+
+
+async def aquery_numverify_api(phone_number: str, api_key: str) -> Dict[str, Any]:
+    """
+    Async version of query_numverify_api() for the ASGI views.
+    
+    Args:
+        phone_number: E.164 formatted phone number (without +)
+        api_key: NumVerify API key
         
-    except requests.RequestException as e:
-        logger.error(f"NumVerify API request failed: {str(e)}")
+    Returns:
+        API response as dictionary
+    """
+    try:
+        return await numverify_client.avalidate(phone_number, api_key)
+    except NumVerifyUnavailable:
         raise
     except Exception as e:
         logger.error(f"NumVerify API error: {str(e)}")
@@ -386,20 +602,14 @@ def format_phone_for_display(phone_number: str) -> str:
     Returns:
         Formatted phone number for display
     """
-    try:
-        parsed = phonenumbers.parse(phone_number, None)
-        country_code = phonenumbers.region_code_for_number(parsed)
-        
-        if country_code == 'US':
-            # Format US numbers as (XXX) XXX-XXXX
-            return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.NATIONAL)
-        else:
-            # Format international numbers
-            return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.INTERNATIONAL)
-            
-    except Exception as e:
-        logger.warning(f"Phone formatting error for {phone_number}: {str(e)}")
+    # US numbers come back as (XXX) XXX-XXXX, international ones in
+    # international format (see parse_phone)
+    parsed = parse_phone(phone_number, None)
+    if not parsed.formatted:
+        logger.warning(f"Phone formatting error for {phone_number}: {parsed.error}")
         return phone_number
+    
+    return parsed.formatted
 
 
 def extract_area_code(phone_number: str) -> Optional[str]:
@@ -412,20 +622,8 @@ def extract_area_code(phone_number: str) -> Optional[str]:
     Returns:
         Area code or None if not found/applicable
     """
-    try:
-        parsed = phonenumbers.parse(phone_number, None)
-        
-        # Only extract area code for US/Canada numbers
-        country_code = phonenumbers.region_code_for_number(parsed)
-        if country_code in ['US', 'CA']:
-            national_number = str(parsed.national_number)
-            if len(national_number) >= 10:
-                return national_number[:3]
-                
-    except Exception as e:
-        logger.warning(f"Area code extraction error for {phone_number}: {str(e)}")
-    
-    return None
+    # Only US/Canada numbers have an area code (see ParsedPhone.area_code)
+    return parse_phone(phone_number, None).area_code
 
 
 def get_phone_number_type_description(line_type: str) -> str:
@@ -0,0 +1,241 @@
+"""
+Vectorized NANP normalization for batches of raw phone number strings.
+
+normalize_nanp() does for a whole array what clean_phone_input(),
+is_valid_us_phone() and the NANP fast path in parse_phone() do for one
+string, using NumPy array operations instead of a Python loop:
+
+1. the strings become a 2-D array of code points, one row per input
+2. the columns are scanned left to right, folding each row's digits into
+   one integer (value * 10 + digit) and counting them, so no per-row
+   string is ever built
+3. length, leading 1 / +1 country code and the NPA/NXX structure rules are
+   checked on whole columns at once
+
+The result holds integer NPA, NXX and line columns plus a validity mask
+and per-row error codes; E.164 and display strings are built from the
+integers on demand, again without a Python loop. Rows that fail here may
+still be valid non-NANP numbers, so callers that need a full answer pass
+only those rows on to parse_phone().
+"""
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Rows are processed in blocks of this many to keep the (rows x width)
+# working array and the per-row columns small enough to stay in cache
+BLOCK_ROWS = 1 << 14
+
+# Longer inputs can't be a formatted NANP number and are rejected up front,
+# before the array is built, so one long input can't widen every row
+MAX_INPUT_WIDTH = 64
+
+# Error codes in NANPBatch.error
+OK = 0
+ERROR_LENGTH = 1        # not 10 digits, or 11 starting with 1
+ERROR_COUNTRY = 2       # has a + country code other than +1
+ERROR_AREA_CODE = 3     # NPA starts with 0/1 or is an N11 service code
+ERROR_EXCHANGE = 4      # NXX starts with 0/1
+ERROR_INPUT = 5         # not a string or integer, or longer than MAX_INPUT_WIDTH
+
+ERROR_MESSAGES = {
+    OK: None,
+    ERROR_LENGTH: 'US phone numbers have 10 digits',
+    ERROR_COUNTRY: 'Only US phone numbers are supported',
+    ERROR_AREA_CODE: 'Area code is not valid',
+    ERROR_EXCHANGE: 'Exchange code is not valid',
+    ERROR_INPUT: f'Phone numbers must be strings of at most {MAX_INPUT_WIDTH} characters',
+}
+
+_DIGIT_0 = ord('0')
+
+# 10 ** k, for splitting national numbers back into digits
+_POWERS = 10 ** np.arange(12, dtype=np.int64)
+
+
+class NANPBatch:
+    """Column-oriented result of normalize_nanp(), one entry per input"""
+
+    __slots__ = ('valid', 'error', 'npa', 'nxx', 'line')
+
+    def __init__(self, valid: np.ndarray, error: np.ndarray, npa: np.ndarray,
+                 nxx: np.ndarray, line: np.ndarray):
+        self.valid = valid
+        self.error = error
+        self.npa = npa
+        self.nxx = nxx
+        self.line = line
+
+    def __len__(self):
+        return len(self.valid)
+
+    @property
+    def national(self) -> np.ndarray:
+        """10-digit national numbers as int64 (0 for invalid rows)"""
+        return (self.npa.astype(np.int64) * 10000000
+                + self.nxx.astype(np.int64) * 10000
+                + self.line.astype(np.int64))
+
+    @property
+    def exchange_slot(self) -> np.ndarray:
+        """NPA * 1000 + NXX, the index used by lookup.nanp.NANPTable"""
+        return self.npa.astype(np.int32) * 1000 + self.nxx.astype(np.int32)
+
+    def _digit_bytes(self, template: bytes, positions: List[int]) -> np.ndarray:
+        # Fill the digit positions of a fixed-width byte template from national
+        out = np.empty((len(self), len(template)), dtype=np.uint8)
+        out[:] = np.frombuffer(template, dtype=np.uint8)
+        national = self.national
+        for power, position in zip(range(9, -1, -1), positions):
+            out[:, position] = (national // _POWERS[power]) % 10 + _DIGIT_0
+        return out.view(f'S{len(template)}').ravel()
+
+    def e164(self) -> np.ndarray:
+        """'+1NXXNXXXXXX' byte strings (b'' for invalid rows)"""
+        out = self._digit_bytes(b'+1XXXXXXXXXX', list(range(2, 12)))
+        out[~self.valid] = b''
+        return out
+
+    def formatted(self) -> np.ndarray:
+        """'(NXX) NXX-XXXX' byte strings (b'' for invalid rows)"""
+        out = self._digit_bytes(b'(XXX) XXX-XXXX', [1, 2, 3, 6, 7, 8, 10, 11, 12, 13])
+        out[~self.valid] = b''
+        return out
+
+    def e164_list(self) -> List[Optional[str]]:
+        """E.164 strings as a Python list, None for invalid rows"""
+        return [number.decode() or None for number in self.e164().tolist()]
+
+    def error_messages(self) -> List[Optional[str]]:
+        return [ERROR_MESSAGES[code] for code in self.error.tolist()]
+
+
+def input_text(value: Any) -> Optional[str]:
+    """
+    The text of one raw input, or None if it can't be a phone number.
+
+    Strings, bytes and integers are accepted (None counts as empty); lists,
+    objects, floats and anything longer than MAX_INPUT_WIDTH are not.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', errors='replace')
+    elif isinstance(value, int) and not isinstance(value, bool):
+        value = str(value)
+    elif not isinstance(value, str):
+        return None
+    return value if len(value) <= MAX_INPUT_WIDTH else None
+
+
+def _as_code_points(values) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Raw inputs as a (rows, width) array of character codes, at most
+    MAX_INPUT_WIDTH wide, and a mask of the rows rejected by input_text()
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'SU':
+        # Already allocated by the caller; only the first columns are read
+        array = np.ascontiguousarray(values.ravel())
+        rejected = None
+    else:
+        texts = [input_text(value) for value in values]
+        rejected = np.fromiter((text is None for text in texts), dtype=bool, count=len(texts))
+        array = np.asarray(['' if text is None else text for text in texts], dtype=np.str_)
+
+    unit = np.uint8 if array.dtype.kind == 'S' else np.uint32
+    width = array.dtype.itemsize // np.dtype(unit).itemsize
+    if width == 0:
+        chars = np.zeros((len(array), 1), dtype=unit)
+    else:
+        chars = array.view(unit).reshape(len(array), width)
+    if rejected is None:
+        rejected = np.zeros(len(array), dtype=bool)
+        if width > MAX_INPUT_WIDTH:
+            rejected = chars[:, MAX_INPUT_WIDTH:].any(axis=1)
+            chars = chars[:, :MAX_INPUT_WIDTH]
+    return chars, rejected
+
+
+def _normalize_block(chars: np.ndarray, out: NANPBatch, start: int):
+    rows = len(chars)
+    # Character code minus '0': digits become 0-9, everything else wraps
+    # around to a large unsigned value. Column-major so each column scanned
+    # below is contiguous.
+    offsets = np.asfortranarray(chars - chars.dtype.type(_DIGIT_0))
+    plus_offset = chars.dtype.type((ord('+') - _DIGIT_0) % (np.iinfo(chars.dtype).max + 1))
+
+    value = np.zeros(rows, dtype=np.int64)
+    count = np.zeros(rows, dtype=np.int16)
+    # A + before the first digit means the digits start with a country code
+    has_plus = np.zeros(rows, dtype=bool)
+    shifted = np.empty(rows, dtype=np.int64)
+    for column in offsets.T:
+        is_digit = column < 10
+        # Rows with more than 11 digits may overflow here; they're rejected
+        # on length below, so the wrapped value is never used
+        np.multiply(value, 10, out=shifted)
+        shifted += column
+        np.copyto(value, shifted, where=is_digit)
+        has_plus |= (column == plus_offset) & (count == 0)
+        count += is_digit
+
+    leading_one = (count == 11) & (value // _POWERS[10] == 1)
+    national = np.where(leading_one, value - _POWERS[10], value)
+
+    error = np.full(rows, OK, dtype=np.uint8)
+    error[~((count == 10) | leading_one)] = ERROR_LENGTH
+    # +1 followed by 10 digits is NANP; any other country code isn't
+    error[has_plus & ~leading_one] = ERROR_COUNTRY
+
+    npa = national // 10000000
+    nxx = (national // 10000) % 1000
+    line = national % 10000
+    # N11 codes (211, 411, 911...) are never area codes; phonenumbers
+    # accepts them as exchanges, so they're only rejected as the NPA
+    error[(error == OK) & ((npa < 200) | (npa % 100 == 11))] = ERROR_AREA_CODE
+    error[(error == OK) & (nxx < 200)] = ERROR_EXCHANGE
+
+    valid = error == OK
+    end = start + rows
+    out.valid[start:end] = valid
+    out.error[start:end] = error
+    out.npa[start:end] = np.where(valid, npa, 0)
+    out.nxx[start:end] = np.where(valid, nxx, 0)
+    out.line[start:end] = np.where(valid, line, 0)
+
+
+def normalize_nanp(values: Iterable, block_rows: int = BLOCK_ROWS) -> NANPBatch:
+    """
+    Normalize and validate a batch of raw US phone number strings.
+
+    Accepts the same formatting clean_phone_input() does: every non-digit
+    is ignored, a leading 1 or +1 is dropped, and any other + country code
+    is rejected. The NPA (area code) and NXX (exchange) must start with 2-9,
+    and the NPA must not be an N11 service code.
+
+    Args:
+        values: Sequence or NumPy array of raw inputs (str, bytes or int;
+            None is empty, anything else fails with ERROR_INPUT)
+        block_rows: Rows processed per block
+
+    Returns:
+        NANPBatch with validity, error codes and NPA/NXX/line columns
+    """
+    chars, rejected = _as_code_points(values)
+    rows = len(chars)
+
+    out = NANPBatch(
+        valid=np.zeros(rows, dtype=bool),
+        error=np.zeros(rows, dtype=np.uint8),
+        npa=np.zeros(rows, dtype=np.int16),
+        nxx=np.zeros(rows, dtype=np.int16),
+        line=np.zeros(rows, dtype=np.int16),
+    )
+    for start in range(0, rows, block_rows):
+        _normalize_block(chars[start:start + block_rows], out, start)
+
+    if rejected.any():
+        out.valid[rejected] = False
+        out.error[rejected] = ERROR_INPUT
+        out.npa[rejected] = out.nxx[rejected] = out.line[rejected] = 0
+    return out
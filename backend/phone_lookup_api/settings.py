@@ -12,7 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -48,13 +48,14 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'lookup.middleware.BlocklistMiddleware',  # Blocked IPs/networks, before anything else runs
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    #'lookup.middleware.RateLimitMiddleware',  # Custom rate limiting
+    'lookup.middleware.RateLimitMiddleware',  # Custom rate limiting
 ]
 
 ROOT_URLCONF = 'phone_lookup_api.urls'
@@ -76,6 +77,9 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'phone_lookup_api.wsgi.application'
+# Route the search endpoints to lookup.async_views. Enable when serving
+# through ASGI (uvicorn/daphne); under WSGI the sync views are cheaper.
+LOOKUP_ASYNC_VIEWS = config('LOOKUP_ASYNC_VIEWS', default=False, cast=bool)
 
 
 # Database
@@ -208,6 +212,48 @@ if config('REDIS_URL', default=None):
         }
     }
 
+# In-process L1 cache in front of CACHES['default'] for search results
+# (lookup.caching). Entries stay at most SEARCH_CACHE_L1_TTL seconds in a
+# worker; invalidations are replayed every SEARCH_CACHE_SYNC_INTERVAL seconds.
+# Misses are remembered for SEARCH_CACHE_NEGATIVE_TTL only while
+# CACHES['default'] is process-local (LocMemCache).
+SEARCH_CACHE_L1_MAX_ENTRIES = config('SEARCH_CACHE_L1_MAX_ENTRIES', default=2048, cast=int)
+SEARCH_CACHE_L1_TTL = config('SEARCH_CACHE_L1_TTL', default=30, cast=int)
+SEARCH_CACHE_NEGATIVE_TTL = config('SEARCH_CACHE_NEGATIVE_TTL', default=5, cast=int)
+SEARCH_CACHE_SYNC_INTERVAL = config('SEARCH_CACHE_SYNC_INTERVAL', default=1, cast=int)
+
+# Search results are fresh for SEARCH_CACHE_TIMEOUT seconds, then served
+# stale for up to SEARCH_CACHE_STALE_TTL more while refreshed in the
+# background. SEARCH_CACHE_XFETCH_BETA > 1 refreshes earlier, 0 disables.
+SEARCH_CACHE_TIMEOUT = config('SEARCH_CACHE_TIMEOUT', default=3600, cast=int)
+SEARCH_CACHE_STALE_TTL = config('SEARCH_CACHE_STALE_TTL', default=86400, cast=int)
+SEARCH_CACHE_XFETCH_BETA = config('SEARCH_CACHE_XFETCH_BETA', default=1.0, cast=float)
+SEARCH_CACHE_REFRESH_WORKERS = config('SEARCH_CACHE_REFRESH_WORKERS', default=4, cast=int)
+
+# Miss coalescing: one worker recomputes a key under a lease of
+# SEARCH_CACHE_LEASE_TIMEOUT seconds while others wait up to LEASE_WAIT
+SEARCH_CACHE_LEASE_TIMEOUT = config('SEARCH_CACHE_LEASE_TIMEOUT', default=10, cast=int)
+SEARCH_CACHE_LEASE_WAIT = config('SEARCH_CACHE_LEASE_WAIT', default=2, cast=float)
+
+# Durable L3 tier in the APIResponseCache table; hit counts are written in
+# batches every SEARCH_CACHE_HIT_FLUSH_INTERVAL seconds or THRESHOLD hits
+SEARCH_CACHE_DURABLE = config('SEARCH_CACHE_DURABLE', default=True, cast=bool)
+SEARCH_CACHE_HIT_FLUSH_INTERVAL = config('SEARCH_CACHE_HIT_FLUSH_INTERVAL', default=60, cast=int)
+SEARCH_CACHE_HIT_FLUSH_THRESHOLD = config('SEARCH_CACHE_HIT_FLUSH_THRESHOLD', default=500, cast=int)
+
+# Search cache keys (lookup.cache_keys) carry a version per search type;
+# `manage.py bump_cache_version <kind>` invalidates a type, and workers pick
+# up new versions within CACHE_KEY_VERSION_SYNC_INTERVAL seconds
+CACHE_KEY_VERSION_SYNC_INTERVAL = config('CACHE_KEY_VERSION_SYNC_INTERVAL', default=5, cast=int)
+
+# SearchLog rows are queued and bulk-inserted by a background thread every
+# SEARCH_LOG_BATCH_SIZE rows or SEARCH_LOG_FLUSH_INTERVAL seconds. Rows are
+# dropped (and counted) once SEARCH_LOG_QUEUE_SIZE are waiting.
+SEARCH_LOG_ASYNC = config('SEARCH_LOG_ASYNC', default=True, cast=bool)
+SEARCH_LOG_BATCH_SIZE = config('SEARCH_LOG_BATCH_SIZE', default=100, cast=int)
+SEARCH_LOG_FLUSH_INTERVAL = config('SEARCH_LOG_FLUSH_INTERVAL', default=2.0, cast=float)
+SEARCH_LOG_QUEUE_SIZE = config('SEARCH_LOG_QUEUE_SIZE', default=10000, cast=int)
+
 
 # Logging Configuration
 LOGGING = {
@@ -260,6 +306,74 @@ os.makedirs(os.path.join(BASE_DIR, 'logs'), exist_ok=True)
 
 # API Keys and External Services
 NUMVERIFY_API_KEY = config('NUMVERIFY_API_KEY', default='')
+
+# NumVerify client (lookup.numverify): one keep-alive pool per process,
+# separate connect/read timeouts, jittered retries on transient failures.
+# A call waits at most NUMVERIFY_POOL_TIMEOUT seconds for a free connection.
+NUMVERIFY_API_URL = config('NUMVERIFY_API_URL', default='http://apilayer.net/api/validate')
+NUMVERIFY_POOL_SIZE = config('NUMVERIFY_POOL_SIZE', default=10, cast=int)
+NUMVERIFY_POOL_TIMEOUT = config('NUMVERIFY_POOL_TIMEOUT', default=1.0, cast=float)
+NUMVERIFY_CONNECT_TIMEOUT = config('NUMVERIFY_CONNECT_TIMEOUT', default=3.05, cast=float)
+NUMVERIFY_READ_TIMEOUT = config('NUMVERIFY_READ_TIMEOUT', default=10, cast=float)
+NUMVERIFY_MAX_RETRIES = config('NUMVERIFY_MAX_RETRIES', default=2, cast=int)
+NUMVERIFY_BACKOFF_BASE = config('NUMVERIFY_BACKOFF_BASE', default=0.2, cast=float)
+NUMVERIFY_BACKOFF_MAX = config('NUMVERIFY_BACKOFF_MAX', default=2.0, cast=float)
+
+# Enrich phone results from NumVerify (needs NUMVERIFY_API_KEY). Calls go
+# through a per-process circuit breaker: it opens for OPEN_SECONDS once
+# FAILURE_RATE of at least MIN_CALLS calls in the last WINDOW seconds
+# failed. The read timeout tracks TIMEOUT_MULTIPLIER x the p(PERCENTILE)
+# latency, between NUMVERIFY_MIN_READ_TIMEOUT and NUMVERIFY_READ_TIMEOUT.
+NUMVERIFY_ENABLED = config('NUMVERIFY_ENABLED', default=False, cast=bool)
+NUMVERIFY_BREAKER_WINDOW = config('NUMVERIFY_BREAKER_WINDOW', default=30, cast=int)
+NUMVERIFY_BREAKER_MIN_CALLS = config('NUMVERIFY_BREAKER_MIN_CALLS', default=20, cast=int)
+NUMVERIFY_BREAKER_FAILURE_RATE = config('NUMVERIFY_BREAKER_FAILURE_RATE', default=0.5, cast=float)
+NUMVERIFY_BREAKER_OPEN_SECONDS = config('NUMVERIFY_BREAKER_OPEN_SECONDS', default=30, cast=float)
+NUMVERIFY_BREAKER_HALF_OPEN_CALLS = config('NUMVERIFY_BREAKER_HALF_OPEN_CALLS', default=3, cast=int)
+NUMVERIFY_TIMEOUT_PERCENTILE = config('NUMVERIFY_TIMEOUT_PERCENTILE', default=0.99, cast=float)
+NUMVERIFY_TIMEOUT_MULTIPLIER = config('NUMVERIFY_TIMEOUT_MULTIPLIER', default=2.0, cast=float)
+NUMVERIFY_MIN_READ_TIMEOUT = config('NUMVERIFY_MIN_READ_TIMEOUT', default=0.5, cast=float)
+
+# External data providers (lookup.providers) queried alongside the local
+# data, e.g. "numverify,stub". They run concurrently; a request slower than
+# the provider's p95 (at least PROVIDER_HEDGE_MIN_DELAY) is hedged with a
+# second one, and whatever hasn't answered by PROVIDER_TIMEOUT is skipped.
+# When every provider fails, the local result stays fresh for
+# PROVIDER_FALLBACK_CACHE_TTL seconds.
+LOOKUP_PROVIDERS = config('LOOKUP_PROVIDERS', default='numverify', cast=Csv())
+PROVIDER_TIMEOUT = config('PROVIDER_TIMEOUT', default=5.0, cast=float)
+PROVIDER_HEDGING = config('PROVIDER_HEDGING', default=True, cast=bool)
+PROVIDER_HEDGE_MIN_DELAY = config('PROVIDER_HEDGE_MIN_DELAY', default=0.05, cast=float)
+PROVIDER_MAX_WORKERS = config('PROVIDER_MAX_WORKERS', default=32, cast=int)
+PROVIDER_FALLBACK_CACHE_TTL = config('PROVIDER_FALLBACK_CACHE_TTL', default=300, cast=int)
+
+# Background checks (lookup.background) query their record sources
+# concurrently, and /api/search/background/stream/ sends each source's
+# sections as it answers. BACKGROUND_SOURCES assigns sources to providers
+# from LOOKUP_PROVIDERS, e.g. "criminal=stub,court=stub" (unlisted sources
+# use the local data). A source that hasn't answered after
+# BACKGROUND_SOURCE_TIMEOUT seconds, or its own BACKGROUND_SOURCE_TIMEOUTS
+# entry ("criminal=12"), is left out.
+BACKGROUND_SOURCES = config('BACKGROUND_SOURCES', default='', cast=Csv())
+BACKGROUND_SOURCE_TIMEOUT = config('BACKGROUND_SOURCE_TIMEOUT', default=8.0, cast=float)
+BACKGROUND_SOURCE_TIMEOUTS = config('BACKGROUND_SOURCE_TIMEOUTS', default='', cast=Csv())
+
+# Background check jobs (POST /api/search/background/jobs/, lookup.jobs) are
+# run by `manage.py run_job_worker` processes that claim them from the
+# database, checking for work every JOB_POLL_INTERVAL seconds. A job whose
+# worker hasn't finished it within JOB_LEASE_SECONDS is requeued, up to
+# JOB_MAX_ATTEMPTS runs. Finished jobs are kept for JOB_RESULT_TTL seconds;
+# callbacks wait JOB_CALLBACK_TIMEOUT seconds for a response and are tried
+# at most JOB_CALLBACK_MAX_ATTEMPTS times. Callback URLs must resolve to
+# public addresses; JOB_CALLBACK_ALLOWED_HOSTS, if set, also limits them to
+# those hosts ('.example.com' matches subdomains too).
+JOB_POLL_INTERVAL = config('JOB_POLL_INTERVAL', default=1.0, cast=float)
+JOB_LEASE_SECONDS = config('JOB_LEASE_SECONDS', default=120, cast=int)
+JOB_MAX_ATTEMPTS = config('JOB_MAX_ATTEMPTS', default=3, cast=int)
+JOB_RESULT_TTL = config('JOB_RESULT_TTL', default=86400, cast=int)
+JOB_CALLBACK_TIMEOUT = config('JOB_CALLBACK_TIMEOUT', default=5, cast=int)
+JOB_CALLBACK_MAX_ATTEMPTS = config('JOB_CALLBACK_MAX_ATTEMPTS', default=5, cast=int)
+JOB_CALLBACK_ALLOWED_HOSTS = config('JOB_CALLBACK_ALLOWED_HOSTS', default='', cast=Csv())
 AFFILIATE_URL_TRUTHFINDER = config(
     'AFFILIATE_URL_TRUTHFINDER', 
     default='https://www.truthfinder.com/?a=default&o=100265&utm_source=numberlookup'
@@ -270,6 +384,72 @@ PHONE_CACHE_TTL_HOURS = config('PHONE_CACHE_TTL_HOURS', default=168, cast=int)
 MAX_PHONE_LOOKUPS_PER_IP_HOUR = config('MAX_PHONE_LOOKUPS_PER_IP_HOUR', default=50, cast=int)
 MAX_PHONE_LOOKUPS_PER_IP_DAY = config('MAX_PHONE_LOOKUPS_PER_IP_DAY', default=100, cast=int)
 
+# Sliding-window limits above, enforced per IP by lookup.middleware on paths
+# starting with RATE_LIMIT_PATHS; bulk lookups count once per number.
+# Polling a background check job is limited separately, to
+# JOB_POLL_RATE_LIMIT_PER_MINUTE requests. Counters live in
+# CACHES['default']; the IPRateLimit admin table is refreshed every
+# RATE_LIMIT_SNAPSHOT_INTERVAL seconds (0 disables the snapshots).
+RATE_LIMIT_ENABLED = config('RATE_LIMIT_ENABLED', default=True, cast=bool)
+RATE_LIMIT_PATHS = config('RATE_LIMIT_PATHS', default='/api/search/', cast=Csv())
+RATE_LIMIT_SNAPSHOT_INTERVAL = config('RATE_LIMIT_SNAPSHOT_INTERVAL', default=60, cast=int)
+JOB_POLL_RATE_LIMIT_PER_MINUTE = config('JOB_POLL_RATE_LIMIT_PER_MINUTE', default=120, cast=int)
+
+# Number of reverse proxies (load balancer, nginx) in front of Django that
+# append to X-Forwarded-For. Rate limits and blocks key off REMOTE_ADDR when
+# 0, else off the X-Forwarded-For entry the outermost trusted proxy added;
+# set it to match the deployment or clients can pick their own address.
+TRUSTED_PROXY_COUNT = config('TRUSTED_PROXY_COUNT', default=0, cast=int)
+
+# Requests to BLOCKLIST_PATHS from BlockedNetwork ranges or blocked IPRateLimit
+# clients get a 403 (lookup.blocklist). Each worker checks for changes at
+# most every BLOCKLIST_SYNC_INTERVAL seconds.
+BLOCKLIST_ENABLED = config('BLOCKLIST_ENABLED', default=True, cast=bool)
+BLOCKLIST_PATHS = config('BLOCKLIST_PATHS', default='/api/', cast=Csv())
+BLOCKLIST_SYNC_INTERVAL = config('BLOCKLIST_SYNC_INTERVAL', default=5, cast=int)
+
+# People search matches names fuzzily against an in-memory index of
+# PersonRecord (lookup.people). Workers check for changed records at most
+# every PEOPLE_INDEX_SYNC_INTERVAL seconds and rebuild in the background.
+PEOPLE_SEARCH_MAX_RESULTS = config('PEOPLE_SEARCH_MAX_RESULTS', default=10, cast=int)
+PEOPLE_INDEX_SYNC_INTERVAL = config('PEOPLE_INDEX_SYNC_INTERVAL', default=30, cast=int)
+
+# POST /api/search/phone/bulk/: numbers per request, and threads used to
+# compute cache misses when external providers are configured
+PHONE_BULK_MAX_NUMBERS = config('PHONE_BULK_MAX_NUMBERS', default=5000, cast=int)
+PHONE_BULK_WORKERS = config('PHONE_BULK_WORKERS', default=8, cast=int)
+
+# Streamed bulk lookups (/api/search/phone/bulk/stream/, manage.py
+# bulk_phone_lookup) read and look up this many numbers at a time
+PHONE_BULK_CHUNK_SIZE = config('PHONE_BULK_CHUNK_SIZE', default=500, cast=int)
+
+# Per-process LRU of parsed phone numbers (lookup.utils.parse_phone)
+PHONE_PARSE_CACHE_SIZE = config('PHONE_PARSE_CACHE_SIZE', default=10000, cast=int)
+
+# Per-number search counts (PhoneNumberAnalytics, PopularSearch) are buffered
+# in memory and flushed every SEARCH_ANALYTICS_FLUSH_INTERVAL seconds, or as
+# soon as SEARCH_ANALYTICS_MAX_BUFFER distinct numbers are waiting
+SEARCH_ANALYTICS_ENABLED = config('SEARCH_ANALYTICS_ENABLED', default=True, cast=bool)
+SEARCH_ANALYTICS_FLUSH_INTERVAL = config('SEARCH_ANALYTICS_FLUSH_INTERVAL', default=30, cast=int)
+SEARCH_ANALYTICS_MAX_BUFFER = config('SEARCH_ANALYTICS_MAX_BUFFER', default=5000, cast=int)
+
+# Trending numbers (manage.py update_trending): searches are weighted by
+# 0.5 ** (age / TRENDING_HALF_LIFE_HOURS) over the last TRENDING_WINDOW_HOURS,
+# and the TRENDING_TOP_K best scoring at least TRENDING_MIN_SCORE are trending
+TRENDING_WINDOW_HOURS = config('TRENDING_WINDOW_HOURS', default=168, cast=int)
+TRENDING_HALF_LIFE_HOURS = config('TRENDING_HALF_LIFE_HOURS', default=24, cast=float)
+TRENDING_TOP_K = config('TRENDING_TOP_K', default=100, cast=int)
+TRENDING_MIN_SCORE = config('TRENDING_MIN_SCORE', default=10.0, cast=float)
+
+# Optional NPA-NXX dataset (CSV with npa,nxx,location,carrier columns) layered
+# on top of the built-in area code data by lookup.nanp
+NANP_EXCHANGE_DATASET = config('NANP_EXCHANGE_DATASET', default='')
+
+# Compiled dataset written by `manage.py build_nanp_dataset` and mmap'd by
+# every worker; replaced files are picked up within NANP_RELOAD_INTERVAL seconds
+NANP_DATASET_FILE = config('NANP_DATASET_FILE', default=os.path.join(BASE_DIR, 'data', 'nanp.bin'))
+NANP_RELOAD_INTERVAL = config('NANP_RELOAD_INTERVAL', default=5, cast=int)
+
 # Security Settings
 if not DEBUG:
     # Production security settings